@@ -0,0 +1,108 @@
+"""
+Cold-start latency of main.py for each tool path, measured with python -X importtime.
+
+Each run starts a fresh interpreter that answers one query through main.main().
+The planner response is fixed per tool and the weather and currency tools talk
+to the local upstream stub, so only startup, imports and the tool path itself
+are measured. The tool module is imported with an import statement before the
+query runs because importtime does not report modules loaded through
+importlib.import_module, which is how the agent loads tools lazily.
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+import time
+
+from bench_utils import summarize
+
+from agent.stubs.upstream_server import UpstreamStubServer
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+DEFAULT_RUNS = 5
+TOP_IMPORTS = 5
+
+PLANS = {
+    "calculator": {"tool": "calculator", "args": {"operand": "%", "operator_1": 12.5, "operator_2": 243}},
+    "currency_converter": {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}},
+    "weather": {"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-19"}},
+    "knowledge_base": {"tool": "knowledge_base", "args": {"query": "Ada Lovelace"}},
+}
+
+TOOL_MODULES = {
+    "calculator": "agent.tools.calculator",
+    "currency_converter": "agent.tools.currency_converter",
+    "weather": "agent.tools.weather",
+    "knowledge_base": "agent.tools.knowledge_loader",
+}
+
+DRIVER = """
+import sys, json
+import main
+import agent.llm.planner as planner
+plan, weather_url, currency_url = json.loads(sys.argv[1]), sys.argv[2], sys.argv[3]
+exec("import " + sys.argv[4])
+planner.ask_to_llm = lambda *args: {"top_matched_titles": ["Ada Lovelace"]} if len(args) > 2 else "answer"
+planner.initiate_planner = lambda query: plan
+if plan["tool"] == "weather":
+    import agent.tools.weather as weather
+    weather.BASE_URL = weather_url
+if plan["tool"] == "currency_converter":
+    import agent.tools.currency_converter as currency_converter
+    currency_converter.BASE_URL = currency_url
+sys.argv = ["main.py", "benchmark query"]
+main.main()
+"""
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Get the cumulative import time of every module imported by the driver.
+
+    Returns:
+        dict[str, float]: Milliseconds keyed by module name.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative) / 1000
+    return imports
+
+def run_once(tool: str, server: UpstreamStubServer) -> tuple[float, dict]:
+    environment = dict(os.environ, WEATHER_API_KEY="benchmark", EXCHANGE_RATE_API_KEY="benchmark")
+    command = [sys.executable, "-X", "importtime", "-c", DRIVER, json.dumps(PLANS[tool]), server.weather_url, server.currency_url, TOOL_MODULES[tool]]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=SRC_PATH, env=environment, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - started) * 1000, parse_importtime(completed.stderr)
+
+def run(tool: str, runs: int, server: UpstreamStubServer) -> dict:
+    latencies = []
+    import_times = []
+    for _ in range(runs):
+        latency, imports = run_once(tool, server)
+        latencies.append(latency)
+        import_times.append(imports)
+
+    last_imports = import_times[-1]
+    top_level = [name for name in last_imports if name in ("main", "requests", "httpx", "dotenv", "sqlite3", "asyncio")
+                 or name.startswith("agent.tools.") or name.startswith("agent.llm.")]
+    median_imports = {name: round(statistics.median(imports.get(name, 0.0) for imports in import_times), 2) for name in top_level}
+    return {
+        "tool": tool,
+        "runs": runs,
+        "process": summarize(latencies),
+        "import_ms": dict(sorted(median_imports.items(), key=lambda item: -item[1])[:TOP_IMPORTS]),
+    }
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    with UpstreamStubServer() as server:
+        for tool in PLANS:
+            print(json.dumps(run(tool, runs, server)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare the calculator's operand dispatch with compiled expressions.
+
+"dispatch" prices one operation per calculate() call, "cached" evaluates
+expressions whose template is already compiled and "compile" clears the
+cache before every expression, so the compiler runs on each call.
+
+Usage: python benchmarks/bench_expression.py [calls]
+"""
+import sys
+import json
+import random
+
+from bench_utils import time_calls, summarize
+
+from agent.tools.calculator import calculate, OPERAND, OPERATOR_1, OPERATOR_2
+from agent.tools.expression import evaluate_expression, clear_expression_cache, expression_cache_stats
+
+DEFAULT_CALLS = 20_000
+TEMPLATES = ["({} % {}) + {} / {}", "{} * {} - {}", "-{} + {} / {}", "({} + {}) * ({} - {})"]
+
+def numbers(generator: random.Random, count: int) -> list:
+    return [round(generator.uniform(0, 1000), 2) for _ in range(count)]
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CALLS
+    generator = random.Random(calls)
+
+    rows = [
+        {OPERAND: generator.choice("+-*/%"), OPERATOR_1: operators[0], OPERATOR_2: operators[1]}
+        for operators in (numbers(generator, 2) for _ in range(calls))
+    ]
+    cached = [template.format(*numbers(generator, template.count("{}"))) for template in generator.choices(TEMPLATES, k=calls)]
+    # The cache is cleared before each of these, so every call compiles its template
+    uncompiled = [template.format(*numbers(generator, template.count("{}"))) for template in generator.choices(TEMPLATES, k=calls)]
+
+    clear_expression_cache()
+    for template in TEMPLATES:
+        evaluate_expression(template.format(*[1] * template.count("{}")))
+
+    results = {
+        "calls": calls,
+        "dispatch": summarize(time_calls(calculate, rows)),
+        "cached": summarize(time_calls(evaluate_expression, cached)),
+    }
+    clear_expression_cache()
+    results["compile"] = summarize(time_calls(lambda expression: (clear_expression_cache(), evaluate_expression(expression)), uncompiled))
+    results["cache"] = expression_cache_stats()
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
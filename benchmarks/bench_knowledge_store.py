@@ -0,0 +1,97 @@
+"""
+Compare the JSON knowledge index with the memory-mapped knowledge store.
+
+For every size a synthetic knowledge base is written as JSON and converted to
+a store file. Each format is then opened in a fresh interpreter that reports
+the load time, the resident memory it added (anonymous memory is private to
+the process, file-backed memory is page cache shared with other processes
+mapping the same file) and the latency of looking up three titles and reading
+their entries.
+
+Usage: python benchmarks/bench_knowledge_store.py [size ...]
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+import subprocess
+
+from bench_utils import summarize, synthetic_entries
+
+from agent.tools.knowledge_loader import ENTRIES
+from agent.tools.knowledge_store import convert
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+LOOKUPS = 1_000
+TITLES_PER_LOOKUP = 3
+
+DRIVER = """
+import sys, json, time
+
+def memory_kb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return {name: int(fields[name].split()[0]) for name in ("RssAnon", "RssFile")}
+
+kind, path, lookups = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+from agent.tools import knowledge_loader
+from agent.tools.knowledge_store import KnowledgeStore
+
+before = memory_kb()
+started = time.perf_counter()
+if kind == "json":
+    knowledge_loader.KNOWLEDGE_SOURCE = path
+    index = knowledge_loader.get_knowledge_index()
+else:
+    index = KnowledgeStore(path)
+load_ms = (time.perf_counter() - started) * 1000
+
+latencies = []
+for titles in lookups:
+    started = time.perf_counter()
+    [index.entry(entry_id) for entry_id in index.find_exact_titles(titles)]
+    latencies.append((time.perf_counter() - started) * 1000)
+after = memory_kb()
+print(json.dumps({"load_ms": load_ms, "latencies": latencies, "anon_kb": after["RssAnon"] - before["RssAnon"], "file_kb": after["RssFile"] - before["RssFile"]}))
+"""
+
+def measure(kind: str, path: str, lookups: list) -> dict:
+    command = [sys.executable, "-c", DRIVER, kind, path, json.dumps(lookups)]
+    completed = subprocess.run(command, cwd=SRC_PATH, capture_output=True, text=True, check=True)
+    result = json.loads(completed.stdout)
+    return {
+        "load_ms": round(result["load_ms"], 1),
+        "rss_private_mb": round(result["anon_kb"] / 1024, 1),
+        "rss_shared_mb": round(result["file_kb"] / 1024, 1),
+        "lookup": summarize(result["latencies"]),
+    }
+
+def run(size: int, directory: str) -> dict:
+    entries = synthetic_entries(size)
+    source = os.path.join(directory, f"knowledge_base_{size}.json")
+    store = os.path.join(directory, f"knowledge_base_{size}.akb")
+    with open(source, "w") as f:
+        json.dump({ENTRIES: entries}, f)
+    convert(source, store)
+
+    generator = random.Random(size)
+    lookups = [[entry["title"] for entry in generator.sample(entries, TITLES_PER_LOOKUP)] for _ in range(LOOKUPS)]
+    del entries
+    return {
+        "size": size,
+        "json_mb": round(os.path.getsize(source) / 2 ** 20, 1),
+        "store_mb": round(os.path.getsize(store) / 2 ** 20, 1),
+        "json": measure("json", source, lookups),
+        "store": measure("store", store, lookups),
+    }
+
+def main() -> None:
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            print(json.dumps(run(size, directory)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput and tail latency of process_user_query against the local LLM stub.
+
+Knowledge base queries go through the LLM planner, title matching and the
+final answer, so each query makes up to three LLM calls over the pooled
+OpenAI compatible backend. The stub adds latency_ms before the first token
+and produces tokens at tokens_per_second.
+
+Usage: python benchmarks/bench_llm_backend.py [latency_ms] [tokens_per_second] [queries]
+"""
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from bench_utils import summarize, synthetic_entries
+
+from agent import agent
+from agent.llm import backend, planner
+from agent.llm.plan_cache import PlanCache
+from agent.stubs.llm_server import LLMStubServer
+from agent.tools import knowledge_loader
+
+DEFAULT_LATENCY_MS = 50
+DEFAULT_TOKENS_PER_SECOND = 500
+DEFAULT_QUERY_COUNT = 64
+CONCURRENCY_LEVELS = [1, 8, 32]
+KNOWLEDGE_BASE_SIZE = 1_000
+
+def timed_query(user_query: str) -> float:
+    started = time.perf_counter()
+    agent.process_user_query(user_query)
+    return (time.perf_counter() - started) * 1000
+
+def run(concurrency: int, queries: list, server: LLMStubServer) -> dict:
+    requests_before = server.request_count
+    with patch.object(planner, "_plan_cache", PlanCache()), ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        latencies = list(pool.map(timed_query, queries))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "queries": len(queries),
+        "queries_per_second": round(len(queries) / elapsed, 1),
+        "latency": summarize(latencies),
+        "llm_requests": server.request_count - requests_before,
+        "llm_connections": server.connection_count,
+    }
+
+def main() -> None:
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LATENCY_MS
+    tokens_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TOKENS_PER_SECOND
+    query_count = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_QUERY_COUNT
+
+    entries = synthetic_entries(KNOWLEDGE_BASE_SIZE)
+    queries = [f"What do you know about {entries[index % len(entries)]['title']}?" for index in range(query_count)]
+
+    with tempfile.TemporaryDirectory() as directory, LLMStubServer(latency_ms=latency_ms, tokens_per_second=tokens_per_second) as server:
+        source = os.path.join(directory, "knowledge_base.json")
+        with open(source, "w") as f:
+            json.dump({knowledge_loader.ENTRIES: entries}, f)
+
+        llm_backend = backend.OpenAICompatibleBackend(server.base_url)
+        backend.set_backend(llm_backend)
+        try:
+            with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source), contextlib.redirect_stdout(io.StringIO()):
+                knowledge_loader.reset_knowledge_index()
+                results = [run(concurrency, queries, server) for concurrency in CONCURRENCY_LEVELS]
+        finally:
+            backend.set_backend(None)
+            llm_backend.close()
+            knowledge_loader.reset_knowledge_index()
+
+    for result in results:
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
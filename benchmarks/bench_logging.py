@@ -0,0 +1,58 @@
+"""
+Measure the per-request cost of logging at each level.
+
+A request answers a knowledge base plan through dispatch_plan with the LLM
+calls patched out (context packing still runs), and lists the knowledge base titles, whose DEBUG record
+contains every entry. Records are written to os.devnull, so the numbers show
+the cost of building and formatting them rather than of the terminal.
+
+Usage: python benchmarks/bench_logging.py [size]
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+from unittest.mock import patch
+
+from bench_utils import summarize, synthetic_entries, time_calls
+
+from agent import agent, logger
+from agent.llm import planner
+from agent.tools import knowledge_loader
+
+DEFAULT_SIZE = 10_000
+REQUEST_COUNT = 200
+# (label, level, sample rate)
+CASES = [("ERROR", "ERROR", 1.0), ("WARNING", "WARNING", 1.0), ("INFO", "INFO", 1.0), ("DEBUG 1%", "DEBUG", 0.01), ("DEBUG", "DEBUG", 1.0)]
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    entries = synthetic_entries(size)
+    generator = random.Random(size)
+    plans = [{"tool": "knowledge_base", "args": {"query": generator.choice(entries)["title"]}} for _ in range(REQUEST_COUNT)]
+
+    def request(plan):
+        knowledge_loader.get_all_titles()
+        return agent.dispatch_plan(plan["args"]["query"], plan)
+
+    results = {"size": size}
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        source = os.path.join(directory, "knowledge_base.json")
+        with open(source, "w") as f:
+            json.dump({knowledge_loader.ENTRIES: entries}, f)
+
+        with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source), \
+                patch.object(planner, "find_top_matched_titles", side_effect=lambda query, titles: {"top_matched_titles": titles[:1]}), \
+                patch.object(planner, "ask_to_llm", return_value="answer"):
+            knowledge_loader.reset_knowledge_index()
+            knowledge_loader.get_knowledge_index()
+            for label, level, sample_rate in CASES:
+                logger.configure(level=level, sample_rate=sample_rate, stream=devnull)
+                results[label] = summarize(time_calls(request, plans))
+            logger.reset()
+            knowledge_loader.reset_knowledge_index()
+    print(json.dumps(results))
+
+if __name__ == "__main__":
+    main()
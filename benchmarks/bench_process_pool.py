@@ -0,0 +1,126 @@
+"""
+Measure how CPU-bound tool work scales with the process pool.
+
+A mixed workload of knowledge base lookups (BM25 shortlist plus entry
+lookup, without the LLM title pick) and batched calculator rows is run from
+a thread pool, first in-process with the JSON index (workers 0) and then with
+an increasing number of worker processes mapping one knowledge store file.
+Every level reports the throughput, its speedup over in-process, tail
+latency and the private resident memory of each worker (the mapped store is
+shared page cache and not counted). Speedups are bounded by the number of
+CPUs of the machine, which is reported too.
+
+Usage: python benchmarks/bench_process_pool.py [size] [requests] [worker counts ...]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from bench_utils import summarize, synthetic_entries
+
+from agent import agent, process_pool
+from agent.tools import knowledge_loader
+from agent.tools.calculator import OPERAND, OPERATOR_1, OPERATOR_2, ROWS
+from agent.tools.knowledge_store import convert
+
+DEFAULT_SIZE = 100_000
+DEFAULT_REQUESTS = 400
+CONCURRENCY = 16
+ROWS_PER_CALCULATION = 2_000
+SHORTLIST_SIZE = 50
+
+def build_workload(entries: list, count: int) -> list:
+    generator = random.Random(count)
+    workload = []
+    for _ in range(count):
+        if generator.random() < 0.75:
+            entry = generator.choice(entries)
+            workload.append((agent.KNOWLEDGE_BASE, " ".join(entry["title"].split()[:2] + entry["detail"].split()[:4])))
+        else:
+            rows = [
+                {OPERAND: generator.choice("+-*/%"), OPERATOR_1: generator.randint(1, 999), OPERATOR_2: generator.randint(1, 999)}
+                for _ in range(ROWS_PER_CALCULATION)
+            ]
+            workload.append((agent.CALCULATOR, {ROWS: rows}))
+    return workload
+
+def run_step(step: tuple, calculate) -> None:
+    tool, args = step
+    if tool == agent.CALCULATOR:
+        calculate(args)
+    else:
+        titles = agent.match_knowledge_titles(args, SHORTLIST_SIZE, confidence_threshold=0.0)
+        process_pool.run(knowledge_loader.search_titles_and_details, titles)
+
+def worker_memory_mb() -> list:
+    private_mb = []
+    for child in multiprocessing.active_children():
+        with open(f"/proc/{child.pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        private_mb.append(round(int(fields["RssAnon"].split()[0]) / 1024, 1))
+    return private_mb
+
+def measure(workers: int, workload: list, store: str) -> dict:
+    if workers:
+        process_pool.enable(workers, store)
+    try:
+        calculate = agent.plan_tools()[agent.CALCULATOR]
+        # Start the workers and map the store before timing
+        for step in workload[:workers * 2 or 1]:
+            run_step(step, calculate)
+
+        latencies = []
+
+        def timed(step):
+            started = time.perf_counter()
+            run_step(step, calculate)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENCY) as threads:
+            list(threads.map(timed, workload))
+        elapsed = time.perf_counter() - started
+        return {
+            "workers": workers,
+            "requests": len(workload),
+            "requests_per_second": round(len(workload) / elapsed, 1),
+            "latency": summarize(latencies),
+            "worker_private_mb": worker_memory_mb() if workers else [],
+        }
+    finally:
+        process_pool.disable()
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REQUESTS
+    cpus = os.cpu_count() or 1
+    worker_counts = [int(count) for count in sys.argv[3:]] or sorted({0, 1, 2, 4, cpus})
+
+    entries = synthetic_entries(size)
+    workload = build_workload(entries, request_count)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "knowledge_base.json")
+        store = os.path.join(directory, "knowledge_base.akb")
+        with open(source, "w") as f:
+            json.dump({knowledge_loader.ENTRIES: entries}, f)
+        convert(source, store)
+        del entries
+
+        with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source):
+            baseline = None
+            for workers in worker_counts:
+                knowledge_loader.reset_knowledge_index()
+                result = measure(workers, workload, store)
+                baseline = baseline or result["requests_per_second"]
+                result["speedup"] = round(result["requests_per_second"] / baseline, 2)
+                result["cpus"] = cpus
+                print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Measure the weather and currency tools offline by replaying a cassette.
+
+A cassette is first recorded from the local upstream stub, with one response
+for every city and week and every base currency of the workload. Weeks do not
+overlap, so the weather cache always misses whole recorded weeks. The
+workload is then replayed from 16 threads at increasing injected error rates.
+Each level reports the answered and failed calls, upstream requests, cache
+hit ratios, the most concurrent upstream requests and tail latency.
+
+A final async run sends every weather call ASYNC_REPEATS times at once
+through the async tools; all of them miss the cache, which shows the per-host
+connection limit of the pooled client.
+
+Usage: python benchmarks/bench_replay.py [calls] [latency_ms]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from bench_utils import summarize
+
+from agent import http_client, transport
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import currency_converter, weather
+from agent.tools.rate_cache import RateTableCache
+from agent.tools.weather_cache import WeatherHistoryCache
+
+DEFAULT_CALLS = 400
+DEFAULT_LATENCY_MS = 20
+CONCURRENCY = 16
+ERROR_RATES = [0.0, 0.1, 0.3]
+ASYNC_REPEATS = 4
+SEED = 7
+CITIES = ["Paris", "London", "Dhaka", "Tokyo", "Lima", "Oslo", "Cairo", "Perth"]
+FIRST_WEEK = datetime.date(2024, 1, 1)
+WEEKS = 6
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BDT", "INR"]
+
+def weather_calls() -> list:
+    calls = []
+    for city in CITIES:
+        for week in range(WEEKS):
+            start = FIRST_WEEK + datetime.timedelta(weeks=week)
+            calls.append({"city": city, "from_date": start.isoformat(), "to_date": (start + datetime.timedelta(days=6)).isoformat()})
+    return calls
+
+def build_workload(count: int) -> list:
+    generator = random.Random(count)
+    weeks = weather_calls()
+    workload = []
+    for _ in range(count):
+        if generator.random() < 0.5:
+            workload.append((weather.get_weather_details, generator.choice(weeks)))
+        else:
+            source, target = generator.sample(CURRENCIES, 2)
+            workload.append((currency_converter.convert_currency, {"from_currency": source, "to_currency": target, "amount": generator.randint(1, 500)}))
+    return workload
+
+def record(path: str) -> int:
+    recorder = transport.RecordingTransport(path)
+    transport.set_transport(recorder)
+    try:
+        with patch.object(weather, "_weather_cache", WeatherHistoryCache()):
+            for args in weather_calls():
+                weather.get_weather_details(args)
+        for base in CURRENCIES:
+            currency_converter.fetch_rates(base)
+    finally:
+        transport.set_transport(None)
+        recorder.close()
+    with open(path) as f:
+        return sum(1 for _ in f)
+
+def replay(path: str, workload: list, latency_ms: float, error_rate: float) -> dict:
+    replayer = transport.ReplayTransport(path, latency_ms=latency_ms, error_rate=error_rate, seed=SEED)
+    weather_cache = WeatherHistoryCache()
+    latencies = []
+    failures = 0
+
+    def call(step):
+        nonlocal failures
+        function, args = step
+        started = time.perf_counter()
+        try:
+            function(args)
+        except ConnectionError:
+            failures += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    transport.set_transport(replayer)
+    try:
+        with patch.object(weather, "_weather_cache", weather_cache), patch.object(currency_converter, "RATE_CACHE", RateTableCache()):
+            with ThreadPoolExecutor(CONCURRENCY) as pool:
+                list(pool.map(call, workload))
+    finally:
+        transport.set_transport(None)
+
+    stats = replayer.stats()
+    weather_count = sum(function is weather.get_weather_details for function, _ in workload)
+    currency_count = len(workload) - weather_count
+    currency_requests = stats["requests"] - weather_cache.upstream_requests
+    return {
+        "error_rate": error_rate,
+        "calls": len(workload),
+        "failed": failures,
+        "upstream_requests": stats["requests"],
+        "injected_errors": stats["injected_errors"],
+        "cassette_misses": stats["misses"],
+        "weather_cache_hit_ratio": round(1 - weather_cache.upstream_requests / weather_count, 3) if weather_count else None,
+        "rate_cache_hit_ratio": round(1 - currency_requests / currency_count, 3) if currency_count else None,
+        "max_in_flight": stats["max_in_flight"],
+        "latency": summarize(latencies),
+    }
+
+def replay_async(path: str, latency_ms: float) -> dict:
+    replayer = transport.ReplayTransport(path, latency_ms=latency_ms)
+    calls = weather_calls() * ASYNC_REPEATS
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(*[weather.get_weather_details_async(args) for args in calls])
+        return (time.perf_counter() - started) * 1000
+
+    transport.set_transport(replayer)
+    try:
+        with patch.object(weather, "_weather_cache", WeatherHistoryCache()):
+            elapsed_ms = asyncio.run(run())
+    finally:
+        transport.set_transport(None)
+    return {
+        "async_calls": len(calls),
+        "connections_per_host": http_client.MAX_CONNECTIONS_PER_HOST,
+        "max_in_flight": replayer.max_in_flight,
+        "wall_ms": round(elapsed_ms, 1),
+    }
+
+def main() -> None:
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CALLS
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY_MS
+    workload = build_workload(call_count)
+
+    environment = {weather.API_KEY_SETTING: "benchmark", currency_converter.API_KEY_SETTING: "benchmark"}
+    with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, environment), UpstreamStubServer() as upstream, \
+            patch.object(weather, "BASE_URL", upstream.weather_url), patch.object(currency_converter, "BASE_URL", upstream.currency_url):
+        cassette = os.path.join(directory, "cassette.jsonl")
+        print(json.dumps({"recorded_interactions": record(cassette)}))
+        requests_after_recording = upstream.request_count
+
+        for error_rate in ERROR_RATES:
+            print(json.dumps(replay(cassette, workload, latency_ms, error_rate)))
+        print(json.dumps(replay_async(cassette, latency_ms)))
+        # Replays never reach the upstream
+        assert upstream.request_count == requests_after_recording
+
+if __name__ == "__main__":
+    main()
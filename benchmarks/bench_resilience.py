@@ -0,0 +1,130 @@
+"""
+Measure how the upstream policy bounds tail latency and outages.
+
+Rate tables of every currency are recorded from the local upstream stub and
+replayed with a fixed latency, while a seeded fraction of the replayed
+requests stalls for STALL_MS, like a hung upstream connection. The same
+requests are sent from 16 threads under increasingly strict policies:
+
+    unbounded   no retries and a read timeout longer than any stall (the old behaviour)
+    timeouts    read timeout plus retries with backoff
+    hedged      timeouts, retries and a duplicate request after the p95 latency
+
+Each level reports tail latency, failed requests and the policy decisions. A
+final outage run drops every connection and compares the time spent with and
+without the circuit breaker.
+
+Usage: python benchmarks/bench_resilience.py [requests] [latency_ms] [stall_rate]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from bench_utils import summarize
+
+import requests
+from agent import resilience, transport
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import currency_converter
+from agent.transport import ReplayTransport
+
+DEFAULT_REQUESTS = 400
+DEFAULT_LATENCY_MS = 20
+DEFAULT_STALL_RATE = 0.02
+STALL_MS = 2000
+READ_TIMEOUT_SECONDS = 0.25
+CONCURRENCY = 16
+OUTAGE_REQUESTS = 100
+SEED = 7
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BDT", "INR"]
+
+POLICIES = {
+    "unbounded": dict(read_timeout=60.0, retries=0, breaker_failures=0),
+    "timeouts": dict(read_timeout=READ_TIMEOUT_SECONDS, retries=2, backoff_ms=20, breaker_failures=0),
+    "hedged": dict(read_timeout=READ_TIMEOUT_SECONDS, retries=2, backoff_ms=20, breaker_failures=0, hedge=True),
+}
+
+class StallingReplay(ReplayTransport):
+    """
+    Replay transport that stalls a seeded fraction of the requests.
+    """
+
+    def __init__(self, cassette_path: str, stall_rate: float, **options):
+        super().__init__(cassette_path, **options)
+        self.stall_rate = stall_rate
+        self._stalls = random.Random(SEED)
+
+    def _begin(self, url: str, params: dict) -> tuple:
+        interaction, delay = super()._begin(url, params)
+        with self._lock:
+            stalled = self._stalls.random() < self.stall_rate
+        return interaction, delay + (STALL_MS / 1000 if stalled else 0.0)
+
+def record(path: str, urls: list) -> None:
+    recorder = transport.RecordingTransport(path)
+    transport.set_transport(recorder)
+    try:
+        for url in urls:
+            transport.get(url)
+    finally:
+        transport.set_transport(None)
+        recorder.close()
+
+def send_all(urls: list, replay, policy: resilience.UpstreamPolicy) -> dict:
+    latencies = []
+    failures = 0
+
+    def call(url):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            transport.get(url).raise_for_status()
+        except requests.RequestException:
+            failures += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    transport.set_transport(replay)
+    resilience.set_policy(policy)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENCY) as pool:
+            list(pool.map(call, urls))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        counters = {}
+        for host in policy.stats().values():
+            counters = {name: host[name] for name in resilience.COUNTERS if host[name]}
+    finally:
+        transport.set_transport(None)
+        resilience.set_policy(None)
+        policy.close()
+    return {"requests": len(urls), "failed": failures, "wall_ms": round(elapsed_ms, 1), "latency": summarize(latencies), "decisions": counters}
+
+def main() -> None:
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY_MS
+    stall_rate = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_STALL_RATE
+
+    with tempfile.TemporaryDirectory() as directory, UpstreamStubServer() as upstream, patch.dict(os.environ, {currency_converter.API_KEY_SETTING: "benchmark"}):
+        cassette = os.path.join(directory, "cassette.jsonl")
+        urls = [f"{upstream.currency_url}/{currency}" for currency in CURRENCIES]
+        record(cassette, urls)
+        workload = [random.Random(request_count + index).choice(urls) for index in range(request_count)]
+
+        for name, options in POLICIES.items():
+            replay = StallingReplay(cassette, stall_rate, latency_ms=latency_ms)
+            result = send_all(workload, replay, resilience.UpstreamPolicy(seed=SEED, **options))
+            print(json.dumps(dict({"policy": name, "stall_rate": stall_rate, "stall_ms": STALL_MS}, **result)))
+
+        for breaker_failures in (0, resilience.BREAKER_FAILURES):
+            replay = ReplayTransport(cassette, latency_ms=latency_ms, error_rate=1.0, error_status=transport.CONNECTION_ERROR_STATUS)
+            policy = resilience.UpstreamPolicy(retries=2, backoff_ms=20, breaker_failures=breaker_failures, seed=SEED)
+            result = send_all(workload[:OUTAGE_REQUESTS], replay, policy)
+            print(json.dumps(dict({"outage": True, "breaker_failures": breaker_failures, "upstream_attempts": replay.request_count}, **result)))
+
+if __name__ == "__main__":
+    main()
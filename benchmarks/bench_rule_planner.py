@@ -0,0 +1,77 @@
+"""
+End-to-end latency of simple queries with and without the rule-based planner.
+
+Arithmetic and currency queries are answered through agent.process_user_query.
+Without rules every query pays a simulated LLM planning round-trip; with rules
+they are planned locally. Currency rates come from the local upstream stub.
+
+Usage: python benchmarks/bench_rule_planner.py [llm_latency_ms] [queries]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import contextlib
+from unittest.mock import patch
+
+from bench_utils import summarize, time_calls
+
+from agent import agent
+from agent.llm import planner, rule_planner
+from agent.llm.plan_cache import PlanCache
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import currency_converter
+from agent.tools.rate_cache import RateTableCache
+
+DEFAULT_LLM_LATENCY_MS = 300
+DEFAULT_QUERY_COUNT = 50
+
+TEMPLATES = [
+    "What is {a}% of {b}?",
+    "{a} + {b}",
+    "what is {a} times {b}",
+    "{a} divided by {b}",
+    "Convert {a} USD to EUR",
+    "how much is {a} GBP in JPY?",
+]
+
+def build_queries(count: int) -> list:
+    # Distinct numbers keep the plan cache from answering repeats
+    generator = random.Random(count)
+    return [generator.choice(TEMPLATES).format(a=index + 1, b=generator.randint(2, 999)) for index in range(count)]
+
+def run(mode: str, queries: list, llm_latency_ms: float) -> dict:
+    def ask_to_llm(system_prompt, user_query, knowledge_base=None):
+        time.sleep(llm_latency_ms / 1000)
+        return rule_planner.plan_from_rules(user_query)
+
+    rules = rule_planner.plan_from_rules if mode == "rules" else (lambda user_query: None)
+    with patch.object(planner, "plan_from_rules", rules), patch.object(planner, "ask_to_llm", ask_to_llm), \
+            patch.object(planner, "_plan_cache", PlanCache()), patch.object(currency_converter, "RATE_CACHE", RateTableCache()), \
+            contextlib.redirect_stdout(io.StringIO()):
+        latencies = time_calls(agent.process_user_query, queries)
+    return {"mode": mode, "queries": len(queries), "latency": summarize(latencies), "total_ms": round(sum(latencies), 1)}
+
+def main() -> None:
+    llm_latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LLM_LATENCY_MS
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_QUERY_COUNT
+    queries = build_queries(query_count)
+    matched = sum(rule_planner.plan_from_rules(query) is not None for query in queries)
+
+    os.environ.setdefault(currency_converter.API_KEY_SETTING, "benchmark")
+    with UpstreamStubServer() as server, patch.object(currency_converter, "BASE_URL", server.currency_url):
+        results = [run(mode, queries, llm_latency_ms) for mode in ("llm", "rules")]
+
+    for result in results:
+        print(json.dumps(result))
+    print(json.dumps({
+        "llm_latency_ms": llm_latency_ms,
+        "rule_match_rate": round(matched / len(queries), 3),
+        "p50_saved_ms": round(results[0]["latency"]["p50_ms"] - results[1]["latency"]["p50_ms"], 2),
+        "total_saved_ms": round(results[0]["total_ms"] - results[1]["total_ms"], 1),
+    }))
+
+if __name__ == "__main__":
+    main()
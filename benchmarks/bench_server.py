@@ -0,0 +1,178 @@
+"""
+Load test of the agent server against the local upstream and LLM stubs.
+
+The server runs in its own interpreter, as it would in production, with the
+tools pointed at the stubs. Clients send a mix of calculator, currency and
+knowledge base queries (the knowledge base ones make LLM calls to the stub)
+over keep-alive connections at increasing concurrency, and the QPS, tail
+latency and refused (503) requests are reported for each level. The server is
+stopped with SIGTERM, so the run also exercises graceful shutdown.
+
+Usage: python benchmarks/bench_server.py [requests] [latency_ms] [workers] [queue_limit]
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import asyncio
+import tempfile
+import subprocess
+
+from bench_utils import summarize, synthetic_entries
+
+import httpx
+
+from agent.stubs.llm_server import LLMStubServer
+from agent.stubs.upstream_server import UpstreamStubServer
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+
+DEFAULT_REQUESTS = 1_000
+DEFAULT_LATENCY_MS = 20
+DEFAULT_WORKERS = 64
+DEFAULT_QUEUE_LIMIT = 256
+CONCURRENCY_LEVELS = [1, 16, 64, 256]
+KNOWLEDGE_BASE_SIZE = 1_000
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BDT", "INR"]
+STARTUP_TIMEOUT_SECONDS = 30
+
+DRIVER = """
+import sys, asyncio
+import agent.tools.weather as weather
+import agent.tools.currency_converter as currency_converter
+import agent.tools.knowledge_loader as knowledge_loader
+from agent.server import AgentServer, serve
+weather.BASE_URL, currency_converter.BASE_URL, knowledge_loader.KNOWLEDGE_SOURCE = sys.argv[1:4]
+port, workers, queue_limit = (int(value) for value in sys.argv[4:7])
+asyncio.run(serve(AgentServer(port=port, workers=workers, queue_limit=queue_limit)))
+"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    raise RuntimeError("Server did not start in time")
+
+def build_queries(count: int, titles: list) -> list:
+    generator = random.Random(count)
+    queries = []
+    for _ in range(count):
+        kind = generator.randrange(3)
+        if kind == 0:
+            queries.append(f"what is {generator.randint(1, 999)} + {generator.randint(1, 999)}")
+        elif kind == 1:
+            source, target = generator.sample(CURRENCIES, 2)
+            queries.append(f"convert {generator.randint(1, 500)} {source} to {target}")
+        else:
+            queries.append(f"What do you know about {generator.choice(titles)}?")
+    return queries
+
+class Connection:
+    """
+    Minimal keep-alive HTTP/1.1 client. httpx's async pool costs more CPU per
+    request than the server at high concurrency, so it would measure itself.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, port: int) -> "Connection":
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def post_json(self, path: str, payload: dict) -> int:
+        body = json.dumps(payload).encode("utf-8")
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in head[1:] if line)
+        await self.reader.readexactly(int(headers["content-length"]))
+        return int(head[0].split(" ")[1])
+
+    def close(self) -> None:
+        self.writer.close()
+
+async def load(port: int, queries: list, concurrency: int) -> dict:
+    latencies = []
+    statuses = {}
+    pending = iter(queries)
+
+    async def client_loop():
+        connection = await Connection.open(port)
+        try:
+            for query in pending:
+                started = time.perf_counter()
+                status = await connection.post_json("/query", {"query": query})
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(queries),
+        "queries_per_second": round(len(queries) / elapsed, 1),
+        "latency": summarize(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+def main() -> None:
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY_MS
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_WORKERS
+    queue_limit = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_QUEUE_LIMIT
+
+    entries = synthetic_entries(KNOWLEDGE_BASE_SIZE)
+    queries = build_queries(request_count, [entry["title"] for entry in entries])
+
+    with tempfile.TemporaryDirectory() as directory, \
+            UpstreamStubServer(latency_ms=latency_ms) as upstream, LLMStubServer(latency_ms=latency_ms) as llm:
+        source = os.path.join(directory, "knowledge_base.json")
+        with open(source, "w") as f:
+            json.dump({"entries": entries}, f)
+
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        environment = {
+            **os.environ,
+            "WEATHER_API_KEY": "bench",
+            "EXCHANGE_RATE_API_KEY": "bench",
+            "LLM_BACKEND": "openai",
+            "LLM_BASE_URL": llm.base_url,
+            # Per-query INFO records would measure stderr instead of the server
+            "LOG_LEVEL": "WARNING",
+        }
+        arguments = [upstream.weather_url, upstream.currency_url, source, str(port), str(workers), str(queue_limit)]
+        process = subprocess.Popen([sys.executable, "-c", DRIVER, *arguments], cwd=SRC_PATH, env=environment)
+        try:
+            wait_until_ready(url, process)
+            for concurrency in CONCURRENCY_LEVELS:
+                result = asyncio.run(load(port, queries, concurrency))
+                result["upstream_requests"] = upstream.request_count
+                result["llm_requests"] = llm.request_count
+                print(json.dumps(result))
+            stats = httpx.get(f"{url}/stats").json()
+            print(json.dumps({key: stats[key] for key in ("served", "failed", "rejected")}))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(STARTUP_TIMEOUT_SECONDS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Offline benchmark suite with JSON results for comparing commits.
+
+Nothing leaves the machine: weather and currency requests go to the local
+upstream stub and LLM calls to the local LLM stub, both with injected
+latency, and knowledge bases are synthetic. Cases:
+
+    calculator.*             calculator.calculate on scalar args, expressions and 1,000 rows
+    knowledge.*.<size>       index build, BM25 shortlist, title lookup and store shortlist
+    weather.*, currency.*    tool calls that miss the cache (one upstream request) or hit it
+    agent.*                  process_user_query end to end for calculator, currency and
+                             knowledge base queries
+
+`run` writes {"metadata": {...}, "results": {case: {...}}} to a JSON file,
+benchmarks/results/<commit>.json by default. `compare` prints the p50 change
+of every case between two such files and exits with status 1 if any case got
+slower than the threshold allows.
+
+Usage: python benchmarks/bench_suite.py run [--output FILE] [--quick] [--filter TEXT]
+       python benchmarks/bench_suite.py compare BASELINE CANDIDATE [--threshold 0.1]
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+from unittest.mock import patch
+
+from bench_utils import summarize, synthetic_entries, time_calls
+
+from agent import agent, logger
+from agent.llm import backend, planner
+from agent.llm.plan_cache import PlanCache
+from agent.stubs.llm_server import LLMStubServer
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import calculator, currency_converter, knowledge_loader, weather
+from agent.tools.knowledge_loader import KNOWLEDGE_STORE_SETTING
+from agent.tools.knowledge_store import convert
+from agent.tools.rate_cache import RateTableCache
+from agent.tools.weather_cache import WeatherHistoryCache
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+KNOWLEDGE_BASE_SIZES = [1_000, 10_000, 100_000]
+QUICK_KNOWLEDGE_BASE_SIZES = [1_000, 10_000]
+CALLS = 200
+QUICK_CALLS = 50
+WARMUP_CALLS = 5
+UPSTREAM_LATENCY_MS = 5
+LLM_LATENCY_MS = 5
+AGENT_KNOWLEDGE_BASE_SIZE = 1_000
+CALCULATOR_ROWS = 1_000
+SHORTLIST_SIZE = 50
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BDT", "INR"]
+WEATHER_FROM_DATE = "2024-01-01"
+WEATHER_TO_DATE = "2024-01-07"
+# Relative p50 growth reported as a regression by compare
+DEFAULT_THRESHOLD = 0.10
+
+def measure(function, inputs: list, warmup: list = None) -> dict:
+    """
+    Time one call per input after a few warm-up calls.
+
+    Args:
+        function (callable): Function taking one input.
+        inputs (list): Inputs of the timed calls.
+        warmup (list, optional): Inputs of the untimed calls, the first inputs by default.
+            Cases that measure cache misses pass inputs the timed calls do not repeat.
+
+    Returns:
+        dict: calls, p50_ms, p99_ms, mean_ms and calls_per_second.
+    """
+    for value in inputs[:WARMUP_CALLS] if warmup is None else warmup:
+        function(value)
+    latencies = time_calls(function, inputs)
+    total_ms = sum(latencies)
+    return {
+        "calls": len(latencies),
+        **summarize(latencies),
+        "mean_ms": round(total_ms / len(latencies), 4),
+        "calls_per_second": round(len(latencies) / (total_ms / 1000), 1) if total_ms else None,
+    }
+
+def measure_once(function) -> dict:
+    started = time.perf_counter()
+    function()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {"calls": 1, "p50_ms": round(elapsed_ms, 4), "p99_ms": round(elapsed_ms, 4), "mean_ms": round(elapsed_ms, 4), "calls_per_second": None}
+
+def calculator_cases(calls: int, generator: random.Random):
+    scalar = [
+        {calculator.OPERAND: generator.choice("+-*/%"), calculator.OPERATOR_1: generator.randint(1, 999), calculator.OPERATOR_2: generator.randint(1, 999)}
+        for _ in range(calls)
+    ]
+    expressions = [
+        {calculator.EXPRESSION: f"({generator.randint(1, 999)} + {generator.randint(1, 999)}) * {generator.randint(1, 99)} / 7"}
+        for _ in range(calls)
+    ]
+    rows = [{calculator.ROWS: [generator.choice(scalar) for _ in range(CALCULATOR_ROWS)]} for _ in range(calls)]
+    yield "calculator.scalar", lambda: measure(calculator.calculate, scalar)
+    yield "calculator.expression", lambda: measure(calculator.calculate, expressions)
+    yield "calculator.rows", lambda: measure(calculator.calculate, rows)
+
+def knowledge_cases(sizes: list, calls: int, generator: random.Random, directory: str):
+    for size in sizes:
+        entries = synthetic_entries(size)
+        source = os.path.join(directory, f"knowledge_base_{size}.json")
+        store = os.path.join(directory, f"knowledge_base_{size}.akb")
+        with open(source, "w") as f:
+            json.dump({knowledge_loader.ENTRIES: entries}, f)
+        convert(source, store)
+
+        sample = [generator.choice(entries) for _ in range(calls)]
+        queries = [" ".join(entry["title"].split()[:2] + entry["detail"].split()[:3]) for entry in sample]
+        lookups = [[entry["title"] for entry in generator.sample(entries, 3)] for _ in range(calls)]
+        del entries
+
+        def shortlist(query):
+            return knowledge_loader.shortlist_titles(query, SHORTLIST_SIZE)
+
+        def with_source(case, source=source):
+            def run():
+                with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source):
+                    knowledge_loader.reset_knowledge_index()
+                    try:
+                        return case()
+                    finally:
+                        knowledge_loader.reset_knowledge_index()
+            return run
+
+        def with_store(case, store=store):
+            def run():
+                knowledge_loader.reset_knowledge_store()
+                try:
+                    with patch.dict(os.environ, {KNOWLEDGE_STORE_SETTING: store}):
+                        return case()
+                finally:
+                    knowledge_loader.reset_knowledge_store()
+            return run
+
+        yield f"knowledge.load.{size}", with_source(lambda: measure_once(knowledge_loader.get_knowledge_index))
+        yield f"knowledge.shortlist.{size}", with_source(lambda queries=queries: measure(shortlist, queries))
+        yield f"knowledge.search.{size}", with_source(lambda lookups=lookups: measure(knowledge_loader.search_titles_and_details, lookups))
+        yield f"knowledge.store_shortlist.{size}", with_store(lambda queries=queries: measure(shortlist, queries))
+
+def upstream_cases(calls: int, generator: random.Random, upstream: UpstreamStubServer):
+    cities = [f"Benchmark City {index}" for index in range(calls + WARMUP_CALLS)]
+    conversions = [
+        dict(zip(("from_currency", "to_currency"), generator.sample(CURRENCIES, 2)), amount=generator.randint(1, 500))
+        for _ in range(calls)
+    ]
+
+    def weather_args(city):
+        return {"city": city, "from_date": WEATHER_FROM_DATE, "to_date": WEATHER_TO_DATE}
+
+    def weather_cold():
+        requests = [weather_args(city) for city in cities]
+        with patch.object(weather, "_weather_cache", WeatherHistoryCache()):
+            return measure(weather.get_weather_details, requests[WARMUP_CALLS:], requests[:WARMUP_CALLS])
+
+    def weather_cached():
+        with patch.object(weather, "_weather_cache", WeatherHistoryCache()):
+            weather.get_weather_details(weather_args(cities[0]))
+            return measure(weather.get_weather_details, [weather_args(cities[0])] * calls)
+
+    def convert_uncached(args):
+        # A fresh rate table cache makes every conversion fetch its base currency
+        currency_converter.RATE_CACHE = RateTableCache()
+        return currency_converter.convert_currency(args)
+
+    def currency_cold():
+        with patch.object(currency_converter, "RATE_CACHE", RateTableCache()):
+            return measure(convert_uncached, conversions)
+
+    def currency_cached():
+        with patch.object(currency_converter, "RATE_CACHE", RateTableCache()):
+            return measure(currency_converter.convert_currency, conversions)
+
+    with patch.object(weather, "BASE_URL", upstream.weather_url), patch.object(currency_converter, "BASE_URL", upstream.currency_url):
+        yield "weather.cold", weather_cold
+        yield "weather.cached", weather_cached
+        yield "currency.cold", currency_cold
+        yield "currency.cached", currency_cached
+
+def agent_cases(calls: int, generator: random.Random, upstream: UpstreamStubServer, directory: str):
+    entries = synthetic_entries(AGENT_KNOWLEDGE_BASE_SIZE)
+    source = os.path.join(directory, "agent_knowledge_base.json")
+    with open(source, "w") as f:
+        json.dump({knowledge_loader.ENTRIES: entries}, f)
+
+    # Distinct queries keep the plan cache from answering repeats
+    arithmetic = [f"what is {index} + {generator.randint(1, 999)}" for index in range(calls + WARMUP_CALLS)]
+    conversions = [f"convert {index + 1} {' to '.join(generator.sample(CURRENCIES, 2))}" for index in range(calls + WARMUP_CALLS)]
+    questions = [f"What do you know about {entries[index % len(entries)]['title']}?" for index in range(calls + WARMUP_CALLS)]
+
+    def end_to_end(queries):
+        def run():
+            with patch.object(planner, "_plan_cache", PlanCache()), patch.object(currency_converter, "RATE_CACHE", RateTableCache()):
+                return measure(agent.process_user_query, queries[WARMUP_CALLS:], queries[:WARMUP_CALLS])
+        return run
+
+    with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source), \
+            patch.object(currency_converter, "BASE_URL", upstream.currency_url):
+        knowledge_loader.reset_knowledge_index()
+        try:
+            yield "agent.calculator", end_to_end(arithmetic)
+            yield "agent.currency", end_to_end(conversions)
+            yield "agent.knowledge_base", end_to_end(questions)
+        finally:
+            knowledge_loader.reset_knowledge_index()
+
+def git_commit() -> str:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(quick: bool = False, case_filter: str = None) -> dict:
+    """
+    Run every case and collect the results.
+
+    Args:
+        quick (bool): Use fewer calls and smaller knowledge bases.
+        case_filter (str, optional): Only run cases whose name contains this text.
+
+    Returns:
+        dict: {"metadata": {...}, "results": {case name: measurement}}.
+    """
+    calls = QUICK_CALLS if quick else CALLS
+    sizes = QUICK_KNOWLEDGE_BASE_SIZES if quick else KNOWLEDGE_BASE_SIZES
+    generator = random.Random(calls)
+    results = {}
+
+    def collect(cases):
+        for name, case in cases:
+            if case_filter and case_filter not in name:
+                continue
+            results[name] = case()
+            sys.stderr.write(f"{name}: p50 {results[name]['p50_ms']} ms\n")
+
+    # Records of every query would measure stderr
+    logger.configure(level="WARNING")
+    environment = {weather.API_KEY_SETTING: "benchmark", currency_converter.API_KEY_SETTING: "benchmark"}
+    with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, environment), \
+            UpstreamStubServer(latency_ms=UPSTREAM_LATENCY_MS) as upstream, LLMStubServer(latency_ms=LLM_LATENCY_MS) as llm:
+        llm_backend = backend.OpenAICompatibleBackend(llm.base_url)
+        backend.set_backend(llm_backend)
+        try:
+            collect(calculator_cases(calls, generator))
+            collect(knowledge_cases(sizes, calls, generator, directory))
+            collect(upstream_cases(calls, generator, upstream))
+            collect(agent_cases(calls, generator, upstream, directory))
+        finally:
+            backend.set_backend(None)
+            llm_backend.close()
+            logger.reset()
+
+    return {
+        "metadata": {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "upstream_latency_ms": UPSTREAM_LATENCY_MS,
+            "llm_latency_ms": LLM_LATENCY_MS,
+        },
+        "results": results,
+    }
+
+def compare_results(baseline: dict, candidate: dict, threshold: float = DEFAULT_THRESHOLD) -> tuple[list, list]:
+    """
+    Compare the p50 latency of every case in two suite results.
+
+    Args:
+        baseline (dict): Result of run_suite for the reference commit.
+        candidate (dict): Result of run_suite for the commit under test.
+        threshold (float): Relative p50 growth above which a case is a regression.
+
+    Returns:
+        tuple[list, list]: Rows of (case, baseline p50, candidate p50, relative change, verdict)
+            for the cases in both results, and the names of the regressed cases.
+    """
+    rows = []
+    regressions = []
+    for name, measured in candidate["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            rows.append((name, None, measured["p50_ms"], None, "new"))
+            continue
+        change = (measured["p50_ms"] - reference["p50_ms"]) / reference["p50_ms"] if reference["p50_ms"] else 0.0
+        if change > threshold:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((name, reference["p50_ms"], measured["p50_ms"], change, verdict))
+    rows.extend((name, baseline["results"][name]["p50_ms"], None, None, "missing") for name in baseline["results"] if name not in candidate["results"])
+    return rows, regressions
+
+def format_comparison(rows: list) -> str:
+    width = max([len("case")] + [len(row[0]) for row in rows])
+    lines = [f"{'case':<{width}} {'base_p50_ms':>12} {'new_p50_ms':>12} {'change':>8}"]
+    for name, base, new, change, verdict in rows:
+        base_text = f"{base:.4f}" if base is not None else "-"
+        new_text = f"{new:.4f}" if new is not None else "-"
+        change_text = f"{change:+.1%}" if change is not None else "-"
+        lines.append(f"{name:<{width}} {base_text:>12} {new_text:>12} {change_text:>8} {verdict}".rstrip())
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="bench_suite.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and write the results as JSON")
+    run_parser.add_argument("--output", help="results file, benchmarks/results/<commit>.json by default")
+    run_parser.add_argument("--quick", action="store_true", help="fewer calls and smaller knowledge bases")
+    run_parser.add_argument("--filter", help="only run cases whose name contains this text")
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    options = parser.parse_args()
+
+    if options.command == "run":
+        suite = run_suite(options.quick, options.filter)
+        output = options.output or os.path.join(RESULTS_DIRECTORY, f"{suite['metadata']['commit'] or 'latest'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(suite, f, indent=2)
+        print(output)
+        return
+
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    with open(options.candidate) as f:
+        candidate = json.load(f)
+    rows, regressions = compare_results(baseline, candidate, options.threshold)
+    print(format_comparison(rows))
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than {options.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
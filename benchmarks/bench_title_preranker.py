@@ -0,0 +1,60 @@
+"""
+Compare sending every knowledge base title to the LLM with sending the local shortlist.
+
+Usage: python benchmarks/bench_title_preranker.py [size ...]
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+from unittest.mock import patch
+
+from bench_utils import estimate_tokens, summarize, synthetic_entries, time_calls
+
+from agent.tools import knowledge_loader
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+QUERY_COUNT = 200
+SHORTLIST_SIZE = 50
+
+def run(size: int) -> dict:
+    entries = synthetic_entries(size)
+    generator = random.Random(size)
+    queries = []
+    for _ in range(QUERY_COUNT):
+        entry = generator.choice(entries)
+        queries.append(" ".join(entry["title"].split()[:2] + entry["detail"].split()[:3]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "knowledge_base.json")
+        with open(source, "w") as f:
+            json.dump({knowledge_loader.ENTRIES: entries}, f)
+
+        with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source):
+            knowledge_loader.reset_knowledge_index()
+            titles = knowledge_loader.get_knowledge_index().titles
+            latencies = time_calls(lambda query: knowledge_loader.shortlist_titles(query, SHORTLIST_SIZE), queries)
+            shortlist_tokens = [
+                estimate_tokens([title for title, _ in knowledge_loader.shortlist_titles(query, SHORTLIST_SIZE)])
+                for query in queries[:20]
+            ]
+            knowledge_loader.reset_knowledge_index()
+
+    full_tokens = estimate_tokens(list(titles))
+    average_shortlist_tokens = sum(shortlist_tokens) / len(shortlist_tokens)
+    return {
+        "size": size,
+        "all_titles_prompt_tokens": full_tokens,
+        "shortlist_prompt_tokens": round(average_shortlist_tokens),
+        "prompt_tokens_saved": round(full_tokens - average_shortlist_tokens),
+        "preranker_latency": summarize(latencies),
+    }
+
+def main() -> None:
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        print(json.dumps(run(size)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import random
+import time
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Get the nearest-rank percentile of the samples.
+
+    Args:
+        samples (list[float]): Measured values.
+        fraction (float): Percentile as a fraction, e.g. 0.99.
+
+    Returns:
+        float: Value below which the given fraction of samples fall.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def time_calls(function, inputs: list) -> list:
+    """
+    Call the function once per input and record the latency of each call.
+
+    Args:
+        function (callable): Function to measure.
+        inputs (list): Single positional argument for each call.
+
+    Returns:
+        list[float]: Latencies in milliseconds.
+    """
+    latencies = []
+    for value in inputs:
+        started = time.perf_counter()
+        function(value)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def summarize(latencies: list) -> dict:
+    """
+    Summarize latencies as p50/p99 in milliseconds.
+    """
+    return {"p50_ms": round(percentile(latencies, 0.50), 4), "p99_ms": round(percentile(latencies, 0.99), 4)}
+
+def estimate_tokens(value) -> int:
+    """
+    Estimate the prompt tokens needed to send a value to the LLM (about 4 characters per token).
+    """
+    text = value if isinstance(value, str) else json.dumps(value)
+    return (len(text) + 3) // 4
+
+def synthetic_entries(size: int, seed: int = 7) -> list:
+    """
+    Build a reproducible synthetic knowledge base.
+
+    Args:
+        size (int): Number of entries.
+        seed (int): Random seed.
+
+    Returns:
+        list[dict[str, str]]: Entries with title and detail.
+    """
+    generator = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "den", "gar", "pol", "tur", "an", "bel", "cor"]
+    vocabulary = ["".join(generator.choice(syllables) for _ in range(3)) for _ in range(max(500, size // 10))]
+    entries = []
+    for entry_id in range(size):
+        title_words = [generator.choice(vocabulary) for _ in range(2)] + [str(entry_id)]
+        detail_words = [generator.choice(vocabulary) for _ in range(20)]
+        entries.append({"title": " ".join(title_words).title(), "detail": " ".join(detail_words).capitalize() + "."})
+    return entries
@@ -0,0 +1,51 @@
+"""
+Compare the scalar calculator loop with the vectorized calculator.
+
+Rows are random calculator args with mixed operands. "rows" passes the
+argument dicts to calculate_rows, "arrays" passes prebuilt NumPy columns to
+calculate_arrays and "single_operand" prices one column with one operand.
+
+Usage: python benchmarks/bench_vector_calculator.py [size ...]
+"""
+import sys
+import json
+import random
+
+import numpy as np
+
+from bench_utils import time_calls
+
+from agent.tools.calculator import calculate, OPERAND, OPERATOR_1, OPERATOR_2
+from agent.tools.vector_calculator import calculate_arrays, calculate_rows
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+def elapsed_ms(function) -> float:
+    return round(time_calls(lambda _: function(), [None])[0], 2)
+
+def run(size: int) -> dict:
+    generator = random.Random(size)
+    rows = [
+        {OPERAND: generator.choice("+-*/%"), OPERATOR_1: round(generator.uniform(0, 1000), 2), OPERATOR_2: round(generator.uniform(0, 1000), 2)}
+        for _ in range(size)
+    ]
+    operands = np.array([row[OPERAND] for row in rows])
+    operators_1 = np.array([row[OPERATOR_1] for row in rows])
+    operators_2 = np.array([row[OPERATOR_2] for row in rows])
+
+    scalar_ms = elapsed_ms(lambda: [calculate(row) for row in rows])
+    return {
+        "size": size,
+        "scalar_ms": scalar_ms,
+        "rows_ms": elapsed_ms(lambda: calculate_rows(rows)),
+        "arrays_ms": elapsed_ms(lambda: calculate_arrays(operands, operators_1, operators_2)),
+        "single_operand_ms": elapsed_ms(lambda: calculate_arrays("%", operators_1, operators_2)),
+    }
+
+def main() -> None:
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        print(json.dumps(run(size)))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,20 @@
-from .llm import planner
-from .tools import calculator, weather, knowledge_loader, currency_converter
+import json
+import threading
+from collections import deque
+from itertools import islice
+from . import config, executor, process_pool, tracing
+from .logger import get_logger
+from .registry import lazy_import
+
+# Tools and the planner are imported on first use, so a query only pays for the modules it needs
+planner = lazy_import(".llm.planner", __package__)
+calculator = lazy_import(".tools.calculator", __package__)
+weather = lazy_import(".tools.weather", __package__)
+knowledge_loader = lazy_import(".tools.knowledge_loader", __package__)
+currency_converter = lazy_import(".tools.currency_converter", __package__)
+singleflight = lazy_import(".singleflight", __package__)
+
+logger = get_logger(__name__)
 
 # Tool names
 CALCULATOR = "calculator"
@@ -13,22 +28,497 @@ ARGS_KEY = "args"
 EXPRESSION_KEY = "expr"
 CITY_KEY = "city"
 QUERY_KEY = "query"
+TOP_MATCHED_TITLES_KEY = "top_matched_titles"
+
+# Answer to queries whose plan names no known tool or cannot be run
+FALLBACK_ANSWER = "Sorry, I couldn't understand your request."
+
+# Batch processing
+BATCH_CONCURRENCY = 16
+# Queries planned and dispatched together; also the number of results buffered ahead of the output
+BATCH_WINDOW_SIZE = 64
+FROM_CURRENCY_KEY = "from_currency"
+TO_CURRENCY_KEY = "to_currency"
+
+# Knowledge base title matching
+TITLE_SHORTLIST_SIZE = 50
+# Confidence (0..1) above which the best local match is used without asking the LLM.
+# Unset always lets the LLM pick from the shortlist.
+TITLE_CONFIDENCE_THRESHOLD_SETTING = "TITLE_CONFIDENCE_THRESHOLD"
+
+# Tools whose concurrent identical calls share one in-flight call; the calculator is cheaper to rerun
+COALESCED_TOOLS = (WEATHER, KNOWLEDGE_BASE, CURRENCY_CONVERTER)
+
+_tool_flights = None
+_tool_flights_lock = threading.Lock()
+
+def canonical_value(value):
+    """
+    Normalize plan arguments so equivalent calls compare equal.
+
+    Strings are trimmed, whitespace collapsed and case folded, and whole
+    floats become ints, so {"city": " Dhaka "} and {"city": "dhaka"} or
+    {"amount": 100.0} and {"amount": 100} are the same call.
+
+    Args:
+        value: Plan arguments or a part of them.
+
+    Returns:
+        The normalized value.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {str(key): canonical_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical_value(item) for item in value]
+    return value
+
+def tool_call_key(tool: str, args) -> str:
+    """
+    Get the identity of a tool call for coalescing.
+
+    Args:
+        tool (str): Tool name.
+        args: Arguments of the call.
+
+    Returns:
+        str: Tool name and canonical arguments as JSON.
+    """
+    return json.dumps([tool, canonical_value(args)], sort_keys=True, default=str)
+
+def get_tool_flights() -> dict:
+    """
+    Get the single-flight group of every coalesced tool, creating them on first use.
+
+    Returns:
+        dict[str, SingleFlight]: Groups keyed by tool name.
+    """
+    global _tool_flights
+    if _tool_flights is None:
+        with _tool_flights_lock:
+            if _tool_flights is None:
+                _tool_flights = {tool: singleflight.SingleFlight() for tool in COALESCED_TOOLS}
+    return _tool_flights
+
+def call_tool(tool: str, function, args):
+    """
+    Call a tool, sharing the result of an identical call that is already in flight.
+
+    Callers that join a call receive the same result object, which must not be mutated.
+    Every call is traced as the stage "tool.<name>".
+
+    Args:
+        tool (str): Tool name.
+        function (callable): Tool function taking the args.
+        args: Arguments of the call.
+
+    Returns:
+        The tool result.
+    """
+    with tracing.span(f"tool.{tool}"):
+        if tool not in COALESCED_TOOLS:
+            return function(args)
+        return get_tool_flights()[tool].do(tool_call_key(tool, args), function, args)
+
+async def call_tool_async(tool: str, function, args):
+    """
+    Asynchronous version of call_tool for coroutine tool functions.
+    """
+    with tracing.span(f"tool.{tool}"):
+        if tool not in COALESCED_TOOLS:
+            return await function(args)
+        return await get_tool_flights()[tool].do_async(tool_call_key(tool, args), function, args)
+
+def coalesced(tool: str, function):
+    """
+    Wrap a tool function so its calls go through call_tool.
+    """
+    return lambda args: call_tool(tool, function, args)
+
+def coalesced_async(tool: str, function):
+    """
+    Wrap a coroutine tool function so its calls go through call_tool_async.
+    """
+    async def call(args):
+        return await call_tool_async(tool, function, args)
+    return call
+
+def coalescing_stats() -> dict:
+    """
+    Get how many tool calls ran and how many upstream calls were saved by coalescing.
+
+    Returns:
+        dict[str, dict]: {"executions": ..., "shared": ...} per coalesced tool;
+            shared calls joined one in flight instead of going upstream.
+    """
+    if _tool_flights is None:
+        return {tool: {"executions": 0, "shared": 0} for tool in COALESCED_TOOLS}
+    return {tool: flights.stats() for tool, flights in _tool_flights.items()}
+
+def offload_rows(function):
+    """
+    Wrap a calculator function so batched rows are evaluated in the process pool.
+
+    Single calculations are cheaper to run here than to send to a worker.
+    """
+    def call(args):
+        if isinstance(args, dict) and calculator.ROWS in args:
+            return process_pool.run(function, args)
+        return function(args)
+    return call
+
+def title_confidence_threshold():
+    """
+    Get the configured TITLE_CONFIDENCE_THRESHOLD, or None if it is not set.
+    """
+    threshold = config.get_setting(TITLE_CONFIDENCE_THRESHOLD_SETTING)
+    return float(threshold) if threshold else None
+
+def match_knowledge_titles(search_query, shortlist_size=TITLE_SHORTLIST_SIZE, confidence_threshold=None) -> list:
+    """
+    Find the knowledge base titles relevant to a search query.
+
+    Titles are pre-ranked locally (in the process pool when it is enabled)
+    and only the shortlist is sent to the LLM. When the best local match clears the confidence threshold, the LLM call
+    is skipped and that title is used directly.
+
+    Args:
+        search_query (str): Search query produced by the planner.
+        shortlist_size (int): Number of locally ranked titles offered to the LLM.
+        confidence_threshold (float, optional): Confidence needed to skip the LLM,
+            the TITLE_CONFIDENCE_THRESHOLD setting by default.
+
+    Returns:
+        list[str]: Titles to look up in the knowledge base.
+    """
+    shortlist = process_pool.run(knowledge_loader.shortlist_titles, search_query, shortlist_size)
+    if not shortlist:
+        return []
+
+    if confidence_threshold is None:
+        confidence_threshold = title_confidence_threshold()
+    top_title, top_confidence = shortlist[0]
+    if confidence_threshold is not None and top_confidence >= confidence_threshold:
+        return [top_title]
+
+    top_matched_titles = planner.find_top_matched_titles(search_query, [title for title, _ in shortlist])
+    if isinstance(top_matched_titles, dict):
+        return top_matched_titles.get(TOP_MATCHED_TITLES_KEY, [])
+    return top_matched_titles
+
+def lookup_knowledge_base(args):
+    """
+    Get the knowledge base entries matching the planner's search query.
+
+    Args:
+        args (dict): Knowledge base plan arguments containing the search query.
+
+    Returns:
+        list[dict[str, str]]: Matched entries with title and detail.
+    """
+    top_matched_titles = match_knowledge_titles(args[QUERY_KEY])
+    return process_pool.run(knowledge_loader.search_titles_and_details, top_matched_titles)
+
+def answer_from_knowledge_base(user_query, args):
+    """
+    Answer a query with the knowledge base entries matching the planner's search query.
+
+    Args:
+        user_query (str): The user's input query.
+        args (dict): Knowledge base plan arguments containing the search query.
+
+    Returns:
+        str: The LLM answer based on the matched entries.
+    """
+    return planner.call_llm_with_knowledge_base(user_query, call_tool(KNOWLEDGE_BASE, lookup_knowledge_base, args))
+
+def plan_tools() -> dict:
+    """
+    Get the tool functions that multi-step plan steps can call.
+
+    Returns:
+        dict: Functions taking the step args, keyed by tool name.
+    """
+    return {
+        CALCULATOR: coalesced(CALCULATOR, offload_rows(calculator.calculate)),
+        WEATHER: coalesced(WEATHER, weather.get_weather_details),
+        KNOWLEDGE_BASE: coalesced(KNOWLEDGE_BASE, lookup_knowledge_base),
+        CURRENCY_CONVERTER: coalesced(CURRENCY_CONVERTER, currency_converter.convert_currency),
+    }
+
+def plan_tools_async() -> dict:
+    """
+    Get the tool functions that multi-step plan steps can call from the async path.
+
+    Returns:
+        dict: Functions or coroutine functions taking the step args, keyed by tool name.
+    """
+    tools = plan_tools()
+    tools[WEATHER] = coalesced_async(WEATHER, weather.get_weather_details_async)
+    tools[CURRENCY_CONVERTER] = coalesced_async(CURRENCY_CONVERTER, currency_converter.convert_currency_async)
+    return tools
+
+def respond_to_plan(user_query, execution):
+    """
+    Turn the results of a multi-step plan into the answer for the user.
+
+    Args:
+        user_query (str): The user's input query.
+        execution (executor.PlanExecution): Results of the plan.
+
+    Returns:
+        str: The answer to the query.
+    """
+    log_critical_path(execution)
+
+    if execution.answer_tool == CALCULATOR:
+        return calculator.generate_response(execution.answer)
+    if execution.answer_tool == CURRENCY_CONVERTER:
+        return execution.answer
+    return planner.call_llm_with_knowledge_base(user_query, execution.results)
+
+def log_critical_path(execution) -> None:
+    logger.info(
+        "plan_critical_path",
+        path=" -> ".join(execution.critical_path),
+        critical_path_ms=round(execution.critical_path_seconds * 1000, 1),
+        wall_ms=round(execution.wall_seconds * 1000, 1),
+    )
+
+def dispatch_plan(user_query, plan):
+    """
+    Run the tools of a planner response and answer the query.
+
+    Args:
+        user_query (str): The user's input query.
+        plan (dict): Single tool plan or multi-step plan from the planner.
+
+    Returns:
+        str: The answer to the query.
+    """
+    logger.debug("plan", plan=plan)
+
+    if executor.is_multi_step_plan(plan):
+        try:
+            execution = executor.execute_plan(plan, plan_tools())
+        except executor.PlanError as e:
+            logger.warning("invalid_plan", error=str(e))
+            return FALLBACK_ANSWER
+        return respond_to_plan(user_query, execution)
+    if plan and isinstance(plan, dict) and TOOL_KEY in plan:
+        if plan[TOOL_KEY] == CALCULATOR:
+            return call_tool(CALCULATOR, offload_rows(calculator.use_calculator_tool), plan[ARGS_KEY])
+        if plan[TOOL_KEY] == WEATHER:
+            weather_history = call_tool(WEATHER, weather.get_weather_details, plan[ARGS_KEY])
+            return planner.call_llm_with_knowledge_base(user_query, weather_history)
+        if plan[TOOL_KEY] == KNOWLEDGE_BASE:
+            return answer_from_knowledge_base(user_query, plan[ARGS_KEY])
+        if plan[TOOL_KEY] == CURRENCY_CONVERTER:
+            return call_tool(CURRENCY_CONVERTER, currency_converter.convert_currency, plan[ARGS_KEY])
+    return FALLBACK_ANSWER
 
 def process_user_query(user_query):
     plan = planner.initiate_planner(user_query)
-    print(f"Planner returned plan: {plan}")
-    
+    return dispatch_plan(user_query, plan)
+
+def stream_plan(user_query, plan):
+    """
+    Streaming version of dispatch_plan.
+
+    Answers written by the LLM (weather, knowledge base and multi-step plans
+    that do not end in a calculation or conversion) are yielded chunk by chunk
+    as they are generated. Other answers are yielded whole.
+
+    Args:
+        user_query (str): The user's input query.
+        plan (dict): Single tool plan or multi-step plan from the planner.
+
+    Yields:
+        str: Chunks of the answer, in order.
+    """
+    if executor.is_multi_step_plan(plan):
+        logger.debug("plan", plan=plan)
+        try:
+            execution = executor.execute_plan(plan, plan_tools())
+        except executor.PlanError as e:
+            logger.warning("invalid_plan", error=str(e))
+            yield FALLBACK_ANSWER
+            return
+        if execution.answer_tool in (CALCULATOR, CURRENCY_CONVERTER):
+            yield respond_to_plan(user_query, execution)
+            return
+        log_critical_path(execution)
+        yield from planner.stream_llm_with_knowledge_base(user_query, execution.results)
+        return
+    if plan and isinstance(plan, dict) and plan.get(TOOL_KEY) == WEATHER:
+        logger.debug("plan", plan=plan)
+        weather_history = call_tool(WEATHER, weather.get_weather_details, plan[ARGS_KEY])
+        yield from planner.stream_llm_with_knowledge_base(user_query, weather_history)
+        return
+    if plan and isinstance(plan, dict) and plan.get(TOOL_KEY) == KNOWLEDGE_BASE:
+        logger.debug("plan", plan=plan)
+        yield from planner.stream_llm_with_knowledge_base(user_query, call_tool(KNOWLEDGE_BASE, lookup_knowledge_base, plan[ARGS_KEY]))
+        return
+    yield dispatch_plan(user_query, plan)
+
+def stream_user_query(user_query):
+    """
+    Answer a query, yielding the answer in chunks as soon as they are available.
+
+    The first words of an LLM written answer arrive without waiting for the
+    rest. Joining the chunks gives the answer of process_user_query as text:
+    the streamed LLM text is not decoded, so an LLM answer that is a JSON
+    object arrives as its JSON text where process_user_query returns the
+    decoded dict.
+
+    Args:
+        user_query (str): The user's input query.
+
+    Yields:
+        str: Chunks of the answer, in order.
+    """
+    plan = planner.initiate_planner(user_query)
+    yield from stream_plan(user_query, plan)
+
+def plan_tool_calls(plan) -> list:
+    """
+    List the tool calls of a plan whose arguments are known before it runs.
+
+    Args:
+        plan (dict): Single tool plan or multi-step plan from the planner.
+
+    Returns:
+        list[tuple[str, dict]]: (tool name, args) pairs. Multi-step plan steps
+            that reference other steps are left out.
+    """
+    if executor.is_multi_step_plan(plan):
+        steps = [step for step in plan[executor.STEPS_KEY] if isinstance(step, dict) and not executor.step_dependencies(step)]
+        return [(step.get(TOOL_KEY), step.get(ARGS_KEY, {})) for step in steps]
+    if plan and isinstance(plan, dict) and TOOL_KEY in plan:
+        return [(plan[TOOL_KEY], plan.get(ARGS_KEY, {}))]
+    return []
+
+def prefetch_tool_calls(plans) -> None:
+    """
+    Group the upstream calls of several plans so each is made once.
+
+    Currency conversions share one rate table request per base currency and
+    weather requests share one request per city and overlapping date range.
+    The tools then serve the individual calls from their caches.
+
+    Args:
+        plans (list[dict]): Planner responses of a batch of queries.
+    """
+    conversions = []
+    weather_requests = []
+    for plan in plans:
+        for tool, args in plan_tool_calls(plan):
+            if not isinstance(args, dict):
+                continue
+            if tool == CURRENCY_CONVERTER and args.get(FROM_CURRENCY_KEY) and args.get(TO_CURRENCY_KEY):
+                conversions.append((str(args[FROM_CURRENCY_KEY]), str(args[TO_CURRENCY_KEY])))
+            elif tool == WEATHER:
+                weather_requests.append(args)
+
+    if conversions:
+        currency_converter.prefetch_rates(conversions)
+    if weather_requests:
+        weather.prefetch_weather_details(weather_requests)
+
+def _dispatch_planned(user_query, plan_future):
+    return dispatch_plan(user_query, plan_future.result())
+
+def _batch_result(future, return_exceptions):
+    try:
+        return future.result()
+    except Exception as e:
+        if return_exceptions:
+            return e
+        raise
+
+def process_user_queries(user_queries, concurrency=BATCH_CONCURRENCY, group_tool_calls=False, return_exceptions=False, window_size=BATCH_WINDOW_SIZE):
+    """
+    Answer many queries with bounded concurrency, yielding the answers in input order.
+
+    Queries are read lazily, so the input can be an unbounded stream. At most
+    two windows of queries are in progress or buffered at a time.
+
+    Args:
+        user_queries (iterable of str): Queries to answer.
+        concurrency (int): Number of queries processed at once.
+        group_tool_calls (bool): Plan each window first and group identical
+            upstream calls (e.g. conversions from the same base currency)
+            into one request before running the tools.
+        return_exceptions (bool): Yield a failing query's exception instead of raising it.
+        window_size (int): Number of queries planned and grouped together.
+
+    Yields:
+        str or Exception: The answer to each query, in input order.
+    """
+    # Imported here, like asyncio below, so the calculator path's cold start does not load it
+    from concurrent.futures import ThreadPoolExecutor, wait
+
+    queries = iter(user_queries)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            window = list(islice(queries, window_size))
+            if not window:
+                break
+
+            if group_tool_calls:
+                plan_futures = [pool.submit(planner.initiate_planner, user_query) for user_query in window]
+                wait(plan_futures)
+                prefetch_tool_calls([future.result() for future in plan_futures if future.exception() is None])
+                pending.extend(pool.submit(_dispatch_planned, user_query, future) for user_query, future in zip(window, plan_futures))
+            else:
+                pending.extend(pool.submit(process_user_query, user_query) for user_query in window)
+
+            while len(pending) > window_size:
+                yield _batch_result(pending.popleft(), return_exceptions)
+
+        while pending:
+            yield _batch_result(pending.popleft(), return_exceptions)
+
+async def process_user_query_async(user_query):
+    """
+    Asynchronous version of process_user_query.
+
+    Weather and currency lookups go through the pooled async HTTP client, and
+    the blocking planner and knowledge base steps run in worker threads, so many
+    queries can be in flight in one process.
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        str: The answer to the query.
+    """
+    # Imported here: loading asyncio would slow the synchronous calculator path
+    import asyncio
+
+    plan = await asyncio.to_thread(planner.initiate_planner, user_query)
+    logger.debug("plan", plan=plan)
+
+    if executor.is_multi_step_plan(plan):
+        try:
+            execution = await executor.execute_plan_async(plan, plan_tools_async())
+        except executor.PlanError as e:
+            logger.warning("invalid_plan", error=str(e))
+            return FALLBACK_ANSWER
+        return await asyncio.to_thread(respond_to_plan, user_query, execution)
     if plan and isinstance(plan, dict) and TOOL_KEY in plan:
         if plan[TOOL_KEY] == CALCULATOR:
-            return calculator.use_calculator_tool(plan[ARGS_KEY])
+            # Batched rows may wait on the process pool, which would block the event loop
+            return await asyncio.to_thread(call_tool, CALCULATOR, offload_rows(calculator.use_calculator_tool), plan[ARGS_KEY])
         if plan[TOOL_KEY] == WEATHER:
-            weather_history = weather.get_weather_details(plan[ARGS_KEY])
-            return planner.call_llm_with_knowledge_base(user_query, weather_history)
+            weather_history = await call_tool_async(WEATHER, weather.get_weather_details_async, plan[ARGS_KEY])
+            return await asyncio.to_thread(planner.call_llm_with_knowledge_base, user_query, weather_history)
         if plan[TOOL_KEY] == KNOWLEDGE_BASE:
-            titles = knowledge_loader.get_all_titles()
-            top_matched_titles = planner.find_top_matched_titles(plan[ARGS_KEY][QUERY_KEY], titles)
-            top_matched_knowledge = knowledge_loader.search_titles_and_details(top_matched_titles)
-            return planner.call_llm_with_knowledge_base(user_query, top_matched_knowledge)
+            return await asyncio.to_thread(answer_from_knowledge_base, user_query, plan[ARGS_KEY])
         if plan[TOOL_KEY] == CURRENCY_CONVERTER:
-            return currency_converter.convert_currency(plan[ARGS_KEY])
-    return "Sorry, I couldn't understand your request."
\ No newline at end of file
+            return await call_tool_async(CURRENCY_CONVERTER, currency_converter.convert_currency_async, plan[ARGS_KEY])
+    return FALLBACK_ANSWER
\ No newline at end of file
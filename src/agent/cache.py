@@ -0,0 +1,123 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time to live.
+
+    Entries are evicted least recently used first once max_size is reached.
+    Hit, miss and eviction counters are kept for metrics.
+    """
+
+    def __init__(self, max_size: int = 128, ttl_seconds: float = None, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept.
+            ttl_seconds (float, optional): Lifetime of an entry, None keeps entries until evicted.
+            clock (callable): Monotonic time source, replaceable in tests.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at >= self.ttl_seconds
+
+    def get_with_age(self, key):
+        """
+        Get a value together with the seconds since it was stored.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            tuple[any, float] or None: (value, age) or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = self.clock()
+            if entry is None or self._is_expired(entry[1], now):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], now - entry[1]
+
+    def get(self, key, default=None):
+        """
+        Get a value if it is cached and not expired.
+
+        Args:
+            key: Cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            any: Cached value or default.
+        """
+        entry = self.get_with_age(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value) -> None:
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+        """
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """
+        Remove an entry and return its value.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def items_with_age(self) -> list:
+        """
+        Get every unexpired entry without changing recency or counters.
+
+        Returns:
+            list[tuple[any, any, float]]: (key, value, age) triples, least recently used first.
+        """
+        with self._lock:
+            now = self.clock()
+            return [(key, value, now - stored_at) for key, (value, stored_at) in self._entries.items() if not self._is_expired(stored_at, now)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry[1], self.clock())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: hits, misses, evictions and current size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
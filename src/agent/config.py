@@ -0,0 +1,50 @@
+import os
+import threading
+
+_dotenv_loaded = False
+_dotenv_lock = threading.Lock()
+
+def _load_dotenv_once() -> None:
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _dotenv_loaded = True
+
+def get_setting(name: str, default: str = None) -> str:
+    """
+    Read a setting from the environment, loading the .env file on first use.
+
+    Args:
+        name (str): Environment variable name.
+        default (str, optional): Value used when the variable is not set.
+
+    Returns:
+        str: The setting value or default.
+    """
+    value = os.getenv(name)
+    if value is None:
+        _load_dotenv_once()
+        value = os.getenv(name, default)
+    return value
+
+def require_setting(name: str) -> str:
+    """
+    Read a setting that must be configured.
+
+    Args:
+        name (str): Environment variable name.
+
+    Returns:
+        str: The setting value.
+
+    Raises:
+        ValueError: If the setting is missing or empty.
+    """
+    value = get_setting(name)
+    if not value:
+        raise ValueError(f"{name} not found in environment variables")
+    return value
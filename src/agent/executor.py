@@ -0,0 +1,316 @@
+import time
+
+# Multi-step plan keys
+STEPS_KEY = "steps"
+STEP_ID_KEY = "id"
+TOOL_KEY = "tool"
+ARGS_KEY = "args"
+ANSWER_KEY = "answer"
+REFERENCE_KEY = "$ref"
+REFERENCE_SEPARATOR = "/"
+
+MAX_PARALLEL_STEPS = 8
+
+class PlanError(ValueError):
+    """
+    Raised when a multi-step plan from the planner cannot be run as written.
+    """
+
+class PlanExecution:
+    """
+    Outcome of running a multi-step plan.
+
+    Attributes:
+        results (dict): Result of each step keyed by step id.
+        durations (dict): Seconds spent in each step keyed by step id.
+        answer_step (str): Id of the step whose result answers the query.
+        answer_tool (str): Tool used by the answer step.
+        critical_path (list[str]): Longest chain of dependent steps.
+        critical_path_seconds (float): Summed duration of the critical path.
+        wall_seconds (float): Time from start to finish of the whole plan.
+    """
+
+    def __init__(self, plan: dict, results: dict, durations: dict, wall_seconds: float):
+        self.results = results
+        self.durations = durations
+        self.wall_seconds = wall_seconds
+        self.answer_step = answer_step_id(plan)
+        self.answer_tool = next(step[TOOL_KEY] for step in plan[STEPS_KEY] if step[STEP_ID_KEY] == self.answer_step)
+        self.critical_path, self.critical_path_seconds = critical_path(plan, durations)
+
+    @property
+    def answer(self):
+        return self.results[self.answer_step]
+
+def is_multi_step_plan(plan) -> bool:
+    """
+    Check whether a planner response is a multi-step plan.
+    """
+    return isinstance(plan, dict) and isinstance(plan.get(STEPS_KEY), list)
+
+def find_references(value) -> list:
+    """
+    Find every step reference inside a step's arguments.
+
+    A reference is a dict {"$ref": "<step id>[/<key or index>...]"}.
+
+    Args:
+        value: Argument value, searched recursively.
+
+    Returns:
+        list[str]: Reference strings in the order they appear.
+    """
+    if isinstance(value, dict):
+        if set(value) == {REFERENCE_KEY}:
+            return [value[REFERENCE_KEY]]
+        return [reference for item in value.values() for reference in find_references(item)]
+    if isinstance(value, list):
+        return [reference for item in value for reference in find_references(item)]
+    return []
+
+def step_dependencies(step: dict) -> set:
+    """
+    Get the ids of the steps a step reads results from.
+    """
+    return {reference.split(REFERENCE_SEPARATOR, 1)[0] for reference in find_references(step.get(ARGS_KEY, {}))}
+
+def resolve_reference(reference: str, results: dict):
+    """
+    Look up the value a reference points to.
+
+    Args:
+        reference (str): "<step id>" or "<step id>/<key or index>/..."
+        results (dict): Results of the finished steps.
+
+    Returns:
+        any: The referenced value.
+
+    Raises:
+        ValueError: If the path does not exist in the step result.
+    """
+    step_id, *path = reference.split(REFERENCE_SEPARATOR)
+    value = results[step_id]
+    for part in path:
+        try:
+            value = value[int(part)] if isinstance(value, list) else value[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ValueError(f"Step '{step_id}' result has no value at '{reference}': {value}")
+    return value
+
+def resolve_arguments(value, results: dict):
+    """
+    Replace every reference in the arguments with the referenced value.
+    """
+    if isinstance(value, dict):
+        if set(value) == {REFERENCE_KEY}:
+            return resolve_reference(value[REFERENCE_KEY], results)
+        return {key: resolve_arguments(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_arguments(item, results) for item in value]
+    return value
+
+def execution_order(plan: dict) -> list:
+    """
+    Order the steps of a plan so every step comes after the steps it references.
+
+    Args:
+        plan (dict): Plan with a list of steps.
+
+    Returns:
+        list[str]: Step ids in a valid execution order.
+
+    Raises:
+        PlanError: If a step is malformed, has a reference that is not a string,
+            references an unknown step or the steps form a cycle.
+    """
+    dependencies = {}
+    for step in plan[STEPS_KEY]:
+        if not isinstance(step, dict) or STEP_ID_KEY not in step or TOOL_KEY not in step:
+            raise PlanError(f"Invalid plan step: {step}")
+        if step[STEP_ID_KEY] in dependencies:
+            raise PlanError(f"Duplicate plan step id: {step[STEP_ID_KEY]}")
+        invalid = [reference for reference in find_references(step.get(ARGS_KEY, {})) if not isinstance(reference, str)]
+        if invalid:
+            raise PlanError(f"Plan step {step[STEP_ID_KEY]} has invalid references: {invalid}")
+        dependencies[step[STEP_ID_KEY]] = step_dependencies(step)
+
+    for step_id, needed in dependencies.items():
+        unknown = needed - set(dependencies)
+        if unknown:
+            raise PlanError(f"Plan step {step_id} references unknown steps: {sorted(unknown)}")
+
+    order = []
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [step_id for step_id, needed in remaining.items() if not needed - set(order)]
+        if not ready:
+            raise PlanError(f"Plan steps form a cycle: {sorted(remaining)}")
+        for step_id in ready:
+            order.append(step_id)
+            del remaining[step_id]
+    return order
+
+def validate_plan(plan: dict, tools: dict) -> list:
+    """
+    Check a multi-step plan against the available tools.
+
+    Args:
+        plan (dict): Plan with a list of steps.
+        tools (dict): Available tools keyed by name.
+
+    Returns:
+        list[str]: Step ids in a valid execution order.
+
+    Raises:
+        PlanError: If the plan is empty, malformed, uses an unknown tool or
+            answers with an unknown step.
+    """
+    if not plan[STEPS_KEY]:
+        raise PlanError("Plan has no steps")
+
+    order = execution_order(plan)
+    for step in plan[STEPS_KEY]:
+        if step[TOOL_KEY] not in tools:
+            raise PlanError(f"Unknown tool in plan step {step[STEP_ID_KEY]}: {step[TOOL_KEY]}")
+
+    answer_step = answer_step_id(plan)
+    if answer_step not in order:
+        raise PlanError(f"Unknown answer step: {answer_step}")
+    return order
+
+def answer_step_id(plan: dict) -> str:
+    """
+    Get the id of the step that answers the query, the last step by default.
+    """
+    return plan.get(ANSWER_KEY, plan[STEPS_KEY][-1].get(STEP_ID_KEY))
+
+def critical_path(plan: dict, durations: dict) -> tuple[list, float]:
+    """
+    Find the chain of dependent steps with the longest total duration.
+
+    This is the lower bound on the plan's latency when every independent step
+    runs in parallel.
+
+    Args:
+        plan (dict): Plan with a list of steps.
+        durations (dict): Seconds spent in each step keyed by step id.
+
+    Returns:
+        tuple[list[str], float]: Step ids on the critical path and its duration.
+    """
+    steps = {step[STEP_ID_KEY]: step for step in plan[STEPS_KEY]}
+    finish = {}
+    previous = {}
+    for step_id in execution_order(plan):
+        slowest_dependency = max(step_dependencies(steps[step_id]), key=lambda dependency: finish[dependency], default=None)
+        previous[step_id] = slowest_dependency
+        finish[step_id] = durations.get(step_id, 0.0) + (finish[slowest_dependency] if slowest_dependency else 0.0)
+
+    step_id = max(finish, key=finish.get)
+    total = finish[step_id]
+    path = []
+    while step_id is not None:
+        path.append(step_id)
+        step_id = previous[step_id]
+    return list(reversed(path)), total
+
+def _run_step(step: dict, tool, results: dict) -> tuple:
+    started = time.perf_counter()
+    result = tool(resolve_arguments(step.get(ARGS_KEY, {}), results))
+    return result, time.perf_counter() - started
+
+def execute_plan(plan: dict, tools: dict, max_workers: int = MAX_PARALLEL_STEPS) -> PlanExecution:
+    """
+    Run a multi-step plan, running steps that do not depend on each other in parallel threads.
+
+    Args:
+        plan (dict): Plan of the form
+            {"steps": [{"id": "...", "tool": "...", "args": {...}}, ...], "answer": "<step id>"}
+            where argument values may be references {"$ref": "<step id>/<key or index>/..."}.
+        tools (dict): Tool functions keyed by tool name, each taking the resolved args.
+        max_workers (int): Maximum number of steps running at once.
+
+    Returns:
+        PlanExecution: Results, per-step durations and critical path of the plan.
+
+    Raises:
+        PlanError: If the plan is invalid.
+        Exception: Whatever a failing step raised.
+    """
+    # Lazy: agent imports this module on the synchronous calculator path
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+    validate_plan(plan, tools)
+    steps = {step[STEP_ID_KEY]: step for step in plan[STEPS_KEY]}
+    dependencies = {step_id: step_dependencies(step) for step_id, step in steps.items()}
+    results = {}
+    durations = {}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        pending = set(steps)
+        while pending or running:
+            for step_id in [step_id for step_id in pending if dependencies[step_id] <= results.keys()]:
+                pending.discard(step_id)
+                step = steps[step_id]
+                running[pool.submit(_run_step, step, tools[step[TOOL_KEY]], dict(results))] = step_id
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                try:
+                    results[step_id], durations[step_id] = future.result()
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    raise
+
+    return PlanExecution(plan, results, durations, time.perf_counter() - started)
+
+async def execute_plan_async(plan: dict, tools: dict) -> PlanExecution:
+    """
+    Asynchronous version of execute_plan.
+
+    Coroutine tools are awaited directly, other tools run in worker threads.
+    Each step starts as soon as the steps it references have finished.
+
+    Args:
+        plan (dict): Plan with a list of steps, see execute_plan.
+        tools (dict): Tool functions or coroutine functions keyed by tool name.
+
+    Returns:
+        PlanExecution: Results, per-step durations and critical path of the plan.
+    """
+    # Lazy: agent imports this module on the synchronous calculator path
+    import asyncio
+
+    order = validate_plan(plan, tools)
+    steps = {step[STEP_ID_KEY]: step for step in plan[STEPS_KEY]}
+    results = {}
+    durations = {}
+    tasks = {}
+    started = time.perf_counter()
+
+    async def run(step_id):
+        step = steps[step_id]
+        await asyncio.gather(*[tasks[dependency] for dependency in step_dependencies(step)])
+        tool = tools[step[TOOL_KEY]]
+        step_started = time.perf_counter()
+        args = resolve_arguments(step.get(ARGS_KEY, {}), results)
+        if asyncio.iscoroutinefunction(tool):
+            results[step_id] = await tool(args)
+        else:
+            results[step_id] = await asyncio.to_thread(tool, args)
+        durations[step_id] = time.perf_counter() - step_started
+
+    for step_id in order:
+        tasks[step_id] = asyncio.ensure_future(run(step_id))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return PlanExecution(plan, results, durations, time.perf_counter() - started)
@@ -0,0 +1,95 @@
+import asyncio
+import weakref
+import threading
+import httpx
+
+# Connection pool settings shared by every async tool call
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+MAX_CONNECTIONS_PER_HOST = 50
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+READ_TIMEOUT_SECONDS = 10.0
+
+HTTPError = httpx.HTTPError
+
+class _LoopClient:
+    # Pooled client and per-host semaphores of one event loop
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+        )
+        self.host_semaphores = {}
+
+# Clients keyed by the event loop they were created on
+_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def _loop_client() -> _LoopClient:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        # A closed loop cannot await aclose(); dropping its client lets the sockets be collected
+        for closed_loop in [other for other in _clients if other.is_closed()]:
+            del _clients[closed_loop]
+        loop_client = _clients.get(loop)
+        if loop_client is None or loop_client.client.is_closed:
+            loop_client = _clients[loop] = _LoopClient()
+        return loop_client
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the pooled async HTTP client for the running event loop.
+
+    Connections are kept alive and reused across calls, so repeated requests
+    to the same upstream skip DNS, TCP and TLS setup. Every event loop gets
+    its own client; call aclose() before the loop ends to release its
+    connections.
+
+    Returns:
+        httpx.AsyncClient: Shared client with connection limits and timeouts.
+    """
+    return _loop_client().client
+
+def _host_semaphore(loop_client: _LoopClient, url: str) -> asyncio.Semaphore:
+    host = httpx.URL(url).host
+    semaphore = loop_client.host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = loop_client.host_semaphores[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return semaphore
+
+async def get(url: str, params: dict = None, timeout: tuple = None) -> httpx.Response:
+    """
+    Send a GET request through the shared client.
+
+    At most MAX_CONNECTIONS_PER_HOST requests run against the same host at once;
+    the rest wait for a free slot.
+
+    Args:
+        url (str): Absolute URL to request.
+        params (dict, optional): Query string parameters.
+        timeout (tuple, optional): (connect, read) timeouts in seconds instead of the client's.
+
+    Returns:
+        httpx.Response: Response of the upstream service.
+
+    Raises:
+        httpx.HTTPError: If the request fails or times out.
+    """
+    loop_client = _loop_client()
+    async with _host_semaphore(loop_client, url):
+        return await loop_client.client.get(url, params=params, timeout=httpx.Timeout(timeout[1], connect=timeout[0]) if timeout else httpx.USE_CLIENT_DEFAULT)
+
+async def aclose() -> None:
+    """
+    Close the running event loop's client and release its pooled connections.
+    """
+    with _lock:
+        loop_client = _clients.pop(asyncio.get_running_loop(), None)
+    if loop_client is not None and not loop_client.client.is_closed:
+        await loop_client.client.aclose()
@@ -0,0 +1,339 @@
+import json
+import time
+import random
+import threading
+from itertools import islice
+from .. import config, tracing
+
+# Settings that select and configure the LLM backend
+LLM_BACKEND_SETTING = "LLM_BACKEND"
+LLM_BASE_URL_SETTING = "LLM_BASE_URL"
+LLM_API_KEY_SETTING = "OPENAI_API_KEY"
+LLM_MODEL_SETTING = "LLM_MODEL"
+LLM_TIMEOUT_SETTING = "LLM_TIMEOUT_SECONDS"
+LLM_MAX_RETRIES_SETTING = "LLM_MAX_RETRIES"
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+CHAT_COMPLETIONS_PATH = "/chat/completions"
+
+# Connection pool and retry policy of the OpenAI compatible backend
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+TIMEOUT_SECONDS = 60.0
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 4.0
+RETRY_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+SSE_DATA_PREFIX = "data:"
+SSE_DONE = "[DONE]"
+
+class LLMError(RuntimeError):
+    """
+    Raised when the LLM backend cannot produce a response.
+    """
+
+def build_messages(system_prompt: str, user_query: str, knowledge_base=None) -> list:
+    """
+    Build chat messages for an LLM call.
+
+    Args:
+        system_prompt (str): The instruction or context provided to the language model.
+        user_query (str): The user's input query or prompt.
+        knowledge_base (optional, any): Additional context, sent as JSON unless it is a string.
+
+    Returns:
+        list[dict]: System and user messages in the chat completions format.
+    """
+    content = user_query
+    if knowledge_base is not None:
+        context = knowledge_base if isinstance(knowledge_base, str) else json.dumps(knowledge_base)
+        content = f"{user_query}\n\nKnowledge base:\n{context}"
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": content}]
+
+def parse_llm_response(text: str):
+    """
+    Decode JSON object responses such as plans, leaving plain answers as text.
+
+    Args:
+        text (str): Raw response text.
+
+    Returns:
+        dict or str: The decoded object, or the text itself.
+    """
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            return json.loads(stripped)
+        except json.JSONDecodeError:
+            pass
+    return text
+
+def backoff_delay(attempt: int, base_seconds: float = BACKOFF_BASE_SECONDS, max_seconds: float = BACKOFF_MAX_SECONDS) -> float:
+    """
+    Get the delay before a retry using exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        base_seconds (float): Delay cap of the first retry.
+        max_seconds (float): Largest delay cap.
+
+    Returns:
+        float: Seconds to wait, uniformly drawn up to the capped exponential delay.
+    """
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+class StubBackend:
+    """
+    Offline backend that returns a fixed response for demonstration purposes.
+    """
+
+    def complete(self, messages: list) -> str:
+        """
+        Get a canned response, ignoring the messages.
+
+        Returns:
+            str: A currency conversion tool plan as JSON.
+        """
+        # Uncomment the line below to simulate a currency conversion tool response
+        return json.dumps({"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}})
+
+        # Uncomment the lines below to simulate a weather tool response
+        # if "Knowledge base:" not in messages[-1]["content"]:
+        #     return json.dumps({"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-23"}})
+        # return "The weather is sunny with a high of 25°C and a low of 15°C."
+
+        # Uncomment the line below to simulate a calculator tool response
+        # return json.dumps({"tool": "calculator","args": {"operand": "%","operator_1": 12.5,"operator_2": 243}})
+
+        # Uncomment the lines below to simulate a multi-step plan response
+        # return json.dumps({"steps": [
+        #     {"id": "paris", "tool": "weather", "args": {"city": "paris", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+        #     {"id": "london", "tool": "weather", "args": {"city": "london", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+        #     {"id": "sum", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "paris/0/average_temperature_in_celcious"}, "operator_2": {"$ref": "london/0/average_temperature_in_celcious"}}},
+        #     {"id": "average", "tool": "calculator", "args": {"operand": "/", "operator_1": {"$ref": "sum"}, "operator_2": 2}},
+        #     {"id": "answer", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "average"}, "operator_2": 10}}
+        # ], "answer": "answer"})
+
+        # Uncomment the line below to simulate a knowledge base tool response
+        # return json.dumps({"top_matched_titles": ["Alan Turing"]})
+
+    def stream(self, messages: list):
+        """
+        Yield the canned response as a single chunk.
+        """
+        yield self.complete(messages)
+
+class OpenAICompatibleBackend:
+    """
+    Backend for any server implementing the OpenAI chat completions API.
+
+    Requests share one keep-alive connection pool. Connection errors, timeouts
+    and retryable status codes are retried with jittered exponential backoff;
+    a stream is only retried until its first token has been received.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: str = None, model: str = DEFAULT_MODEL,
+                 timeout_seconds: float = TIMEOUT_SECONDS, max_retries: int = MAX_RETRIES, sleep=time.sleep):
+        """
+        Args:
+            base_url (str): API root, e.g. https://api.openai.com/v1.
+            api_key (str, optional): Bearer token sent with every request.
+            model (str): Model name.
+            timeout_seconds (float): Read timeout of a request, or between two streamed chunks.
+            max_retries (int): Retries after the first failed attempt.
+            sleep (callable): Waits between retries, replaceable in tests.
+        """
+        import httpx
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.url = base_url.rstrip("/") + CHAT_COMPLETIONS_PATH
+        self.model = model
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.retries = 0
+        self.client = httpx.Client(
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(timeout_seconds, connect=CONNECT_TIMEOUT_SECONDS),
+        )
+        self._retryable_errors = (httpx.TransportError,)
+        self._status_error = httpx.HTTPStatusError
+
+    def _payload(self, messages: list, stream: bool) -> dict:
+        return {"model": self.model, "messages": messages, "stream": stream}
+
+    def _with_retries(self, attempt_call):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return attempt_call()
+            except self._retryable_errors as e:
+                error = e
+            except self._status_error as e:
+                if e.response.status_code not in RETRY_STATUS_CODES:
+                    raise LLMError(f"LLM request failed with status {e.response.status_code}") from e
+                error = e
+            if attempt < self.max_retries:
+                self.retries += 1
+                self.sleep(backoff_delay(attempt))
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {error}") from error
+
+    def complete(self, messages: list) -> str:
+        """
+        Get a complete response.
+
+        Args:
+            messages (list[dict]): Chat messages.
+
+        Returns:
+            str: Content of the first choice.
+
+        Raises:
+            LLMError: If every attempt failed or the response is malformed.
+        """
+        def attempt_call():
+            with tracing.span("http.llm") as span:
+                response = self.client.post(self.url, json=self._payload(messages, False))
+                span.set_attribute("status", response.status_code)
+                response.raise_for_status()
+                try:
+                    return response.json()
+                except ValueError as e:
+                    # e.g. an HTML page from a proxy or gateway
+                    raise LLMError(f"Malformed LLM response: {response.text[:200]!r}") from e
+
+        body = self._with_retries(attempt_call)
+        try:
+            return body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Malformed LLM response: {body}") from e
+
+    def stream(self, messages: list):
+        """
+        Stream a response as server-sent events.
+
+        Args:
+            messages (list[dict]): Chat messages.
+
+        Yields:
+            str: Content chunks in order.
+
+        Raises:
+            LLMError: If every attempt to start the stream failed.
+        """
+        def open_stream():
+            # Traced up to the first chunk, the time the user waits before the answer starts
+            with tracing.span("http.llm_first_chunk") as span:
+                request = self.client.build_request("POST", self.url, json=self._payload(messages, True))
+                response = self.client.send(request, stream=True)
+                span.set_attribute("status", response.status_code)
+                try:
+                    response.raise_for_status()
+                    # One parser reads the whole response, so what it skipped before the first chunk is kept
+                    chunks = _sse_chunks(response.iter_lines())
+                    # Read up to the first chunk so failures before it can be retried
+                    first_chunks = list(islice(chunks, 1))
+                except BaseException:
+                    response.close()
+                    raise
+                return response, chunks, first_chunks
+
+        response, chunks, first_chunks = self._with_retries(open_stream)
+        try:
+            yield from first_chunks
+            yield from chunks
+        except self._retryable_errors as e:
+            raise LLMError(f"LLM stream interrupted: {e}") from e
+        finally:
+            response.close()
+
+    def close(self) -> None:
+        self.client.close()
+
+def _sse_chunks(lines):
+    # Content deltas of an OpenAI style event stream, until [DONE]
+    skipped = []
+    for line in lines:
+        if not line.startswith(SSE_DATA_PREFIX):
+            if skipped is not None and line.strip() and len(skipped) < 3:
+                skipped.append(line)
+            continue
+        skipped = None
+        data = line[len(SSE_DATA_PREFIX):].strip()
+        if data == SSE_DONE:
+            return
+        try:
+            content = json.loads(data)["choices"][0]["delta"].get("content")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise LLMError(f"Malformed LLM stream event: {data}") from e
+        if content:
+            yield content
+    if skipped:
+        # The body had text but no events, e.g. an HTML page from a proxy or gateway
+        raise LLMError(f"Malformed LLM stream: {' '.join(skipped)[:200]!r}")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend():
+    """
+    Create the backend selected by LLM_BACKEND: "stub" (default) or "openai".
+
+    Returns:
+        StubBackend or OpenAICompatibleBackend: New backend.
+
+    Raises:
+        ValueError: If LLM_BACKEND names an unknown backend.
+    """
+    name = config.get_setting(LLM_BACKEND_SETTING, "stub")
+    if name == "stub":
+        return StubBackend()
+    if name == "openai":
+        return OpenAICompatibleBackend(
+            base_url=config.get_setting(LLM_BASE_URL_SETTING, DEFAULT_BASE_URL),
+            api_key=config.get_setting(LLM_API_KEY_SETTING),
+            model=config.get_setting(LLM_MODEL_SETTING, DEFAULT_MODEL),
+            timeout_seconds=float(config.get_setting(LLM_TIMEOUT_SETTING, TIMEOUT_SECONDS)),
+            max_retries=int(config.get_setting(LLM_MAX_RETRIES_SETTING, MAX_RETRIES)),
+        )
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+def get_backend():
+    """
+    Get the LLM backend shared by every call, creating it on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def set_backend(backend) -> None:
+    """
+    Replace the shared LLM backend.
+
+    Args:
+        backend: Object with complete(messages) and stream(messages) methods, or None to
+            create the configured backend again on next use.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def close_backend() -> None:
+    """
+    Close the shared LLM backend's connections; the next call creates the configured backend again.
+    """
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if backend is not None and hasattr(backend, "close"):
+        backend.close()
@@ -0,0 +1,285 @@
+"""
+Fit the context sent with an LLM call into a token budget.
+
+Knowledge base entries are split into chunks of their detail text, other list
+contexts (e.g. weather days) into one chunk per item, and the results of a
+multi-step plan into the chunks of every step. Chunks are scored
+against the query with BM25 and the budget is filled greedily with the best
+chunks, which are then put back in their original order.
+"""
+import re
+import json
+import math
+from collections import Counter
+
+TITLE_KEY = "title"
+DETAIL_KEY = "detail"
+
+CONTEXT_TOKEN_BUDGET = 2000
+CHUNK_TOKENS = 64
+
+# BM25 ranking parameters for chunks
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Roughly how BPE tokenizers split text: words, groups of digits and pairs of punctuation marks
+TOKEN_PIECE_PATTERN = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]{1,2}|_")
+CHARACTERS_PER_TOKEN = 6
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens of a text without a tokenizer.
+
+    Every word, group of up to three digits and pair of punctuation marks
+    counts as one token, and words longer than CHARACTERS_PER_TOKEN count as
+    one token per CHARACTERS_PER_TOKEN characters. This tracks common BPE
+    tokenizers closely enough for budgeting, at a fraction of their cost.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return sum(-(-len(piece) // CHARACTERS_PER_TOKEN) for piece in TOKEN_PIECE_PATTERN.findall(text))
+
+def context_tokens(context) -> int:
+    """
+    Estimate the tokens of a context the way it is sent to the LLM (JSON unless it is a string).
+    """
+    return estimate_tokens(context if isinstance(context, str) else json.dumps(context))
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """
+    Split text into chunks of whole sentences of at most max_tokens each.
+
+    Sentences longer than max_tokens are split between words.
+
+    Args:
+        text (str): Text to split.
+        max_tokens (int): Token limit of a chunk.
+
+    Returns:
+        list[str]: Chunks in order; joining them with spaces gives the text back up to whitespace.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in SENTENCE_END_PATTERN.split(text.strip()):
+        pieces = [sentence]
+        if estimate_tokens(sentence) > max_tokens:
+            pieces = sentence.split()
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def score_chunks(query: str, chunks: list) -> list:
+    """
+    Score text chunks against a query with BM25, using the chunks themselves as the corpus.
+
+    Args:
+        query (str): Free text query.
+        chunks (list[str]): Chunks to score.
+
+    Returns:
+        list[float]: Score of every chunk, in order.
+    """
+    query_words = set(WORD_PATTERN.findall(query.lower()))
+    chunk_words = [Counter(WORD_PATTERN.findall(chunk.lower())) for chunk in chunks]
+    if not chunks or not query_words:
+        return [0.0] * len(chunks)
+
+    average_length = sum(sum(words.values()) for words in chunk_words) / len(chunks) or 1.0
+    idf = {}
+    for word in query_words:
+        count = sum(1 for words in chunk_words if word in words)
+        if count:
+            idf[word] = math.log(1 + (len(chunks) - count + 0.5) / (count + 0.5))
+
+    scores = []
+    for words in chunk_words:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(words.values()) / average_length)
+        scores.append(sum(
+            weight * words[word] * (BM25_K1 + 1) / (words[word] + norm)
+            for word, weight in idf.items() if word in words
+        ))
+    return scores
+
+class PackedContext:
+    """
+    Context fitted into a token budget, with the estimated tokens before and after.
+    """
+
+    def __init__(self, context, original_tokens: int, packed_tokens: int, chunks_kept: int, chunks_total: int):
+        self.context = context
+        self.original_tokens = original_tokens
+        self.packed_tokens = packed_tokens
+        self.chunks_kept = chunks_kept
+        self.chunks_total = chunks_total
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.packed_tokens
+
+def _is_entry(item) -> bool:
+    return isinstance(item, dict) and isinstance(item.get(DETAIL_KEY), str)
+
+def _split_items(context: list) -> list:
+    # (item index, chunk) pairs; an entry's chunk is a piece of its detail, other items are one chunk
+    chunks = []
+    for index, item in enumerate(context):
+        if _is_entry(item):
+            chunks.extend((index, chunk) for chunk in chunk_text(item[DETAIL_KEY]) or [""])
+        else:
+            chunks.append((index, item))
+    return chunks
+
+def _chunk_text_for_scoring(context: list, index: int, chunk) -> str:
+    item = context[index]
+    if _is_entry(item):
+        return f"{item.get(TITLE_KEY, '')} {chunk}"
+    return chunk if isinstance(chunk, str) else json.dumps(chunk)
+
+def _rebuild(context: list, selected: list) -> list:
+    # Put the selected chunks back together in their original order, as (item index, item) pairs
+    chunks_by_item = {}
+    for index, chunk in sorted(selected, key=lambda pair: pair[0]):
+        chunks_by_item.setdefault(index, []).append(chunk)
+    packed = []
+    for index in sorted(chunks_by_item):
+        item = context[index]
+        if _is_entry(item):
+            packed.append((index, {**item, DETAIL_KEY: " ".join(chunks_by_item[index])}))
+        else:
+            packed.append((index, item))
+    return packed
+
+def _flatten_steps(context: dict) -> tuple[list, list]:
+    # Items of every step result with the step id of each; list results give one item per element
+    items = []
+    owners = []
+    for step_id, result in context.items():
+        if isinstance(result, list):
+            values = result
+        elif isinstance(result, str):
+            values = [{DETAIL_KEY: result}]
+        else:
+            values = [result]
+        items.extend(values)
+        owners.extend([step_id] * len(values))
+    return items, owners
+
+def _unflatten_steps(context: dict, owners: list, packed: list) -> dict:
+    # Steps without a kept item are left out
+    kept = {}
+    for index, item in packed:
+        kept.setdefault(owners[index], []).append(item)
+    steps = {}
+    for step_id, result in context.items():
+        if step_id not in kept:
+            continue
+        if isinstance(result, list):
+            steps[step_id] = kept[step_id]
+        elif isinstance(result, str):
+            steps[step_id] = kept[step_id][0][DETAIL_KEY]
+        else:
+            steps[step_id] = kept[step_id][0]
+    return steps
+
+def _truncate(item, max_tokens: int) -> str:
+    # Leading text of an item that does not fit on its own
+    text = item if isinstance(item, str) else json.dumps(item)
+    return (chunk_text(text, max_tokens) or [""])[0]
+
+def pack_context(query: str, context, token_budget: int = CONTEXT_TOKEN_BUDGET) -> PackedContext:
+    """
+    Fit a context into a token budget, keeping the chunks most relevant to the query.
+
+    Contexts within the budget are returned unchanged. Lists are chunked as
+    described in the module docstring; strings are chunked by sentence. Dicts of
+    multi-step plan results are chunked across all steps: list results by
+    element, text results by sentence and other results whole; steps with
+    nothing left are dropped. Other contexts cannot be split and are returned
+    unchanged. When not even the most relevant item fits, it is truncated to
+    leading text that does.
+
+    Args:
+        query (str): The user's query.
+        context: Knowledge base entries, weather days, text, step results keyed by step id or any other context.
+        token_budget (int): Maximum estimated tokens of the packed context.
+
+    Returns:
+        PackedContext: The packed context and its token counts.
+    """
+    original_tokens = context_tokens(context)
+    if original_tokens <= token_budget or not isinstance(context, (list, str, dict)):
+        return PackedContext(context, original_tokens, original_tokens, 1, 1)
+
+    owners = None
+    if isinstance(context, str):
+        items = [{DETAIL_KEY: context}]
+    elif isinstance(context, dict):
+        items, owners = _flatten_steps(context)
+    else:
+        items = context
+    chunks = _split_items(items)
+    scores = score_chunks(query, [_chunk_text_for_scoring(items, index, chunk) for index, chunk in chunks])
+
+    # Best chunks first; an entry's title and keys are paid for with its first chunk,
+    # and a step's key with its first item
+    ranked = sorted(range(len(chunks)), key=lambda position: (-scores[position], position))
+    used_tokens = context_tokens({} if owners is not None else [])
+    started_items = set()
+    started_steps = set()
+    selected_positions = []
+    for position in ranked:
+        index, chunk = chunks[position]
+        item = items[index]
+        if _is_entry(item):
+            # Counted as escaped JSON, the form it is sent in
+            tokens = estimate_tokens(json.dumps(chunk)) + 1
+            if index not in started_items:
+                tokens += context_tokens({**item, DETAIL_KEY: ""}) + 1
+        else:
+            tokens = context_tokens(chunk) + 1
+        if owners is not None and owners[index] not in started_steps:
+            tokens += context_tokens({owners[index]: []})
+        if used_tokens + tokens > token_budget:
+            continue
+        used_tokens += tokens
+        started_items.add(index)
+        if owners is not None:
+            started_steps.add(owners[index])
+        selected_positions.append(position)
+
+    def finish(pairs):
+        if isinstance(context, str):
+            return pairs[0][1][DETAIL_KEY] if pairs else ""
+        if owners is not None:
+            return _unflatten_steps(context, owners, pairs)
+        return [item for _, item in pairs]
+
+    packed = finish(_rebuild(items, [chunks[position] for position in selected_positions]))
+    if not selected_positions and chunks:
+        # Keep the most relevant item, truncated until it fits, rather than sending no context at all
+        index, chunk = chunks[ranked[0]]
+        limit = token_budget
+        while limit > 0:
+            text = _truncate(chunk, limit)
+            candidate = finish([(index, {**items[index], DETAIL_KEY: text} if _is_entry(items[index]) else text)])
+            if context_tokens(candidate) <= token_budget:
+                packed = candidate
+                selected_positions = [ranked[0]]
+                break
+            limit //= 2
+    return PackedContext(packed, original_tokens, context_tokens(packed), len(selected_positions), len(chunks))
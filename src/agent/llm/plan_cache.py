@@ -0,0 +1,266 @@
+import re
+import json
+import time
+import threading
+from ..cache import TTLCache
+
+PLAN_CACHE_MAX_SIZE = 4096
+# Plans of relative queries ("weather last week") go stale as days pass
+PLAN_CACHE_TTL_SECONDS = 3600
+SHINGLE_SIZE = 2
+
+TOOL_KEY = "tool"
+STEPS_KEY = "steps"
+
+# Numbers (with optional thousands separators and decimals), words, or single symbols
+QUERY_TOKEN_PATTERN = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+|\w+|[^\w\s]")
+# Sentence punctuation that never changes the plan; operators such as % + - * / are kept
+IGNORED_PUNCTUATION = frozenset("?!.,;:'\"`")
+# Words and operators that make "100,200,300" possibly a list of operands rather than one number
+LIST_CONTEXT_TOKENS = frozenset({
+    "add", "sum", "plus", "total", "subtract", "minus", "multiply", "times", "product", "divide",
+    "average", "mean", "numbers", "and", "+", "-", "*", "/", "%", "x",
+})
+# Politeness and question words that shingle keys ignore; prepositions are kept
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "please", "kindly", "hey", "hi", "can", "could", "would", "you", "me", "i",
+    "tell", "show", "give", "what", "whats", "s", "is", "are", "was", "do", "does", "like", "want", "know",
+})
+
+def canonical_number(token: str) -> str:
+    """
+    Write a numeric token in a single canonical form.
+
+    Args:
+        token (str): Token such as "12.50", "1,000" or ".5".
+
+    Returns:
+        str: "12.5", "1000" or "0.5".
+    """
+    whole, _, fraction = token.replace(",", "").partition(".")
+    whole = whole.lstrip("0") or "0"
+    fraction = fraction.rstrip("0")
+    return f"{whole}.{fraction}" if fraction else whole
+
+def query_tokens(user_query: str) -> list:
+    """
+    Split a query into case-folded words, canonical numbers and operator symbols.
+
+    Thousands separators are dropped ("1,000" becomes "1000") unless the number
+    has no decimal part and the query has words or operators in
+    LIST_CONTEXT_TOKENS. Then "add 100,200,300" may mean three operands and the
+    number is kept as written, so it never shares a key with "add 100200300".
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        list[str]: Tokens with sentence punctuation removed.
+    """
+    tokens = [token for token in QUERY_TOKEN_PATTERN.findall(user_query.casefold()) if token not in IGNORED_PUNCTUATION]
+    list_context = not LIST_CONTEXT_TOKENS.isdisjoint(tokens)
+    for index, token in enumerate(tokens):
+        if token[0].isdigit() or token[0] == ".":
+            if not (list_context and "," in token and "." not in token):
+                tokens[index] = canonical_number(token)
+    return tokens
+
+def normalize_query(user_query: str) -> str:
+    """
+    Normalize a query so that trivially different spellings share a cache key.
+
+    "What is 12.5% of 243?" and "what is 12.50 % of 243" both become
+    "what is 12.5 % of 243".
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        str: Normalized query.
+    """
+    return " ".join(query_tokens(user_query))
+
+def shingle_key(user_query: str, size: int = SHINGLE_SIZE) -> str:
+    """
+    Hash the set of word shingles of a normalized query without filler words.
+
+    "Please tell me the weather in Paris" and "weather in paris?" share a key,
+    while swapping currencies or changing any number gives a different key.
+
+    Args:
+        user_query (str): The user's input query.
+        size (int): Number of tokens per shingle.
+
+    Returns:
+        str: Hex digest of the sorted shingles.
+    """
+    import hashlib
+
+    tokens = [token for token in query_tokens(user_query) if token not in FILLER_WORDS]
+    shingles = {" ".join(tokens[start:start + size]) for start in range(max(len(tokens) - size + 1, 1))}
+    return hashlib.blake2b("\n".join(sorted(shingles)).encode("utf-8"), digest_size=16).hexdigest()
+
+def is_cacheable_plan(plan) -> bool:
+    """
+    Check whether a planner response is a tool plan worth caching.
+    """
+    return isinstance(plan, dict) and (TOOL_KEY in plan or STEPS_KEY in plan)
+
+class SQLitePlanStore:
+    """
+    Persistent plan store backed by a SQLite file.
+
+    Any object with the same get, set, clear and close methods can be used
+    as the persistent backend of a PlanCache.
+    """
+
+    def __init__(self, database_path: str):
+        """
+        Args:
+            database_path (str): SQLite file holding the plans.
+        """
+        import sqlite3
+
+        self._database = sqlite3.connect(database_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._database:
+            self._database.execute(
+                "CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, plan TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        """
+        Get a stored plan.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple[str, float] or None: (plan JSON, time stored) or None if missing.
+        """
+        with self._lock:
+            return self._database.execute("SELECT plan, stored_at FROM plans WHERE key = ?", (key,)).fetchone()
+
+    def set(self, key: str, plan_json: str, stored_at: float) -> None:
+        with self._lock, self._database:
+            self._database.execute(
+                "INSERT OR REPLACE INTO plans (key, plan, stored_at) VALUES (?, ?, ?)", (key, plan_json, stored_at)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._database:
+            self._database.execute("DELETE FROM plans")
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+class PlanCache:
+    """
+    Cache of planner responses keyed by normalized query.
+
+    Plans are kept as JSON in an in-memory LRU and, when a store is given,
+    in a persistent backend shared across restarts. Both tiers honour the
+    same time to live, measured from when the plan was first produced.
+    """
+
+    def __init__(self, max_size: int = PLAN_CACHE_MAX_SIZE, ttl_seconds: float = PLAN_CACHE_TTL_SECONDS,
+                 store=None, key_function=normalize_query, clock=time.time):
+        """
+        Args:
+            max_size (int): Maximum number of plans kept in memory.
+            ttl_seconds (float, optional): Lifetime of a plan, None keeps plans until evicted.
+            store (SQLitePlanStore, optional): Persistent backend.
+            key_function (callable): Maps a query to its cache key, normalize_query or shingle_key.
+            clock (callable): Wall clock time source, replaceable in tests.
+        """
+        self.memory = TTLCache(max_size)
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self.key_function = key_function
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return self.ttl_seconds is None or self.clock() - stored_at < self.ttl_seconds
+
+    def get(self, user_query: str):
+        """
+        Get the cached plan of a query.
+
+        Args:
+            user_query (str): The user's input query.
+
+        Returns:
+            dict or None: A fresh copy of the plan, or None on a miss.
+        """
+        key = self.key_function(user_query)
+        entry = self.memory.get(key)
+        from_store = False
+        if (entry is None or not self._is_fresh(entry[1])) and self.store is not None:
+            entry = self.store.get(key)
+            from_store = entry is not None
+
+        if entry is None or not self._is_fresh(entry[1]):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if from_store:
+            self.memory.set(key, tuple(entry))
+        with self._lock:
+            self.hits += 1
+            self.store_hits += from_store
+        return json.loads(entry[0])
+
+    def set(self, user_query: str, plan) -> bool:
+        """
+        Cache the plan of a query. Responses that are not tool plans are ignored.
+
+        Args:
+            user_query (str): The user's input query.
+            plan (dict): Planner response.
+
+        Returns:
+            bool: True if the plan was cached.
+        """
+        if not is_cacheable_plan(plan):
+            return False
+        key = self.key_function(user_query)
+        entry = (json.dumps(plan), self.clock())
+        self.memory.set(key, entry)
+        if self.store is not None:
+            self.store.set(key, *entry)
+        return True
+
+    def clear(self) -> None:
+        """
+        Drop every cached plan from memory and the persistent store.
+        """
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: hits, misses, hits served by the persistent store, memory evictions and size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "store_hits": self.store_hits,
+                "evictions": self.memory.evictions,
+                "size": len(self.memory),
+            }
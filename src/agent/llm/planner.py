@@ -1,39 +1,23 @@
 import json
-
-def initiate_planner(user_query: str) -> dict:
-    """
-    Generates a tool usage plan for the given user query by identifying which tool 
-    should be used and extracting the necessary arguments for that tool.
-
-    The function prompts a language model to analyze the user's query and decide 
-    which tool is appropriate based on the query content. It supports tools such as:
-    - Calculator (for math calculations)
-    - Weather (for weather information)
-    - Knowledge Base (for querying stored information)
-    - Currency Converter (for currency conversion)
-    - No Tools (if the query can be answered directly without tools)
-
-    For each tool, the function expects the language model to return a JSON-formatted 
-    plan specifying the tool name and its required arguments.
-
-    Args:
-        user_query (str): The user's input query or request.
-
-    Returns:
-        str: A JSON string representing the planned tool to be used and its arguments, 
-             as generated by the language model.
-
-    Example response formats:
-        {"tool": "calculator", "args": {"operand": "%", "operator_1": 12.5, "operator_2": 243}}
-        {"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-23"}}
-        {"tool": "knowledge_base", "args": {"query": "summarize user prompt"}}
-        {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}}
-
-    Note:
-        The response should contain no additional information other than the JSON plan.
-    """
-
-    system_prompt = """You are a tool planner for an autonomous agent.
+import threading
+from .. import config, tracing
+from ..logger import get_logger
+from . import backend
+from .rule_planner import plan_from_rules
+from .context_packer import CONTEXT_TOKEN_BUDGET, pack_context
+from .plan_cache import PLAN_CACHE_TTL_SECONDS, PlanCache, SQLitePlanStore, normalize_query, shingle_key
+
+logger = get_logger(__name__)
+
+PLAN_CACHE_DATABASE_SETTING = "PLAN_CACHE_DATABASE"
+PLAN_CACHE_TTL_SETTING = "PLAN_CACHE_TTL_SECONDS"
+# "normalized" (default) or "shingles"
+PLAN_CACHE_KEY_SETTING = "PLAN_CACHE_KEY"
+PLAN_CACHE_KEY_FUNCTIONS = {"normalized": normalize_query, "shingles": shingle_key}
+# Estimated tokens of context sent with an answer
+CONTEXT_TOKEN_BUDGET_SETTING = "LLM_CONTEXT_TOKEN_BUDGET"
+
+PLANNER_SYSTEM_PROMPT = """You are a tool planner for an autonomous agent.
     Available tools:
     1. Calculator - For math calculations
         if the query is about math, return a plan with tool "calculator",
@@ -41,6 +25,8 @@ def initiate_planner(user_query: str) -> dict:
         and return like the example below:
         
         Example response: {"tool": "calculator","args": {"operand": "%","operator_1": 12.5,"operator_2": 243}}
+        For a query with more than one operation, return the whole expression instead:
+        Example response: {"tool": "calculator","args": {"expr": "(12.5 % 243) + 10 / 3"}}
         Do not return any other information in the plan.
 
     2. Weather - For weather information
@@ -68,9 +54,127 @@ def initiate_planner(user_query: str) -> dict:
         Do not return any other information in the plan.
 
     5. No Tools - If the query can be answered directly without tools
+
+    6. Multiple Steps - If the query needs several tool calls
+        return a plan with a list of "steps", each with a unique "id", a "tool" and its "args".
+        An argument can use the result of an earlier step with {"$ref": "<step id>/<key or index>/..."}.
+        Steps that do not reference each other run in parallel. Put the id of the step that answers
+        the query in "answer".
+
+        Example response: {"steps": [
+            {"id": "paris", "tool": "weather", "args": {"city": "paris", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+            {"id": "london", "tool": "weather", "args": {"city": "london", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+            {"id": "sum", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "paris/0/average_temperature_in_celcious"}, "operator_2": {"$ref": "london/0/average_temperature_in_celcious"}}},
+            {"id": "average", "tool": "calculator", "args": {"operand": "/", "operator_1": {"$ref": "sum"}, "operator_2": 2}},
+            {"id": "answer", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "average"}, "operator_2": 10}}
+        ], "answer": "answer"}
+        Do not return any other information in the plan.
+    """
+
+KNOWLEDGE_BASE_SYSTEM_PROMPT = """You are a helpful assistant. Use the knowledge base to answer the question.
+    you are given a prompt and a knowledge base. generate a response based on the knowledge base.
+    """
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+def get_plan_cache() -> PlanCache:
+    """
+    Get the plan cache shared by every query, creating it on first use.
+
+    Returns:
+        PlanCache: Cache configured from PLAN_CACHE_DATABASE, PLAN_CACHE_TTL_SECONDS and PLAN_CACHE_KEY.
+    """
+    global _plan_cache
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                database_path = config.get_setting(PLAN_CACHE_DATABASE_SETTING)
+                ttl_seconds = float(config.get_setting(PLAN_CACHE_TTL_SETTING, PLAN_CACHE_TTL_SECONDS))
+                key_name = config.get_setting(PLAN_CACHE_KEY_SETTING, "normalized")
+                _plan_cache = PlanCache(
+                    ttl_seconds=ttl_seconds,
+                    store=SQLitePlanStore(database_path) if database_path else None,
+                    key_function=PLAN_CACHE_KEY_FUNCTIONS[key_name],
+                )
+    return _plan_cache
+
+def initiate_planner(user_query: str) -> dict:
+    """
+    Generates a tool usage plan for the given user query by identifying which tool 
+    should be used and extracting the necessary arguments for that tool.
+
+    The function prompts a language model to analyze the user's query and decide 
+    which tool is appropriate based on the query content. It supports tools such as:
+    - Calculator (for math calculations)
+    - Weather (for weather information)
+    - Knowledge Base (for querying stored information)
+    - Currency Converter (for currency conversion)
+    - No Tools (if the query can be answered directly without tools)
+
+    For each tool, the function expects the language model to return a JSON-formatted 
+    plan specifying the tool name and its required arguments.
+
+    Args:
+        user_query (str): The user's input query or request.
+
+    Returns:
+        str: A JSON string representing the planned tool to be used and its arguments, 
+             or a multi-step plan, as generated by the language model.
+
+    Example response formats:
+        {"tool": "calculator", "args": {"operand": "%", "operator_1": 12.5, "operator_2": 243}}
+        {"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-23"}}
+        {"tool": "knowledge_base", "args": {"query": "summarize user prompt"}}
+        {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}}
+        {"steps": [
+            {"id": "paris", "tool": "weather", "args": {"city": "paris", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+            {"id": "london", "tool": "weather", "args": {"city": "london", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+            {"id": "sum", "tool": "calculator", "args": {"operand": "+",
+                "operator_1": {"$ref": "paris/0/average_temperature_in_celcious"},
+                "operator_2": {"$ref": "london/0/average_temperature_in_celcious"}}},
+            {"id": "average", "tool": "calculator", "args": {"operand": "/", "operator_1": {"$ref": "sum"}, "operator_2": 2}},
+            {"id": "answer", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "average"}, "operator_2": 10}}
+        ], "answer": "answer"}
+
+    Note:
+        The response should contain no additional information other than the JSON plan.
+        Plain arithmetic and currency conversions are planned by rules without the
+        language model, and other plans are cached by normalized query, so repeated
+        queries skip the language model too.
+    """
+    with tracing.span("planner") as span:
+        plan = plan_from_rules(user_query)
+        if plan is not None:
+            span.set_attribute("source", "rules")
+            return plan
+
+        plan_cache = get_plan_cache()
+        plan = plan_cache.get(user_query)
+        if plan is not None:
+            span.set_attribute("source", "cache")
+            return plan
+
+        span.set_attribute("source", "llm")
+        plan = ask_to_llm(PLANNER_SYSTEM_PROMPT, user_query)
+        plan_cache.set(user_query, plan)
+        return plan
+
+def pack_knowledge_base(user_query, knowledge_base):
     """
+    Fit the context of an answer into the LLM_CONTEXT_TOKEN_BUDGET setting and report the tokens saved.
+
+    Args:
+        user_query (str): The question or prompt provided by the user.
+        knowledge_base: Matched entries, weather days or other context for the answer.
 
-    return ask_to_llm(system_prompt, user_query)
+    Returns:
+        The context, keeping the chunks most relevant to the query if it was over budget.
+    """
+    token_budget = int(config.get_setting(CONTEXT_TOKEN_BUDGET_SETTING, CONTEXT_TOKEN_BUDGET))
+    packed = pack_context(user_query, knowledge_base, token_budget)
+    logger.info("context_packed", sent_tokens=packed.packed_tokens, total_tokens=packed.original_tokens, saved_tokens=packed.saved_tokens)
+    return packed.context
 
 def call_llm_with_knowledge_base(user_query, knowledge_base)  -> dict:
     """
@@ -78,7 +182,8 @@ def call_llm_with_knowledge_base(user_query, knowledge_base)  -> dict:
 
     This function constructs a system prompt instructing the language model to use 
     the knowledge base when answering the user's question, then calls the LLM 
-    interface function `ask_to_llm` to generate the response.
+    interface function `ask_to_llm` to generate the response. The knowledge base
+    is first packed into the context token budget.
 
     Args:
         user_query (str): The question or prompt provided by the user.
@@ -89,11 +194,21 @@ def call_llm_with_knowledge_base(user_query, knowledge_base)  -> dict:
         and knowledge base.
     """
 
-    system_prompt = """You are a helpful assistant. Use the knowledge base to answer the question.
-    you are given a prompt and a knowledge base. generate a response based on the knowledge base.
+    with tracing.span("llm.answer"):
+        return ask_to_llm(KNOWLEDGE_BASE_SYSTEM_PROMPT, user_query, pack_knowledge_base(user_query, knowledge_base))
+
+def stream_llm_with_knowledge_base(user_query, knowledge_base):
     """
+    Streaming version of call_llm_with_knowledge_base.
+
+    Args:
+        user_query (str): The question or prompt provided by the user.
+        knowledge_base (str): The textual knowledge base or context to be used by the LLM.
 
-    return ask_to_llm(system_prompt, user_query, knowledge_base)
+    Yields:
+        str: Chunks of the response, in order, as the language model produces them.
+    """
+    return stream_from_llm(KNOWLEDGE_BASE_SYSTEM_PROMPT, user_query, pack_knowledge_base(user_query, knowledge_base))
 
 def find_top_matched_titles(user_query, titles)  -> dict:
     """
@@ -122,15 +237,17 @@ def find_top_matched_titles(user_query, titles)  -> dict:
         Do not return any other information in the plan.
     """
     
-    return ask_to_llm(system_prompt, user_query, titles)
+    with tracing.span("llm.title_matching", titles=len(titles)):
+        return ask_to_llm(system_prompt, user_query, titles)
 
 def ask_to_llm(system_prompt, user_query, knowledge_base=None) -> dict:
     """
-    Simulates a call to a language model by taking a system prompt, user query,
-    and optionally a knowledge base, then returning a predetermined response.
+    Calls the configured language model backend with a system prompt, user query
+    and optionally a knowledge base.
 
-    This is a stub function intended to mock the behavior of a real LLM API call.
-    It ignores the inputs and returns a fixed response for demonstration purposes.
+    The backend is chosen with the LLM_BACKEND setting. The default "stub" backend
+    returns a predetermined response for demonstration purposes; "openai" calls an
+    OpenAI compatible chat completions endpoint over a pooled HTTP client.
 
     Args:
         system_prompt (str): The instruction or context provided to the language model.
@@ -138,20 +255,23 @@ def ask_to_llm(system_prompt, user_query, knowledge_base=None) -> dict:
         knowledge_base (optional, any): Additional contextual information to assist the model.
 
     Returns:
-        dict: A simulated response, here returning a fixed dictionary representing a 
-              currency conversion tool plan.
+        dict: The decoded JSON response, such as a tool plan, or the response text
+              if the model answered in plain text.
     """
+    messages = backend.build_messages(system_prompt, user_query, knowledge_base)
+    return backend.parse_llm_response(backend.get_backend().complete(messages))
 
-    # Uncomment the line below to simulate a currency conversion tool response
-    return {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}}
-    
-    # Uncomment the lines below to simulate a weather tool response    
-    # if(knowledge_base == None):
-    #     return {"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-23"}}
-    # return "The weather is sunny with a high of 25°C and a low of 15°C."
+def stream_from_llm(system_prompt, user_query, knowledge_base=None):
+    """
+    Streaming version of ask_to_llm for plain text answers.
 
-    # Uncomment the line below to simulate a calculator tool response
-    # return {"tool": "calculator","args": {"operand": "%","operator_1": 12.5,"operator_2": 243}}
-    
-    # Uncomment the line below to simulate a knowledge base tool response
-    # return {"top_matched_titles": ["Alan Turing"]}
\ No newline at end of file
+    Args:
+        system_prompt (str): The instruction or context provided to the language model.
+        user_query (str): The user's input query or prompt.
+        knowledge_base (optional, any): Additional contextual information to assist the model.
+
+    Yields:
+        str: Chunks of the response text, in order.
+    """
+    messages = backend.build_messages(system_prompt, user_query, knowledge_base)
+    yield from backend.get_backend().stream(messages)
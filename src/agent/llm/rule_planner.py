@@ -0,0 +1,166 @@
+import re
+
+CALCULATOR_TOOL = "calculator"
+CURRENCY_CONVERTER_TOOL = "currency_converter"
+
+# Currencies recognised without the LLM; anything else falls back to the planner
+CURRENCY_CODES = frozenset({
+    "AED", "ARS", "AUD", "BDT", "BRL", "CAD", "CHF", "CLP", "CNY", "COP", "CZK", "DKK", "EGP", "EUR",
+    "GBP", "HKD", "HUF", "IDR", "ILS", "INR", "JPY", "KES", "KRW", "KWD", "LKR", "MXN", "MYR", "NGN",
+    "NOK", "NPR", "NZD", "PHP", "PKR", "PLN", "QAR", "RUB", "SAR", "SEK", "SGD", "THB", "TRY", "TWD",
+    "UAH", "USD", "VND", "ZAR",
+})
+CURRENCY_NAMES = {
+    "$": "USD", "dollar": "USD", "dollars": "USD",
+    "€": "EUR", "euro": "EUR", "euros": "EUR",
+    "£": "GBP", "pound": "GBP", "pounds": "GBP",
+    "¥": "JPY", "yen": "JPY",
+    "rupee": "INR", "rupees": "INR",
+    "taka": "BDT",
+    "yuan": "CNY",
+}
+
+# Word and symbol spellings of the calculator operands
+OPERATORS = {
+    "+": "+", "plus": "+",
+    "-": "-", "minus": "-",
+    "*": "*", "x": "*", "×": "*", "times": "*", "multiplied by": "*",
+    "/": "/", "÷": "/", "over": "/", "divided by": "/",
+}
+
+NUMBER = r"[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|[-+]?\.\d+"
+QUESTION_PREFIX = r"(?:(?:please\s+)?(?:what\s+is|what's|whats|calculate|compute|evaluate|how\s+much\s+is|tell\s+me)\s+)?(?:the\s+)?"
+CONVERSION_PREFIX = r"(?:(?:please\s+)?(?:convert|exchange|change|how\s+much\s+is|what\s+is|what's|whats)\s+)?"
+CURRENCY = r"[a-z]{3}|dollars?|euros?|pounds?|yen|rupees?|taka|yuan|[$€£¥]"
+END = r"\s*[?.!]*"
+
+def _operator_pattern() -> str:
+    # Longest spellings first so "multiplied by" wins over shorter alternatives
+    spellings = sorted(OPERATORS, key=len, reverse=True)
+    patterns = []
+    for spelling in spellings:
+        pattern = re.escape(spelling).replace(r"\ ", r"\s+")
+        # Words need whitespace around them, so "0x10" or "2plus3" are not calculations
+        patterns.append(rf"(?<=\s){pattern}(?=\s)" if spelling[0].isalpha() else pattern)
+    return "|".join(patterns)
+
+CALCULATOR_RULES = [
+    # "what is 12.5% of 243", "12.5 percent of 243"
+    (re.compile(rf"{QUESTION_PREFIX}(?P<first>{NUMBER})\s*(?:%|percent)\s+of\s+(?P<second>{NUMBER}){END}", re.IGNORECASE), "%"),
+    # "sum of 2 and 3", "add 2 and 3", "add 2 to 3"
+    (re.compile(rf"{QUESTION_PREFIX}(?:sum\s+of|add)\s+(?P<first>{NUMBER})\s+(?:and|to)\s+(?P<second>{NUMBER}){END}", re.IGNORECASE), "+"),
+    # "product of 4 and 5", "multiply 4 by 5"
+    (re.compile(rf"{QUESTION_PREFIX}(?:product\s+of\s+(?P<first>{NUMBER})\s+and|multiply\s+(?P<first_>{NUMBER})\s+by)\s+(?P<second>{NUMBER}){END}", re.IGNORECASE), "*"),
+    # "difference between 9 and 4"
+    (re.compile(rf"{QUESTION_PREFIX}difference\s+between\s+(?P<first>{NUMBER})\s+and\s+(?P<second>{NUMBER}){END}", re.IGNORECASE), "-"),
+    # "divide 10 by 4"
+    (re.compile(rf"{QUESTION_PREFIX}divide\s+(?P<first>{NUMBER})\s+by\s+(?P<second>{NUMBER}){END}", re.IGNORECASE), "/"),
+    # "subtract 4 from 9" is 9 - 4
+    (re.compile(rf"{QUESTION_PREFIX}subtract\s+(?P<second>{NUMBER})\s+from\s+(?P<first>{NUMBER}){END}", re.IGNORECASE), "-"),
+    # "2 + 3", "7 minus 2", "6 divided by 3"
+    (re.compile(rf"{QUESTION_PREFIX}(?P<first>{NUMBER})\s*(?P<operator>{_operator_pattern()})\s*(?P<second>{NUMBER}){END}", re.IGNORECASE), None),
+]
+
+CONVERSION_RULES = [
+    # "convert 100 USD to EUR", "100 dollars in euros", "$100 to GBP"
+    re.compile(rf"{CONVERSION_PREFIX}(?P<source>{CURRENCY})?\s*(?P<amount>{NUMBER})\s*(?P<from>{CURRENCY})?\s+(?:to|in|into)\s+(?P<to>{CURRENCY}){END}", re.IGNORECASE),
+]
+
+def parse_number(text: str):
+    """
+    Parse a number as written in a query.
+
+    Args:
+        text (str): Number such as "12.5", "1,000" or "-3".
+
+    Returns:
+        int or float: int for whole numbers written without a decimal point.
+    """
+    text = text.replace(",", "")
+    return float(text) if "." in text else int(text)
+
+def currency_code(text: str) -> str:
+    """
+    Map a currency code, name or symbol to its ISO code.
+
+    Args:
+        text (str): Currency as written in a query.
+
+    Returns:
+        str or None: ISO code, or None if the currency is not recognised.
+    """
+    lowered = text.lower()
+    if lowered in CURRENCY_NAMES:
+        return CURRENCY_NAMES[lowered]
+    code = text.upper()
+    return code if code in CURRENCY_CODES else None
+
+def plan_calculation(user_query: str) -> dict:
+    """
+    Build a calculator plan for a simple arithmetic query.
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        dict or None: Calculator plan, or None if no rule matches.
+    """
+    for pattern, operand in CALCULATOR_RULES:
+        match = pattern.fullmatch(user_query)
+        if match is None:
+            continue
+        groups = match.groupdict()
+        first = groups["first"] or groups.get("first_")
+        if operand is None:
+            operand = OPERATORS[" ".join(groups["operator"].lower().split())]
+        return {"tool": CALCULATOR_TOOL, "args": {
+            "operand": operand,
+            "operator_1": parse_number(first),
+            "operator_2": parse_number(groups["second"]),
+        }}
+    return None
+
+def plan_conversion(user_query: str) -> dict:
+    """
+    Build a currency converter plan for a "convert <amount> <from> to <to>" query.
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        dict or None: Currency converter plan, or None if no rule matches or a currency is unknown.
+    """
+    for pattern in CONVERSION_RULES:
+        match = pattern.fullmatch(user_query)
+        if match is None:
+            continue
+        # Exactly one of "$100" or "100 USD" names the source currency
+        if (match["source"] is None) == (match["from"] is None):
+            return None
+        from_currency = currency_code(match["source"] or match["from"])
+        to_currency = currency_code(match["to"])
+        amount = parse_number(match["amount"])
+        if from_currency is None or to_currency is None or amount <= 0:
+            return None
+        return {"tool": CURRENCY_CONVERTER_TOOL, "args": {
+            "from_currency": from_currency,
+            "to_currency": to_currency,
+            "amount": amount,
+        }}
+    return None
+
+def plan_from_rules(user_query: str) -> dict:
+    """
+    Plan a query without the LLM when it is plain arithmetic or a currency conversion.
+
+    The rules only accept queries they fully understand, so anything else
+    (including multi-step requests) is left to the LLM planner.
+
+    Args:
+        user_query (str): The user's input query.
+
+    Returns:
+        dict or None: Plan in the same shape as initiate_planner, or None to fall back to the LLM.
+    """
+    user_query = user_query.strip()
+    return plan_calculation(user_query) or plan_conversion(user_query)
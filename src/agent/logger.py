@@ -0,0 +1,178 @@
+"""
+Structured, level-gated logging for the agent.
+
+Records are an event name plus fields, written to stderr as one line each,
+in logfmt ("text", the default) or as JSON objects ("json"):
+
+    2026-10-18T09:30:00.123 INFO agent.llm.planner context_packed sent_tokens=812 total_tokens=5120 saved_tokens=4308
+
+A record below the level costs one comparison: fields are only formatted when
+the record is written, and fields passed as zero-argument callables are only
+evaluated then, so expensive debug output can be passed as a lambda. DEBUG
+and INFO records can be sampled; warnings and errors are always written.
+
+Settings: LOG_LEVEL (DEBUG, INFO, WARNING or ERROR, default INFO),
+LOG_SAMPLE_RATE (fraction of DEBUG and INFO records written, default 1) and
+LOG_FORMAT ("text" or "json"). They are read from the process environment
+only, not the .env file, so logging never makes a query load python-dotenv.
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+
+LOG_LEVEL_SETTING = "LOG_LEVEL"
+LOG_SAMPLE_RATE_SETTING = "LOG_SAMPLE_RATE"
+LOG_FORMAT_SETTING = "LOG_FORMAT"
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+DEFAULT_LEVEL = "INFO"
+TEXT_FORMAT = "text"
+JSON_FORMAT = "json"
+
+_threshold = None
+_sample_rate = 1.0
+_format = TEXT_FORMAT
+_stream = None
+_settings_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+def _load_settings() -> int:
+    global _threshold, _sample_rate, _format
+    with _settings_lock:
+        if _threshold is None:
+            level = os.getenv(LOG_LEVEL_SETTING, DEFAULT_LEVEL).upper()
+            _sample_rate = float(os.getenv(LOG_SAMPLE_RATE_SETTING, "1"))
+            _format = os.getenv(LOG_FORMAT_SETTING, TEXT_FORMAT).lower()
+            _threshold = LEVELS.get(level, LEVELS[DEFAULT_LEVEL])
+    return _threshold
+
+def configure(level: str = None, sample_rate: float = None, format: str = None, stream=None) -> None:
+    """
+    Override the logging settings. Arguments left as None keep their current value.
+
+    Args:
+        level (str, optional): Lowest level written: DEBUG, INFO, WARNING or ERROR.
+        sample_rate (float, optional): Fraction of DEBUG and INFO records written.
+        format (str, optional): "text" or "json".
+        stream (file object, optional): Destination; sys.stderr at the time of writing by default.
+
+    Raises:
+        ValueError: If the level is unknown.
+    """
+    global _threshold, _sample_rate, _format, _stream
+    _load_settings()
+    with _settings_lock:
+        if level is not None:
+            if level.upper() not in LEVELS:
+                raise ValueError(f"Unknown log level: {level}")
+            _threshold = LEVELS[level.upper()]
+        if sample_rate is not None:
+            _sample_rate = sample_rate
+        if format is not None:
+            _format = format
+        if stream is not None:
+            _stream = stream
+
+def reset() -> None:
+    """
+    Drop overrides so the settings are read again on the next record.
+    """
+    global _threshold, _sample_rate, _format, _stream
+    with _settings_lock:
+        _threshold = None
+        _sample_rate = 1.0
+        _format = TEXT_FORMAT
+        _stream = None
+
+def _logfmt_value(value) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if not text or any(character in text for character in ' ="\n'):
+        return json.dumps(text)
+    return text
+
+def format_record(created: float, level: int, name: str, event: str, fields: dict, format: str = TEXT_FORMAT) -> str:
+    """
+    Format a record as one line without the trailing newline.
+
+    Args:
+        created (float): Time of the record in seconds since the epoch.
+        level (int): Level of the record.
+        name (str): Logger name.
+        event (str): Event name.
+        fields (dict): Evaluated fields.
+        format (str): "text" or "json".
+
+    Returns:
+        str: The formatted record.
+    """
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created)) + f".{int(created % 1 * 1000):03d}"
+    if format == JSON_FORMAT:
+        return json.dumps({"time": timestamp, "level": LEVEL_NAMES[level], "logger": name, "event": event, **fields}, default=str)
+    parts = [timestamp, LEVEL_NAMES[level], name, event]
+    parts.extend(f"{key}={_logfmt_value(value)}" for key, value in fields.items())
+    return " ".join(parts)
+
+class Logger:
+    """
+    Named logger; get one with get_logger(__name__).
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= (_threshold or _load_settings())
+
+    def debug(self, event: str, **fields) -> None:
+        if DEBUG >= (_threshold or _load_settings()):
+            self._write(DEBUG, event, fields)
+
+    def info(self, event: str, **fields) -> None:
+        if INFO >= (_threshold or _load_settings()):
+            self._write(INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        if WARNING >= (_threshold or _load_settings()):
+            self._write(WARNING, event, fields)
+
+    def error(self, event: str, **fields) -> None:
+        if ERROR >= (_threshold or _load_settings()):
+            self._write(ERROR, event, fields)
+
+    def _write(self, level: int, event: str, fields: dict) -> None:
+        if level < WARNING and _sample_rate < 1.0 and random.random() >= _sample_rate:
+            return
+        fields = {key: value() if callable(value) else value for key, value in fields.items()}
+        line = format_record(time.time(), level, self.name, event, fields, _format) + "\n"
+        stream = _stream or sys.stderr
+        with _write_lock:
+            stream.write(line)
+            stream.flush()
+
+_loggers = {}
+
+def get_logger(name: str) -> Logger:
+    """
+    Get the logger of a module.
+
+    Args:
+        name (str): Logger name, usually __name__.
+
+    Returns:
+        Logger: The shared logger of that name.
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, Logger(name))
+    return logger
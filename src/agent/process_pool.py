@@ -0,0 +1,137 @@
+"""
+Process pool for CPU-bound tool work.
+
+Threads answering queries (batch mode, the server's workers) share one GIL,
+so BM25 ranking of knowledge base titles and batched calculator rows
+serialize behind it. With the pool enabled those steps run in worker
+processes instead, while the calling thread waits without holding the GIL.
+
+Workers do not load the knowledge base. They map the knowledge store file
+(agent.tools.knowledge_store), whose entries, term dictionary and postings
+are shared by all of them through the OS page cache. If KNOWLEDGE_STORE is
+not set, the JSON knowledge base is converted to a temporary store once when
+the pool starts, so later edits of the JSON file are not seen until restart.
+
+While the pool is disabled run() calls the function in the calling thread.
+
+Settings: PROCESS_POOL_WORKERS=<n> starts n workers; 0, the default, keeps
+all work in-process.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from . import config
+from .logger import get_logger
+
+PROCESS_POOL_WORKERS_SETTING = "PROCESS_POOL_WORKERS"
+# Workers are started fresh: forking a process whose threads hold locks can deadlock the child
+START_METHOD = "spawn"
+TEMPORARY_STORE_NAME = "knowledge_base.akb"
+
+logger = get_logger(__name__)
+
+_pool = None
+_temporary_directory = None
+_lock = threading.Lock()
+
+def _initialize_worker(store_path: str, knowledge_source: str) -> None:
+    from .tools import knowledge_loader
+
+    knowledge_loader.KNOWLEDGE_SOURCE = knowledge_source
+    if store_path:
+        os.environ[knowledge_loader.KNOWLEDGE_STORE_SETTING] = store_path
+        # Map the store now rather than in the first query a worker gets
+        knowledge_loader.get_knowledge_store()
+
+def _build_temporary_store(knowledge_source: str):
+    global _temporary_directory
+    from .tools import knowledge_store
+
+    directory = tempfile.mkdtemp(prefix="agent-knowledge-")
+    path = os.path.join(directory, TEMPORARY_STORE_NAME)
+    try:
+        knowledge_store.convert(knowledge_source, path)
+    except (OSError, ValueError) as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        logger.warning("knowledge_store_not_built", source=knowledge_source, error=str(e))
+        return None
+    _temporary_directory = directory
+    return path
+
+def is_enabled() -> bool:
+    return _pool is not None
+
+def enable(workers: int = None, store_path: str = None) -> None:
+    """
+    Start the worker processes. A running pool is shut down first.
+
+    Args:
+        workers (int, optional): Number of processes, the number of CPUs by default.
+        store_path (str, optional): Knowledge store the workers map. Defaults to
+            KNOWLEDGE_STORE, or a store converted from the JSON knowledge base.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    from .tools import knowledge_loader
+
+    global _pool
+    disable()
+    with _lock:
+        knowledge_source = knowledge_loader.KNOWLEDGE_SOURCE
+        store_path = store_path or config.get_setting(knowledge_loader.KNOWLEDGE_STORE_SETTING)
+        if not store_path:
+            store_path = _build_temporary_store(knowledge_source)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_initialize_worker,
+            initargs=(store_path, knowledge_source),
+        )
+
+def disable() -> None:
+    """
+    Wait for running work, stop the workers and remove a temporary store.
+    """
+    global _pool, _temporary_directory
+    with _lock:
+        pool, directory = _pool, _temporary_directory
+        _pool, _temporary_directory = None, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def configure_from_settings() -> bool:
+    """
+    Enable the pool as configured by PROCESS_POOL_WORKERS.
+
+    Returns:
+        bool: Whether the pool is enabled.
+
+    Raises:
+        ValueError: If PROCESS_POOL_WORKERS is not an integer.
+    """
+    workers = int(config.get_setting(PROCESS_POOL_WORKERS_SETTING, "0"))
+    if workers > 0:
+        enable(workers)
+    return is_enabled()
+
+def run(function, *args):
+    """
+    Call a function in a worker process, or in the calling thread while the pool is disabled.
+
+    The function and arguments are pickled, so the function must be defined at
+    module level. Exceptions raised in the worker are raised here.
+
+    Args:
+        function (callable): Module-level function to call.
+        *args: Positional arguments of the call.
+
+    Returns:
+        The function's result.
+    """
+    pool = _pool
+    if pool is None:
+        return function(*args)
+    return pool.submit(function, *args).result()
@@ -0,0 +1,63 @@
+import importlib
+import threading
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Lets a module refer to its tools by name (e.g. calculator.calculate) while
+    only paying the import cost of the tools a query actually uses.
+    """
+
+    def __init__(self, name: str, package: str = None):
+        """
+        Args:
+            name (str): Module name, relative names need package.
+            package (str, optional): Package to resolve a relative name against.
+        """
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_package", package)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def load(self):
+        """
+        Import the module if it has not been imported yet.
+
+        Returns:
+            module: The imported module.
+        """
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    object.__setattr__(self, "_module", importlib.import_module(self._name, self._package))
+                module = self._module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self.load(), attribute, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name: str, package: str = None) -> LazyModule:
+    """
+    Refer to a module without importing it until it is used.
+
+    Args:
+        name (str): Module name, e.g. ".tools.weather".
+        package (str, optional): Package to resolve a relative name against, usually __package__.
+
+    Returns:
+        LazyModule: Proxy that imports the module on first attribute access.
+    """
+    return LazyModule(name, package)
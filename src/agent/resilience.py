@@ -0,0 +1,451 @@
+"""
+Resilience policy of the requests to the upstream APIs.
+
+transport.get() and transport.get_async() send every weather and currency
+request through the shared UpstreamPolicy, which applies, per host:
+
+    timeouts     connect and read timeouts on every attempt
+    retries      connection failures, timeouts and RETRY_STATUSES are retried
+                 with exponential backoff and full jitter
+    breaker      after BREAKER_FAILURES consecutive failures the host's circuit
+                 opens and requests fail at once; after the reset period one
+                 trial request is let through and its outcome closes or reopens it
+    hedging      optional; when an attempt takes longer than the host's p95
+                 latency, a duplicate is sent and the first response wins
+
+A request rejected by an open circuit raises requests.ConnectionError (sync) or
+httpx.ConnectError (async), so the tools report it like any outage. Every
+decision is counted per host; stats() returns the counters, the circuit state
+and the latency histogram behind the hedge delay.
+
+Settings: UPSTREAM_CONNECT_TIMEOUT_SECONDS, UPSTREAM_READ_TIMEOUT_SECONDS,
+UPSTREAM_RETRIES (retries after the first attempt), UPSTREAM_BACKOFF_MS and
+UPSTREAM_BACKOFF_MAX_MS (first and largest backoff), UPSTREAM_BREAKER_FAILURES,
+UPSTREAM_BREAKER_RESET_SECONDS and UPSTREAM_HEDGE=1 (hedged requests).
+"""
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import requests
+from . import config
+from .logger import get_logger
+from .tracing import LatencyHistogram
+
+UPSTREAM_CONNECT_TIMEOUT_SETTING = "UPSTREAM_CONNECT_TIMEOUT_SECONDS"
+UPSTREAM_READ_TIMEOUT_SETTING = "UPSTREAM_READ_TIMEOUT_SECONDS"
+UPSTREAM_RETRIES_SETTING = "UPSTREAM_RETRIES"
+UPSTREAM_BACKOFF_SETTING = "UPSTREAM_BACKOFF_MS"
+UPSTREAM_BACKOFF_MAX_SETTING = "UPSTREAM_BACKOFF_MAX_MS"
+UPSTREAM_BREAKER_FAILURES_SETTING = "UPSTREAM_BREAKER_FAILURES"
+UPSTREAM_BREAKER_RESET_SETTING = "UPSTREAM_BREAKER_RESET_SECONDS"
+UPSTREAM_HEDGE_SETTING = "UPSTREAM_HEDGE"
+
+# Same timeouts as the pooled async client
+CONNECT_TIMEOUT_SECONDS = 5.0
+READ_TIMEOUT_SECONDS = 10.0
+RETRIES = 2
+BACKOFF_MS = 100.0
+BACKOFF_MAX_MS = 2000.0
+BREAKER_FAILURES = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Responses worth another attempt; the server errors among them also count as breaker failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SERVER_ERROR_STATUSES = frozenset({500, 502, 503, 504})
+
+# Hedge after the p95 latency of the host, once it is based on enough responses
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = 16
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+COUNTERS = ("requests", "attempts", "retries", "timeouts", "errors", "server_errors",
+            "breaker_opened", "breaker_rejected", "hedges", "hedge_wins")
+
+logger = get_logger(__name__)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker of one host.
+
+    Attributes:
+        state (str): CLOSED, OPEN or HALF_OPEN.
+        failures (int): Consecutive failures since the last success.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit; 0 never opens it.
+            reset_seconds (float): How long the circuit stays open before a trial request.
+            clock (callable): Monotonic time source in seconds.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent, claiming the trial request of a half open circuit.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """
+        Give back the trial request of a half open circuit whose outcome is unknown,
+        e.g. because it raised an unexpected exception or was cancelled.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed request.
+
+        Returns:
+            bool: True if this failure opened the circuit.
+        """
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failure_threshold and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self.clock()
+                return True
+            return False
+
+class _HostState:
+    # Breaker, counters and successful attempt latencies of one host
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latency = LatencyHistogram()
+
+class UpstreamPolicy:
+    """
+    Timeouts, retries, circuit breaking and hedging of the upstream requests.
+    """
+
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT_SECONDS, read_timeout: float = READ_TIMEOUT_SECONDS,
+                 retries: int = RETRIES, backoff_ms: float = BACKOFF_MS, backoff_max_ms: float = BACKOFF_MAX_MS,
+                 breaker_failures: int = BREAKER_FAILURES, breaker_reset_seconds: float = BREAKER_RESET_SECONDS,
+                 hedge: bool = False, seed: int = None):
+        """
+        Args:
+            connect_timeout (float): Seconds to establish a connection.
+            read_timeout (float): Seconds to wait for response data.
+            retries (int): Attempts after the first one.
+            backoff_ms (float): Backoff ceiling before the first retry; doubles for every further retry.
+            backoff_max_ms (float): Largest backoff ceiling.
+            breaker_failures (int): Consecutive failures that open a host's circuit; 0 disables the breaker.
+            breaker_reset_seconds (float): How long an open circuit rejects requests.
+            hedge (bool): Send a duplicate of attempts slower than the host's p95 latency.
+            seed (int, optional): Seed of the backoff jitter, for reproducible runs.
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.hedge = hedge
+        self._random = random.Random(seed)
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._hedge_pool = None
+
+    def host(self, url: str) -> _HostState:
+        name = urlsplit(url).netloc
+        state = self._hosts.get(name)
+        if state is None:
+            with self._lock:
+                state = self._hosts.setdefault(name, _HostState(CircuitBreaker(self.breaker_failures, self.breaker_reset_seconds)))
+        return state
+
+    def _count(self, host: _HostState, counter: str) -> None:
+        with self._lock:
+            host.counters[counter] += 1
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get the delay in seconds before a retry, with full jitter.
+
+        Args:
+            attempt (int): Number of the failed attempt, from 0.
+        """
+        ceiling = min(self.backoff_max_ms, self.backoff_ms * 2 ** attempt)
+        with self._lock:
+            return self._random.uniform(0, ceiling) / 1000
+
+    def hedge_delay(self, host: _HostState):
+        """
+        Get how long an attempt may run before it is hedged.
+
+        Returns:
+            float or None: Seconds, or None if hedging is off or the host has too few samples.
+        """
+        if not self.hedge:
+            return None
+        with self._lock:
+            if host.latency.count < HEDGE_MIN_SAMPLES:
+                return None
+            return host.latency.percentile(HEDGE_PERCENTILE) / 1000
+
+    def _admit(self, host: _HostState, url: str, attempt: int, error_class) -> None:
+        if not host.breaker.allow():
+            self._count(host, "breaker_rejected")
+            raise error_class(f"Circuit breaker open for {urlsplit(url).netloc}")
+        self._count(host, "attempts")
+        if attempt:
+            self._count(host, "retries")
+
+    def _on_response(self, host: _HostState, url: str, response, elapsed_ms: float) -> bool:
+        # Record an answered attempt; returns whether it is worth retrying
+        status = response.status_code
+        if status in SERVER_ERROR_STATUSES:
+            self._count(host, "server_errors")
+            self._on_failure(host, url)
+        else:
+            host.breaker.record_success()
+            with self._lock:
+                host.latency.record(elapsed_ms)
+        return status in RETRY_STATUSES
+
+    def _on_error(self, host: _HostState, url: str, timed_out: bool) -> None:
+        self._count(host, "timeouts" if timed_out else "errors")
+        self._on_failure(host, url)
+
+    def _on_failure(self, host: _HostState, url: str) -> None:
+        if host.breaker.record_failure():
+            self._count(host, "breaker_opened")
+            logger.warning("circuit_breaker_opened", host=urlsplit(url).netloc, failures=host.breaker.failures)
+
+    def get(self, send, url: str, **kwargs):
+        """
+        Send a GET request under the policy.
+
+        Args:
+            send (callable): Sync transport function, called as send(url, **kwargs).
+            url (str): URL without the query string.
+            **kwargs: Arguments of requests.get; timeout defaults to the policy's timeouts.
+
+        Returns:
+            requests.Response: Response of the last attempt.
+
+        Raises:
+            requests.RequestException: If every attempt failed or the host's circuit is open.
+        """
+        host = self.host(url)
+        kwargs.setdefault("timeout", self.timeout)
+        self._count(host, "requests")
+        for attempt in range(self.retries + 1):
+            self._admit(host, url, attempt, requests.ConnectionError)
+            started = time.perf_counter()
+            try:
+                response = self._send_hedged(host, send, url, kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._on_error(host, url, isinstance(e, requests.Timeout))
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                host.breaker.release_trial()
+                raise
+            else:
+                if not self._on_response(host, url, response, (time.perf_counter() - started) * 1000) or attempt == self.retries:
+                    return response
+            time.sleep(self.backoff(attempt))
+
+    def _send_hedged(self, host: _HostState, send, url: str, kwargs: dict):
+        delay = self.hedge_delay(host)
+        if delay is None:
+            return send(url, **kwargs)
+        pool = self._get_hedge_pool()
+        first = pool.submit(contextvars.copy_context().run, send, url, **kwargs)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        self._count(host, "hedges")
+        second = pool.submit(contextvars.copy_context().run, send, url, **kwargs)
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # The slower request is left to finish; requests cannot be cancelled
+                if future.exception() is None or not pending:
+                    if future is second and future.exception() is None:
+                        self._count(host, "hedge_wins")
+                    return future.result()
+
+    def _get_hedge_pool(self):
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix="upstream-hedge")
+        return self._hedge_pool
+
+    async def get_async(self, send, url: str, params: dict = None):
+        """
+        Send a GET request under the policy without blocking the event loop.
+
+        Args:
+            send (callable): Async transport function, called as send(url, params, timeout).
+            url (str): URL without the query string.
+            params (dict, optional): Query string parameters.
+
+        Returns:
+            httpx.Response: Response of the last attempt.
+
+        Raises:
+            httpx.HTTPError: If every attempt failed or the host's circuit is open.
+        """
+        import httpx
+
+        host = self.host(url)
+        self._count(host, "requests")
+        for attempt in range(self.retries + 1):
+            self._admit(host, url, attempt, httpx.ConnectError)
+            started = time.perf_counter()
+            try:
+                response = await self._send_hedged_async(host, send, url, params)
+            except httpx.TransportError as e:
+                self._on_error(host, url, isinstance(e, httpx.TimeoutException))
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                # Includes cancellation of the request or of its hedge
+                host.breaker.release_trial()
+                raise
+            else:
+                if not self._on_response(host, url, response, (time.perf_counter() - started) * 1000) or attempt == self.retries:
+                    return response
+            await asyncio.sleep(self.backoff(attempt))
+
+    async def _send_hedged_async(self, host: _HostState, send, url: str, params: dict):
+        delay = self.hedge_delay(host)
+        if delay is None:
+            return await send(url, params, self.timeout)
+        first = asyncio.ensure_future(send(url, params, self.timeout))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+            self._count(host, "hedges")
+            second = asyncio.ensure_future(send(url, params, self.timeout))
+            pending = {first, second}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        if task is second and task.exception() is None:
+                            self._count(host, "hedge_wins")
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """
+        Get the policy decisions of every host.
+
+        Returns:
+            dict[str, dict]: Per host (netloc) the COUNTERS, the circuit "state" and
+                the "latency" summary of successful attempts.
+        """
+        with self._lock:
+            return {
+                name: dict(host.counters, state=host.breaker.state, latency=host.latency.summary())
+                for name, host in self._hosts.items()
+            }
+
+    def close(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+            self._hedge_pool = None
+
+_policy = None
+_policy_lock = threading.Lock()
+
+def create_policy() -> UpstreamPolicy:
+    """
+    Create an upstream policy from the UPSTREAM_* settings.
+
+    Returns:
+        UpstreamPolicy: New policy; unset settings keep the module defaults.
+    """
+    return UpstreamPolicy(
+        connect_timeout=float(config.get_setting(UPSTREAM_CONNECT_TIMEOUT_SETTING, CONNECT_TIMEOUT_SECONDS)),
+        read_timeout=float(config.get_setting(UPSTREAM_READ_TIMEOUT_SETTING, READ_TIMEOUT_SECONDS)),
+        retries=int(config.get_setting(UPSTREAM_RETRIES_SETTING, RETRIES)),
+        backoff_ms=float(config.get_setting(UPSTREAM_BACKOFF_SETTING, BACKOFF_MS)),
+        backoff_max_ms=float(config.get_setting(UPSTREAM_BACKOFF_MAX_SETTING, BACKOFF_MAX_MS)),
+        breaker_failures=int(config.get_setting(UPSTREAM_BREAKER_FAILURES_SETTING, BREAKER_FAILURES)),
+        breaker_reset_seconds=float(config.get_setting(UPSTREAM_BREAKER_RESET_SETTING, BREAKER_RESET_SECONDS)),
+        hedge=config.get_setting(UPSTREAM_HEDGE_SETTING, "0") == "1",
+    )
+
+def get_policy() -> UpstreamPolicy:
+    """
+    Get the policy shared by every upstream request, creating it on first use.
+    """
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = create_policy()
+    return _policy
+
+def set_policy(policy: UpstreamPolicy) -> None:
+    """
+    Replace the shared policy. The previous one is not closed.
+
+    Args:
+        policy (UpstreamPolicy): New policy, or None to create one from the settings on next use.
+    """
+    global _policy
+    with _policy_lock:
+        _policy = policy
+
+def close_policy() -> None:
+    """
+    Close the shared policy, dropping its circuits and metrics.
+    """
+    global _policy
+    with _policy_lock:
+        policy, _policy = _policy, None
+    if policy is not None:
+        policy.close()
+
+def stats() -> dict:
+    """
+    Get the per host decisions of the shared policy, empty before the first request.
+    """
+    return _policy.stats() if _policy is not None else {}
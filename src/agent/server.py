@@ -0,0 +1,389 @@
+"""
+Long-running HTTP server that answers queries with warm caches.
+
+Endpoints:
+    POST /query   {"query": "..."} -> {"result": "..."}, or {"error": "..."} with 400, 500 or 503
+    GET  /health  -> {"status": "ok" or "draining", "running": n, "queued": n}
+    GET  /stats   -> request counts, tool call coalescing, upstream policy decisions and traced stage latencies
+
+Queries are answered by process_user_query_async on one event loop, so the
+tool modules, pooled HTTP connections, LLM backend, caches and knowledge
+index stay loaded between requests. At most `workers` queries are answered at
+once and up to `queue_limit` more wait for a worker; further queries are
+refused with 503 and Retry-After instead of piling up. SIGINT and SIGTERM stop
+accepting connections, let admitted queries finish within the shutdown
+timeout and close the pooled clients.
+
+Usage: python main.py --serve [--host HOST] [--port PORT] [--workers N] [--queue-limit N]
+"""
+import json
+import signal
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from . import config, tracing
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+SERVER_HOST_SETTING = "SERVER_HOST"
+SERVER_PORT_SETTING = "SERVER_PORT"
+SERVER_WORKERS_SETTING = "SERVER_WORKERS"
+SERVER_QUEUE_LIMIT_SETTING = "SERVER_QUEUE_LIMIT"
+SERVER_SHUTDOWN_TIMEOUT_SETTING = "SERVER_SHUTDOWN_TIMEOUT_SECONDS"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 64
+DEFAULT_QUEUE_LIMIT = 256
+DEFAULT_SHUTDOWN_TIMEOUT_SECONDS = 30.0
+RETRY_AFTER_SECONDS = 1
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+QUERY_KEY = "query"
+RESULT_KEY = "result"
+ERROR_KEY = "error"
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+class BadRequest(ValueError):
+    """
+    The request could not be parsed; answered with the given status.
+    """
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def parse_request_head(head: bytes) -> tuple:
+    """
+    Parse the request line and headers of an HTTP/1.x request.
+
+    Args:
+        head (bytes): Request up to and including the blank line after the headers.
+
+    Returns:
+        tuple[str, str, str, dict]: Method, path without the query string, HTTP version
+            and headers with lower case names.
+
+    Raises:
+        BadRequest: If the request line or a header is malformed.
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise BadRequest("Malformed request line")
+    if not version.startswith("HTTP/1."):
+        raise BadRequest(f"Unsupported protocol {version}")
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            raise BadRequest("Malformed header")
+        headers[name.strip().lower()] = value.strip()
+    return method, target.split("?", 1)[0], version, headers
+
+def parse_query(body: bytes) -> str:
+    """
+    Get the query of a POST /query body.
+
+    Raises:
+        BadRequest: If the body is not a JSON object with a non-empty "query" string.
+    """
+    try:
+        record = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise BadRequest("Body must be JSON")
+    query = record.get(QUERY_KEY) if isinstance(record, dict) else None
+    if not isinstance(query, str) or not query.strip():
+        raise BadRequest('Body must have a non-empty "query" string')
+    return query
+
+class AgentServer:
+    """
+    HTTP front end for process_user_query_async with bounded concurrency.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                 queue_limit: int = DEFAULT_QUEUE_LIMIT, shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT_SECONDS, answer=None):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 for any free port.
+            workers (int): Queries answered at once.
+            queue_limit (int): Queries waiting for a worker before new ones are refused.
+            shutdown_timeout (float): Seconds admitted queries get to finish on shutdown.
+            answer (coroutine function, optional): Answers a query; process_user_query_async by default.
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.shutdown_timeout = shutdown_timeout
+        self.answer = answer
+        self.draining = False
+        self.running = 0
+        self.admitted = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+        self._server = None
+        self._worker_slots = None
+        self._idle = None
+        self._stopped = None
+        # Connection task -> whether it is handling a request
+        self._connections = {}
+
+    @property
+    def queued(self) -> int:
+        return self.admitted - self.running
+
+    async def start(self) -> "AgentServer":
+        """
+        Warm up and start accepting connections. port is updated to the bound port.
+        """
+        loop = asyncio.get_running_loop()
+        # Planner, LLM and knowledge base steps run in threads; one per worker avoids a second queue
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent-worker"))
+        self._worker_slots = asyncio.Semaphore(self.workers)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stopped = asyncio.Event()
+        await self.warm_up()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("server_started", host=self.host, port=self.port, workers=self.workers, queue_limit=self.queue_limit)
+        return self
+
+    async def warm_up(self) -> None:
+        """
+        Load the tools, LLM backend, HTTP client and knowledge search index before the first query.
+
+        Failures (e.g. a missing knowledge base file) are logged; the query that needs
+        the resource reports them again.
+        """
+        from . import agent, http_client
+        from .llm import backend
+
+        if self.answer is None:
+            self.answer = agent.process_user_query_async
+        for module in (agent.planner, agent.calculator, agent.weather, agent.knowledge_loader, agent.currency_converter):
+            module.load()
+        http_client.get_async_client()
+        try:
+            await asyncio.to_thread(backend.get_backend)
+            # The memory-mapped store when KNOWLEDGE_STORE is set, so the JSON index is not built for nothing
+            await asyncio.to_thread(agent.knowledge_loader.get_search_index)
+        except Exception as e:
+            logger.warning("warm_up_failed", error=str(e))
+
+    async def serve_forever(self) -> None:
+        """
+        Serve until shutdown() is called.
+        """
+        await self._stopped.wait()
+
+    async def shutdown(self) -> None:
+        """
+        Stop accepting connections, wait for admitted queries and close the pooled clients.
+
+        Queries still running after the shutdown timeout are cancelled.
+        """
+        if self.draining:
+            await self._stopped.wait()
+            return
+        self.draining = True
+        logger.info("server_draining", running=self.running, queued=self.queued)
+        self._server.close()
+        # Idle keep-alive connections would otherwise wait for another request
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("shutdown_timeout", cancelled=self.admitted)
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._close_clients()
+        logger.info("server_stopped", served=self.served, failed=self.failed, rejected=self.rejected)
+        self._stopped.set()
+
+    async def _close_clients(self) -> None:
+        from . import http_client
+        from .llm import backend
+
+        await http_client.aclose()
+        await asyncio.to_thread(backend.close_backend)
+
+    def stats(self) -> dict:
+        """
+        Get the request counts, tool call coalescing, upstream policy decisions and traced stage latencies.
+        """
+        from . import agent, resilience
+
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "served": self.served,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "coalescing": agent.coalescing_stats(),
+            "upstream": resilience.stats(),
+            "stages": tracing.stage_stats(),
+        }
+
+    async def answer_query(self, query: str) -> tuple:
+        """
+        Answer a query within the worker and queue limits.
+
+        Returns:
+            tuple[int, dict, dict]: HTTP status, JSON payload and extra headers.
+        """
+        if self.draining:
+            return 503, {ERROR_KEY: "Server is shutting down"}, {}
+        if self.admitted >= self.workers + self.queue_limit:
+            self.rejected += 1
+            return 503, {ERROR_KEY: "Server is busy"}, {"Retry-After": str(RETRY_AFTER_SECONDS)}
+
+        self.admitted += 1
+        self._idle.clear()
+        try:
+            async with self._worker_slots:
+                self.running += 1
+                try:
+                    with tracing.span("server.query"):
+                        result = await self.answer(query)
+                finally:
+                    self.running -= 1
+            self.served += 1
+            return 200, {RESULT_KEY: result}, {}
+        except Exception as e:
+            self.failed += 1
+            logger.error("query_failed", query=query, error=str(e))
+            return 500, {ERROR_KEY: str(e)}, {}
+        finally:
+            self.admitted -= 1
+            if self.admitted == 0:
+                self._idle.set()
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        """
+        Handle one request.
+
+        Returns:
+            tuple[int, dict, dict]: HTTP status, JSON payload and extra headers.
+        """
+        routes = {"/query": "POST", "/health": "GET", "/stats": "GET"}
+        if path not in routes:
+            return 404, {ERROR_KEY: f"No route for {path}"}, {}
+        if method != routes[path]:
+            return 405, {ERROR_KEY: f"Use {routes[path]} for {path}"}, {"Allow": routes[path]}
+        if path == "/health":
+            return 200, {"status": "draining" if self.draining else "ok", "running": self.running, "queued": self.queued}, {}
+        if path == "/stats":
+            return 200, self.stats(), {}
+        return await self.answer_query(parse_query(body))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = False
+        try:
+            keep_alive = True
+            while keep_alive and not self.draining:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {ERROR_KEY: "Request headers too large"}, {}, False)
+                    break
+                self._connections[task] = True
+                try:
+                    method, path, version, headers = parse_request_head(head)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    if "chunked" in headers.get("transfer-encoding", "").lower():
+                        raise BadRequest("Chunked request bodies are not supported; send Content-Length")
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        raise BadRequest("Request body too large", 413)
+                    body = await reader.readexactly(length)
+                    status, payload, extra_headers = await self.route(method, path, body)
+                except BadRequest as e:
+                    status, payload, extra_headers = e.status, {ERROR_KEY: str(e)}, {}
+                    keep_alive = False
+                except ValueError:
+                    status, payload, extra_headers = 400, {ERROR_KEY: "Invalid Content-Length"}, {}
+                    keep_alive = False
+                keep_alive = keep_alive and not self.draining
+                await self._respond(writer, status, payload, extra_headers, keep_alive)
+                self._connections[task] = False
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, extra_headers: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **extra_headers,
+        }
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+async def serve(server: AgentServer) -> None:
+    """
+    Run a server until SIGINT or SIGTERM, then shut it down gracefully.
+    """
+    await server.start()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal_number, lambda: asyncio.ensure_future(server.shutdown()))
+    await server.serve_forever()
+
+def run(arguments: list) -> None:
+    """
+    Parse the --serve command line options and run the server.
+
+    Args:
+        arguments (list[str]): Command line arguments after --serve.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py --serve")
+    parser.add_argument("--host", default=config.get_setting(SERVER_HOST_SETTING, DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(config.get_setting(SERVER_PORT_SETTING, DEFAULT_PORT)))
+    parser.add_argument("--workers", type=int, default=int(config.get_setting(SERVER_WORKERS_SETTING, DEFAULT_WORKERS)))
+    parser.add_argument("--queue-limit", type=int, default=int(config.get_setting(SERVER_QUEUE_LIMIT_SETTING, DEFAULT_QUEUE_LIMIT)))
+    parser.add_argument("--shutdown-timeout", type=float,
+                        default=float(config.get_setting(SERVER_SHUTDOWN_TIMEOUT_SETTING, DEFAULT_SHUTDOWN_TIMEOUT_SECONDS)))
+    options = parser.parse_args(arguments)
+
+    server = AgentServer(options.host, options.port, options.workers, options.queue_limit, options.shutdown_timeout)
+    asyncio.run(serve(server))
@@ -0,0 +1,108 @@
+import threading
+import asyncio
+from concurrent.futures import Future
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result or exception. Once the call
+    finishes, the next caller for that key runs the function again.
+
+    Works for threads (do) and for asyncio tasks (do_async). Async calls are
+    tracked per event loop.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.shared = 0
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key) -> bool:
+        """
+        Check whether a call for the key is currently running.
+        """
+        with self._lock:
+            return key in self._calls or any(call_key == key for _, call_key in self._async_calls)
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run function(*args, **kwargs) unless a call with the same key is in flight.
+
+        Args:
+            key: Hashable identity of the call.
+            function (callable): Function to run.
+
+        Returns:
+            any: Result of the shared call.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    async def do_async(self, key, function, *args, **kwargs):
+        """
+        Await function(*args, **kwargs) unless a call with the same key is in flight.
+
+        The call runs in its own task, so cancelling one waiter does not cancel
+        the call for the others.
+
+        Args:
+            key: Hashable identity of the call.
+            function (callable): Coroutine function to run.
+
+        Returns:
+            any: Result of the shared call.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        call_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._async_calls.get(call_key)
+            if task is not None:
+                self.shared += 1
+            else:
+                task = asyncio.ensure_future(function(*args, **kwargs))
+                self._async_calls[call_key] = task
+                self.executions += 1
+                task.add_done_callback(lambda _: self._forget_async(call_key, task))
+        return await asyncio.shield(task)
+
+    def _forget_async(self, call_key, task) -> None:
+        with self._lock:
+            if self._async_calls.get(call_key) is task:
+                del self._async_calls[call_key]
+
+    def stats(self) -> dict:
+        """
+        Get the call counters.
+
+        Returns:
+            dict: executions (calls that ran) and shared (calls that reused an in-flight result).
+        """
+        with self._lock:
+            return {"executions": self.executions, "shared": self.shared}
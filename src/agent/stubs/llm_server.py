@@ -0,0 +1,213 @@
+"""
+Local stand-in for an OpenAI compatible chat completions API.
+
+Serves POST /v1/chat/completions, with and without "stream": true, after a
+configurable latency and at a configurable token rate. Replies are chosen from
+the system prompt:
+    tool planner prompt  -> {"tool": "knowledge_base", "args": {"query": <user query>}}
+    title matching prompt -> {"top_matched_titles": [<first titles sent>]}
+    anything else         -> a plain text answer of answer_tokens words
+
+Usage: python -m agent.stubs.llm_server [port] [latency_ms] [tokens_per_second]
+"""
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_TOKENS = 40
+KNOWLEDGE_BASE_MARKER = "\n\nKnowledge base:\n"
+
+def split_user_content(content: str) -> tuple:
+    """
+    Split a user message into the query and the knowledge base sent with it.
+
+    Returns:
+        tuple[str, str]: (query, knowledge base or None).
+    """
+    query, found, context = content.partition(KNOWLEDGE_BASE_MARKER)
+    return query, context if found else None
+
+def default_reply(messages: list, answer_tokens: int = ANSWER_TOKENS) -> str:
+    """
+    Build a deterministic reply for the agent's prompts.
+
+    Args:
+        messages (list[dict]): Chat messages of the request.
+        answer_tokens (int): Words in a plain text answer.
+
+    Returns:
+        str: Response content.
+    """
+    system_prompt = messages[0]["content"] if messages else ""
+    query, context = split_user_content(messages[-1]["content"] if messages else "")
+    if "tool planner" in system_prompt:
+        return json.dumps({"tool": "knowledge_base", "args": {"query": query}})
+    if "list of titles" in system_prompt:
+        try:
+            titles = json.loads(context) if context else []
+        except json.JSONDecodeError:
+            titles = []
+        return json.dumps({"top_matched_titles": titles[:3] if isinstance(titles, list) else []})
+    return " ".join(f"token{index}" for index in range(answer_tokens))
+
+def split_tokens(text: str) -> list:
+    """
+    Split a reply into streamed tokens, one word with its leading space each.
+    """
+    words = text.split(" ")
+    return [words[0]] + [" " + word for word in words[1:]]
+
+class LLMRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            server.connections.add(self.client_address)
+            failure_status = server.failures.pop(0) if server.failures else None
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_json(404, {"error": {"message": "Not found"}})
+            return
+        if failure_status is not None:
+            self.send_json(failure_status, {"error": {"message": "Simulated failure"}})
+            return
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (ValueError, KeyError):
+            self.send_json(400, {"error": {"message": "messages are required"}})
+            return
+
+        if server.latency_seconds:
+            time.sleep(server.latency_seconds)
+        reply = server.reply(messages)
+        if request.get("stream"):
+            self.send_stream(split_tokens(reply))
+        else:
+            if server.token_delay_seconds:
+                time.sleep(server.token_delay_seconds * len(split_tokens(reply)))
+            self.send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]})
+
+    def send_stream(self, tokens: list) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                if self.server.token_delay_seconds:
+                    time.sleep(self.server.token_delay_seconds)
+                event = {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                self.write_chunk(f"data: {json.dumps(event)}\n\n")
+            self.write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading the stream early
+            self.close_connection = True
+
+    def write_chunk(self, text: str) -> None:
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class LLMHTTPServer(ThreadingHTTPServer):
+    # Room for bursts of concurrent connections without SYN retries
+    request_queue_size = 128
+    daemon_threads = True
+
+class LLMStubServer:
+    """
+    Threaded local HTTP server that imitates an OpenAI compatible LLM endpoint.
+
+    Use it as a context manager and point OpenAICompatibleBackend at base_url.
+    fail_next() makes the next requests fail with a status code, to exercise retries.
+    """
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, tokens_per_second: float = None, reply=default_reply):
+        """
+        Args:
+            port (int): Port to listen on, 0 picks a free port.
+            latency_ms (float): Delay before the first token of every response.
+            tokens_per_second (float, optional): Rate at which tokens are produced, None for no delay.
+            reply (callable): Maps the request messages to the response content.
+        """
+        self.httpd = LLMHTTPServer(("127.0.0.1", port), LLMRequestHandler)
+        self.httpd.latency_seconds = latency_ms / 1000
+        self.httpd.token_delay_seconds = 1 / tokens_per_second if tokens_per_second else 0
+        self.httpd.reply = reply
+        self.httpd.request_count = 0
+        self.httpd.connections = set()
+        self.httpd.failures = []
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.httpd.connections)
+
+    def fail_next(self, *statuses: int) -> None:
+        """
+        Answer the next requests with the given error statuses, one per request.
+        """
+        with self.httpd.lock:
+            self.httpd.failures.extend(statuses)
+
+    def start(self) -> "LLMStubServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "LLMStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8082
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    tokens_per_second = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    server = LLMStubServer(port, latency_ms, tokens_per_second)
+    print(f"Serving LLM stub on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
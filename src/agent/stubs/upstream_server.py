@@ -0,0 +1,189 @@
+"""
+Local stand-in for weatherapi.com and exchangerate-api.com.
+
+Serves deterministic responses for:
+    GET /v1/history.json?q=<city>&dt=<date>&end_dt=<date>
+    GET /v4/latest/<currency>
+
+Usage: python -m agent.stubs.upstream_server [port] [latency_ms]
+"""
+import sys
+import json
+import time
+import datetime
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Exchange rates with USD as base
+USD_RATES = {
+    "USD": 1.0,
+    "EUR": 0.85,
+    "GBP": 0.74,
+    "JPY": 147.5,
+    "BDT": 121.6,
+    "INR": 83.2,
+}
+
+CONDITIONS = ["Sunny", "Partly cloudy", "Cloudy", "Light rain", "Overcast"]
+
+def weather_day(city: str, day: datetime.date) -> dict:
+    """
+    Build a reproducible forecastday entry for a city and date.
+
+    Args:
+        city (str): City name.
+        day (datetime.date): Date of the entry.
+
+    Returns:
+        dict: Entry in the weatherapi.com history.json forecastday format.
+    """
+    seed = zlib.crc32(f"{city.lower()}:{day.isoformat()}".encode())
+    average = 5 + seed % 250 / 10
+    return {
+        "date": day.isoformat(),
+        "day": {
+            "maxtemp_c": round(average + 4, 1),
+            "mintemp_c": round(average - 4, 1),
+            "avgtemp_c": round(average, 1),
+            "condition": {"text": CONDITIONS[seed % len(CONDITIONS)]},
+        },
+    }
+
+def exchange_rates(base: str) -> dict:
+    """
+    Get the rate table for a base currency, derived from USD_RATES.
+
+    Args:
+        base (str): Base currency code.
+
+    Returns:
+        dict: Rates keyed by currency code, or None if the base is unknown.
+    """
+    if base not in USD_RATES:
+        return None
+    return {currency: round(rate / USD_RATES[base], 6) for currency, rate in USD_RATES.items()}
+
+class UpstreamRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            server.paths.append(self.path)
+            server.connections.add(self.client_address)
+        if server.latency_seconds:
+            time.sleep(server.latency_seconds)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/v1/history.json":
+            self.send_history(query)
+        elif url.path.startswith("/v4/latest/"):
+            self.send_rates(url.path.rsplit("/", 1)[-1].upper())
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def send_history(self, query: dict) -> None:
+        try:
+            city = query["q"][0]
+            start = datetime.date.fromisoformat(query["dt"][0])
+            end = datetime.date.fromisoformat(query.get("end_dt", query["dt"])[0])
+        except (KeyError, ValueError):
+            self.send_json(400, {"error": {"message": "Parameter q and dt are required"}})
+            return
+        days = [weather_day(city, start + datetime.timedelta(days=offset)) for offset in range((end - start).days + 1)]
+        self.send_json(200, {"location": {"name": city}, "forecast": {"forecastday": days}})
+
+    def send_rates(self, base: str) -> None:
+        rates = exchange_rates(base)
+        if rates is None:
+            self.send_json(404, {"result": "error", "error-type": "unsupported-code"})
+            return
+        self.send_json(200, {"base": base, "rates": rates})
+
+    def send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class UpstreamStubServer:
+    """
+    Threaded local HTTP server that imitates the weather and exchange rate APIs.
+
+    Use it as a context manager, point the tools' BASE_URL at weather_url or
+    currency_url and inspect request_count/paths to see upstream traffic.
+    """
+
+    def __init__(self, port: int = 0, latency_ms: float = 0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), UpstreamRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency_seconds = latency_ms / 1000
+        self.httpd.request_count = 0
+        self.httpd.paths = []
+        self.httpd.connections = set()
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def weather_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def currency_url(self) -> str:
+        return f"{self.url}/v4/latest"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def paths(self) -> list:
+        return list(self.httpd.paths)
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.httpd.connections)
+
+    def start(self) -> "UpstreamStubServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "UpstreamStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    server = UpstreamStubServer(port, latency_ms)
+    print(f"Serving upstream stubs on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,19 @@
 OPERATOR_1 = "operator_1"
 OPERATOR_2 = "operator_2"
 OPERAND = "operand"
+# Rows of operand/operator triples evaluated together by the vectorized calculator
+ROWS = "rows"
+# Arithmetic expression such as "(12.5 % 243) + 10 / 3", evaluated instead of operand/operators
+EXPRESSION = "expr"
+
+# Supported operations
+OPERATIONS = {
+    '+': lambda x, y: x + y,
+    '-': lambda x, y: x - y,
+    '*': lambda x, y: x * y,
+    '/': lambda x, y: round(x / y, 2) if y != 0 else float('inf'),
+    '%': lambda x, y: round((x / 100) * y, 2)
+}
 
 def calculate(args: dict) -> float:
     """
@@ -12,10 +25,27 @@ def calculate(args: dict) -> float:
             - operand: The operation type (+, -, *, /, %)
             - operator_1: First number
             - operator_2: Second number
+            or
+            - rows: List of such dictionaries, evaluated together with NumPy
+            or
+            - expr: Arithmetic expression with + - * / % and parentheses
     
     Returns:
         float: Result of the calculation or error message
+        (list[float or None] for rows, None where a row is invalid)
     """
+    if ROWS in args:
+        # Imported here so scalar calculations do not load NumPy
+        from . import vector_calculator
+        return vector_calculator.calculate_rows(args[ROWS]).to_list()
+
+    if EXPRESSION in args:
+        from .expression import evaluate_expression
+        try:
+            return evaluate_expression(str(args[EXPRESSION]))
+        except ValueError as e:
+            return f"Invalid values: {str(e)}"
+
     try:
         # Extract values from dictionary with validation
         if OPERAND not in args:
@@ -28,21 +58,12 @@ def calculate(args: dict) -> float:
         operator_1 = float(args[OPERATOR_1])
         operator_2 = float(args[OPERATOR_2])
 
-        # Define operations
-        operations = {
-            '+': lambda x, y: x + y,
-            '-': lambda x, y: x - y,
-            '*': lambda x, y: x * y,
-            '/': lambda x, y: round(x / y, 2) if y != 0 else float('inf'),
-            '%': lambda x, y: round((x / 100) * y, 2)
-        }
-
         # Validate operand
-        if operand not in operations:
+        if operand not in OPERATIONS:
             raise ValueError(f"Invalid operand: {operand}")
 
         # Perform calculation
-        result = operations[operand](operator_1, operator_2)
+        result = OPERATIONS[operand](operator_1, operator_2)
         return result
 
     except (ValueError) as e:
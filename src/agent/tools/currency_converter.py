@@ -1,16 +1,128 @@
 import requests
-import os
-from dotenv import load_dotenv
+from collections import Counter
 from typing import Dict, Any
+from .. import config, tracing, transport
+from ..registry import lazy_import
+from .rate_cache import RateTableCache
 
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv('EXCHANGE_RATE_API_KEY')
-if not API_KEY:
-    raise ValueError("EXCHANGE_RATE_API_KEY not found in environment variables")
+http_client = lazy_import("..http_client", __package__)
+
+# Settings, read from the environment or .env on first use
+API_KEY_SETTING = "EXCHANGE_RATE_API_KEY"
 
 BASE_URL = "https://api.exchangerate-api.com/v4/latest"
 
+def __getattr__(name):
+    # Module level API_KEY is resolved lazily
+    if name == "API_KEY":
+        return config.get_setting(API_KEY_SETTING)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Rate tables shared by every conversion in this process
+RATE_CACHE = RateTableCache()
+
+def parse_conversion_args(args: Dict[str, Any]) -> tuple[str, str, float]:
+    """
+    Extract and validate the conversion parameters.
+
+    Args:
+        args (dict): Dictionary containing from_currency, to_currency and amount
+
+    Returns:
+        tuple[str, str, float]: Source currency, target currency and amount
+
+    Raises:
+        ValueError: If a parameter is missing or the amount is negative
+    """
+    from_currency = args.get('from_currency', '').upper()
+    to_currency = args.get('to_currency', '').upper()
+    amount = float(args.get('amount', 0))
+
+    # Validate inputs
+    if not all([from_currency, to_currency, amount]):
+        raise ValueError("Missing required parameters")
+    
+    if amount < 0:
+        raise ValueError("Amount must be positive")
+
+    return from_currency, to_currency, amount
+
+def fetch_rates(base_currency: str) -> Dict[str, float]:
+    """
+    Fetch the full exchange rate table for a base currency.
+
+    Args:
+        base_currency (str): Base currency code
+
+    Returns:
+        dict: Rates keyed by currency code
+
+    Raises:
+        ValueError: If EXCHANGE_RATE_API_KEY is not configured
+        requests.RequestException: If the API request fails
+        KeyError: If the response has no rates
+    """
+    config.require_setting(API_KEY_SETTING)
+    with tracing.span("http.currency", base=base_currency):
+        response = transport.get(f"{BASE_URL}/{base_currency}")
+    response.raise_for_status()
+    return response.json()['rates']
+
+async def fetch_rates_async(base_currency: str) -> Dict[str, float]:
+    """
+    Asynchronous version of fetch_rates using the shared HTTP client.
+    """
+    config.require_setting(API_KEY_SETTING)
+    with tracing.span("http.currency", base=base_currency):
+        response = await transport.get_async(f"{BASE_URL}/{base_currency}")
+    response.raise_for_status()
+    return response.json()['rates']
+
+def prefetch_rates(conversions: list) -> None:
+    """
+    Load the rate tables needed by a batch of conversions with as few requests as possible.
+
+    Bases are fetched from most to least used. A base is skipped when it is
+    already cached or all its target currencies can be derived as cross rates
+    from a cached table. Failures are ignored; the conversion itself reports them.
+
+    Args:
+        conversions (list[tuple[str, str]]): (from_currency, to_currency) pairs
+    """
+    conversions = [(from_currency.upper(), to_currency.upper()) for from_currency, to_currency in conversions]
+    for base, _ in Counter(from_currency for from_currency, _ in conversions).most_common():
+        targets = {to_currency for from_currency, to_currency in conversions if from_currency == base}
+        if base in RATE_CACHE.tables or all(RATE_CACHE.cross_rate(base, target) is not None for target in targets):
+            continue
+        try:
+            RATE_CACHE.get_rates(base, fetch_rates)
+        except (requests.RequestException, KeyError, ValueError):
+            pass
+
+def generate_response(amount: float, from_currency: str, to_currency: str, rate: float) -> str:
+    """
+    Convert the amount with a conversion rate and describe the result.
+
+    Args:
+        amount (float): Amount to convert
+        from_currency (str): Source currency code
+        to_currency (str): Target currency code
+        rate (float or None): Conversion rate, None if the target currency is unknown
+
+    Returns:
+        str: Sentence with the converted amount and the conversion rate
+
+    Raises:
+        ValueError: If there is no rate for to_currency
+    """
+    if rate is None:
+        raise ValueError(f"Invalid currency code: {to_currency}")
+
+    # Calculate conversion
+    result = amount * rate
+
+    return "If amount of " + str(amount) + " is converted from " + str(from_currency) + " to " + str(to_currency) + " then the amount is " + str(round(result, 2)) + " and the conversion rate is " + str(rate)  
+
 def convert_currency(args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Convert amount from one currency to another.
@@ -30,35 +142,45 @@ def convert_currency(args: Dict[str, Any]) -> Dict[str, Any]:
         ConnectionError: If API request fails
     """
     try:
-        # Extract parameters
-        from_currency = args.get('from_currency', '').upper()
-        to_currency = args.get('to_currency', '').upper()
-        amount = float(args.get('amount', 0))
-
-        # Validate inputs
-        if not all([from_currency, to_currency, amount]):
-            raise ValueError("Missing required parameters")
-        
-        if amount < 0:
-            raise ValueError("Amount must be positive")
-
-        # Make API request
-        response = requests.get(f"{BASE_URL}/{from_currency}")
-        response.raise_for_status()
-        
-        rates = response.json()['rates']
-        if to_currency not in rates:
-            raise ValueError(f"Invalid currency code: {to_currency}")
-
-        # Calculate conversion
-        rate = rates[to_currency]
-        result = amount * rate
-
-        return "If amount of " + str(amount) + " is converted from " + str(from_currency) + " to " + str(to_currency) + " then the amount is " + str(round(result, 2)) + " and the conversion rate is " + str(rate)  
+        from_currency, to_currency, amount = parse_conversion_args(args)
+
+        # Rate tables are cached per base currency, so most conversions skip the API request
+        rate = RATE_CACHE.get_rate(from_currency, to_currency, fetch_rates)
+        return generate_response(amount, from_currency, to_currency, rate)
 
     except requests.RequestException as e:
         raise ConnectionError(f"Failed to fetch exchange rates: {str(e)}")
     except (ValueError, KeyError) as e:
         raise ValueError(f"Invalid input: {str(e)}")
     except Exception as e:
-        raise RuntimeError(f"Conversion error: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Conversion error: {str(e)}")
+
+async def convert_currency_async(args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert amount from one currency to another without blocking the event loop.
+
+    Uses the shared pooled HTTP client and rate cache, so concurrent
+    conversions from the same base share one upstream request.
+
+    Args:
+        args (dict): Same arguments as convert_currency
+
+    Returns:
+        str: Same conversion sentence as convert_currency
+
+    Raises:
+        ValueError: If invalid currency codes or amount
+        ConnectionError: If API request fails
+    """
+    try:
+        from_currency, to_currency, amount = parse_conversion_args(args)
+
+        rate = await RATE_CACHE.get_rate_async(from_currency, to_currency, fetch_rates_async)
+        return generate_response(amount, from_currency, to_currency, rate)
+
+    except http_client.HTTPError as e:
+        raise ConnectionError(f"Failed to fetch exchange rates: {str(e)}")
+    except (ValueError, KeyError) as e:
+        raise ValueError(f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Conversion error: {str(e)}")
@@ -0,0 +1,154 @@
+import re
+import ast
+from ..cache import TTLCache
+from .calculator import OPERATIONS
+
+# Compiled expression templates kept in memory
+EXPRESSION_CACHE_SIZE = 1024
+MAX_EXPRESSION_LENGTH = 1000
+
+NUMBER_PATTERN = re.compile(r"(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+PLACEHOLDER = "n"
+# "12.5% of 243" is written as the calculator's percent operator, "12.5 % 243"
+PERCENT_OF_PATTERN = re.compile(r"%\s*of\b", re.IGNORECASE)
+SYMBOL_ALIASES = {"×": "*", "x": "*", "÷": "/"}
+# A textual x needs whitespace or a bracket on both sides, so "0x10" is not read as 0 * 10
+SYMBOL_ALIAS_PATTERN = re.compile(r"×|÷|(?<=[\s)])x(?=[\s(])")
+
+# Binary operators allowed in expressions; "/" and "%" keep the calculator's rounding
+BINARY_OPERATORS = {
+    ast.Add: "({} + {})",
+    ast.Sub: "({} - {})",
+    ast.Mult: "({} * {})",
+    ast.Div: "_divide({}, {})",
+    ast.Mod: "_percent_of({}, {})",
+}
+UNARY_OPERATORS = {
+    ast.UAdd: "(+{})",
+    ast.USub: "(-{})",
+}
+
+# The only names generated code can reach
+COMPILED_GLOBALS = {"__builtins__": {}, "_divide": OPERATIONS['/'], "_percent_of": OPERATIONS['%']}
+
+_compiled_expressions = TTLCache(EXPRESSION_CACHE_SIZE)
+
+def normalize_expression(expression: str) -> tuple:
+    """
+    Split an expression into a template with numbered placeholders and its numbers.
+
+    "(12.5% of 243) + 10 / 3" becomes ("(n0%n1)+n2/n3", (12.5, 243.0, 10.0, 3.0)),
+    so every expression with the same shape shares one compiled template.
+
+    Args:
+        expression (str): Arithmetic expression.
+
+    Returns:
+        tuple[str, tuple[float, ...]]: Whitespace free template and the numbers in order.
+
+    Raises:
+        ValueError: If the expression is too long.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+
+    expression = PERCENT_OF_PATTERN.sub("%", expression)
+    expression = SYMBOL_ALIAS_PATTERN.sub(lambda match: SYMBOL_ALIASES[match.group()], expression)
+    numbers = []
+
+    def placeholder(match):
+        numbers.append(float(match.group()))
+        return f"{PLACEHOLDER}{len(numbers) - 1}"
+
+    template = NUMBER_PATTERN.sub(placeholder, expression)
+    return "".join(template.split()), tuple(numbers)
+
+def _generate(node, placeholder_count: int) -> str:
+    # Python source for a whitelisted node; anything else is rejected
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BINARY_OPERATORS[type(node.op)].format(_generate(node.left, placeholder_count), _generate(node.right, placeholder_count))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)].format(_generate(node.operand, placeholder_count))
+    if isinstance(node, ast.Name) and re.fullmatch(rf"{PLACEHOLDER}\d+", node.id) and int(node.id[1:]) < placeholder_count:
+        return f"numbers[{int(node.id[1:])}]"
+    raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
+def compile_template(template: str, placeholder_count: int):
+    """
+    Compile an expression template to a function of its numbers.
+
+    The template is parsed with ast and only numbers, parentheses, unary +/-
+    and the binary operators + - * / % are accepted. Source code is then
+    generated from the checked tree and compiled once, without access to
+    builtins, so evaluation never runs user supplied code.
+
+    Args:
+        template (str): Template from normalize_expression.
+        placeholder_count (int): Number of numbers the template takes.
+
+    Returns:
+        callable: Function taking the tuple of numbers and returning the result.
+
+    Raises:
+        ValueError: If the template is not a supported arithmetic expression.
+    """
+    try:
+        tree = ast.parse(template, mode="eval")
+        source = f"lambda numbers: {_generate(tree.body, placeholder_count)}"
+        code = compile(source, "<expression>", "eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from e
+    except RecursionError as e:
+        raise ValueError("Expression is nested too deeply") from e
+    return eval(code, dict(COMPILED_GLOBALS))
+
+def compile_expression(expression: str) -> tuple:
+    """
+    Get the compiled template of an expression, compiling it on a cache miss.
+
+    Args:
+        expression (str): Arithmetic expression.
+
+    Returns:
+        tuple[callable, tuple[float, ...]]: Compiled template and the expression's numbers.
+
+    Raises:
+        ValueError: If the expression is not a supported arithmetic expression.
+    """
+    template, numbers = normalize_expression(expression)
+    function = _compiled_expressions.get(template)
+    if function is None:
+        function = compile_template(template, len(numbers))
+        _compiled_expressions.set(template, function)
+    return function, numbers
+
+def evaluate_expression(expression: str) -> float:
+    """
+    Evaluate an arithmetic expression such as "(12.5% of 243) + 10 / 3".
+
+    "/" and "%" behave like the calculator operands: division is rounded to
+    2 decimals and gives inf when dividing by zero, "a % b" is a percent of b.
+
+    Args:
+        expression (str): Arithmetic expression.
+
+    Returns:
+        float: Result of the expression.
+
+    Raises:
+        ValueError: If the expression is not a supported arithmetic expression.
+    """
+    function, numbers = compile_expression(expression)
+    try:
+        return float(function(numbers))
+    except OverflowError as e:
+        raise ValueError(f"Result out of range: {e}") from e
+
+def expression_cache_stats() -> dict:
+    """
+    Get the counters of the compiled expression cache.
+    """
+    return _compiled_expressions.stats()
+
+def clear_expression_cache() -> None:
+    _compiled_expressions.clear()
@@ -1,28 +1,424 @@
 import os
+import re
 import json
+import math
+import heapq
+import threading
+from collections import defaultdict
+from .. import config, tracing
+from ..logger import get_logger
+from .knowledge_reader import iter_entries
+
+logger = get_logger(__name__)
 
 ENTRIES = "entries"
 TTILE = "title"
 DETAIL = "detail"
 KNOWLEDGE_SOURCE = "data/knowledge_base.json"
+# Optional store file built by agent.tools.knowledge_store, used for title lookups
+KNOWLEDGE_STORE_SETTING = "KNOWLEDGE_STORE"
+
+# BM25 ranking parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_BOOST = 2
+
+TRIGRAM_SIZE = 3
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: Lowercase tokens in the order they appear.
+    """
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def character_ngrams(text: str, size: int = TRIGRAM_SIZE) -> set:
+    """
+    Get the set of character n-grams of the normalized text.
+
+    Args:
+        text (str): Text to split.
+        size (int): Length of each n-gram.
+
+    Returns:
+        set[str]: Character n-grams of the space-padded, lowercase tokens.
+    """
+    normalized = " " + " ".join(tokenize(text)) + " "
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+class KnowledgeIndex:
+    """
+    In-memory inverted index over the knowledge base entries.
+
+    The index keeps the entries in file order together with:
+        - an exact title hash map (title -> entry ids)
+        - title token postings, used to find titles contained in a search query
+        - title/detail token postings with term frequencies, used for BM25 ranking
+
+    All lookups only touch the postings of the query tokens, so their cost does
+    not grow with the number of entries in the knowledge base.
+    """
+
+    def __init__(self, entries: list):
+        self.titles = []
+        self.details = []
+        self.title_map = defaultdict(list)
+        self.title_postings = defaultdict(list)
+        self.untokenized_titles = []
+        self.postings = defaultdict(list)
+        self.document_lengths = []
+
+        for entry_id, entry in enumerate(entries):
+            title = entry.get(TTILE, "")
+            detail = entry.get(DETAIL, "")
+            self.titles.append(title)
+            self.details.append(detail)
+            self.title_map[title].append(entry_id)
+
+            title_tokens = tokenize(title)
+            if not title_tokens:
+                self.untokenized_titles.append(entry_id)
+            for token in set(title_tokens):
+                self.title_postings[token].append(entry_id)
+
+            term_frequencies = defaultdict(int)
+            for token in title_tokens:
+                term_frequencies[token] += TITLE_BOOST
+            detail_tokens = tokenize(detail)
+            for token in detail_tokens:
+                term_frequencies[token] += 1
+            for token, frequency in term_frequencies.items():
+                self.postings[token].append((entry_id, frequency))
+            self.document_lengths.append(TITLE_BOOST * len(title_tokens) + len(detail_tokens))
+
+        total_length = sum(self.document_lengths)
+        self.average_document_length = total_length / len(self.document_lengths) if self.document_lengths else 0.0
+        self._trigram_postings = None
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def entry(self, entry_id: int) -> dict:
+        """
+        Get the entry stored under the given id.
+
+        Args:
+            entry_id (int): Position of the entry in the knowledge base.
+
+        Returns:
+            dict[str, str]: Entry with title and detail.
+        """
+        return {TTILE: self.titles[entry_id], DETAIL: self.details[entry_id]}
+
+    def find_exact_titles(self, titles) -> list:
+        """
+        Get the ids of entries whose title is one of the given titles.
+
+        Args:
+            titles (iterable of str): Titles to look up.
+
+        Returns:
+            list[int]: Matching entry ids in knowledge base order.
+        """
+        matched_ids = set()
+        for title in titles:
+            if isinstance(title, str):
+                matched_ids.update(self.title_map.get(title, ()))
+        return sorted(matched_ids)
+
+    def find_titles_in_text(self, text: str) -> list:
+        """
+        Get the ids of entries whose title appears as a substring of the text.
+
+        Only titles sharing at least one whole word token with the text are
+        checked, so a title found only inside a longer word ("Py" in
+        "Python") does not match. Entries without title tokens are always
+        checked.
+
+        Args:
+            text (str): Text to search titles in.
+
+        Returns:
+            list[int]: Matching entry ids in knowledge base order.
+        """
+        candidate_ids = set(self.untokenized_titles)
+        for token in set(tokenize(text)):
+            candidate_ids.update(self.title_postings.get(token, ()))
+        return sorted(entry_id for entry_id in candidate_ids if self.titles[entry_id] in text)
+
+    def title(self, entry_id: int) -> str:
+        return self.titles[entry_id]
+
+    def top_k(self, query: str, k: int = 3) -> list:
+        """
+        Rank entries against a query with BM25 and return the best ones.
+
+        Args:
+            query (str): Free text query.
+            k (int): Maximum number of results.
+
+        Returns:
+            list[tuple[int, float]]: (entry id, score) pairs, best score first.
+        """
+        return bm25_top_k(query, self.postings.get, self.document_lengths, self.average_document_length, k)
+
+    def score_bound(self, query: str) -> float:
+        """
+        Get the highest BM25 score any entry could reach for the query.
+
+        Every term contributes at most idf * (k1 + 1), so dividing a score by
+        this bound gives a confidence between 0 and 1.
+
+        Args:
+            query (str): Free text query.
+
+        Returns:
+            float: Upper bound of the BM25 score, 0.0 if no query token is indexed.
+        """
+        return bm25_score_bound(query, self.postings.get, len(self.titles))
+
+    def similar_titles(self, text: str, k: int = 3) -> list:
+        """
+        Rank titles by character trigram overlap with the text.
+
+        This tolerates typos and partial words that token based ranking misses.
+        The trigram postings are built on first use.
+
+        Args:
+            text (str): Text to compare titles against.
+            k (int): Maximum number of results.
+
+        Returns:
+            list[tuple[int, float]]: (entry id, Dice coefficient) pairs, best first.
+        """
+        if self._trigram_postings is None:
+            self._trigram_postings = build_trigram_postings(self.titles)
+        return rank_similar_titles(text, self._trigram_postings, self.titles, k)
+
+def bm25_idf(document_count: int, document_frequency: int) -> float:
+    return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+def bm25_top_k(query: str, postings, document_lengths, average_document_length: float, k: int) -> list:
+    """
+    Rank entries against a query with BM25.
+
+    Shared by the in-memory index and the memory-mapped store, which keep
+    their postings and document lengths in different containers.
+
+    Args:
+        query (str): Free text query.
+        postings (callable): Maps a token to its sized sequence of (entry id, term frequency) pairs, or None.
+        document_lengths (sequence of int): Weighted token count of every entry.
+        average_document_length (float): Mean of the document lengths.
+        k (int): Maximum number of results.
+
+    Returns:
+        list[tuple[int, float]]: (entry id, score) pairs, best score first.
+    """
+    document_count = len(document_lengths)
+    if k <= 0 or not document_count:
+        return []
+
+    scores = defaultdict(float)
+    for token in set(tokenize(query)):
+        token_postings = postings(token)
+        if not token_postings:
+            continue
+        idf = bm25_idf(document_count, len(token_postings))
+        for entry_id, frequency in token_postings:
+            length_ratio = document_lengths[entry_id] / average_document_length
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length_ratio)
+            scores[entry_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+def bm25_score_bound(query: str, postings, document_count: int) -> float:
+    """
+    Get the highest BM25 score any entry could reach for the query.
+
+    Args:
+        query (str): Free text query.
+        postings (callable): Maps a token to its sized sequence of postings, or None.
+        document_count (int): Number of entries.
+
+    Returns:
+        float: Upper bound of the BM25 score, 0.0 if no query token is indexed.
+    """
+    bound = 0.0
+    for token in set(tokenize(query)):
+        token_postings = postings(token)
+        if token_postings:
+            bound += bm25_idf(document_count, len(token_postings)) * (BM25_K1 + 1)
+    return bound
+
+def build_trigram_postings(titles) -> dict:
+    """
+    Map every character trigram of the titles to the ids of the titles containing it.
+    """
+    trigram_postings = defaultdict(list)
+    for entry_id, title in enumerate(titles):
+        for trigram in character_ngrams(title):
+            trigram_postings[trigram].append(entry_id)
+    return trigram_postings
+
+def rank_similar_titles(text: str, trigram_postings: dict, titles, k: int) -> list:
+    """
+    Rank titles by the Dice coefficient of their trigrams and the text's.
+
+    Args:
+        text (str): Text to compare titles against.
+        trigram_postings (dict): Postings built by build_trigram_postings.
+        titles (sequence of str): Titles by entry id.
+        k (int): Maximum number of results.
+
+    Returns:
+        list[tuple[int, float]]: (entry id, Dice coefficient) pairs, best first.
+    """
+    text_trigrams = character_ngrams(text)
+    shared_counts = defaultdict(int)
+    for trigram in text_trigrams:
+        for entry_id in trigram_postings.get(trigram, ()):
+            shared_counts[entry_id] += 1
+
+    scores = {
+        entry_id: 2 * shared / (len(text_trigrams) + len(character_ngrams(titles[entry_id])))
+        for entry_id, shared in shared_counts.items()
+    }
+    return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+_index = None
+_index_signature = None
+_index_lock = threading.Lock()
+
+def _source_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """
+    Get the in-process knowledge index, building it on first use.
+
+    The index is rebuilt whenever the modification time or size of the
+    knowledge base file changes. If the file cannot be stat-ed, the index
+    is not cached and the file is read again on the next call. Entries are
+    streamed from the file, so only the index itself is kept in memory.
+
+    Returns:
+        KnowledgeIndex: Index over the current knowledge base.
+
+    Raises:
+        FileNotFoundError: If knowledge base file is not found
+        json.JSONDecodeError: If JSON format is invalid
+    """
+    global _index, _index_signature
+
+    signature = _source_signature(KNOWLEDGE_SOURCE)
+    index = _index
+    if index is not None and signature is not None and signature == _index_signature:
+        return index
+
+    with _index_lock:
+        if _index is not None and signature is not None and signature == _index_signature:
+            return _index
+
+        with tracing.span("knowledge.load", source=KNOWLEDGE_SOURCE):
+            index = KnowledgeIndex(iter_entries(KNOWLEDGE_SOURCE, ENTRIES))
+
+        _index = index if signature is not None else None
+        _index_signature = signature
+        return index
+
+def reset_knowledge_index() -> None:
+    """
+    Drop the cached knowledge index so the next lookup reloads the file.
+    """
+    global _index, _index_signature
+    with _index_lock:
+        _index = None
+        _index_signature = None
+
+_store = None
+_store_signature = None
+_store_lock = threading.Lock()
+
+def get_knowledge_store():
+    """
+    Get the memory-mapped knowledge store named by the KNOWLEDGE_STORE setting.
+
+    The store is opened again whenever its file changes. Maps of replaced
+    files stay valid for the callers still holding them.
+
+    Returns:
+        KnowledgeStore or None: The open store, or None if no store is configured.
+
+    Raises:
+        FileNotFoundError: If the store file is not found
+        KnowledgeStoreError: If the file is not a knowledge store
+    """
+    global _store, _store_signature
+
+    path = config.get_setting(KNOWLEDGE_STORE_SETTING)
+    if not path:
+        return None
+    signature = (path, _source_signature(path))
+    store = _store
+    if store is not None and signature == _store_signature:
+        return store
+
+    with _store_lock:
+        if _store is None or signature != _store_signature:
+            from .knowledge_store import KnowledgeStore
+            with tracing.span("knowledge.load", source=path):
+                _store = KnowledgeStore(path)
+            _store_signature = signature
+        return _store
+
+def reset_knowledge_store() -> None:
+    """
+    Drop the cached knowledge store so the next lookup opens the file again.
+    """
+    global _store, _store_signature
+    with _store_lock:
+        _store = None
+        _store_signature = None
+
+def get_search_index():
+    """
+    Get the memory-mapped store if KNOWLEDGE_STORE is set, the JSON knowledge index otherwise.
+
+    Both answer the same lookups and rankings, so callers need not know which one is used.
+
+    Returns:
+        KnowledgeStore or KnowledgeIndex: Index over the current knowledge base.
+    """
+    store = get_knowledge_store()
+    return store if store is not None else get_knowledge_index()
 
 def load_knowledge_base():
     """
-    Load the knowledge base from a JSON file.
+    Load the knowledge base from a JSON or JSON Lines file.
 
     Returns:
-        dict: Parsed contents of the knowledge base.
+        dict: The knowledge base as {"entries": [...]}.
 
     Raises:
-        FileNotFoundError: If the JSON file is not found at the specified path.
+        FileNotFoundError: If the knowledge base file is not found at the specified path.
         ValueError: If the file content is not valid JSON.
     """
-    knowledge_base_path = os.path.join(os.path.dirname(KNOWLEDGE_SOURCE))
     try:
-        with open(knowledge_base_path, 'r') as file:
-            return json.load(file)
+        return {ENTRIES: list(iter_entries(KNOWLEDGE_SOURCE, ENTRIES))}
     except FileNotFoundError:
-        raise FileNotFoundError(f"Knowledge base file not found at: {knowledge_base_path}")
+        raise FileNotFoundError(f"Knowledge base file not found at: {KNOWLEDGE_SOURCE}")
     except json.JSONDecodeError:
         raise ValueError("Invalid JSON format in knowledge base file")
     
@@ -38,25 +434,29 @@ def get_all_titles() -> list:
         json.JSONDecodeError: If JSON format is invalid
     """
     try:
-        with open(KNOWLEDGE_SOURCE, "r") as f:
-            knowledge_base = json.load(f)
+        index = get_knowledge_index()
 
-        print("knowledge_base: ", knowledge_base.get(ENTRIES, []))
-        
-        # Extract all titles from entries
-        titles = [entry.get(TTILE, "") for entry in knowledge_base.get(ENTRIES, [])]
+        logger.debug("knowledge_base", entries=lambda: [index.entry(entry_id) for entry_id in range(len(index))])
+
+        titles = list(index.titles)
         return titles if titles else ["No titles found."]
         
     except Exception as e:
-        print(f"Error loading knowledge base: {str(e)}")
+        logger.error("knowledge_base_load_failed", error=str(e))
         return []
     
-def search_titles_and_details(search_query: str) -> list[dict[str, str]]:
+def search_titles_and_details(search_query) -> list[dict[str, str]]:
     """
     Get titles and details that match the search query.
+
+    A string query matches every entry whose title appears in it and shares
+    a whole word with it (see KnowledgeIndex.find_titles_in_text). Any other
+    container (e.g. the list of titles chosen by the planner) matches the
+    entries whose title is a member of it. When KNOWLEDGE_STORE is set, the
+    lookup goes to the memory-mapped store and only matched entries are read.
     
     Args:
-        search_query (str): Text to search for in titles
+        search_query (str or list[str]): Text to search for in titles, or titles to match
         
     Returns:
         list[dict[str, str]]: List of matching entries with title and detail
@@ -67,19 +467,69 @@ def search_titles_and_details(search_query: str) -> list[dict[str, str]]:
         json.JSONDecodeError: If JSON format is invalid
     """
     try:
-        with open(KNOWLEDGE_SOURCE, "r") as f:
-            knowledge_base = json.load(f)
+        index = get_search_index()
 
-        print("search Query: ", search_query)
+        logger.debug("knowledge_base_search", query=search_query)
 
-        matched_entries = []
-        for entry in knowledge_base.get(ENTRIES, []):
-            title = entry.get(TTILE, "")
-            if title in search_query:
-                matched_entries.append({TTILE: entry.get(TTILE, ""), DETAIL: entry.get(DETAIL, "")})
+        if isinstance(search_query, str):
+            matched_ids = index.find_titles_in_text(search_query)
+        else:
+            matched_ids = index.find_exact_titles(search_query)
 
-        return matched_entries
+        return [index.entry(entry_id) for entry_id in matched_ids]
         
     except Exception as e:
-        print(f"Error searching knowledge base: {str(e)}")
-        return []
\ No newline at end of file
+        logger.error("knowledge_base_search_failed", error=str(e))
+        return []
+
+def rank_titles_and_details(query: str, top_k: int = 3) -> list[dict[str, str]]:
+    """
+    Get the entries that best match a free text query, ranked with BM25.
+
+    When KNOWLEDGE_STORE is set, the ranking reads the store's postings.
+
+    Args:
+        query (str): Free text query
+        top_k (int): Maximum number of entries to return
+
+    Returns:
+        list[dict[str, str]]: Best matching entries with title and detail, best first
+            Format: [{"title": "...", "detail": "..."}, ...]
+    """
+    try:
+        index = get_search_index()
+        return [index.entry(entry_id) for entry_id, _ in index.top_k(query, top_k)]
+
+    except Exception as e:
+        logger.error("knowledge_base_ranking_failed", error=str(e))
+        return []
+
+def shortlist_titles(query: str, limit: int = 50) -> list[tuple[str, float]]:
+    """
+    Pick the titles most likely to answer a query without calling the LLM.
+
+    Entries are ranked with BM25 over titles and details. If no query token is
+    indexed, titles are ranked by character trigram similarity instead.
+    When KNOWLEDGE_STORE is set, the ranking reads the store's postings.
+
+    Args:
+        query (str): Free text query
+        limit (int): Maximum number of titles to return
+
+    Returns:
+        list[tuple[str, float]]: (title, confidence) pairs, best first.
+            Confidence is between 0 and 1.
+    """
+    try:
+        index = get_search_index()
+
+        ranked = index.top_k(query, limit)
+        if ranked:
+            bound = index.score_bound(query)
+            return [(index.title(entry_id), min(score / bound, 1.0)) for entry_id, score in ranked]
+
+        return [(index.title(entry_id), score) for entry_id, score in index.similar_titles(query, limit)]
+
+    except Exception as e:
+        logger.error("knowledge_base_ranking_failed", error=str(e))
+        return []
@@ -0,0 +1,271 @@
+"""
+Incremental readers for knowledge base files.
+
+Two formats are supported:
+    .json   {"entries": [{"title": ..., "detail": ...}, ...]}, read in chunks.
+            Only the entry being decoded is held in memory, so multi-GB files
+            can be indexed in bounded memory.
+    .jsonl  One entry object per line. New entries can be appended with
+            append_entries without rewriting the file.
+"""
+import os
+import re
+import json
+
+JSONL_EXTENSION = ".jsonl"
+DEFAULT_ENTRIES_KEY = "entries"
+CHUNK_SIZE = 1 << 16
+
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r]*")
+# Characters that end or escape a string, and that open, close or start something inside a container
+STRING_SPECIAL_PATTERN = re.compile(r'["\\]')
+CONTAINER_SPECIAL_PATTERN = re.compile(r'["{}\[\]]')
+SCALAR_END_PATTERN = re.compile(r"[,:}\] \t\n\r]")
+DECODER = json.JSONDecoder()
+
+class _Buffer:
+    # Text read so far that has not been consumed yet, refilled from the file on demand
+
+    def __init__(self, file):
+        self.file = file
+        self.text = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read more text, at least as much as is pending so long values are not rescanned often.
+
+        Returns:
+            bool: False if the file has no more text.
+        """
+        if self.eof:
+            return False
+        if self.position > CHUNK_SIZE:
+            self.text = self.text[self.position:]
+            self.position = 0
+        chunk = self.file.read(max(CHUNK_SIZE, len(self.text) - self.position))
+        if not chunk:
+            self.eof = True
+            return False
+        self.text += chunk
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and get the next character, or "" at the end of the file.
+        """
+        while True:
+            self.position = WHITESPACE_PATTERN.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters: str) -> str:
+        """
+        Consume the next character, which must be one of the given characters.
+
+        Raises:
+            json.JSONDecodeError: If another character or the end of the file comes next.
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            expected = " or ".join(f"'{character}'" for character in characters)
+            raise json.JSONDecodeError(f"Expecting {expected}", self.text, self.position)
+        self.position += 1
+        return character
+
+    def value_span(self) -> tuple:
+        """
+        Consume the next JSON value without decoding it.
+
+        Returns:
+            tuple[int, int]: Start and end of the value in text.
+
+        Raises:
+            json.JSONDecodeError: If the file ends inside the value.
+        """
+        if not self.peek():
+            raise json.JSONDecodeError("Expecting value", self.text, self.position)
+        while True:
+            end = _value_end(self.text, self.position)
+            if end is not None:
+                break
+            if not self.fill():
+                if self.text[self.position] in '{["':
+                    raise json.JSONDecodeError("Unterminated value", self.text, self.position)
+                end = len(self.text)
+                break
+        start, self.position = self.position, end
+        return start, end
+
+    def read_value(self):
+        """
+        Consume and decode the next JSON value.
+
+        Raises:
+            json.JSONDecodeError: If the value is invalid or the file ends inside it.
+        """
+        if not self.peek():
+            raise json.JSONDecodeError("Expecting value", self.text, self.position)
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                # A value cut off at the end of the buffer needs more text; a complete one is invalid
+                if _value_end(self.text, self.position) is not None or not self.fill():
+                    raise
+                continue
+            # A scalar is complete only where a delimiter follows it: "1e" may be "1e5" cut off at a chunk boundary
+            complete = self.text[self.position] in '{["' or SCALAR_END_PATTERN.match(self.text, end)
+            if complete or not self.fill():
+                self.position = end
+                return value
+
+def _string_end(text: str, position: int):
+    # End of a string whose opening quote is just before position, None if it is cut off
+    while True:
+        match = STRING_SPECIAL_PATTERN.search(text, position)
+        if match is None:
+            return None
+        if match.group() == '"':
+            return match.end()
+        if match.end() >= len(text):
+            return None
+        position = match.end() + 1
+
+def _value_end(text: str, start: int):
+    # End of the value starting at start, None if it may continue past the end of text
+    first = text[start]
+    if first == '"':
+        return _string_end(text, start + 1)
+    if first not in "{[":
+        match = SCALAR_END_PATTERN.search(text, start)
+        return match.start() if match else None
+
+    depth = 0
+    position = start
+    while True:
+        match = CONTAINER_SPECIAL_PATTERN.search(text, position)
+        if match is None:
+            return None
+        character = match.group()
+        if character == '"':
+            position = _string_end(text, match.end())
+            if position is None:
+                return None
+            continue
+        depth += 1 if character in "{[" else -1
+        position = match.end()
+        if depth == 0:
+            return position
+
+def iter_json_entries(file, key: str = DEFAULT_ENTRIES_KEY):
+    """
+    Yield the items of the array stored under key in a top-level JSON object, one at a time.
+
+    Other members of the object are skipped without being decoded. The file is
+    read up to the end of the top-level object.
+
+    Args:
+        file (file object): Text file positioned at the start of the document.
+        key (str): Name of the array member.
+
+    Yields:
+        Decoded array items in order.
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+    """
+    buffer = _Buffer(file)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        if buffer.peek() != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", buffer.text, buffer.position)
+        name = buffer.read_value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield buffer.read_value()
+                    if buffer.expect(",]") == "]":
+                        break
+        else:
+            buffer.value_span()
+        if buffer.expect(",}") == "}":
+            return
+
+def iter_jsonl_entries(file):
+    """
+    Yield the entry on every non-blank line of a JSON Lines file.
+
+    Args:
+        file (file object): Text file.
+
+    Yields:
+        dict: Decoded entries in order.
+
+    Raises:
+        json.JSONDecodeError: If a line is not valid JSON.
+    """
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"{e.msg} on line {line_number}", e.doc, e.pos) from e
+
+def is_jsonl(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == JSONL_EXTENSION
+
+def iter_entries(path: str, key: str = DEFAULT_ENTRIES_KEY):
+    """
+    Stream the entries of a knowledge base file, choosing the format from its extension.
+
+    Args:
+        path (str): .json or .jsonl knowledge base file.
+        key (str): Name of the entries array in a .json file.
+
+    Yields:
+        dict: Entries in file order.
+
+    Raises:
+        FileNotFoundError: If the file is not found
+        json.JSONDecodeError: If the file content is not valid JSON
+    """
+    with open(path, "r") as f:
+        if is_jsonl(path):
+            yield from iter_jsonl_entries(f)
+        else:
+            yield from iter_json_entries(f, key)
+
+def append_entries(path: str, entries) -> int:
+    """
+    Append entries to a JSON Lines knowledge base, creating it if needed.
+
+    Args:
+        path (str): .jsonl knowledge base file.
+        entries (iterable of dict): Entries to append.
+
+    Returns:
+        int: Number of entries appended.
+    """
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            # A last line without a newline would merge with the first new entry
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        count = 0
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            count += 1
+    return count
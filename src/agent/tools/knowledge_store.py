@@ -0,0 +1,450 @@
+"""
+Memory-mapped, columnar knowledge base file.
+
+The file is built from a JSON or JSON Lines knowledge base by the converter below and holds,
+after a fixed header, little-endian sections aligned to 8 bytes:
+    title offsets    (entry_count + 1) uint64, start of each title in the title blob
+    detail offsets   (entry_count + 1) uint64, start of each detail in the detail blob
+    title order      entry_count uint32, entry ids sorted by title bytes (the title dictionary)
+    title blob       UTF-8 titles back to back
+    detail blob      UTF-8 details back to back
+    document lengths entry_count uint32, BM25 length of each entry
+    term offsets     (term_count + 1) uint64, start of each term in the term blob
+    term blob        UTF-8 terms sorted by their bytes (the term dictionary)
+    posting offsets  (term_count + 1) uint64, start of each term's postings
+    posting ids      uint32 entry ids of every term's postings, in entry order
+    posting counts   uint32 term frequencies matching the posting ids
+
+Opening a store only maps the file. A lookup binary-searches the title
+dictionary and decodes just the matched entries, and BM25 ranking
+binary-searches the term dictionary and reads the postings in place, so every
+process that maps the same file shares one copy of the index through the OS
+page cache instead of building its own.
+
+Usage: python -m agent.tools.knowledge_store <knowledge_base.json or .jsonl> <store file>
+"""
+import os
+import sys
+import mmap
+import array
+import bisect
+import shutil
+import struct
+import tempfile
+from collections import defaultdict
+from .knowledge_loader import ENTRIES, TTILE, DETAIL, TITLE_BOOST, tokenize, bm25_top_k, bm25_score_bound, build_trigram_postings, rank_similar_titles
+from .knowledge_reader import iter_entries
+
+MAGIC = b"AKB1"
+VERSION = 2
+SECTION_COUNT = 11
+# magic, version, entry count, term count, summed document length, then the positions of the sections
+HEADER = struct.Struct("<4sIQQQ" + "Q" * SECTION_COUNT)
+OFFSET = struct.Struct("<Q")
+ENTRY_ID = struct.Struct("<I")
+ALIGNMENT = 8
+
+class KnowledgeStoreError(ValueError):
+    """
+    Raised when a file is not a knowledge store this version can read.
+    """
+
+def _padding(position: int) -> bytes:
+    return b"\0" * (-position % ALIGNMENT)
+
+def write_knowledge_store(entries, path: str) -> int:
+    """
+    Write knowledge base entries to a store file.
+
+    Details are spooled to a temporary file as the entries stream in, so
+    only titles, offsets and the postings are held in memory. The store is written next
+    to path and renamed over it, so readers never map a half written store.
+
+    Args:
+        entries (iterable of dict): Entries with title and detail.
+        path (str): Store file to create or replace.
+
+    Returns:
+        int: Number of entries written.
+    """
+    titles = []
+    title_offsets = array.array("Q", [0])
+    detail_offsets = array.array("Q", [0])
+    document_lengths = array.array("I")
+    # term -> (entry ids, term frequencies), counted the same way as KnowledgeIndex
+    postings = defaultdict(lambda: (array.array("I"), array.array("I")))
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as detail_blob:
+        for entry_id, entry in enumerate(entries):
+            title_text = entry.get(TTILE, "")
+            detail_text = entry.get(DETAIL, "")
+            title = str(title_text).encode("utf-8")
+            detail = str(detail_text).encode("utf-8")
+            titles.append(title)
+            title_offsets.append(title_offsets[-1] + len(title))
+            detail_offsets.append(detail_offsets[-1] + detail_blob.write(detail))
+
+            term_frequencies = defaultdict(int)
+            title_tokens = tokenize(title_text)
+            for token in title_tokens:
+                term_frequencies[token] += TITLE_BOOST
+            detail_tokens = tokenize(detail_text)
+            for token in detail_tokens:
+                term_frequencies[token] += 1
+            for token, frequency in term_frequencies.items():
+                entry_ids, frequencies = postings[token]
+                entry_ids.append(entry_id)
+                frequencies.append(frequency)
+            document_lengths.append(TITLE_BOOST * len(title_tokens) + len(detail_tokens))
+        count = len(titles)
+        title_order = array.array("I", sorted(range(count), key=titles.__getitem__))
+
+        terms = sorted(token.encode("utf-8") for token in postings)
+        term_offsets = array.array("Q", [0])
+        posting_offsets = array.array("Q", [0])
+        posting_ids = array.array("I")
+        posting_counts = array.array("I")
+        for term in terms:
+            entry_ids, frequencies = postings.pop(term.decode("utf-8"))
+            term_offsets.append(term_offsets[-1] + len(term))
+            posting_offsets.append(posting_offsets[-1] + len(entry_ids))
+            posting_ids.extend(entry_ids)
+            posting_counts.extend(frequencies)
+        total_length = sum(document_lengths)
+
+        tables = (title_offsets, detail_offsets, title_order, document_lengths, term_offsets, posting_offsets, posting_ids, posting_counts)
+        if sys.byteorder != "little":
+            for table in tables:
+                table.byteswap()
+
+        section_sizes = [len(title_offsets) * OFFSET.size, len(detail_offsets) * OFFSET.size,
+                         len(title_order) * ENTRY_ID.size, title_offsets[-1], detail_offsets[-1],
+                         len(document_lengths) * ENTRY_ID.size, len(term_offsets) * OFFSET.size, term_offsets[-1],
+                         len(posting_offsets) * OFFSET.size, len(posting_ids) * ENTRY_ID.size, len(posting_counts) * ENTRY_ID.size]
+        positions = []
+        position = HEADER.size
+        for size in section_sizes:
+            position += len(_padding(position))
+            positions.append(position)
+            position += size
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, count, len(terms), total_length, *positions))
+            for table in (title_offsets, detail_offsets, title_order):
+                f.write(_padding(f.tell()))
+                table.tofile(f)
+            f.write(_padding(f.tell()))
+            for title in titles:
+                f.write(title)
+            f.write(_padding(f.tell()))
+            detail_blob.seek(0)
+            shutil.copyfileobj(detail_blob, f)
+            for section in (document_lengths, term_offsets, terms, posting_offsets, posting_ids, posting_counts):
+                f.write(_padding(f.tell()))
+                if isinstance(section, array.array):
+                    section.tofile(f)
+                else:
+                    f.writelines(section)
+    os.replace(temporary_path, path)
+    return count
+
+def convert(source_path: str, store_path: str) -> int:
+    """
+    Convert a knowledge_base.json or JSON Lines file to a store file.
+
+    Entries are streamed from the source, so sources larger than memory can be converted.
+
+    Args:
+        source_path (str): Knowledge base in the {"entries": [...]} JSON or JSON Lines format.
+        store_path (str): Store file to create or replace.
+
+    Returns:
+        int: Number of entries written.
+
+    Raises:
+        FileNotFoundError: If the source file is not found
+        json.JSONDecodeError: If JSON format is invalid
+    """
+    return write_knowledge_store(iter_entries(source_path, ENTRIES), store_path)
+
+class _SortedTitles:
+    # Title bytes in dictionary order as a sequence, for bisect
+    def __init__(self, store: "KnowledgeStore"):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, rank: int) -> bytes:
+        return self.store._title_bytes(self.store._title_order[rank])
+
+class _SortedTerms:
+    # Term bytes in dictionary order as a sequence, for bisect
+    def __init__(self, store: "KnowledgeStore"):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store._term_count
+
+    def __getitem__(self, rank: int) -> bytes:
+        return self.store._term_bytes(rank)
+
+class _PostingList:
+    # Sized view of one term's postings, iterated as (entry id, term frequency) pairs
+    __slots__ = ("entry_ids", "frequencies")
+
+    def __init__(self, entry_ids: memoryview, frequencies: memoryview):
+        self.entry_ids = entry_ids
+        self.frequencies = frequencies
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def __iter__(self):
+        return zip(self.entry_ids, self.frequencies)
+
+class KnowledgeStore:
+    """
+    Read-only view of a store file through mmap.
+
+    Titles and details are decoded on access, and BM25 ranking reads the
+    postings from the map, so the store answers the same lookups and
+    rankings as KnowledgeIndex. The title token postings used by
+    find_titles_in_text and the trigram postings used by similar_titles are
+    built from the titles on first use; details are never loaded as a whole.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Store file written by write_knowledge_store.
+
+        Raises:
+            FileNotFoundError: If the store file is not found
+            KnowledgeStoreError: If the file is not a store of this version
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise KnowledgeStoreError(f"Not a knowledge store: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, term_count, total_length, *positions = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise KnowledgeStoreError(f"Not a knowledge store of version {VERSION}: {path}")
+        self._count = count
+        self._term_count = term_count
+        self.average_document_length = total_length / count if count else 0.0
+        (title_offsets, detail_offsets, title_order, title_blob, detail_blob,
+         document_lengths, term_offsets, term_blob, posting_offsets, posting_ids, posting_counts) = positions
+        # Typed views read the tables without unpacking; the file is little-endian
+        if sys.byteorder != "little":
+            self._map.close()
+            raise KnowledgeStoreError("Knowledge stores can only be read on little-endian machines")
+        self._view = memoryview(self._map)
+        self._title_offsets = self._view[title_offsets:title_offsets + OFFSET.size * (count + 1)].cast("Q")
+        self._detail_offsets = self._view[detail_offsets:detail_offsets + OFFSET.size * (count + 1)].cast("Q")
+        self._title_order = self._view[title_order:title_order + ENTRY_ID.size * count].cast("I")
+        self._title_blob = title_blob
+        self._detail_blob = detail_blob
+        self._document_lengths = self._view[document_lengths:document_lengths + ENTRY_ID.size * count].cast("I")
+        self._term_offsets = self._view[term_offsets:term_offsets + OFFSET.size * (term_count + 1)].cast("Q")
+        self._term_blob = term_blob
+        self._posting_offsets = self._view[posting_offsets:posting_offsets + OFFSET.size * (term_count + 1)].cast("Q")
+        posting_count = self._posting_offsets[term_count]
+        self._posting_ids = self._view[posting_ids:posting_ids + ENTRY_ID.size * posting_count].cast("I")
+        self._posting_counts = self._view[posting_counts:posting_counts + ENTRY_ID.size * posting_count].cast("I")
+        self._sorted_titles = _SortedTitles(self)
+        self._sorted_terms = _SortedTerms(self)
+        self._titles = None
+        self._title_postings = None
+        self._untokenized_titles = None
+        self._trigram_postings = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _title_bytes(self, entry_id: int) -> bytes:
+        start = self._title_blob + self._title_offsets[entry_id]
+        return self._map[start:self._title_blob + self._title_offsets[entry_id + 1]]
+
+    def title(self, entry_id: int) -> str:
+        return self._title_bytes(entry_id).decode("utf-8")
+
+    def detail(self, entry_id: int) -> str:
+        start = self._detail_blob + self._detail_offsets[entry_id]
+        return self._map[start:self._detail_blob + self._detail_offsets[entry_id + 1]].decode("utf-8")
+
+    def entry(self, entry_id: int) -> dict:
+        """
+        Get the entry stored under the given id.
+
+        Args:
+            entry_id (int): Position of the entry in the knowledge base.
+
+        Returns:
+            dict[str, str]: Entry with title and detail.
+
+        Raises:
+            IndexError: If there is no entry with that id.
+        """
+        if not 0 <= entry_id < self._count:
+            raise IndexError(f"No knowledge base entry {entry_id}")
+        return {TTILE: self.title(entry_id), DETAIL: self.detail(entry_id)}
+
+    @property
+    def titles(self) -> list:
+        """
+        Every title in knowledge base order, decoded on first use.
+        """
+        if self._titles is None:
+            self._titles = [self.title(entry_id) for entry_id in range(self._count)]
+        return self._titles
+
+    def find_exact_titles(self, titles) -> list:
+        """
+        Get the ids of entries whose title is one of the given titles.
+
+        Each title costs a binary search of the title dictionary.
+
+        Args:
+            titles (iterable of str): Titles to look up.
+
+        Returns:
+            list[int]: Matching entry ids in knowledge base order.
+        """
+        matched_ids = set()
+        for title in titles:
+            if not isinstance(title, str):
+                continue
+            wanted = title.encode("utf-8")
+            low = bisect.bisect_left(self._sorted_titles, wanted)
+            while low < self._count:
+                entry_id = self._title_order[low]
+                if self._title_bytes(entry_id) != wanted:
+                    break
+                matched_ids.add(entry_id)
+                low += 1
+        return sorted(matched_ids)
+
+    def find_titles_in_text(self, text: str) -> list:
+        """
+        Get the ids of entries whose title appears as a substring of the text.
+
+        As in KnowledgeIndex.find_titles_in_text, a title must share a whole
+        word token with the text, so "Py" is not found in "Python".
+
+        Args:
+            text (str): Text to search titles in.
+
+        Returns:
+            list[int]: Matching entry ids in knowledge base order.
+        """
+        if self._title_postings is None:
+            title_postings = defaultdict(list)
+            untokenized_titles = []
+            for entry_id, title in enumerate(self.titles):
+                title_tokens = set(tokenize(title))
+                if not title_tokens:
+                    untokenized_titles.append(entry_id)
+                for token in title_tokens:
+                    title_postings[token].append(entry_id)
+            self._title_postings = title_postings
+            self._untokenized_titles = untokenized_titles
+
+        candidate_ids = set(self._untokenized_titles)
+        for token in set(tokenize(text)):
+            candidate_ids.update(self._title_postings.get(token, ()))
+        return sorted(entry_id for entry_id in candidate_ids if self.titles[entry_id] in text)
+
+    def _term_bytes(self, rank: int) -> bytes:
+        start = self._term_blob + self._term_offsets[rank]
+        return self._map[start:self._term_blob + self._term_offsets[rank + 1]]
+
+    def postings(self, token: str):
+        """
+        Get the postings of a token from the term dictionary.
+
+        Args:
+            token (str): Lowercase token as produced by tokenize.
+
+        Returns:
+            _PostingList or None: (entry id, term frequency) pairs, None if the token is not indexed.
+        """
+        wanted = token.encode("utf-8")
+        rank = bisect.bisect_left(self._sorted_terms, wanted)
+        if rank == self._term_count or self._term_bytes(rank) != wanted:
+            return None
+        start, end = self._posting_offsets[rank], self._posting_offsets[rank + 1]
+        return _PostingList(self._posting_ids[start:end], self._posting_counts[start:end])
+
+    def top_k(self, query: str, k: int = 3) -> list:
+        """
+        Rank entries against a query with BM25 and return the best ones.
+
+        Scores are the same as KnowledgeIndex.top_k over the same entries.
+
+        Args:
+            query (str): Free text query.
+            k (int): Maximum number of results.
+
+        Returns:
+            list[tuple[int, float]]: (entry id, score) pairs, best score first.
+        """
+        return bm25_top_k(query, self.postings, self._document_lengths, self.average_document_length, k)
+
+    def score_bound(self, query: str) -> float:
+        """
+        Get the highest BM25 score any entry could reach for the query.
+
+        Args:
+            query (str): Free text query.
+
+        Returns:
+            float: Upper bound of the BM25 score, 0.0 if no query token is indexed.
+        """
+        return bm25_score_bound(query, self.postings, self._count)
+
+    def similar_titles(self, text: str, k: int = 3) -> list:
+        """
+        Rank titles by character trigram overlap with the text.
+
+        The trigram postings are built from the titles on first use.
+
+        Args:
+            text (str): Text to compare titles against.
+            k (int): Maximum number of results.
+
+        Returns:
+            list[tuple[int, float]]: (entry id, Dice coefficient) pairs, best first.
+        """
+        if self._trigram_postings is None:
+            self._trigram_postings = build_trigram_postings(self.titles)
+        return rank_similar_titles(text, self._trigram_postings, self.titles, k)
+
+    def close(self) -> None:
+        self._sorted_titles = None
+        self._sorted_terms = None
+        views = (self._title_offsets, self._detail_offsets, self._title_order, self._document_lengths,
+                 self._term_offsets, self._posting_offsets, self._posting_ids, self._posting_counts, self._view)
+        for view in views:
+            view.release()
+        self._map.close()
+
+    def __enter__(self) -> "KnowledgeStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        print("Usage: python -m agent.tools.knowledge_store <knowledge_base.json or .jsonl> <store file>")
+        sys.exit(2)
+    count = convert(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} entries to {sys.argv[2]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import time
+import threading
+import asyncio
+from ..cache import TTLCache
+from ..singleflight import SingleFlight
+
+# Exchange rate tables only change a few times a day
+RATE_TABLE_TTL_SECONDS = 3600
+# How long an expired table may still be served while it is refreshed
+RATE_TABLE_STALE_SECONDS = 600
+RATE_TABLE_MAX_BASES = 32
+
+class RateTableCache:
+    """
+    Cache of exchange rate tables keyed by base currency.
+
+    - Tables are fresh for ttl_seconds and evicted least recently used first.
+    - For stale_seconds after that, the stale table is served immediately and
+      refreshed in the background (stale-while-revalidate).
+    - Concurrent misses for the same base share a single upstream fetch.
+    - A rate between two currencies is derived from any fresh cached table that
+      has both, e.g. EUR -> JPY through a cached USD table.
+    """
+
+    def __init__(self, ttl_seconds: float = RATE_TABLE_TTL_SECONDS, stale_seconds: float = RATE_TABLE_STALE_SECONDS,
+                 max_bases: int = RATE_TABLE_MAX_BASES, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.tables = TTLCache(max_bases, ttl_seconds + stale_seconds, clock)
+        self.flights = SingleFlight()
+        self.upstream_fetches = 0
+        self.cross_rate_hits = 0
+        self.stale_hits = 0
+        self._background_tasks = set()
+
+    def _store(self, base: str, rates: dict) -> dict:
+        self.upstream_fetches += 1
+        self.tables.set(base, rates)
+        return rates
+
+    def _fetch(self, base: str, fetch) -> dict:
+        return self._store(base, fetch(base))
+
+    async def _fetch_async(self, base: str, fetch) -> dict:
+        return self._store(base, await fetch(base))
+
+    def _refresh_in_background(self, base: str, fetch) -> None:
+        if self.flights.in_flight(base):
+            return
+
+        def refresh():
+            try:
+                self.flights.do(base, self._fetch, base, fetch)
+            except Exception:
+                # Keep serving the stale table until it expires for good
+                pass
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _refresh_in_background_async(self, base: str, fetch) -> None:
+        if self.flights.in_flight(base):
+            return
+
+        async def refresh():
+            try:
+                await self.flights.do_async(base, self._fetch_async, base, fetch)
+            except Exception:
+                # Keep serving the stale table until it expires for good
+                pass
+
+        task = asyncio.ensure_future(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _cached(self, base: str):
+        cached = self.tables.get_with_age(base)
+        if cached is None:
+            return None, False
+        rates, age = cached
+        stale = age >= self.ttl_seconds
+        if stale:
+            self.stale_hits += 1
+        return rates, stale
+
+    def get_rates(self, base: str, fetch) -> dict:
+        """
+        Get the rate table for a base currency.
+
+        Args:
+            base (str): Base currency code.
+            fetch (callable): fetch(base) -> dict, loads the table from upstream.
+
+        Returns:
+            dict: Rates keyed by currency code.
+
+        Raises:
+            Exception: Whatever fetch raised, if no usable table is cached.
+        """
+        rates, stale = self._cached(base)
+        if rates is not None:
+            if stale:
+                self._refresh_in_background(base, fetch)
+            return rates
+        return self.flights.do(base, self._fetch, base, fetch)
+
+    async def get_rates_async(self, base: str, fetch) -> dict:
+        """
+        Asynchronous version of get_rates.
+
+        Args:
+            base (str): Base currency code.
+            fetch (callable): Coroutine function fetch(base) -> dict.
+
+        Returns:
+            dict: Rates keyed by currency code.
+        """
+        rates, stale = self._cached(base)
+        if rates is not None:
+            if stale:
+                self._refresh_in_background_async(base, fetch)
+            return rates
+        return await self.flights.do_async(base, self._fetch_async, base, fetch)
+
+    def cross_rate(self, from_currency: str, to_currency: str):
+        """
+        Derive a rate from a fresh cached table that contains both currencies.
+
+        Args:
+            from_currency (str): Source currency code.
+            to_currency (str): Target currency code.
+
+        Returns:
+            float or None: Rate from source to target, None if no table has both.
+        """
+        for _, rates, age in reversed(self.tables.items_with_age()):
+            if age >= self.ttl_seconds:
+                continue
+            from_rate = rates.get(from_currency)
+            to_rate = rates.get(to_currency)
+            if from_rate and to_rate is not None:
+                return float(f"{to_rate / from_rate:.6g}")
+        return None
+
+    def get_rate(self, from_currency: str, to_currency: str, fetch):
+        """
+        Get the rate between two currencies, fetching the source table only if
+        neither it nor a usable cross rate is cached.
+
+        Args:
+            from_currency (str): Source currency code.
+            to_currency (str): Target currency code.
+            fetch (callable): fetch(base) -> dict, loads a table from upstream.
+
+        Returns:
+            float or None: Conversion rate, None if to_currency is unknown.
+        """
+        if from_currency not in self.tables:
+            rate = self.cross_rate(from_currency, to_currency)
+            if rate is not None:
+                self.cross_rate_hits += 1
+                return rate
+        return self.get_rates(from_currency, fetch).get(to_currency)
+
+    async def get_rate_async(self, from_currency: str, to_currency: str, fetch):
+        """
+        Asynchronous version of get_rate.
+        """
+        if from_currency not in self.tables:
+            rate = self.cross_rate(from_currency, to_currency)
+            if rate is not None:
+                self.cross_rate_hits += 1
+                return rate
+        return (await self.get_rates_async(from_currency, fetch)).get(to_currency)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Table cache counters plus upstream fetches, stale and cross rate hits
+                and calls that shared an in-flight fetch.
+        """
+        stats = self.tables.stats()
+        stats.update({
+            "upstream_fetches": self.upstream_fetches,
+            "stale_hits": self.stale_hits,
+            "cross_rate_hits": self.cross_rate_hits,
+            "coalesced_fetches": self.flights.stats()["shared"],
+        })
+        return stats
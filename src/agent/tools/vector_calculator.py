@@ -0,0 +1,204 @@
+import numpy as np
+from .calculator import OPERAND, OPERATOR_1, OPERATOR_2
+
+# Distance from a half cent below which np.round and round() may disagree
+HALF_CENT_TOLERANCE = 1e-6
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Round to 2 decimals exactly like the built-in round().
+
+    np.round scales by 100 before rounding, which can tip values lying within
+    float error of a half cent the other way. Those few elements are rounded
+    with round() instead.
+
+    Args:
+        values (np.ndarray): Values to round.
+
+    Returns:
+        np.ndarray: Rounded values.
+    """
+    rounded = np.round(values, 2)
+    scaled = np.abs(values * 100)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < HALF_CENT_TOLERANCE
+    if near_half.any():
+        rounded = np.array(rounded, dtype=float)
+        indexes = np.flatnonzero(near_half)
+        rounded.flat[indexes] = [round(value, 2) for value in np.ravel(values)[indexes].tolist()]
+    return rounded
+
+# NumPy versions of calculator.OPERATIONS with the same rounding and division by zero results
+VECTOR_OPERATIONS = {
+    '+': lambda x, y: x + y,
+    '-': lambda x, y: x - y,
+    '*': lambda x, y: x * y,
+    '/': lambda x, y: np.where(y != 0, round_cents(x / y), np.inf),
+    '%': lambda x, y: round_cents((x / 100) * y),
+}
+
+class VectorResult:
+    """
+    Results of a vectorized calculation with per-element error masks.
+
+    values holds NaN wherever an error mask is set.
+    """
+
+    def __init__(self, values: np.ndarray, invalid_operand: np.ndarray, invalid_value: np.ndarray):
+        """
+        Args:
+            values (np.ndarray): Calculated values.
+            invalid_operand (np.ndarray): True where the operand is not one of + - * / %.
+            invalid_value (np.ndarray): True where an operator is missing or not a number.
+        """
+        self.values = values
+        self.invalid_operand = invalid_operand
+        self.invalid_value = invalid_value
+
+    @property
+    def errors(self) -> np.ndarray:
+        return self.invalid_operand | self.invalid_value
+
+    def to_list(self) -> list:
+        """
+        Get the values as Python floats, with None for elements that failed.
+        """
+        errors = self.errors
+        return [None if error else value for value, error in zip(self.values.tolist(), errors.tolist())]
+
+    def __len__(self) -> int:
+        return self.values.size
+
+def to_float_array(values) -> tuple:
+    """
+    Convert operator values to a float array, masking the ones that are not numbers.
+
+    Args:
+        values: Number, sequence or array of numbers or numeric strings.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Float array with NaN for invalid values, and the invalid mask.
+    """
+    try:
+        array = np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        # Only mixed input with non-numbers needs converting one by one
+        array = np.array([_to_float(value) for value in np.ravel(np.asarray(values, dtype=object))], dtype=float)
+        array = array.reshape(np.shape(values))
+    return array, np.isnan(array)
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def apply_operations(operands, operators_1, operators_2) -> VectorResult:
+    """
+    Apply operands element-wise to two operator arrays, broadcasting like NumPy.
+
+    Args:
+        operands: Operand symbol, or array of symbols.
+        operators_1: First operator values.
+        operators_2: Second operator values.
+
+    Returns:
+        VectorResult: Values and error masks with the broadcast shape.
+    """
+    x, invalid_x = to_float_array(operators_1)
+    y, invalid_y = to_float_array(operators_2)
+    return _apply(np.asarray(operands, dtype=str), x, y, invalid_x | invalid_y)
+
+def _apply(operands: np.ndarray, x: np.ndarray, y: np.ndarray, invalid_value: np.ndarray) -> VectorResult:
+    operands, x, y, invalid_value = np.broadcast_arrays(operands, x, y, invalid_value)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if operands.size and (operands == operands.flat[0]).all() and operands.flat[0] in VECTOR_OPERATIONS:
+            # One operand for every element, the common case for expression trees
+            values = np.asarray(VECTOR_OPERATIONS[operands.flat[0]](x, y), dtype=float)
+            invalid_operand = np.zeros(values.shape, dtype=bool)
+        else:
+            values = np.full(x.shape, np.nan)
+            known_operand = np.zeros(x.shape, dtype=bool)
+            keys, symbol_key = _operand_keys(operands)
+            for symbol, operation in VECTOR_OPERATIONS.items():
+                selected = keys == symbol_key(symbol)
+                if selected.any():
+                    values[selected] = operation(x[selected], y[selected])
+                    known_operand |= selected
+            invalid_operand = ~known_operand
+    values = np.where(invalid_operand | invalid_value, np.nan, values)
+    return VectorResult(values, invalid_operand, invalid_value.copy())
+
+def _operand_keys(operands: np.ndarray) -> tuple:
+    # Single character operands compare much faster as integer code points
+    if operands.dtype == np.dtype("<U1"):
+        return np.ascontiguousarray(operands).view(np.uint32), ord
+    return operands, str
+
+def calculate_arrays(operands, operators_1, operators_2) -> VectorResult:
+    """
+    Evaluate columns of operands and operators in one shot.
+
+    Args:
+        operands (array-like of str): Operand of each row, or one operand for all rows.
+        operators_1 (array-like): First operator of each row.
+        operators_2 (array-like): Second operator of each row.
+
+    Returns:
+        VectorResult: One value per row.
+    """
+    return apply_operations(operands, operators_1, operators_2)
+
+def calculate_rows(rows) -> VectorResult:
+    """
+    Evaluate many calculator argument dicts or (operand, operator_1, operator_2) triples.
+
+    Args:
+        rows (list[dict or tuple]): Rows in the calculator args format or as triples.
+
+    Returns:
+        VectorResult: One value per row, in order.
+    """
+    rows = list(rows)
+    try:
+        # One pass per column is much cheaper than building a tuple per row
+        operands = [row.get(OPERAND) for row in rows]
+        operators_1 = [row.get(OPERATOR_1) for row in rows]
+        operators_2 = [row.get(OPERATOR_2) for row in rows]
+    except AttributeError:
+        triples = [_row_triple(row) for row in rows]
+        operands, operators_1, operators_2 = [list(column) for column in zip(*triples)] if triples else ([], [], [])
+    return calculate_arrays(operands, operators_1, operators_2)
+
+def _row_triple(row) -> tuple:
+    if isinstance(row, dict):
+        return row.get(OPERAND), row.get(OPERATOR_1), row.get(OPERATOR_2)
+    if isinstance(row, (list, tuple)) and len(row) == 3:
+        return tuple(row)
+    return None, None, None
+
+def evaluate(expression) -> VectorResult:
+    """
+    Evaluate an expression tree whose leaves may be numbers or arrays.
+
+    A node is a dict in the calculator args format whose operators can be
+    nested nodes. Leaves broadcast against each other, so one tree can
+    price a whole array of rows, e.g.
+    {"operand": "+", "operator_1": {"operand": "%", "operator_1": 12.5, "operator_2": [100, 200]}, "operator_2": 10}.
+
+    Args:
+        expression (dict or number or array-like): Expression tree.
+
+    Returns:
+        VectorResult: Values and error masks; errors of a subtree propagate to its parents.
+    """
+    if not isinstance(expression, dict):
+        values, invalid_value = to_float_array(expression)
+        return VectorResult(values, np.zeros(values.shape, dtype=bool), invalid_value)
+
+    left = evaluate(expression.get(OPERATOR_1))
+    right = evaluate(expression.get(OPERATOR_2))
+    result = _apply(np.asarray(expression.get(OPERAND), dtype=str), left.values, right.values, left.invalid_value | right.invalid_value)
+    operand_errors = np.broadcast_arrays(result.invalid_operand, left.invalid_operand, right.invalid_operand)
+    result.invalid_operand = operand_errors[0] | operand_errors[1] | operand_errors[2]
+    result.values = np.where(result.errors, np.nan, result.values)
+    return result
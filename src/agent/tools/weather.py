@@ -1,7 +1,15 @@
 import requests
 import datetime
-import os
-from dotenv import load_dotenv
+import threading
+import asyncio
+from .. import config, tracing, transport
+from ..logger import get_logger
+from ..registry import lazy_import
+from .weather_cache import FINAL_AFTER_DAYS, WeatherHistoryCache, normalize_city
+
+http_client = lazy_import("..http_client", __package__)
+
+logger = get_logger(__name__)
 
 DATE = "date"
 MAX_TEMPERATURE_IN_CELCIOUS = "max_tempareture_in_celcious"
@@ -9,14 +17,134 @@ MIN_TEMPERATURE_IN_CELCIOUS = "min_tempareture_in_celcious"
 AVERAGE_TEMPERATURE_IN_CELCIOUS = "average_temperature_in_celcious"
 WEATHER_CONDITION = "weather_condition"
 
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv('WEATHER_API_KEY')
-if not API_KEY:
-    raise ValueError("WEATHER_API_KEY not found in environment variables")
+# Settings, read from the environment or .env on first use
+API_KEY_SETTING = "WEATHER_API_KEY"
+# Optional SQLite file that keeps fetched days across restarts
+WEATHER_CACHE_DATABASE_SETTING = "WEATHER_CACHE_DATABASE"
 
 BASE_URL = "http://api.weatherapi.com/v1"
 
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+
+def get_weather_cache() -> WeatherHistoryCache:
+    """
+    Get the weather history cache shared by every request, creating it on first use.
+
+    Returns:
+        WeatherHistoryCache: Cache with the SQLite tier enabled if WEATHER_CACHE_DATABASE is set.
+    """
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                _weather_cache = WeatherHistoryCache(database_path=config.get_setting(WEATHER_CACHE_DATABASE_SETTING))
+    return _weather_cache
+
+def __getattr__(name):
+    # Module level API_KEY and WEATHER_CACHE are resolved lazily
+    if name == "API_KEY":
+        return config.get_setting(API_KEY_SETTING)
+    if name == "WEATHER_CACHE":
+        return get_weather_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def parse_weather_args(args: dict) -> tuple[str, datetime.date, datetime.date]:
+    """
+    Extract and validate the weather request parameters.
+
+    Args:
+        args (dict): Dictionary containing city, from_date and to_date
+
+    Returns:
+        tuple[str, datetime.date, datetime.date]: City, start date and end date
+
+    Raises:
+        ValueError: If a parameter is missing or a date is not in ISO format
+    """
+    city = args.get('city')
+    from_date = args.get('from_date')
+    to_date = args.get('to_date')
+
+    # Validate required parameters
+    if not all([city, from_date, to_date]):
+        raise ValueError("Missing required parameters: city, from_date, or to_date")
+
+    # Convert dates to datetime objects
+    start = datetime.date.fromisoformat(from_date)
+    end = datetime.date.fromisoformat(to_date)
+    if start > end:
+        raise ValueError("from_date must not be after to_date")
+    return city, start, end
+
+def build_history_request(city: str, start: datetime.date, end: datetime.date) -> tuple[str, dict]:
+    """
+    Build the history.json URL and query parameters for a date range.
+
+    Args:
+        city (str): Name of the city
+        start (datetime.date): First date of the range
+        end (datetime.date): Last date of the range
+
+    Returns:
+        tuple[str, dict]: Request URL and query parameters
+    """
+    weatherHistoryUrl = f"{BASE_URL}/history.json"
+    params = {
+        "key": config.require_setting(API_KEY_SETTING),
+        "q": city,
+        "dt": start.isoformat(),
+        "end_dt": end.isoformat()
+    }
+    return weatherHistoryUrl, params
+
+def merge_weather_history(start: datetime.date, end: datetime.date, days: dict) -> list:
+    """
+    Order the cached and fetched days of a range by date.
+
+    Args:
+        start (datetime.date): First date of the range
+        end (datetime.date): Last date of the range
+        days (dict): Day summaries keyed by ISO date
+
+    Returns:
+        list: Weather data for each available day in the range
+    """
+    dates = (start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1))
+    return [days[date.isoformat()] for date in dates if date.isoformat() in days]
+
+def parse_weather_history(data: dict) -> list:
+    """
+    Convert a history.json response into the per-day weather summary.
+
+    Args:
+        data (dict): Decoded JSON response of the weather API
+
+    Returns:
+        list: Weather data for each day in the response
+
+    Raises:
+        ValueError: If the response has no forecast data
+    """
+    # Check if we have forecast data
+    if 'forecast' not in data:
+        logger.debug("weather_response_without_forecast", response=data)
+        raise ValueError("No forecast data in response")
+
+    # Collecting weather data for each day
+    forecast_days = data['forecast']['forecastday']
+    weatherHistory = []
+    for day in forecast_days:
+        day_info = {
+            DATE: day['date'],
+            MAX_TEMPERATURE_IN_CELCIOUS: day['day']['maxtemp_c'],
+            MIN_TEMPERATURE_IN_CELCIOUS: day['day']['mintemp_c'],
+            AVERAGE_TEMPERATURE_IN_CELCIOUS: day['day']['avgtemp_c'],
+            WEATHER_CONDITION: day['day']['condition']['text']
+        }
+        weatherHistory.append(day_info)
+    return weatherHistory
+
 def get_weather_details(args: dict) -> list:
     """
     Get weather data for a city between two dates.
@@ -30,53 +158,109 @@ def get_weather_details(args: dict) -> list:
     Returns:
         list: Weather data for each day in the date range
     """
-    # Extract parameters from args dictionary
-    city = args.get('city')
-    from_date = args.get('from_date')
-    to_date = args.get('to_date')
-    
     try:
-        # Validate required parameters
-        if not all([city, from_date, to_date]):
-            raise ValueError("Missing required parameters: city, from_date, or to_date")
-
-        # Convert dates to datetime objects
-        start = datetime.date.fromisoformat(from_date)
-        end = datetime.date.fromisoformat(to_date)
-
-        weatherHistoryUrl = f"{BASE_URL}/history.json"
-        params = {
-            "key": API_KEY,
-            "q": city,
-            "dt": start.isoformat(),
-            "end_dt": end.isoformat()
-        }
-        
-        response = requests.get(weatherHistoryUrl, params=params)
+        city, start, end = parse_weather_args(args)
+
+        # Past days never change, so only the uncached sub-ranges are requested
+        weather_cache = get_weather_cache()
+        days = weather_cache.get_days(city, start, end)
+        for gap_start, gap_end in weather_cache.missing_ranges(start, end, days):
+            weatherHistoryUrl, params = build_history_request(city, gap_start, gap_end)
+
+            weather_cache.record_upstream_request()
+            with tracing.span("http.weather", city=city):
+                response = transport.get(weatherHistoryUrl, params=params)
+            # Raise exception for bad status codes
+            response.raise_for_status()
+
+            fetched_days = parse_weather_history(response.json())
+            weather_cache.store_days(city, fetched_days, DATE)
+            days.update((day[DATE], day) for day in fetched_days)
+
+        return merge_weather_history(start, end, days)
+
+    except (ValueError) as e:
+        return f"Error from system: {str(e)}"
+    except requests.RequestException as e:
+        raise ConnectionError(f"Failed to fetch weather detail: {str(e)}")
+
+def prefetch_weather_details(requests_args: list) -> None:
+    """
+    Fetch the weather history for a batch of requests with as few requests as possible.
+
+    Overlapping or adjacent date ranges of the same city are merged and fetched
+    once; the individual requests are then served from the weather history cache.
+    Days too recent to be cached are left to the individual requests, since
+    prefetching them would only fetch them twice.
+    Invalid requests and failures are ignored; the request itself reports them.
+
+    Args:
+        requests_args (list[dict]): Arguments of each weather request
+    """
+    ranges_by_city = {}
+    for args in requests_args:
+        try:
+            city, start, end = parse_weather_args(args)
+        except (ValueError, TypeError):
+            continue
+        ranges_by_city.setdefault(normalize_city(city), (city, []))[1].append((start, end))
+
+    last_final_day = get_weather_cache().today() - datetime.timedelta(days=FINAL_AFTER_DAYS)
+    for city, ranges in ranges_by_city.values():
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        for start, end in merged:
+            end = min(end, last_final_day)
+            if start > end:
+                continue
+            try:
+                get_weather_details({'city': city, 'from_date': start.isoformat(), 'to_date': end.isoformat()})
+            except ConnectionError:
+                pass
+
+async def get_weather_details_async(args: dict) -> list:
+    """
+    Get weather data for a city between two dates without blocking the event loop.
+
+    Uses the shared pooled HTTP client and the weather history cache. Missing
+    sub-ranges are fetched concurrently.
+
+    Args:
+        args (dict): Same arguments as get_weather_details
+
+    Returns:
+        list: Weather data for each day in the date range
+    """
+    async def fetch_range(city, gap_start, gap_end):
+        weatherHistoryUrl, params = build_history_request(city, gap_start, gap_end)
+
+        weather_cache = get_weather_cache()
+        weather_cache.record_upstream_request()
+        with tracing.span("http.weather", city=city):
+            response = await transport.get_async(weatherHistoryUrl, params=params)
         # Raise exception for bad status codes
         response.raise_for_status()
 
-        data = response.json()
-        # Check if we have forecast data
-        if 'forecast' not in data:
-            print(f"Debug - Full response: {data}")
-            raise ValueError("No forecast data in response")
-
-        # Collecting weather data for each day
-        forecast_days = data['forecast']['forecastday']
-        weatherHistory = []
-        for day in forecast_days:
-            day_info = {
-                DATE: day['date'],
-                MAX_TEMPERATURE_IN_CELCIOUS: day['day']['maxtemp_c'],
-                MIN_TEMPERATURE_IN_CELCIOUS: day['day']['mintemp_c'],
-                AVERAGE_TEMPERATURE_IN_CELCIOUS: day['day']['avgtemp_c'],
-                WEATHER_CONDITION: day['day']['condition']['text']
-            }
-            weatherHistory.append(day_info)
-        return weatherHistory
+        fetched_days = parse_weather_history(response.json())
+        weather_cache.store_days(city, fetched_days, DATE)
+        return fetched_days
+
+    try:
+        city, start, end = parse_weather_args(args)
+
+        weather_cache = get_weather_cache()
+        days = weather_cache.get_days(city, start, end)
+        gaps = weather_cache.missing_ranges(start, end, days)
+        for fetched_days in await asyncio.gather(*[fetch_range(city, gap_start, gap_end) for gap_start, gap_end in gaps]):
+            days.update((day[DATE], day) for day in fetched_days)
+
+        return merge_weather_history(start, end, days)
 
     except (ValueError) as e:
         return f"Error from system: {str(e)}"
-    except requests.RequestException as e:
-        raise ConnectionError(f"Failed to fetch weather detail: {str(e)}")
\ No newline at end of file
+    except http_client.HTTPError as e:
+        raise ConnectionError(f"Failed to fetch weather detail: {str(e)}")
@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import datetime
+import threading
+from ..cache import TTLCache
+
+WEATHER_CACHE_MAX_DAYS = 100_000
+# Days at least this old are final and never change upstream
+FINAL_AFTER_DAYS = 2
+
+def normalize_city(city: str) -> str:
+    """
+    Normalize a city name for use in cache keys.
+
+    Args:
+        city (str): City name as given by the user or planner.
+
+    Returns:
+        str: Lowercase city name with collapsed whitespace.
+    """
+    return " ".join(str(city).split()).lower()
+
+def date_range(start: datetime.date, end: datetime.date) -> list:
+    """
+    Get every date from start to end, inclusive.
+    """
+    return [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+class WeatherHistoryCache:
+    """
+    Cache of daily weather summaries keyed by (normalized city, date).
+
+    Days are kept in an in-memory LRU and, when database_path is set, in a
+    SQLite file that survives restarts. Only final days (at least
+    FINAL_AFTER_DAYS old) are cached because recent days may still change.
+    """
+
+    def __init__(self, max_days: int = WEATHER_CACHE_MAX_DAYS, database_path: str = None, today=datetime.date.today):
+        """
+        Args:
+            max_days (int): Maximum number of days kept in memory.
+            database_path (str, optional): SQLite file for the on-disk tier.
+            today (callable): Returns the current date, replaceable in tests.
+        """
+        self.memory = TTLCache(max_days)
+        self.today = today
+        self.hits = 0
+        self.misses = 0
+        self.upstream_requests = 0
+        # Counters are updated from prefetch threads and async tasks at once
+        self._stats_lock = threading.Lock()
+        self._database = None
+        self._database_lock = threading.Lock()
+        if database_path:
+            self._database = sqlite3.connect(database_path, check_same_thread=False)
+            with self._database_lock, self._database:
+                self._database.execute(
+                    "CREATE TABLE IF NOT EXISTS weather_days ("
+                    "city TEXT NOT NULL, date TEXT NOT NULL, day TEXT NOT NULL, PRIMARY KEY (city, date))"
+                )
+
+    def is_final(self, day: datetime.date) -> bool:
+        """
+        Check whether a day is old enough to be cached.
+        """
+        return day <= self.today() - datetime.timedelta(days=FINAL_AFTER_DAYS)
+
+    def get_days(self, city: str, start: datetime.date, end: datetime.date) -> dict:
+        """
+        Get the cached days of a date range.
+
+        Args:
+            city (str): City name.
+            start (datetime.date): First date of the range.
+            end (datetime.date): Last date of the range.
+
+        Returns:
+            dict[str, dict]: Cached day summaries keyed by ISO date.
+        """
+        key_city = normalize_city(city)
+        dates = [day.isoformat() for day in date_range(start, end)]
+        found = {}
+        for date in dates:
+            day_info = self.memory.get((key_city, date))
+            if day_info is not None:
+                found[date] = day_info
+
+        if self._database is not None and len(found) < len(dates):
+            with self._database_lock:
+                rows = self._database.execute(
+                    "SELECT date, day FROM weather_days WHERE city = ? AND date BETWEEN ? AND ?",
+                    (key_city, dates[0], dates[-1]),
+                ).fetchall()
+            for date, day in rows:
+                if date not in found:
+                    found[date] = json.loads(day)
+                    self.memory.set((key_city, date), found[date])
+
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(dates) - len(found)
+        return {date: dict(day_info) for date, day_info in found.items()}
+
+    def store_days(self, city: str, days: list, date_key: str) -> None:
+        """
+        Cache the final days of an upstream response.
+
+        Args:
+            city (str): City name.
+            days (list[dict]): Day summaries as returned by the weather tool.
+            date_key (str): Key of the ISO date in each summary.
+        """
+        key_city = normalize_city(city)
+        final_days = [day for day in days if self.is_final(datetime.date.fromisoformat(day[date_key]))]
+        for day in final_days:
+            self.memory.set((key_city, day[date_key]), dict(day))
+
+        if self._database is not None and final_days:
+            with self._database_lock, self._database:
+                self._database.executemany(
+                    "INSERT OR REPLACE INTO weather_days (city, date, day) VALUES (?, ?, ?)",
+                    [(key_city, day[date_key], json.dumps(day)) for day in final_days],
+                )
+
+    def missing_ranges(self, start: datetime.date, end: datetime.date, cached: dict) -> list:
+        """
+        Split a date range into the contiguous sub-ranges that are not cached.
+
+        Args:
+            start (datetime.date): First date of the range.
+            end (datetime.date): Last date of the range.
+            cached (dict): Cached days keyed by ISO date, as returned by get_days.
+
+        Returns:
+            list[tuple[datetime.date, datetime.date]]: Inclusive (start, end) pairs to fetch.
+        """
+        ranges = []
+        gap_start = None
+        previous = None
+        for day in date_range(start, end):
+            if day.isoformat() in cached:
+                if gap_start is not None:
+                    ranges.append((gap_start, previous))
+                    gap_start = None
+            elif gap_start is None:
+                gap_start = day
+            previous = day
+        if gap_start is not None:
+            ranges.append((gap_start, previous))
+        return ranges
+
+    def clear(self) -> None:
+        """
+        Drop every cached day from memory and disk.
+        """
+        self.memory.clear()
+        if self._database is not None:
+            with self._database_lock, self._database:
+                self._database.execute("DELETE FROM weather_days")
+
+    def close(self) -> None:
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def record_upstream_request(self) -> None:
+        """
+        Count a request sent upstream for days missing from the cache.
+        """
+        with self._stats_lock:
+            self.upstream_requests += 1
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Cached days served (hits), days fetched (misses) and upstream requests.
+        """
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "upstream_requests": self.upstream_requests}
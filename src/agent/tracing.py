@@ -0,0 +1,337 @@
+"""
+Lightweight tracing of the agent pipeline.
+
+Code wraps a stage in `with tracing.span("planner"):`. While tracing is
+disabled span() returns a shared no-op object, so an instrumented call costs
+one function call and a flag check. When enabled, every finished span is
+added to an in-process latency histogram of its stage and passed to the
+configured exporters (JSON lines, OpenTelemetry).
+
+Spans started inside another span on the same thread or asyncio task become
+its children.
+
+Settings: TRACE_ENABLED=1 keeps histograms only, TRACE_FILE=<path> also writes
+JSON lines, TRACE_OTEL=1 also exports to OpenTelemetry.
+"""
+import math
+import collections
+import time
+import random
+import threading
+import contextvars
+from . import config
+from .logger import get_logger
+
+TRACE_ENABLED_SETTING = "TRACE_ENABLED"
+TRACE_FILE_SETTING = "TRACE_FILE"
+TRACE_OTEL_SETTING = "TRACE_OTEL"
+
+# Exported spans whose OpenTelemetry context is kept for children that finish after them
+OTEL_CONTEXT_CACHE_SIZE = 10000
+
+# Histogram buckets grow by 2% from 1 microsecond, so percentiles are within 2%
+HISTOGRAM_MIN_MS = 0.001
+HISTOGRAM_GROWTH = 1.02
+PERCENTILES = {"p50_ms": 0.50, "p95_ms": 0.95, "p99_ms": 0.99}
+
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+
+logger = get_logger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded memory.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        bucket = math.ceil(math.log(duration_ms / HISTOGRAM_MIN_MS) / _LOG_GROWTH) if duration_ms > HISTOGRAM_MIN_MS else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Get the nearest-rank percentile, as the upper bound of its bucket.
+
+        Args:
+            fraction (float): Percentile as a fraction, e.g. 0.99.
+
+        Returns:
+            float: Latency in milliseconds, 0.0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(HISTOGRAM_MIN_MS * HISTOGRAM_GROWTH ** bucket, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict:
+        """
+        Get the count, mean, p50/p95/p99 and maximum in milliseconds.
+        """
+        summary = {"count": self.count, "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0}
+        summary.update((name, round(self.percentile(fraction), 3)) for name, fraction in PERCENTILES.items())
+        summary["max_ms"] = round(self.max_ms, 3)
+        return summary
+
+class Span:
+    """
+    Timed stage of a request. Use it as a context manager through span().
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_time", "duration_ms", "error", "_started", "_token")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+        self.duration_ms = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time()
+        self._token = _current_span.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _tracer.finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class _NoopSpan:
+    # Returned by span() while tracing is disabled
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class JSONLinesExporter:
+    """
+    Append every finished span to a file as one JSON object per line.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        import json
+
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+class OpenTelemetryExporter:
+    """
+    Re-create finished spans with the OpenTelemetry API.
+
+    The opentelemetry-api package and an SDK configured by the application
+    are required. Spans keep their timing, attributes and parent; the agent's
+    trace and parent ids are attached as attributes.
+
+    Children finish before their parent, so a span is held back until its
+    parent has been re-created and is then started in the parent's context.
+    """
+
+    def __init__(self, tracer_name: str = "agent"):
+        """
+        Raises:
+            ImportError: If opentelemetry is not installed.
+        """
+        from opentelemetry import trace
+
+        self.trace = trace
+        self.tracer = trace.get_tracer(tracer_name)
+        self.status = trace.Status
+        self.error_status = trace.StatusCode.ERROR
+        # OTel context of recently exported spans by agent span id, for children finishing later
+        self.contexts = collections.OrderedDict()
+        # Finished spans waiting for their parent, by parent span id
+        self.waiting = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            if span.parent_id is not None and span.parent_id not in self.contexts:
+                self.waiting.setdefault(span.parent_id, []).append(span)
+                return
+            ready = [span]
+            while ready:
+                finished = ready.pop()
+                self._export(finished)
+                ready.extend(self.waiting.pop(finished.span_id, ()))
+
+    def _export(self, span: Span) -> None:
+        attributes = {key: value if isinstance(value, (str, bool, int, float)) else str(value) for key, value in span.attributes.items()}
+        attributes.update({"agent.trace_id": span.trace_id, "agent.span_id": span.span_id, "agent.parent_id": span.parent_id or ""})
+        start_ns = int(span.start_time * 1e9)
+        parent = self.contexts.get(span.parent_id) if span.parent_id is not None else None
+        otel_span = self.tracer.start_span(span.name, context=parent, start_time=start_ns, attributes=attributes)
+        if span.error:
+            otel_span.set_status(self.status(self.error_status, span.error))
+        otel_span.end(end_time=start_ns + int(span.duration_ms * 1e6))
+        self.contexts[span.span_id] = self.trace.set_span_in_context(otel_span)
+        if len(self.contexts) > OTEL_CONTEXT_CACHE_SIZE:
+            self.contexts.popitem(last=False)
+
+    def close(self) -> None:
+        pass
+
+class Tracer:
+    """
+    Collects finished spans into per-stage histograms and hands them to exporters.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.exporters = []
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span) -> None:
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = LatencyHistogram()
+            histogram.record(span.duration_ms)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.error("span_export_failed", span=span.name, error=str(e))
+
+_tracer = Tracer()
+
+def span(name: str, **attributes):
+    """
+    Time a stage of the pipeline.
+
+    Args:
+        name (str): Stage name, e.g. "planner" or "http.weather".
+        **attributes: Details recorded with the span.
+
+    Returns:
+        Span or a no-op span: Context manager; set_attribute adds details while it runs.
+    """
+    if not _tracer.enabled:
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+def is_enabled() -> bool:
+    return _tracer.enabled
+
+def enable(exporters: list = ()) -> None:
+    """
+    Start recording spans.
+
+    Args:
+        exporters (list): Objects with export(span) and close() receiving every finished span.
+    """
+    with _tracer._lock:
+        _tracer.exporters = list(exporters)
+        _tracer.enabled = True
+
+def disable() -> None:
+    """
+    Stop recording spans and close the exporters. Histograms are kept.
+    """
+    with _tracer._lock:
+        exporters = _tracer.exporters
+        _tracer.exporters = []
+        _tracer.enabled = False
+    for exporter in exporters:
+        exporter.close()
+
+def configure_from_settings() -> bool:
+    """
+    Enable tracing as configured by TRACE_ENABLED, TRACE_FILE and TRACE_OTEL.
+
+    Returns:
+        bool: Whether tracing is enabled.
+    """
+    exporters = []
+    trace_file = config.get_setting(TRACE_FILE_SETTING)
+    if trace_file:
+        exporters.append(JSONLinesExporter(trace_file))
+    if config.get_setting(TRACE_OTEL_SETTING) == "1":
+        try:
+            exporters.append(OpenTelemetryExporter())
+        except ImportError as e:
+            logger.warning("opentelemetry_export_disabled", error=str(e))
+    if exporters or config.get_setting(TRACE_ENABLED_SETTING) == "1":
+        enable(exporters)
+    return _tracer.enabled
+
+def stage_stats() -> dict:
+    """
+    Get the latency summary of every traced stage.
+
+    Returns:
+        dict[str, dict]: count, mean_ms, p50_ms, p95_ms, p99_ms and max_ms keyed by stage name.
+    """
+    with _tracer._lock:
+        return {name: histogram.summary() for name, histogram in sorted(_tracer.histograms.items())}
+
+def format_stage_stats() -> str:
+    """
+    Format the stage latencies as a table for the CLI.
+    """
+    stats = stage_stats()
+    width = max([len("stage")] + [len(name) for name in stats])
+    lines = [f"{'stage':<{width}} {'count':>7} {'p50_ms':>10} {'p95_ms':>10} {'p99_ms':>10} {'max_ms':>10}"]
+    for name, summary in stats.items():
+        lines.append(f"{name:<{width}} {summary['count']:>7} {summary['p50_ms']:>10.3f} {summary['p95_ms']:>10.3f} {summary['p99_ms']:>10.3f} {summary['max_ms']:>10.3f}")
+    return "\n".join(lines)
+
+def reset_stats() -> None:
+    """
+    Forget the recorded latencies.
+    """
+    with _tracer._lock:
+        _tracer.histograms = {}
@@ -0,0 +1,399 @@
+"""
+HTTP transport under the weather and currency tools.
+
+The tools send their GET requests through get() and get_async() instead of
+calling requests or the pooled http_client directly, so the upstream can be
+swapped without touching them:
+
+    live    requests for sync calls, the pooled http_client for async calls (default)
+    record  live requests, with every response appended to a cassette file
+    replay  responses served from a cassette, with injected latency and errors
+
+A cassette is a JSON Lines file with one interaction per line:
+
+    {"method": "GET", "url": "...", "params": {"q": "Paris"}, "status": 200,
+     "headers": {"content-type": "application/json"}, "body": "...", "elapsed_ms": 182.4}
+
+Query parameters in REDACTED_PARAMS (API keys) are not written to cassettes
+and are ignored when matching, so a cassette can be shared and replayed with
+any key. Replay serves the recorded responses of a request in order and
+starts over when they run out. Requests the cassette does not know fail like
+an unreachable upstream, so the tools handle them as they handle outages.
+Async replays wait for one of http_client.MAX_CONNECTIONS_PER_HOST slots per
+host, like requests through the pooled client.
+
+Requests go through the resilience policy of agent.resilience (timeouts,
+retries, circuit breaker, hedging) before reaching the transport. Replays
+honour the read timeout: a replayed delay longer than it fails as a timeout.
+
+Settings: HTTP_TRANSPORT (live, record or replay), HTTP_CASSETTE (cassette
+file), HTTP_REPLAY_LATENCY_MS (milliseconds added to every replayed
+response, or "recorded" for the latency measured while recording),
+HTTP_REPLAY_ERROR_RATE (fraction of replayed requests that fail),
+HTTP_REPLAY_ERROR_STATUS (status of the failed requests, 0 for a dropped
+connection) and HTTP_REPLAY_SEED (seed of the error injection).
+"""
+import json
+import time
+import random
+import threading
+import asyncio
+from urllib.parse import urlsplit
+import requests
+from . import config, resilience
+from .registry import lazy_import
+
+http_client = lazy_import(".http_client", __package__)
+
+HTTP_TRANSPORT_SETTING = "HTTP_TRANSPORT"
+HTTP_CASSETTE_SETTING = "HTTP_CASSETTE"
+HTTP_REPLAY_LATENCY_SETTING = "HTTP_REPLAY_LATENCY_MS"
+HTTP_REPLAY_ERROR_RATE_SETTING = "HTTP_REPLAY_ERROR_RATE"
+HTTP_REPLAY_ERROR_STATUS_SETTING = "HTTP_REPLAY_ERROR_STATUS"
+HTTP_REPLAY_SEED_SETTING = "HTTP_REPLAY_SEED"
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+# HTTP_REPLAY_LATENCY_MS value that replays the latency measured while recording
+RECORDED_LATENCY = "recorded"
+
+DEFAULT_ERROR_STATUS = 503
+# Status of injected failures that drop the connection instead of answering
+CONNECTION_ERROR_STATUS = 0
+METHOD = "GET"
+REDACTED_PARAMS = frozenset({"key", "api_key", "apikey", "access_key"})
+# Response headers kept in cassettes
+RECORDED_HEADERS = ("content-type",)
+
+def interaction_key(method: str, url: str, params: dict = None) -> str:
+    """
+    Get the identity of a request for matching it against a cassette.
+
+    Args:
+        method (str): HTTP method.
+        url (str): URL without the query string.
+        params (dict, optional): Query string parameters.
+
+    Returns:
+        str: Method, URL and the sorted parameters outside REDACTED_PARAMS.
+    """
+    return json.dumps([method, url, recorded_params(params)], sort_keys=True)
+
+def recorded_params(params: dict = None) -> dict:
+    return {str(name): str(value) for name, value in (params or {}).items() if name not in REDACTED_PARAMS}
+
+def read_timeout_seconds(timeout):
+    # requests accepts one timeout for both phases or a (connect, read) tuple
+    return timeout[1] if isinstance(timeout, tuple) else timeout
+
+def build_response(interaction: dict):
+    """
+    Turn a cassette interaction into the response requests.get would return.
+    """
+    response = requests.Response()
+    response.status_code = interaction["status"]
+    response.headers.update(interaction.get("headers", {}))
+    response._content = interaction["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = interaction["url"]
+    return response
+
+def build_async_response(interaction: dict):
+    """
+    Turn a cassette interaction into the response http_client.get would return.
+    """
+    import httpx
+
+    request = httpx.Request(interaction["method"], interaction["url"], params=interaction.get("params"))
+    return httpx.Response(interaction["status"], headers=interaction.get("headers", {}), content=interaction["body"].encode("utf-8"), request=request)
+
+class LiveTransport:
+    """
+    Sends requests to the real upstream services.
+    """
+
+    def get(self, url: str, **kwargs):
+        return requests.get(url, **kwargs)
+
+    async def get_async(self, url: str, params: dict = None, timeout: tuple = None):
+        return await http_client.get(url, params=params, timeout=timeout)
+
+    def close(self) -> None:
+        pass
+
+class RecordingTransport(LiveTransport):
+    """
+    Sends requests to the real upstream services and appends every response to a cassette.
+    """
+
+    def __init__(self, cassette_path: str):
+        """
+        Args:
+            cassette_path (str): JSON Lines file to append to; created if missing.
+        """
+        self.cassette_path = cassette_path
+        self._lock = threading.Lock()
+        self._file = open(cassette_path, "a", encoding="utf-8")
+
+    def record(self, url: str, params: dict, status: int, headers, body: str, elapsed_ms: float) -> None:
+        interaction = {
+            "method": METHOD,
+            "url": url,
+            "params": recorded_params(params),
+            "status": status,
+            "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            "body": body,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+        line = json.dumps(interaction) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def get(self, url: str, **kwargs):
+        started = time.perf_counter()
+        response = super().get(url, **kwargs)
+        self.record(url, kwargs.get("params"), response.status_code, response.headers, response.text, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def get_async(self, url: str, params: dict = None, timeout: tuple = None):
+        started = time.perf_counter()
+        response = await super().get_async(url, params, timeout)
+        self.record(url, params, response.status_code, response.headers, response.text, (time.perf_counter() - started) * 1000)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+class ReplayTransport:
+    """
+    Serves recorded responses from a cassette without network access.
+
+    Attributes:
+        request_count (int): Requests received.
+        injected_errors (int): Requests failed by error injection.
+        misses (int): Requests with no recorded interaction.
+        max_in_flight (int): Most requests served at the same time.
+    """
+
+    def __init__(self, cassette_path: str, latency_ms=0.0, error_rate: float = 0.0,
+                 error_status: int = DEFAULT_ERROR_STATUS, seed: int = None):
+        """
+        Args:
+            cassette_path (str): JSON Lines file written by RecordingTransport.
+            latency_ms (float or str): Delay before every response, or RECORDED_LATENCY
+                to wait as long as the recorded request took.
+            error_rate (float): Fraction of requests that fail.
+            error_status (int): Status of the failed requests, CONNECTION_ERROR_STATUS
+                to drop the connection instead.
+            seed (int, optional): Seed of the error injection, for reproducible runs.
+
+        Raises:
+            FileNotFoundError: If the cassette file is not found
+            json.JSONDecodeError: If a line of the cassette is not valid JSON
+        """
+        self.cassette_path = cassette_path
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._interactions = {}
+        self._positions = {}
+        self.request_count = 0
+        self.injected_errors = 0
+        self.misses = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._host_limits = {}
+        self._host_limits_loop = None
+        with open(cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction_key(interaction["method"], interaction["url"], interaction.get("params")), []).append(interaction)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "injected_errors": self.injected_errors,
+                "misses": self.misses,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def _begin(self, url: str, params: dict) -> tuple:
+        # Pick the response of this request (None for a miss) and its delay in seconds
+        key = interaction_key(METHOD, url, params)
+        with self._lock:
+            self.request_count += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            recorded = self._interactions.get(key)
+            if not recorded:
+                self.misses += 1
+                return None, 0.0
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            interaction = recorded[position % len(recorded)]
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.injected_errors += 1
+                interaction = dict(interaction, status=self.error_status, body=json.dumps({"error": "Injected failure"}))
+        latency_ms = interaction.get("elapsed_ms", 0.0) if self.latency_ms == RECORDED_LATENCY else self.latency_ms
+        return interaction, latency_ms / 1000
+
+    def _end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _host_limit(self, url: str):
+        # Semaphores belong to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        if loop is not self._host_limits_loop:
+            self._host_limits = {}
+            self._host_limits_loop = loop
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(http_client.MAX_CONNECTIONS_PER_HOST)
+        return limit
+
+    def get(self, url: str, **kwargs):
+        params = kwargs.get("params")
+        read_timeout = read_timeout_seconds(kwargs.get("timeout"))
+        interaction, delay = self._begin(url, params)
+        try:
+            if read_timeout is not None and delay > read_timeout:
+                time.sleep(read_timeout)
+                raise requests.ReadTimeout(f"Read timed out after {read_timeout}s for {METHOD} {url}")
+            if delay:
+                time.sleep(delay)
+            if interaction is None:
+                raise requests.ConnectionError(f"No recorded response for {METHOD} {url} in {self.cassette_path}")
+            if interaction["status"] == CONNECTION_ERROR_STATUS:
+                raise requests.ConnectionError(f"Injected connection failure for {METHOD} {url}")
+            return build_response(interaction)
+        finally:
+            self._end()
+
+    async def get_async(self, url: str, params: dict = None, timeout: tuple = None):
+        import httpx
+
+        read_timeout = read_timeout_seconds(timeout)
+        async with self._host_limit(url):
+            interaction, delay = self._begin(url, params)
+            try:
+                if read_timeout is not None and delay > read_timeout:
+                    await asyncio.sleep(read_timeout)
+                    raise httpx.ReadTimeout(f"Read timed out after {read_timeout}s for {METHOD} {url}")
+                if delay:
+                    await asyncio.sleep(delay)
+                if interaction is None:
+                    raise httpx.ConnectError(f"No recorded response for {METHOD} {url} in {self.cassette_path}")
+                if interaction["status"] == CONNECTION_ERROR_STATUS:
+                    raise httpx.ConnectError(f"Injected connection failure for {METHOD} {url}")
+                return build_async_response(interaction)
+            finally:
+                self._end()
+
+    def close(self) -> None:
+        pass
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def create_transport():
+    """
+    Create the transport selected by HTTP_TRANSPORT: "live" (default), "record" or "replay".
+
+    Returns:
+        LiveTransport, RecordingTransport or ReplayTransport: New transport.
+
+    Raises:
+        ValueError: If HTTP_TRANSPORT names an unknown transport, or HTTP_CASSETTE is
+            missing for record and replay.
+    """
+    name = config.get_setting(HTTP_TRANSPORT_SETTING, LIVE)
+    if name == LIVE:
+        return LiveTransport()
+    if name == RECORD:
+        return RecordingTransport(config.require_setting(HTTP_CASSETTE_SETTING))
+    if name == REPLAY:
+        latency = config.get_setting(HTTP_REPLAY_LATENCY_SETTING, "0")
+        seed = config.get_setting(HTTP_REPLAY_SEED_SETTING)
+        return ReplayTransport(
+            config.require_setting(HTTP_CASSETTE_SETTING),
+            latency_ms=latency if latency == RECORDED_LATENCY else float(latency),
+            error_rate=float(config.get_setting(HTTP_REPLAY_ERROR_RATE_SETTING, "0")),
+            error_status=int(config.get_setting(HTTP_REPLAY_ERROR_STATUS_SETTING, DEFAULT_ERROR_STATUS)),
+            seed=int(seed) if seed else None,
+        )
+    raise ValueError(f"Unknown HTTP transport: {name}")
+
+def get_transport():
+    """
+    Get the transport shared by every tool, creating it on first use.
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = create_transport()
+    return _transport
+
+def set_transport(transport) -> None:
+    """
+    Replace the shared transport. The previous one is not closed.
+
+    Args:
+        transport: Object with get(url, **kwargs) and get_async(url, params, timeout) methods, or None
+            to create the configured transport again on next use.
+    """
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+def close_transport() -> None:
+    """
+    Close the shared transport, flushing a cassette being recorded.
+    """
+    global _transport
+    with _transport_lock:
+        transport, _transport = _transport, None
+    if transport is not None:
+        transport.close()
+
+def get(url: str, **kwargs):
+    """
+    Send a GET request through the shared transport under the shared resilience policy.
+
+    Args:
+        url (str): URL without the query string.
+        **kwargs: Arguments of requests.get, e.g. params.
+
+    Returns:
+        requests.Response: Response of the upstream service or the cassette.
+
+    Raises:
+        requests.RequestException: If the request fails.
+    """
+    return resilience.get_policy().get(get_transport().get, url, **kwargs)
+
+async def get_async(url: str, params: dict = None):
+    """
+    Send a GET request through the shared transport under the shared resilience policy,
+    without blocking the event loop.
+
+    Args:
+        url (str): URL without the query string.
+        params (dict, optional): Query string parameters.
+
+    Returns:
+        httpx.Response: Response of the upstream service or the cassette.
+
+    Raises:
+        httpx.HTTPError: If the request fails.
+    """
+    return await resilience.get_policy().get_async(get_transport().get_async, url, params)
@@ -1,20 +1,131 @@
 import sys
-from agent.agent import process_user_query
+import json
+import contextlib
+from collections import deque
+from agent import process_pool, tracing
+from agent.agent import stream_user_query, process_user_queries, BATCH_CONCURRENCY
+
+BATCH_FLAG = "--batch"
+SERVE_FLAG = "--serve"
+TRACE_STATS_FLAG = "--trace-stats"
+QUERY_KEY = "query"
+RESULT_KEY = "result"
+ERROR_KEY = "error"
 
 def print_correct_usage() -> None:
-    user_instructions = "Usage: python main.py <your question here>"
+    user_instructions = "Usage: python main.py [--trace-stats] <your question here>\n       python main.py [--trace-stats] --batch [file] [--concurrency N] [--group-tool-calls]\n       python main.py [--trace-stats] --serve [--host HOST] [--port PORT] [--workers N] [--queue-limit N]"
     print(user_instructions)
     sys.exit(1)
 
 def generate_result() -> None:
     user_query = " ".join(sys.argv[1:])
-    generated_result = process_user_query(user_query)
-    print(generated_result)
+    # Print the answer as it is generated instead of waiting for all of it
+    for chunk in stream_user_query(user_query):
+        sys.stdout.write(str(chunk))
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+
+def parse_batch_line(line: str) -> dict:
+    """
+    Parse one line of batch input.
+
+    A line is either a JSON object with a "query" key (other keys are echoed
+    back in the output), a JSON string, or plain query text.
+
+    Args:
+        line (str): Input line without the trailing newline.
+
+    Returns:
+        dict: Record with at least the "query" key.
+    """
+    if line.startswith("{") or line.startswith('"'):
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            return {QUERY_KEY: line}
+        if isinstance(value, dict) and isinstance(value.get(QUERY_KEY), str):
+            return value
+        if isinstance(value, str):
+            return {QUERY_KEY: value}
+    return {QUERY_KEY: line}
+
+def read_batch_records(lines):
+    """
+    Lazily turn input lines into batch records, skipping blank lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield parse_batch_line(line)
+
+def run_batch(arguments: list) -> None:
+    """
+    Answer newline-delimited queries or JSONL records and stream JSONL results to stdout.
+
+    Args:
+        arguments (list[str]): Command line arguments after --batch.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=f"main.py {BATCH_FLAG}")
+    parser.add_argument("file", nargs="?", default="-", help="input file, '-' for stdin")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--group-tool-calls", action="store_true", help="share upstream requests between queries")
+    options = parser.parse_args(arguments)
+
+    output = sys.stdout
+    source = sys.stdin if options.file == "-" else open(options.file, "r")
+    records = deque()
+
+    def queries():
+        for record in read_batch_records(source):
+            records.append(record)
+            yield record[QUERY_KEY]
+
+    try:
+        # Diagnostics printed while answering must not end up in the JSONL output
+        with contextlib.redirect_stdout(sys.stderr):
+            results = process_user_queries(queries(), options.concurrency, options.group_tool_calls, return_exceptions=True)
+            for result in results:
+                record = records.popleft()
+                if isinstance(result, Exception):
+                    record[ERROR_KEY] = str(result)
+                else:
+                    record[RESULT_KEY] = result
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+def print_trace_stats() -> None:
+    """
+    Print the p50/p95/p99 latency of every traced stage to stderr.
+    """
+    sys.stderr.write(tracing.format_stage_stats() + "\n")
 
 def main() -> None:
+    trace_stats = TRACE_STATS_FLAG in sys.argv[1:2]
+    if trace_stats:
+        del sys.argv[1]
     if len(sys.argv) < 2:
         print_correct_usage()
-    generate_result()
+    if not tracing.configure_from_settings() and trace_stats:
+        tracing.enable()
+    try:
+        process_pool.configure_from_settings()
+        if sys.argv[1] == BATCH_FLAG:
+            run_batch(sys.argv[2:])
+        elif sys.argv[1] == SERVE_FLAG:
+            from agent import server
+            server.run(sys.argv[2:])
+        else:
+            generate_result()
+    finally:
+        if trace_stats:
+            print_trace_stats()
+        process_pool.disable()
+        tracing.disable()
     
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import unittest
+from unittest.mock import patch
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.llm import backend, planner
+from agent.stubs.llm_server import LLMStubServer
+
+class TestResponseHelpers(unittest.TestCase):
+    def test_build_messages_appends_knowledge_base(self):
+        messages = backend.build_messages("system", "query", ["Ada Lovelace"])
+        self.assertEqual(messages[0], {"role": "system", "content": "system"})
+        self.assertEqual(messages[1]["content"], 'query\n\nKnowledge base:\n["Ada Lovelace"]')
+
+    def test_parse_llm_response_decodes_json_objects_only(self):
+        self.assertEqual(backend.parse_llm_response(' {"tool": "calculator"} '), {"tool": "calculator"})
+        self.assertEqual(backend.parse_llm_response("It is sunny"), "It is sunny")
+        self.assertEqual(backend.parse_llm_response("{not json"), "{not json")
+
+    def test_backoff_delay_is_jittered_and_capped(self):
+        for attempt in range(10):
+            delay = backend.backoff_delay(attempt, base_seconds=0.1, max_seconds=1.0)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(1.0, 0.1 * 2 ** attempt))
+
+    def test_stub_backend_is_the_default(self):
+        with patch.dict(os.environ, {backend.LLM_BACKEND_SETTING: "stub"}):
+            self.assertIsInstance(backend.create_backend(), backend.StubBackend)
+
+    def test_unknown_backend_raises(self):
+        with patch.dict(os.environ, {backend.LLM_BACKEND_SETTING: "unknown"}):
+            with self.assertRaises(ValueError):
+                backend.create_backend()
+
+class TestMalformedResponses(unittest.TestCase):
+    HTML = "<html><body>502 Bad Gateway</body></html>"
+
+    def backend_answering(self, content_type, body):
+        import httpx
+
+        llm = backend.OpenAICompatibleBackend("http://gateway.test/v1", max_retries=0)
+        llm.client.close()
+        llm.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, headers={"content-type": content_type}, text=body)))
+        self.addCleanup(llm.close)
+        return llm
+
+    def test_non_json_body_raises_llm_error(self):
+        llm = self.backend_answering("text/html", self.HTML)
+        with self.assertRaisesRegex(backend.LLMError, "Malformed LLM response"):
+            llm.complete(backend.build_messages("Answer", "query"))
+
+    def test_stream_without_events_raises_llm_error(self):
+        llm = self.backend_answering("text/html", self.HTML)
+        with self.assertRaisesRegex(backend.LLMError, "Malformed LLM stream"):
+            list(llm.stream(backend.build_messages("Answer", "query")))
+
+    def test_stream_with_invalid_event_raises_llm_error(self):
+        llm = self.backend_answering("text/event-stream", "data: <html>\n\n")
+        with self.assertRaisesRegex(backend.LLMError, "Malformed LLM stream event"):
+            list(llm.stream(backend.build_messages("Answer", "query")))
+
+    def test_stream_retried_after_a_comment_line_keeps_parsing_state(self):
+        import httpx
+
+        class FailingStream(httpx.SyncByteStream):
+            def __iter__(self):
+                yield b": connected\n\n"
+                raise httpx.ReadError("connection reset")
+
+        responses = iter([
+            httpx.Response(200, stream=FailingStream()),
+            httpx.Response(200, text=': connected\n\ndata: {"choices": [{"delta": {"content": "Hi"}}]}\n\n: closing\n\n'),
+        ])
+        llm = backend.OpenAICompatibleBackend("http://gateway.test/v1", max_retries=1, sleep=lambda seconds: None)
+        llm.client.close()
+        llm.client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+        self.addCleanup(llm.close)
+
+        self.assertEqual(list(llm.stream(backend.build_messages("Answer", "query"))), ["Hi"])
+        self.assertEqual(llm.retries, 1)
+
+class TestOpenAICompatibleBackend(unittest.TestCase):
+    def setUp(self):
+        self.server = LLMStubServer().start()
+        self.delays = []
+        self.backend = backend.OpenAICompatibleBackend(self.server.base_url, api_key="test", max_retries=2, sleep=self.delays.append)
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.stop()
+
+    def test_complete_returns_message_content(self):
+        # Act
+        content = self.backend.complete(backend.build_messages("You are a tool planner", "Tell me about Ada"))
+
+        # Assert
+        self.assertEqual(json.loads(content), {"tool": "knowledge_base", "args": {"query": "Tell me about Ada"}})
+
+    def test_stream_yields_tokens_in_order(self):
+        # Act
+        chunks = list(self.backend.stream(backend.build_messages("Answer", "query")))
+
+        # Assert
+        self.assertEqual(len(chunks), 40)
+        self.assertEqual("".join(chunks).split(), [f"token{index}" for index in range(40)])
+
+    def test_connections_are_kept_alive(self):
+        # Act
+        for _ in range(5):
+            self.backend.complete(backend.build_messages("Answer", "query"))
+
+        # Assert
+        self.assertEqual(self.server.request_count, 5)
+        self.assertEqual(self.server.connection_count, 1)
+
+    def test_retryable_errors_are_retried_with_backoff(self):
+        # Arrange
+        self.server.fail_next(503, 429)
+
+        # Act
+        content = self.backend.complete(backend.build_messages("Answer", "query"))
+
+        # Assert
+        self.assertTrue(content.startswith("token0"))
+        self.assertEqual(self.backend.retries, 2)
+        self.assertEqual(len(self.delays), 2)
+
+    def test_stream_is_retried_before_first_token(self):
+        # Arrange
+        self.server.fail_next(502)
+
+        # Act
+        chunks = list(self.backend.stream(backend.build_messages("Answer", "query")))
+
+        # Assert
+        self.assertEqual(len(chunks), 40)
+        self.assertEqual(self.backend.retries, 1)
+
+    def test_gives_up_after_max_retries(self):
+        # Arrange
+        self.server.fail_next(500, 500, 500)
+
+        # Act / Assert
+        with self.assertRaises(backend.LLMError):
+            self.backend.complete(backend.build_messages("Answer", "query"))
+        self.assertEqual(self.server.request_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        # Arrange
+        self.server.fail_next(400)
+
+        # Act / Assert
+        with self.assertRaises(backend.LLMError):
+            self.backend.complete(backend.build_messages("Answer", "query"))
+        self.assertEqual(self.backend.retries, 0)
+
+    def test_timeouts_are_retried(self):
+        # Arrange
+        slow_server = LLMStubServer(latency_ms=300).start()
+        slow_backend = backend.OpenAICompatibleBackend(slow_server.base_url, timeout_seconds=0.05, max_retries=1, sleep=self.delays.append)
+
+        # Act / Assert
+        try:
+            with self.assertRaises(backend.LLMError):
+                slow_backend.complete(backend.build_messages("Answer", "query"))
+            self.assertEqual(slow_backend.retries, 1)
+        finally:
+            slow_backend.close()
+            slow_server.stop()
+
+    def test_ask_to_llm_uses_configured_backend(self):
+        # Arrange
+        backend.set_backend(self.backend)
+
+        # Act
+        try:
+            titles = planner.find_top_matched_titles("computing pioneers", ["Ada Lovelace", "Alan Turing"])
+        finally:
+            backend.set_backend(None)
+
+        # Assert
+        self.assertEqual(titles, {"top_matched_titles": ["Ada Lovelace", "Alan Turing"]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import random
+from unittest.mock import patch
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent import logger
+from agent.llm import planner
+from agent.llm.context_packer import estimate_tokens, context_tokens, chunk_text, score_chunks, pack_context
+
+TURING = "Alan Turing was a mathematician. He broke the Enigma cipher at Bletchley Park. " * 40
+LOVELACE = "Ada Lovelace wrote the first program for the Analytical Engine. " * 40
+KNOWLEDGE_BASE = [{"title": "Alan Turing", "detail": TURING}, {"title": "Ada Lovelace", "detail": LOVELACE}]
+WEATHER_DAYS = [{"date": f"2025-08-{day:02d}", "average_temperature_in_celcious": 25.3, "weather_condition": "Sunny"} for day in range(1, 32)]
+
+def test_estimate_tokens_counts_words_digits_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello, world!") == 4
+    assert estimate_tokens("2025-08-17") == 6
+    assert estimate_tokens("internationalization") == 4
+
+def test_chunk_text_keeps_sentences_within_the_limit():
+    chunks = chunk_text(TURING, max_tokens=30)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks).split() == TURING.split()
+
+def test_chunk_text_splits_long_sentences_between_words():
+    sentence = " ".join(["word"] * 100)
+    chunks = chunk_text(sentence, max_tokens=10)
+    assert [len(chunk.split()) for chunk in chunks] == [10] * 10
+
+def test_score_chunks_prefers_chunks_with_rare_query_words():
+    scores = score_chunks("Who broke Enigma?", ["Turing broke Enigma.", "Lovelace wrote a program.", "Turing was a mathematician."])
+    assert scores[0] > scores[2] >= scores[1] == 0
+
+def test_context_within_budget_is_unchanged():
+    packed = pack_context("Who broke Enigma?", KNOWLEDGE_BASE, 100_000)
+    assert packed.context is KNOWLEDGE_BASE
+    assert packed.saved_tokens == 0
+
+def test_knowledge_base_is_packed_with_relevant_chunks():
+    packed = pack_context("Who broke Enigma?", KNOWLEDGE_BASE, 300)
+    assert packed.packed_tokens <= 300
+    assert packed.saved_tokens == packed.original_tokens - packed.packed_tokens > 0
+    assert [entry["title"] for entry in packed.context] == ["Alan Turing"]
+    assert "Enigma" in packed.context[0]["detail"]
+
+def test_packed_chunks_keep_their_order():
+    knowledge_base = [
+        {"title": "Alan Turing", "detail": " ".join(f"Fact {index} about Turing and Enigma." for index in range(60))},
+        {"title": "Ada Lovelace", "detail": " ".join(f"Fact {index} about the Analytical Engine." for index in range(60))},
+    ]
+    packed = pack_context("Analytical Engine Enigma", knowledge_base, context_tokens(knowledge_base) * 3 // 4)
+    assert [entry["title"] for entry in packed.context] == ["Alan Turing", "Ada Lovelace"]
+    for entry in packed.context:
+        facts = [int(word) for word in entry["detail"].split() if word.isdigit()]
+        assert facts == sorted(facts)
+
+def test_weather_days_are_packed_as_whole_items():
+    packed = pack_context("Weather on 2025-08-17", WEATHER_DAYS, 150)
+    assert packed.packed_tokens <= 150
+    assert 0 < len(packed.context) < len(WEATHER_DAYS)
+    assert all(day in WEATHER_DAYS for day in packed.context)
+    assert WEATHER_DAYS[16] in packed.context
+
+def test_text_context_is_packed_by_sentence():
+    packed = pack_context("Enigma", TURING, 50)
+    assert isinstance(packed.context, str)
+    assert packed.packed_tokens <= 50
+    assert "Enigma" in packed.context
+
+def test_multi_step_results_are_packed_across_steps():
+    results = {"paris": WEATHER_DAYS, "kb": KNOWLEDGE_BASE, "note": TURING, "sum": 42.5}
+    packed = pack_context("Who broke Enigma?", results, 300)
+    assert context_tokens(results) > 3000
+    assert packed.packed_tokens <= 300
+    assert set(packed.context) <= set(results)
+    assert "Enigma" in json.dumps(packed.context)
+    assert all(day in WEATHER_DAYS for day in packed.context.get("paris", []))
+    assert all(entry["title"] in ("Alan Turing", "Ada Lovelace") for entry in packed.context.get("kb", []))
+
+def test_item_larger_than_the_budget_is_truncated_instead_of_dropped():
+    huge = [{"log": TURING}]
+    packed = pack_context("Enigma", huge, 40)
+    assert packed.packed_tokens <= 40
+    assert packed.context and packed.context[0].startswith('{"log": "Alan Turing')
+
+    packed = pack_context("Enigma", {"step": {"log": TURING}}, 40)
+    assert packed.packed_tokens <= 40
+    assert "Alan Turing" in packed.context["step"]
+
+def test_packed_context_never_exceeds_budget():
+    generator = random.Random(3)
+    words = ["Enigma", "café", "\"quoted\"", "x_y", "✓", "internationalization", "42.5", "(a)", "the"]
+    for _ in range(300):
+        context = [{"title": generator.choice(words), "detail": " ".join(generator.choices(words, k=generator.randint(0, 300)))}
+                   for _ in range(generator.randint(1, 5))]
+        budget = generator.randint(20, 800)
+        packed = pack_context(generator.choice(words), context, budget)
+        assert packed.packed_tokens <= budget or packed.context is context
+        assert packed.packed_tokens == context_tokens(packed.context)
+
+def test_llm_receives_packed_context(capsys):
+    logger.configure(level="INFO")
+    try:
+        with patch.dict(os.environ, {planner.CONTEXT_TOKEN_BUDGET_SETTING: "300"}), patch.object(planner, "ask_to_llm", return_value="answer") as ask_to_llm:
+            assert planner.call_llm_with_knowledge_base("Who broke Enigma?", KNOWLEDGE_BASE) == "answer"
+    finally:
+        logger.reset()
+
+    sent = ask_to_llm.call_args.args[2]
+    assert context_tokens(sent) <= 300
+    assert f"context_packed sent_tokens={context_tokens(sent)}" in capsys.readouterr().err
+
+def test_llm_receives_packed_multi_step_results():
+    results = {"kb": KNOWLEDGE_BASE * 20, "paris": WEATHER_DAYS}
+    with patch.dict(os.environ, {planner.CONTEXT_TOKEN_BUDGET_SETTING: "100"}), patch.object(planner, "ask_to_llm", return_value="answer") as ask_to_llm:
+        planner.call_llm_with_knowledge_base("Who broke Enigma?", results)
+    assert context_tokens(results) > 9000
+    assert context_tokens(ask_to_llm.call_args.args[2]) <= 100
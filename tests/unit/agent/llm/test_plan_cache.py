@@ -0,0 +1,110 @@
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.llm import planner
+from agent.llm.plan_cache import PlanCache, SQLitePlanStore, normalize_query, shingle_key, canonical_number
+
+CALCULATOR_PLAN = {"tool": "calculator", "args": {"operand": "%", "operator_1": 12.5, "operator_2": 243}}
+WEATHER_PLAN = {"tool": "weather", "args": {"city": "dhaka", "from_date": "2025-08-17", "to_date": "2025-08-23"}}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.mark.parametrize("token, expected", [("12.50", "12.5"), ("1,000", "1000"), (".5", "0.5"), ("007", "7"), ("10.0", "10"), ("0", "0")])
+def test_canonical_number(token, expected):
+    assert canonical_number(token) == expected
+
+def test_normalize_query_ignores_case_spacing_punctuation_and_number_format():
+    assert normalize_query("What is 12.5% of 243?") == "what is 12.5 % of 243"
+    assert normalize_query("  what is 12.50 %   of 243") == "what is 12.5 % of 243"
+    assert normalize_query("Convert 1,000 USD to EUR.") == normalize_query("convert 1000 usd to eur")
+
+def test_normalize_query_keeps_numbers_and_operators_apart():
+    assert normalize_query("what is 12.5% of 243") != normalize_query("what is 12.5% of 244")
+    assert normalize_query("2 + 3") != normalize_query("2 * 3")
+
+def test_thousands_separators_are_kept_where_they_may_separate_operands():
+    assert normalize_query("add 100,200,300") != normalize_query("add 100200300")
+    assert shingle_key("add 100,200,300") != shingle_key("add 100200300")
+    assert normalize_query("sum of 1,500.25 and 2") == normalize_query("sum of 1500.25 and 2")
+
+def test_shingle_key_ignores_filler_words_but_not_word_order():
+    assert shingle_key("Please tell me the weather in Paris") == shingle_key("weather in paris?")
+    assert shingle_key("weather in paris") != shingle_key("weather in london")
+    assert shingle_key("convert 100 usd to eur") != shingle_key("convert 100 eur to usd")
+
+def test_repeated_query_is_a_hit(clock):
+    cache = PlanCache(clock=clock)
+    assert cache.get("What is 12.5% of 243?") is None
+    assert cache.set("What is 12.5% of 243?", CALCULATOR_PLAN)
+    assert cache.get("what is 12.5 % of 243") == CALCULATOR_PLAN
+    assert cache.stats() == {"hits": 1, "misses": 1, "store_hits": 0, "evictions": 0, "size": 1}
+
+def test_hits_return_independent_copies(clock):
+    cache = PlanCache(clock=clock)
+    cache.set("query", CALCULATOR_PLAN)
+    cache.get("query")["args"]["operator_1"] = 0
+    assert cache.get("query") == CALCULATOR_PLAN
+
+def test_responses_that_are_not_plans_are_not_cached(clock):
+    cache = PlanCache(clock=clock)
+    assert not cache.set("hello", "Hi there")
+    assert not cache.set("hello", {"answer": "Hi there"})
+    assert cache.get("hello") is None
+
+def test_plans_expire_after_ttl(clock):
+    cache = PlanCache(ttl_seconds=60, clock=clock)
+    cache.set("query", CALCULATOR_PLAN)
+    clock.now += 60
+    assert cache.get("query") is None
+
+def test_least_recently_used_plan_is_evicted(clock):
+    cache = PlanCache(max_size=1, clock=clock)
+    cache.set("first", CALCULATOR_PLAN)
+    cache.set("second", CALCULATOR_PLAN)
+    assert cache.get("first") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_sqlite_store_survives_restart(tmp_path, clock):
+    database_path = str(tmp_path / "plans.sqlite3")
+    cache = PlanCache(store=SQLitePlanStore(database_path), clock=clock)
+    cache.set("What is 12.5% of 243?", CALCULATOR_PLAN)
+    cache.close()
+
+    restarted = PlanCache(store=SQLitePlanStore(database_path), clock=clock)
+    assert restarted.get("what is 12.5 % of 243") == CALCULATOR_PLAN
+    assert restarted.get("what is 12.5 % of 243") == CALCULATOR_PLAN
+    assert restarted.stats()["store_hits"] == 1
+    restarted.close()
+
+def test_sqlite_store_honours_ttl_from_first_plan(tmp_path, clock):
+    database_path = str(tmp_path / "plans.sqlite3")
+    cache = PlanCache(ttl_seconds=60, store=SQLitePlanStore(database_path), clock=clock)
+    cache.set("query", CALCULATOR_PLAN)
+    cache.close()
+
+    clock.now += 60
+    restarted = PlanCache(ttl_seconds=60, store=SQLitePlanStore(database_path), clock=clock)
+    assert restarted.get("query") is None
+    restarted.close()
+
+def test_initiate_planner_skips_llm_for_repeated_queries():
+    with patch.object(planner, "_plan_cache", PlanCache()), \
+            patch.object(planner, "ask_to_llm", return_value=WEATHER_PLAN) as mock_ask_to_llm:
+        assert planner.initiate_planner("Weather in Dhaka from 2025-08-17 to 2025-08-23?") == WEATHER_PLAN
+        assert planner.initiate_planner("weather in dhaka from 2025-08-17 to 2025-08-23") == WEATHER_PLAN
+
+    mock_ask_to_llm.assert_called_once()
@@ -1,12 +1,27 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import os
+import random
 import sys
+import time
+import asyncio
+import threading
 
 # Add src/ to sys.path so imports work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
 
-from agent.agent import process_user_query
+from agent import agent as agent_module
+from agent.agent import process_user_query, process_user_query_async, process_user_queries, prefetch_tool_calls, plan_tool_calls, match_knowledge_titles, stream_user_query, tool_call_key, coalescing_stats
+from agent.llm import backend
+from agent.llm import planner as llm_planner
+
+MULTI_STEP_PLAN = {"steps": [
+    {"id": "paris", "tool": "weather", "args": {"city": "paris", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+    {"id": "london", "tool": "weather", "args": {"city": "london", "from_date": "2025-08-17", "to_date": "2025-08-17"}},
+    {"id": "sum", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "paris/0/average_temperature_in_celcious"}, "operator_2": {"$ref": "london/0/average_temperature_in_celcious"}}},
+    {"id": "average", "tool": "calculator", "args": {"operand": "/", "operator_1": {"$ref": "sum"}, "operator_2": 2}},
+    {"id": "answer", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "average"}, "operator_2": 10}}
+], "answer": "answer"}
 
 class TestProcessUserQuery(unittest.TestCase):
 
@@ -70,7 +85,7 @@ class TestProcessUserQuery(unittest.TestCase):
             "tool": "knowledge_base",
             "args": {"query": "Python decorators"}
         }
-        mock_knowledge.get_all_titles.return_value = ["Python Basics", "Python Decorators"]
+        mock_knowledge.shortlist_titles.return_value = [("Python Decorators", 0.4), ("Python Basics", 0.2)]
         mock_planner.find_top_matched_titles.return_value = ["Python Decorators"]
         mock_knowledge.search_titles_and_details.return_value = [{"title": "Python Decorators", "details": "Example details"}]
         mock_planner.call_llm_with_knowledge_base.return_value = "Decorators allow wrapping functions"
@@ -79,8 +94,8 @@ class TestProcessUserQuery(unittest.TestCase):
         result = process_user_query("Tell me about Python decorators")
 
         # Arrange
-        mock_knowledge.get_all_titles.assert_called_once()
-        mock_planner.find_top_matched_titles.assert_called_once_with("Python decorators", ["Python Basics", "Python Decorators"])
+        mock_knowledge.shortlist_titles.assert_called_once_with("Python decorators", 50)
+        mock_planner.find_top_matched_titles.assert_called_once_with("Python decorators", ["Python Decorators", "Python Basics"])
         mock_knowledge.search_titles_and_details.assert_called_once_with(["Python Decorators"])
 
         # Assert
@@ -107,6 +122,76 @@ class TestProcessUserQuery(unittest.TestCase):
         # Assert
         self.assertEqual(result, "Converted amount: 92 EUR")
 
+    @patch("agent.agent.knowledge_loader")
+    @patch("agent.agent.planner")
+    def test_match_knowledge_titles_skips_llm_when_confident(self, mock_planner, mock_knowledge):
+        # Arrange
+        mock_knowledge.shortlist_titles.return_value = [("Ada Lovelace", 0.9), ("Alan Turing", 0.1)]
+
+        # Act
+        result = match_knowledge_titles("Ada Lovelace", confidence_threshold=0.8)
+
+        # Assert
+        self.assertEqual(result, ["Ada Lovelace"])
+        mock_planner.find_top_matched_titles.assert_not_called()
+
+    @patch("agent.agent.knowledge_loader")
+    @patch("agent.agent.planner")
+    def test_match_knowledge_titles_reads_threshold_from_settings(self, mock_planner, mock_knowledge):
+        # Arrange
+        mock_knowledge.shortlist_titles.return_value = [("Ada Lovelace", 0.9), ("Alan Turing", 0.1)]
+
+        # Act
+        with patch.dict(os.environ, {agent_module.TITLE_CONFIDENCE_THRESHOLD_SETTING: "0.8"}):
+            result = match_knowledge_titles("Ada Lovelace")
+
+        # Assert
+        self.assertEqual(result, ["Ada Lovelace"])
+        mock_planner.find_top_matched_titles.assert_not_called()
+
+    @patch("agent.agent.knowledge_loader")
+    @patch("agent.agent.planner")
+    def test_match_knowledge_titles_asks_llm_below_threshold(self, mock_planner, mock_knowledge):
+        # Arrange
+        mock_knowledge.shortlist_titles.return_value = [("Ada Lovelace", 0.5), ("Alan Turing", 0.4)]
+        mock_planner.find_top_matched_titles.return_value = {"top_matched_titles": ["Alan Turing"]}
+
+        # Act
+        result = match_knowledge_titles("computing pioneers", shortlist_size=2, confidence_threshold=0.8)
+
+        # Assert
+        mock_knowledge.shortlist_titles.assert_called_once_with("computing pioneers", 2)
+        mock_planner.find_top_matched_titles.assert_called_once_with("computing pioneers", ["Ada Lovelace", "Alan Turing"])
+        self.assertEqual(result, ["Alan Turing"])
+
+    @patch("agent.agent.knowledge_loader")
+    @patch("agent.agent.planner")
+    def test_match_knowledge_titles_without_candidates(self, mock_planner, mock_knowledge):
+        # Arrange
+        mock_knowledge.shortlist_titles.return_value = []
+
+        # Act
+        result = match_knowledge_titles("nothing relevant")
+
+        # Assert
+        self.assertEqual(result, [])
+        mock_planner.find_top_matched_titles.assert_not_called()
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.planner")
+    def test_multi_step_plan(self, mock_planner, mock_weather):
+        # Arrange
+        mock_planner.initiate_planner.return_value = MULTI_STEP_PLAN
+        mock_weather.get_weather_details.side_effect = lambda args: [{"average_temperature_in_celcious": {"paris": 21.0, "london": 17.0}[args["city"]]}]
+
+        # Act
+        result = process_user_query("Add 10 to the average temperature in Paris and London right now.")
+
+        # Assert
+        self.assertEqual(mock_weather.get_weather_details.call_count, 2)
+        mock_planner.call_llm_with_knowledge_base.assert_not_called()
+        self.assertEqual(result, "The result of the calculation is: 29.0")
+
     @patch("agent.agent.planner")
     def test_unknown_tool(self, mock_planner):
         # Planner returns something unexpected
@@ -117,4 +202,376 @@ class TestProcessUserQuery(unittest.TestCase):
         result = process_user_query("Do something weird")
 
         # Assert
-        self.assertEqual(result, "Sorry, I couldn't understand your request.")
\ No newline at end of file
+        self.assertEqual(result, "Sorry, I couldn't understand your request.")
+
+
+MALFORMED_PLANS = {
+    "no steps": {"steps": []},
+    "unknown tool": {"steps": [{"id": "a", "tool": "nope", "args": {}}]},
+    "unknown step reference": {"steps": [{"id": "a", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "b"}, "operator_2": 1}}]},
+    "non-string reference": {"steps": [{"id": "a", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": 1}, "operator_2": 1}}]},
+    "cycle": {"steps": [
+        {"id": "a", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "b"}, "operator_2": 1}},
+        {"id": "b", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "a"}, "operator_2": 1}},
+    ]},
+    "invalid step": {"steps": [{"id": "a"}]},
+    "unknown answer step": {"steps": [{"id": "a", "tool": "calculator", "args": {"operand": "+", "operator_1": 1, "operator_2": 1}}], "answer": "b"},
+}
+
+class TestMalformedPlans(unittest.TestCase):
+
+    @patch("agent.agent.planner")
+    def test_malformed_plans_get_the_fallback_answer(self, mock_planner):
+        for name, plan in MALFORMED_PLANS.items():
+            with self.subTest(name):
+                mock_planner.initiate_planner.return_value = plan
+                self.assertEqual(process_user_query("Do something weird"), agent_module.FALLBACK_ANSWER)
+                self.assertEqual("".join(stream_user_query("Do something weird")), agent_module.FALLBACK_ANSWER)
+                self.assertEqual(asyncio.run(process_user_query_async("Do something weird")), agent_module.FALLBACK_ANSWER)
+        mock_planner.call_llm_with_knowledge_base.assert_not_called()
+
+    @patch("agent.agent.planner")
+    def test_errors_while_running_a_valid_plan_are_not_swallowed(self, mock_planner):
+        mock_planner.initiate_planner.return_value = {"steps": [
+            {"id": "a", "tool": "calculator", "args": {"operand": "+", "operator_1": 1, "operator_2": 1}},
+            {"id": "b", "tool": "calculator", "args": {"operand": "+", "operator_1": {"$ref": "a/missing"}, "operator_2": 1}},
+        ]}
+        with self.assertRaisesRegex(ValueError, "has no value"):
+            process_user_query("Add one twice")
+
+class TestProcessUserQueries(unittest.TestCase):
+
+    @patch("agent.agent.calculator")
+    @patch("agent.agent.planner")
+    def test_results_keep_input_order(self, mock_planner, mock_calculator):
+        # Arrange
+        def plan(user_query):
+            time.sleep(random.random() / 100)
+            return {"tool": "calculator", "args": {"operator_1": int(user_query)}}
+        mock_planner.initiate_planner.side_effect = plan
+        mock_calculator.use_calculator_tool.side_effect = lambda args: args["operator_1"] * 2
+
+        # Act
+        results = list(process_user_queries((str(number) for number in range(50)), concurrency=8, window_size=5))
+
+        # Assert
+        self.assertEqual(results, [number * 2 for number in range(50)])
+
+    @patch("agent.agent.currency_converter")
+    @patch("agent.agent.planner")
+    def test_return_exceptions(self, mock_planner, mock_currency):
+        # Arrange
+        mock_planner.initiate_planner.return_value = {"tool": "currency_converter", "args": {}}
+        mock_currency.convert_currency.side_effect = [ConnectionError("down"), "Converted"]
+
+        # Act
+        results = list(process_user_queries(["a", "b"], concurrency=1, return_exceptions=True))
+
+        # Assert
+        self.assertIsInstance(results[0], ConnectionError)
+        self.assertEqual(results[1], "Converted")
+
+    @patch("agent.agent.currency_converter")
+    @patch("agent.agent.planner")
+    def test_exceptions_are_raised_by_default(self, mock_planner, mock_currency):
+        mock_planner.initiate_planner.return_value = {"tool": "currency_converter", "args": {}}
+        mock_currency.convert_currency.side_effect = ConnectionError("down")
+
+        with self.assertRaises(ConnectionError):
+            list(process_user_queries(["a"]))
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.currency_converter")
+    @patch("agent.agent.planner")
+    def test_group_tool_calls_prefetches_before_dispatch(self, mock_planner, mock_currency, mock_weather):
+        # Arrange
+        calls = []
+        plans = {
+            "usd-eur": {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 1}},
+            "usd-jpy": {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "JPY", "amount": 1}},
+        }
+        mock_planner.initiate_planner.side_effect = lambda user_query: plans[user_query]
+        mock_currency.prefetch_rates.side_effect = lambda conversions: calls.append(("prefetch", sorted(conversions)))
+        mock_currency.convert_currency.side_effect = lambda args: calls.append(("convert", args["to_currency"])) or args["to_currency"]
+
+        # Act
+        results = list(process_user_queries(["usd-eur", "usd-jpy"], group_tool_calls=True))
+
+        # Assert
+        self.assertEqual(results, ["EUR", "JPY"])
+        self.assertEqual(calls[0], ("prefetch", [("USD", "EUR"), ("USD", "JPY")]))
+        mock_weather.prefetch_weather_details.assert_not_called()
+
+    def test_plan_tool_calls_skips_dependent_steps(self):
+        self.assertEqual(plan_tool_calls(MULTI_STEP_PLAN), [
+            ("weather", MULTI_STEP_PLAN["steps"][0]["args"]),
+            ("weather", MULTI_STEP_PLAN["steps"][1]["args"]),
+        ])
+        self.assertEqual(plan_tool_calls({"tool": "calculator", "args": {}}), [("calculator", {})])
+        self.assertEqual(plan_tool_calls("not a plan"), [])
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.currency_converter")
+    def test_prefetch_tool_calls_groups_weather_requests(self, mock_currency, mock_weather):
+        prefetch_tool_calls([MULTI_STEP_PLAN, {"tool": "calculator", "args": {}}])
+
+        mock_weather.prefetch_weather_details.assert_called_once_with([
+            MULTI_STEP_PLAN["steps"][0]["args"], MULTI_STEP_PLAN["steps"][1]["args"]
+        ])
+        mock_currency.prefetch_rates.assert_not_called()
+
+
+class FakeStreamingBackend:
+    """
+    LLM backend that yields fixed tokens with a delay before each one.
+    """
+
+    def __init__(self, tokens, token_delay_seconds=0.0):
+        self.tokens = tokens
+        self.token_delay_seconds = token_delay_seconds
+        self.messages = []
+
+    def complete(self, messages):
+        return "".join(self.stream(messages))
+
+    def stream(self, messages):
+        self.messages.append(messages)
+        for token in self.tokens:
+            time.sleep(self.token_delay_seconds)
+            yield token
+
+
+class TestStreamUserQuery(unittest.TestCase):
+
+    def tearDown(self):
+        backend.set_backend(None)
+
+    @patch("agent.agent.weather")
+    def test_weather_answer_is_streamed_in_order(self, mock_weather):
+        # Arrange
+        tokens = ["The ", "weather ", "is ", "sunny."]
+        fake_backend = FakeStreamingBackend(tokens)
+        backend.set_backend(fake_backend)
+        mock_weather.get_weather_details.return_value = [{"date": "2024-01-01"}]
+        plan = {"tool": "weather", "args": {"city": "Dhaka"}}
+
+        # Act
+        with patch.object(llm_planner, "initiate_planner", return_value=plan):
+            chunks = list(stream_user_query("Tell me the weather in Dhaka"))
+
+        # Assert
+        self.assertEqual(chunks, tokens)
+        self.assertIn('[{"date": "2024-01-01"}]', fake_backend.messages[0][-1]["content"])
+
+    @patch("agent.agent.weather")
+    def test_json_answers_are_streamed_as_text(self, mock_weather):
+        backend.set_backend(FakeStreamingBackend(['{"summary": ', '"sunny"}']))
+        mock_weather.get_weather_details.return_value = [{"date": "2024-01-01"}]
+        plan = {"tool": "weather", "args": {"city": "Dhaka"}}
+
+        with patch.object(llm_planner, "initiate_planner", return_value=plan):
+            streamed = "".join(stream_user_query("Summarize the weather in Dhaka"))
+            answered = process_user_query("Summarize the weather in Dhaka")
+
+        self.assertEqual(streamed, '{"summary": "sunny"}')
+        self.assertEqual(answered, {"summary": "sunny"})
+
+    @patch("agent.agent.knowledge_loader")
+    @patch("agent.agent.match_knowledge_titles")
+    def test_knowledge_base_answer_is_streamed(self, mock_match_titles, mock_knowledge):
+        # Arrange
+        backend.set_backend(FakeStreamingBackend(["Decorators ", "wrap ", "functions."]))
+        mock_match_titles.return_value = ["Python Decorators"]
+        mock_knowledge.search_titles_and_details.return_value = [{"title": "Python Decorators", "detail": "..."}]
+        plan = {"tool": "knowledge_base", "args": {"query": "Python decorators"}}
+
+        # Act
+        with patch.object(llm_planner, "initiate_planner", return_value=plan):
+            answer = "".join(stream_user_query("Tell me about Python decorators"))
+
+        # Assert
+        self.assertEqual(answer, "Decorators wrap functions.")
+
+    @patch("agent.agent.weather")
+    def test_time_to_first_token_does_not_wait_for_full_answer(self, mock_weather):
+        # Arrange
+        token_delay_seconds = 0.05
+        backend.set_backend(FakeStreamingBackend([f"token{index} " for index in range(6)], token_delay_seconds))
+        mock_weather.get_weather_details.return_value = []
+        plan = {"tool": "weather", "args": {"city": "Dhaka"}}
+
+        # Act
+        with patch.object(llm_planner, "initiate_planner", return_value=plan):
+            started = time.perf_counter()
+            chunks = stream_user_query("Tell me the weather in Dhaka")
+            next(chunks)
+            time_to_first_token = time.perf_counter() - started
+            remaining = list(chunks)
+            total = time.perf_counter() - started
+
+        # Assert
+        self.assertEqual(len(remaining), 5)
+        self.assertLess(time_to_first_token, 3 * token_delay_seconds)
+        self.assertGreaterEqual(total, 6 * token_delay_seconds)
+
+    @patch("agent.agent.calculator")
+    def test_tool_answers_are_yielded_whole(self, mock_calculator):
+        # Arrange
+        mock_calculator.use_calculator_tool.return_value = "The result of the calculation is: 3.0"
+        plan = {"tool": "calculator", "args": {"operand": "+", "operator_1": 1, "operator_2": 2}}
+
+        # Act
+        with patch.object(llm_planner, "initiate_planner", return_value=plan):
+            chunks = list(stream_user_query("1 + 2"))
+
+        # Assert
+        self.assertEqual(chunks, ["The result of the calculation is: 3.0"])
+
+    @patch("agent.agent.weather")
+    def test_multi_step_plan_ending_in_calculation(self, mock_weather):
+        # Arrange
+        mock_weather.get_weather_details.side_effect = lambda args: [{"average_temperature_in_celcious": {"paris": 21.0, "london": 17.0}[args["city"]]}]
+
+        # Act
+        with patch.object(llm_planner, "initiate_planner", return_value=MULTI_STEP_PLAN):
+            chunks = list(stream_user_query("Add 10 to the average temperature in Paris and London right now."))
+
+        # Assert
+        self.assertEqual(chunks, ["The result of the calculation is: 29.0"])
+
+
+class TestProcessUserQueryAsync(unittest.IsolatedAsyncioTestCase):
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.planner")
+    async def test_weather_tool(self, mock_planner, mock_weather):
+        # Arrange
+        args = {"city": "Dhaka", "from_date": "2024-01-01", "to_date": "2024-01-02"}
+        mock_planner.initiate_planner.return_value = {"tool": "weather", "args": args}
+        mock_weather.get_weather_details_async = AsyncMock(return_value=[{"date": "2024-01-01"}])
+        mock_planner.call_llm_with_knowledge_base.return_value = "Weather is sunny with 25°C"
+
+        # Act
+        result = await process_user_query_async("Tell me the weather in Dhaka")
+
+        # Assert
+        mock_weather.get_weather_details_async.assert_awaited_once_with(args)
+        mock_weather.get_weather_details.assert_not_called()
+        mock_planner.call_llm_with_knowledge_base.assert_called_once_with("Tell me the weather in Dhaka", [{"date": "2024-01-01"}])
+        self.assertEqual(result, "Weather is sunny with 25°C")
+
+    @patch("agent.agent.currency_converter")
+    @patch("agent.agent.planner")
+    async def test_currency_converter_tool(self, mock_planner, mock_currency):
+        # Arrange
+        args = {"amount": 100, "from_currency": "USD", "to_currency": "EUR"}
+        mock_planner.initiate_planner.return_value = {"tool": "currency_converter", "args": args}
+        mock_currency.convert_currency_async = AsyncMock(return_value="Converted amount: 92 EUR")
+
+        # Act
+        result = await process_user_query_async("Convert 100 USD to EUR")
+
+        # Assert
+        mock_currency.convert_currency_async.assert_awaited_once_with(args)
+        self.assertEqual(result, "Converted amount: 92 EUR")
+
+    @patch("agent.agent.calculator")
+    @patch("agent.agent.planner")
+    async def test_calculator_tool(self, mock_planner, mock_calculator):
+        # Arrange
+        mock_planner.initiate_planner.return_value = {"tool": "calculator", "args": {"operand": "+", "operator_1": 1, "operator_2": 2}}
+        mock_calculator.use_calculator_tool.return_value = "The result of the calculation is: 3.0"
+
+        # Act
+        result = await process_user_query_async("1 + 2")
+
+        # Assert
+        self.assertEqual(result, "The result of the calculation is: 3.0")
+
+    @patch("agent.agent.calculator")
+    @patch("agent.agent.planner")
+    async def test_calculator_tool_runs_off_the_event_loop(self, mock_planner, mock_calculator):
+        mock_planner.initiate_planner.return_value = {"tool": "calculator", "args": {"rows": []}}
+        mock_calculator.use_calculator_tool.side_effect = lambda args: threading.get_ident()
+
+        self.assertNotEqual(await process_user_query_async("Add the rows"), threading.get_ident())
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.planner")
+    async def test_multi_step_plan(self, mock_planner, mock_weather):
+        # Arrange
+        mock_planner.initiate_planner.return_value = MULTI_STEP_PLAN
+
+        async def get_weather_details_async(args):
+            return [{"average_temperature_in_celcious": {"paris": 21.0, "london": 17.0}[args["city"]]}]
+        mock_weather.get_weather_details_async = get_weather_details_async
+
+        # Act
+        result = await process_user_query_async("Add 10 to the average temperature in Paris and London right now.")
+
+        # Assert
+        self.assertEqual(result, "The result of the calculation is: 29.0")
+
+    @patch("agent.agent.planner")
+    async def test_unknown_tool(self, mock_planner):
+        mock_planner.initiate_planner.return_value = {"tool": "unknown"}
+        self.assertEqual(await process_user_query_async("Do something weird"), "Sorry, I couldn't understand your request.")
+
+class TestToolCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        flights = patch.object(agent_module, "_tool_flights", None)
+        flights.start()
+        self.addCleanup(flights.stop)
+
+    def test_equivalent_args_share_a_key(self):
+        self.assertEqual(tool_call_key("weather", {"city": " Dhaka ", "days": 2.0}), tool_call_key("weather", {"days": 2, "city": "dhaka"}))
+        self.assertNotEqual(tool_call_key("weather", {"city": "dhaka"}), tool_call_key("weather", {"city": "paris"}))
+        self.assertNotEqual(tool_call_key("weather", {"city": "dhaka"}), tool_call_key("knowledge_base", {"city": "dhaka"}))
+
+    @patch("agent.agent.weather")
+    @patch("agent.agent.planner")
+    def test_concurrent_identical_calls_go_upstream_once(self, mock_planner, mock_weather):
+        release = threading.Event()
+
+        def get_weather_details(args):
+            release.wait(1)
+            return [{"date": "2024-01-01"}]
+
+        mock_weather.get_weather_details.side_effect = get_weather_details
+        mock_planner.initiate_planner.side_effect = lambda query: {"tool": "weather", "args": {"city": query, "from_date": "2024-01-01", "to_date": "2024-01-01"}}
+        mock_planner.call_llm_with_knowledge_base.side_effect = lambda query, history: f"{query}: {history}"
+
+        queries = ["Dhaka", "dhaka ", "DHAKA", "Paris"]
+        results = []
+        threads = [threading.Thread(target=lambda query=query: results.append(process_user_query(query))) for query in queries]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mock_weather.get_weather_details.call_count, 2)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(coalescing_stats()["weather"], {"executions": 2, "shared": 2})
+
+    @patch("agent.agent.currency_converter")
+    @patch("agent.agent.planner")
+    def test_concurrent_identical_async_calls_go_upstream_once(self, mock_planner, mock_currency):
+        calls = []
+
+        async def convert_currency_async(args):
+            calls.append(args)
+            await asyncio.sleep(0.1)
+            return "100 USD = 92 EUR"
+
+        mock_currency.convert_currency_async = convert_currency_async
+        mock_planner.initiate_planner.return_value = {"tool": "currency_converter", "args": {"from_currency": "USD", "to_currency": "EUR", "amount": 100}}
+
+        async def run():
+            return await asyncio.gather(*(process_user_query_async("Convert 100 USD to EUR") for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), ["100 USD = 92 EUR"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(coalescing_stats()["currency_converter"], {"executions": 1, "shared": 4})
@@ -0,0 +1,66 @@
+import os
+import sys
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_get_returns_cached_value(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 0, "evictions": 0, "size": 1}
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 10
+    assert cache.get("a", "missing") == "missing"
+    assert "a" not in cache
+    assert len(cache) == 0
+
+def test_get_with_age(clock):
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4
+    assert cache.get_with_age("a") == (1, 4)
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_size=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_items_with_age_skips_expired_entries(clock):
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 6
+    cache.set("b", 2)
+    clock.now = 12
+    assert cache.items_with_age() == [("b", 2, 6)]
+
+def test_pop_and_clear(clock):
+    cache = TTLCache(clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "missing") == "missing"
+    cache.clear()
+    assert len(cache) == 0
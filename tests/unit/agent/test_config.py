@@ -0,0 +1,26 @@
+import os
+import sys
+from unittest.mock import patch
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import config
+
+def test_get_setting_reads_environment(monkeypatch):
+    monkeypatch.setenv("AGENT_TEST_SETTING", "value")
+    assert config.get_setting("AGENT_TEST_SETTING") == "value"
+
+def test_get_setting_loads_dotenv_only_when_missing(monkeypatch):
+    monkeypatch.delenv("AGENT_TEST_SETTING", raising=False)
+    monkeypatch.setattr(config, "_dotenv_loaded", False)
+    with patch("dotenv.load_dotenv") as mock_load_dotenv:
+        assert config.get_setting("AGENT_TEST_SETTING", "default") == "default"
+        assert config.get_setting("AGENT_TEST_SETTING", "default") == "default"
+    mock_load_dotenv.assert_called_once()
+
+def test_require_setting_raises_when_missing(monkeypatch):
+    monkeypatch.setenv("AGENT_TEST_SETTING", "")
+    with pytest.raises(ValueError, match="AGENT_TEST_SETTING not found in environment variables"):
+        config.require_setting("AGENT_TEST_SETTING")
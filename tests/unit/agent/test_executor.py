@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import time
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent.executor import (
+    execute_plan,
+    execute_plan_async,
+    execution_order,
+    validate_plan,
+    critical_path,
+    resolve_arguments,
+    step_dependencies,
+    is_multi_step_plan,
+)
+
+def slow_weather(args):
+    time.sleep(0.1)
+    return [{"date": "2025-08-17", "average": {"paris": 20.0, "london": 16.0}[args["city"]]}]
+
+async def slow_weather_async(args):
+    await asyncio.sleep(0.1)
+    return [{"date": "2025-08-17", "average": {"paris": 20.0, "london": 16.0}[args["city"]]}]
+
+def add(args):
+    return args["a"] + args["b"]
+
+TOOLS = {"weather": slow_weather, "add": add}
+
+AVERAGE_PLAN = {
+    "steps": [
+        {"id": "paris", "tool": "weather", "args": {"city": "paris"}},
+        {"id": "london", "tool": "weather", "args": {"city": "london"}},
+        {"id": "sum", "tool": "add", "args": {"a": {"$ref": "paris/0/average"}, "b": {"$ref": "london/0/average"}}},
+        {"id": "answer", "tool": "add", "args": {"a": {"$ref": "sum"}, "b": 10}},
+    ],
+}
+
+# ---------- Plan structure ----------
+def test_is_multi_step_plan():
+    assert is_multi_step_plan(AVERAGE_PLAN)
+    assert not is_multi_step_plan({"tool": "calculator", "args": {}})
+    assert not is_multi_step_plan("text")
+
+def test_step_dependencies():
+    assert step_dependencies(AVERAGE_PLAN["steps"][2]) == {"paris", "london"}
+    assert step_dependencies(AVERAGE_PLAN["steps"][0]) == set()
+
+def test_resolve_arguments_with_nested_references():
+    results = {"a": [{"value": 1}], "b": {"items": [5, 6]}}
+    args = {"x": {"$ref": "a/0/value"}, "y": [{"$ref": "b/items/1"}], "z": 3}
+    assert resolve_arguments(args, results) == {"x": 1, "y": [6], "z": 3}
+
+def test_resolve_arguments_with_missing_path():
+    with pytest.raises(ValueError, match="Step 'a' result has no value at 'a/0/missing'"):
+        resolve_arguments({"x": {"$ref": "a/0/missing"}}, {"a": [{"value": 1}]})
+
+def test_execution_order_puts_dependencies_first():
+    order = execution_order(AVERAGE_PLAN)
+    assert order.index("sum") > order.index("paris")
+    assert order.index("sum") > order.index("london")
+    assert order[-1] == "answer"
+
+@pytest.mark.parametrize("plan, message", [
+    ({"steps": []}, "Plan has no steps"),
+    ({"steps": [{"id": "a"}]}, "Invalid plan step"),
+    ({"steps": [{"id": "a", "tool": "add"}, {"id": "a", "tool": "add"}]}, "Duplicate plan step id"),
+    ({"steps": [{"id": "a", "tool": "unknown"}]}, "Unknown tool"),
+    ({"steps": [{"id": "a", "tool": "add", "args": {"a": {"$ref": "b"}}}]}, "references unknown steps"),
+    ({"steps": [{"id": "a", "tool": "add", "args": {"a": [{"$ref": 1}]}}]}, "invalid references"),
+    ({"steps": [{"id": "a", "tool": "add", "args": {"a": {"$ref": "b"}}},
+                {"id": "b", "tool": "add", "args": {"a": {"$ref": "a"}}}]}, "form a cycle"),
+    ({"steps": [{"id": "a", "tool": "add"}], "answer": "b"}, "Unknown answer step"),
+])
+def test_validate_plan_rejects_invalid_plans(plan, message):
+    with pytest.raises(ValueError, match=message):
+        validate_plan(plan, TOOLS)
+
+def test_critical_path():
+    durations = {"paris": 0.3, "london": 0.1, "sum": 0.01, "answer": 0.02}
+    path, seconds = critical_path(AVERAGE_PLAN, durations)
+    assert path == ["paris", "sum", "answer"]
+    assert seconds == pytest.approx(0.33)
+
+# ---------- Execution ----------
+def test_execute_plan_runs_independent_steps_in_parallel():
+    execution = execute_plan(AVERAGE_PLAN, TOOLS)
+
+    assert execution.answer == 46.0
+    assert execution.answer_step == "answer"
+    assert execution.answer_tool == "add"
+    assert execution.results["sum"] == 36.0
+    assert execution.wall_seconds < 0.18
+    assert execution.critical_path[-2:] == ["sum", "answer"]
+    assert execution.critical_path_seconds >= 0.1
+
+def test_execute_plan_with_explicit_answer_step():
+    plan = dict(AVERAGE_PLAN, answer="sum")
+    assert execute_plan(plan, TOOLS).answer == 36.0
+
+def test_execute_plan_raises_step_errors():
+    def failing(args):
+        raise ConnectionError("upstream down")
+
+    plan = {"steps": [{"id": "a", "tool": "fail"}, {"id": "b", "tool": "add", "args": {"a": {"$ref": "a"}, "b": 1}}]}
+    with pytest.raises(ConnectionError, match="upstream down"):
+        execute_plan(plan, {"fail": failing, "add": add})
+
+def test_execute_plan_async_mixes_coroutine_and_sync_tools():
+    tools = {"weather": slow_weather_async, "add": add}
+
+    execution = asyncio.run(execute_plan_async(AVERAGE_PLAN, tools))
+
+    assert execution.answer == 46.0
+    assert execution.wall_seconds < 0.18
+    assert set(execution.durations) == {"paris", "london", "sum", "answer"}
+
+def test_execute_plan_async_raises_step_errors():
+    async def failing(args):
+        raise ConnectionError("upstream down")
+
+    plan = {"steps": [{"id": "a", "tool": "fail"}, {"id": "b", "tool": "add", "args": {"a": {"$ref": "a"}, "b": 1}}]}
+    with pytest.raises(ConnectionError, match="upstream down"):
+        asyncio.run(execute_plan_async(plan, {"fail": failing, "add": add}))
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import http_client
+from agent.stubs.upstream_server import UpstreamStubServer
+
+class TestAsyncHttpClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = UpstreamStubServer().start()
+
+    async def asyncTearDown(self):
+        await http_client.aclose()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_client_is_shared_within_event_loop(self):
+        self.assertIs(http_client.get_async_client(), http_client.get_async_client())
+
+    async def test_get_returns_upstream_response(self):
+        # Act
+        response = await http_client.get(f"{self.server.currency_url}/EUR")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["base"], "EUR")
+
+    async def test_connections_are_kept_alive(self):
+        # Act
+        for _ in range(5):
+            response = await http_client.get(f"{self.server.currency_url}/USD")
+            response.raise_for_status()
+
+        # Assert
+        self.assertEqual(self.server.request_count, 5)
+        self.assertEqual(self.server.connection_count, 1)
+
+    async def test_concurrent_requests_respect_per_host_limit(self):
+        # Arrange
+        original_limit = http_client.MAX_CONNECTIONS_PER_HOST
+        http_client.MAX_CONNECTIONS_PER_HOST = 2
+        self.server.httpd.latency_seconds = 0.02
+        try:
+            # Act
+            responses = await asyncio.gather(*[http_client.get(f"{self.server.currency_url}/USD") for _ in range(6)])
+        finally:
+            http_client.MAX_CONNECTIONS_PER_HOST = original_limit
+
+        # Assert
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertLessEqual(self.server.connection_count, 2)
+
+    async def test_aclose_closes_client(self):
+        client = http_client.get_async_client()
+        await http_client.aclose()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(http_client.get_async_client(), client)
+
+    async def test_clients_of_closed_loops_are_dropped(self):
+        async def other_loop_client():
+            return http_client.get_async_client()
+
+        other_client = await asyncio.to_thread(asyncio.run, other_loop_client())
+        client = http_client.get_async_client()
+        self.assertIsNot(client, other_client)
+        self.assertEqual([loop_client.client for loop_client in http_client._clients.values()], [client])
+
+    async def test_each_running_loop_keeps_its_client(self):
+        async def hold_client(ready, release):
+            client = http_client.get_async_client()
+            ready.set()
+            await asyncio.to_thread(release.wait)
+            return client is http_client.get_async_client()
+
+        ready, release = threading.Event(), threading.Event()
+        with ThreadPoolExecutor(1) as pool:
+            other = pool.submit(asyncio.run, hold_client(ready, release))
+            ready.wait()
+            client = http_client.get_async_client()
+            release.set()
+            self.assertTrue(other.result())
+        self.assertIs(http_client.get_async_client(), client)
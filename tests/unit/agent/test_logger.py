@@ -0,0 +1,89 @@
+import sys
+import os
+import io
+import json
+from unittest.mock import patch
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import logger
+from agent.logger import get_logger
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    logger.configure(level="INFO", sample_rate=1.0, format="text", stream=stream)
+    yield stream
+    logger.reset()
+
+def test_records_below_level_are_skipped(stream):
+    log = get_logger("test")
+    log.debug("hidden", value=1)
+    log.info("shown", value=2)
+    assert stream.getvalue().split()[1:] == ["INFO", "test", "shown", "value=2"]
+
+def test_fields_are_evaluated_lazily(stream):
+    log = get_logger("test")
+    expensive = []
+
+    log.debug("entries", entries=lambda: expensive.append("called"))
+    assert expensive == []
+
+    logger.configure(level="DEBUG")
+    log.debug("entries", entries=lambda: ["a", "b"], count=lambda: 2)
+    assert stream.getvalue().rstrip().endswith('entries="[\\"a\\", \\"b\\"]" count=2')
+
+def test_logfmt_quotes_values_with_spaces(stream):
+    get_logger("test").info("plan", path="a -> b", tool="weather", empty="")
+    assert stream.getvalue().rstrip().endswith('path="a -> b" tool=weather empty=""')
+
+def test_json_format(stream):
+    logger.configure(format="json")
+    get_logger("agent.agent").error("failed", error="boom", plan={"tool": "calculator"})
+    record = json.loads(stream.getvalue())
+    assert {key: record[key] for key in ("level", "logger", "event", "error", "plan")} == {
+        "level": "ERROR", "logger": "agent.agent", "event": "failed", "error": "boom", "plan": {"tool": "calculator"},
+    }
+
+def test_sampling_skips_debug_and_info_only(stream):
+    logger.configure(level="DEBUG", sample_rate=0.0)
+    log = get_logger("test")
+    log.debug("sampled")
+    log.info("sampled")
+    log.warning("kept")
+    log.error("kept")
+    assert [line.split()[3] for line in stream.getvalue().splitlines()] == ["kept", "kept"]
+
+def test_level_from_environment():
+    logger.reset()
+    try:
+        with patch.dict(os.environ, {logger.LOG_LEVEL_SETTING: "warning"}):
+            assert not get_logger("test").is_enabled_for(logger.INFO)
+            assert get_logger("test").is_enabled_for(logger.WARNING)
+    finally:
+        logger.reset()
+
+def test_unknown_level_raises():
+    with pytest.raises(ValueError):
+        logger.configure(level="verbose")
+
+def test_knowledge_base_is_only_dumped_at_debug(stream, tmp_path):
+    from agent.tools import knowledge_loader
+
+    source = tmp_path / "knowledge_base.json"
+    source.write_text(json.dumps({"entries": [{"title": "Alan Turing", "detail": "Mathematician"}]}))
+    knowledge_loader.reset_knowledge_index()
+    try:
+        with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", str(source)):
+            assert knowledge_loader.get_all_titles() == ["Alan Turing"]
+            assert stream.getvalue() == ""
+
+            logger.configure(level="DEBUG")
+            knowledge_loader.get_all_titles()
+    finally:
+        knowledge_loader.reset_knowledge_index()
+
+    assert "DEBUG agent.tools.knowledge_loader knowledge_base entries=" in stream.getvalue()
+    assert "Mathematician" in stream.getvalue()
@@ -0,0 +1,83 @@
+import sys
+import os
+import json
+from unittest.mock import patch
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import process_pool
+from agent.agent import offload_rows
+from agent.tools import knowledge_loader
+
+ENTRIES = [
+    {"title": "Alan Turing", "detail": "Mathematician who formalized computation"},
+    {"title": "Ada Lovelace", "detail": "Wrote the first published computer program"},
+    {"title": "Grace Hopper", "detail": "Built the first compiler"},
+]
+
+@pytest.fixture
+def knowledge_source(tmp_path):
+    source = tmp_path / "knowledge_base.json"
+    source.write_text(json.dumps({"entries": ENTRIES}))
+    knowledge_loader.reset_knowledge_index()
+    with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", str(source)), \
+         patch.dict(os.environ, {knowledge_loader.KNOWLEDGE_STORE_SETTING: ""}):
+        yield str(source)
+    knowledge_loader.reset_knowledge_index()
+
+@pytest.fixture
+def pool(knowledge_source):
+    process_pool.enable(workers=1)
+    yield process_pool
+    process_pool.disable()
+
+def test_disabled_pool_calls_in_the_calling_thread():
+    assert not process_pool.is_enabled()
+    assert process_pool.run(os.getpid) == os.getpid()
+
+def test_workers_rank_from_a_converted_store(pool, knowledge_source):
+    expected = knowledge_loader.shortlist_titles("first compiler", 2)
+
+    with patch.object(knowledge_loader, "get_knowledge_index", side_effect=AssertionError("parent loaded the index")):
+        assert pool.run(os.getpid) != os.getpid()
+        assert pool.run(knowledge_loader.shortlist_titles, "first compiler", 2) == expected
+        assert pool.run(knowledge_loader.search_titles_and_details, ["Ada Lovelace"]) == [ENTRIES[1]]
+        # Workers read the temporary store, not the JSON file
+        store_path = os.path.join(pool._temporary_directory, pool.TEMPORARY_STORE_NAME)
+        assert pool.run(os.getenv, knowledge_loader.KNOWLEDGE_STORE_SETTING) == store_path
+
+def test_disable_removes_the_temporary_store(knowledge_source):
+    process_pool.enable(workers=1)
+    directory = process_pool._temporary_directory
+    assert os.path.isdir(directory)
+    process_pool.disable()
+    assert not os.path.exists(directory)
+    assert not process_pool.is_enabled()
+
+def test_worker_exceptions_are_raised(pool):
+    with pytest.raises(ValueError):
+        pool.run(int, "not a number")
+
+def test_only_batched_rows_are_offloaded():
+    calls = []
+
+    def run(function, *args):
+        calls.append(args)
+        return function(*args)
+
+    calculate = offload_rows(lambda args: "answered")
+    with patch.object(process_pool, "run", side_effect=run):
+        assert calculate({"operand": "+", "operator_1": 1, "operator_2": 2}) == "answered"
+        assert calculate({"rows": []}) == "answered"
+    assert calls == [({"rows": []},)]
+
+def test_configure_from_settings(knowledge_source):
+    with patch.dict(os.environ, {process_pool.PROCESS_POOL_WORKERS_SETTING: "0"}):
+        assert process_pool.configure_from_settings() is False
+    with patch.dict(os.environ, {process_pool.PROCESS_POOL_WORKERS_SETTING: "1"}):
+        try:
+            assert process_pool.configure_from_settings() is True
+        finally:
+            process_pool.disable()
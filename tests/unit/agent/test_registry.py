@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# Add src/ to sys.path so imports work
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src"))
+sys.path.insert(0, SRC_PATH)
+
+from agent.registry import lazy_import
+
+def test_module_is_imported_on_first_attribute_access():
+    module = lazy_import(".tools.calculator", "agent")
+    assert not module.is_loaded
+    assert module.OPERAND == "operand"
+    assert module.is_loaded
+
+def test_setting_an_attribute_sets_it_on_the_module():
+    module = lazy_import("agent.tools.calculator")
+    original = module.OPERAND
+    try:
+        module.OPERAND = "changed"
+        assert sys.modules["agent.tools.calculator"].OPERAND == "changed"
+    finally:
+        module.OPERAND = original
+
+def test_missing_module_raises_on_use():
+    module = lazy_import("agent.tools.does_not_exist")
+    with pytest.raises(ModuleNotFoundError):
+        module.anything
+
+def test_calculator_query_does_not_import_other_tools():
+    code = (
+        "import sys, os\n"
+        "os.environ.pop('WEATHER_API_KEY', None)\n"
+        "os.environ.pop('EXCHANGE_RATE_API_KEY', None)\n"
+        "from agent import agent\n"
+        "agent.planner.initiate_planner = lambda query: {'tool': 'calculator', 'args': {'operand': '+', 'operator_1': 1, 'operator_2': 2}}\n"
+        "print(agent.process_user_query('1 + 2'))\n"
+        "print(sorted(name for name in sys.modules if name in ('requests', 'httpx', 'dotenv', 'asyncio', 'concurrent.futures', 'agent.tools.weather', 'agent.tools.currency_converter', 'agent.tools.knowledge_loader')))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, capture_output=True, text=True, check=True).stdout
+
+    assert "The result of the calculation is: 3.0" in output
+    assert output.strip().splitlines()[-1] == "[]"
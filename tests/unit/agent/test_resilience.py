@@ -0,0 +1,231 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+import httpx
+import pytest
+import requests
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import resilience
+from agent.resilience import CircuitBreaker, UpstreamPolicy
+from agent.transport import ReplayTransport
+
+URL = "http://upstream.test/v1/history.json"
+
+class Response:
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+
+class ScriptedSend:
+    """
+    Transport function answering with a scripted sequence of statuses, exceptions and delays.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def next_outcome(self, kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        return outcome if isinstance(outcome, tuple) else (outcome, 0.0)
+
+    def __call__(self, url, **kwargs):
+        outcome, delay = self.next_outcome(kwargs)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+    async def send_async(self, url, params=None, timeout=None):
+        outcome, delay = self.next_outcome({"params": params, "timeout": timeout})
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+def counters(policy):
+    return {name: value for name, value in policy.stats()["upstream.test"].items() if name in resilience.COUNTERS and value}
+
+def test_timeouts_are_applied_to_every_request():
+    send = ScriptedSend(200)
+    UpstreamPolicy(connect_timeout=1.5, read_timeout=4.0).get(send, URL, params={"q": "Paris"})
+    assert send.calls == [{"params": {"q": "Paris"}, "timeout": (1.5, 4.0)}]
+
+def test_transient_failures_are_retried_with_backoff():
+    send = ScriptedSend(requests.ConnectionError("reset"), requests.ReadTimeout("slow"), 200)
+    policy = UpstreamPolicy(retries=2, backoff_ms=20, seed=1)
+    started = time.perf_counter()
+    assert policy.get(send, URL).status_code == 200
+    assert time.perf_counter() - started < 0.2
+    assert counters(policy) == {"requests": 1, "attempts": 3, "retries": 2, "errors": 1, "timeouts": 1}
+    assert policy.stats()["upstream.test"]["latency"]["count"] == 1
+
+def test_retryable_statuses_are_retried_until_attempts_run_out():
+    policy = UpstreamPolicy(retries=2, backoff_ms=0)
+    assert policy.get(ScriptedSend(503, 429, 200), URL).status_code == 200
+    assert policy.get(ScriptedSend(502), URL).status_code == 502
+    assert counters(policy)["server_errors"] == 4
+
+def test_client_errors_and_unexpected_exceptions_are_not_retried():
+    policy = UpstreamPolicy(backoff_ms=0)
+    not_found = ScriptedSend(404)
+    assert policy.get(not_found, URL).status_code == 404
+    invalid = ScriptedSend(requests.RequestException("invalid URL"))
+    with pytest.raises(requests.RequestException):
+        policy.get(invalid, URL)
+    assert (len(not_found.calls), len(invalid.calls)) == (1, 1)
+
+def test_last_failure_is_raised():
+    policy = UpstreamPolicy(retries=1, backoff_ms=0)
+    with pytest.raises(requests.ConnectionError, match="second"):
+        policy.get(ScriptedSend(requests.ConnectionError("first"), requests.ConnectionError("second")), URL)
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=lambda: now[0])
+    assert [breaker.record_failure() for _ in range(3)] == [False, False, True]
+    assert breaker.state == resilience.OPEN and not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.allow()
+    assert not breaker.allow(), "only one trial request while half open"
+    assert breaker.record_failure() and breaker.state == resilience.OPEN
+
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == resilience.CLOSED and breaker.allow()
+
+def test_open_circuit_fails_fast():
+    policy = UpstreamPolicy(retries=1, backoff_ms=0, breaker_failures=4)
+    down = ScriptedSend(requests.ConnectionError("refused"))
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError, match="refused"):
+            policy.get(down, URL)
+    with pytest.raises(requests.ConnectionError, match="Circuit breaker open for upstream.test"):
+        policy.get(down, URL)
+    assert len(down.calls) == 4
+    assert counters(policy)["breaker_opened"] == 1
+    assert counters(policy)["breaker_rejected"] == 1
+    assert policy.stats()["upstream.test"]["state"] == resilience.OPEN
+
+@pytest.mark.parametrize("error", [requests.exceptions.ChunkedEncodingError("truncated"), requests.TooManyRedirects("loop")])
+def test_trial_request_raising_an_unexpected_exception_frees_the_trial(error):
+    now = [0.0]
+    policy = UpstreamPolicy(retries=0, breaker_failures=1, breaker_reset_seconds=10)
+    policy.host(URL).breaker.clock = lambda: now[0]
+    with pytest.raises(requests.ConnectionError):
+        policy.get(ScriptedSend(requests.ConnectionError("refused")), URL)
+
+    now[0] = 10.0
+    with pytest.raises(type(error)):
+        policy.get(ScriptedSend(error), URL)
+    assert policy.get(ScriptedSend(200), URL).status_code == 200
+    assert policy.stats()["upstream.test"]["state"] == resilience.CLOSED
+
+def test_cancelled_async_trial_frees_the_trial():
+    now = [0.0]
+    policy = UpstreamPolicy(retries=0, breaker_failures=1, breaker_reset_seconds=10)
+    policy.host(URL).breaker.clock = lambda: now[0]
+
+    async def run():
+        with pytest.raises(httpx.ConnectError):
+            await policy.get_async(ScriptedSend(httpx.ConnectError("refused")).send_async, URL)
+        now[0] = 10.0
+        trial = asyncio.ensure_future(policy.get_async(ScriptedSend((200, 1.0)).send_async, URL))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await policy.get_async(ScriptedSend(200).send_async, URL)
+
+    assert asyncio.run(run()).status_code == 200
+
+def test_slow_requests_are_hedged():
+    policy = UpstreamPolicy(hedge=True)
+    warm = ScriptedSend((200, 0.001))
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        policy.get(warm, URL)
+    assert policy.hedge_delay(policy.host(URL)) < 0.05
+
+    send = ScriptedSend((200, 1.0), (200, 0.0))
+    started = time.perf_counter()
+    assert policy.get(send, URL).status_code == 200
+    assert time.perf_counter() - started < 0.5
+    assert len(send.calls) == 2
+    assert (counters(policy)["hedges"], counters(policy)["hedge_wins"]) == (1, 1)
+    policy.close()
+
+def test_hedging_waits_for_enough_samples():
+    policy = UpstreamPolicy(hedge=True)
+    send = ScriptedSend((200, 0.01))
+    policy.get(send, URL)
+    assert policy.hedge_delay(policy.host(URL)) is None
+    assert len(send.calls) == 1
+
+def test_async_retries_breaker_and_hedging():
+    policy = UpstreamPolicy(retries=1, backoff_ms=0, breaker_failures=2, hedge=True)
+
+    async def run():
+        flaky = ScriptedSend(httpx.ConnectTimeout("slow"), 200)
+        first = await policy.get_async(flaky.send_async, URL, {"q": "Paris"})
+        warm = ScriptedSend((200, 0.001))
+        for _ in range(resilience.HEDGE_MIN_SAMPLES):
+            await policy.get_async(warm.send_async, URL)
+        hedged = ScriptedSend((200, 1.0), (200, 0.0))
+        second = await policy.get_async(hedged.send_async, URL)
+        down = ScriptedSend(httpx.ConnectError("refused"))
+        with pytest.raises(httpx.ConnectError, match="refused"):
+            await policy.get_async(down.send_async, URL)
+        with pytest.raises(httpx.ConnectError, match="Circuit breaker open"):
+            await policy.get_async(down.send_async, URL)
+        return first, second, flaky.calls
+
+    first, second, calls = asyncio.run(run())
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert calls[0] == {"params": {"q": "Paris"}, "timeout": (5.0, 10.0)}
+    assert {name: counters(policy)[name] for name in ("timeouts", "errors", "hedge_wins", "breaker_rejected")} == \
+        {"timeouts": 1, "errors": 2, "hedge_wins": 1, "breaker_rejected": 1}
+
+def test_replayed_delays_longer_than_the_read_timeout_time_out(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    path.write_text(json.dumps({"method": "GET", "url": URL, "params": {}, "status": 200, "headers": {}, "body": "{}"}) + "\n")
+    replay = ReplayTransport(str(path), latency_ms=200)
+    policy = UpstreamPolicy(read_timeout=0.05, retries=1, backoff_ms=0)
+
+    started = time.perf_counter()
+    with pytest.raises(requests.ReadTimeout):
+        policy.get(replay.get, URL)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(policy.get_async(replay.get_async, URL))
+    assert time.perf_counter() - started < 0.4
+    assert counters(policy)["timeouts"] == 4
+
+def test_policy_from_settings():
+    settings = {
+        resilience.UPSTREAM_CONNECT_TIMEOUT_SETTING: "2",
+        resilience.UPSTREAM_READ_TIMEOUT_SETTING: "3.5",
+        resilience.UPSTREAM_RETRIES_SETTING: "0",
+        resilience.UPSTREAM_BREAKER_FAILURES_SETTING: "10",
+        resilience.UPSTREAM_HEDGE_SETTING: "1",
+    }
+    with patch.dict(os.environ, settings):
+        policy = resilience.create_policy()
+    assert (policy.timeout, policy.retries, policy.breaker_failures, policy.hedge) == ((2.0, 3.5), 0, 10, True)
+    assert policy.backoff_ms == resilience.BACKOFF_MS
+
+    resilience.set_policy(policy)
+    try:
+        assert resilience.get_policy() is policy
+        assert resilience.stats() == {}
+    finally:
+        resilience.close_policy()
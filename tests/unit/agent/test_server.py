@@ -0,0 +1,159 @@
+import sys
+import os
+import asyncio
+from unittest.mock import patch
+import httpx
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent.server import AgentServer, BadRequest, parse_request_head, parse_query
+
+def run_with_server(scenario, **options):
+    async def run():
+        server = await AgentServer(port=0, **options).start()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+                return await scenario(server, client)
+        finally:
+            await server.shutdown()
+    return asyncio.run(run())
+
+async def echo(query):
+    return query.upper()
+
+def test_parse_request_head():
+    head = b"POST /query?debug=1 HTTP/1.1\r\nHost: localhost\r\nContent-Length: 12\r\n\r\n"
+    assert parse_request_head(head) == ("POST", "/query", "HTTP/1.1", {"host": "localhost", "content-length": "12"})
+    with pytest.raises(BadRequest):
+        parse_request_head(b"garbage\r\n\r\n")
+
+@pytest.mark.parametrize("body", [b"not json", b"[]", b'{"query": ""}', b'{"query": 3}'])
+def test_parse_query_rejects_invalid_bodies(body):
+    with pytest.raises(BadRequest):
+        parse_query(body)
+
+def test_answers_queries_over_keep_alive_connection():
+    async def scenario(server, client):
+        first = await client.post("/query", json={"query": "hello"})
+        second = await client.post("/query", json={"query": "again"})
+        return first, second, (await client.get("/stats")).json()
+
+    first, second, stats = run_with_server(scenario, answer=echo)
+    assert first.json() == {"result": "HELLO"}
+    assert second.json() == {"result": "AGAIN"}
+    assert first.headers["connection"] == "keep-alive"
+    assert stats["served"] == 2
+
+def test_routes_and_errors():
+    async def chunked_body():
+        yield b'{"query": "chunked"}'
+
+    async def scenario(server, client):
+        return [
+            (await client.post("/query", content=b"not json")).status_code,
+            (await client.get("/missing")).status_code,
+            (await client.get("/query")).status_code,
+            (await client.post("/query", content=chunked_body())).status_code,
+            (await client.get("/health")).json(),
+        ]
+
+    assert run_with_server(scenario, answer=echo) == [400, 404, 405, 400, {"status": "ok", "running": 0, "queued": 0}]
+
+def test_failed_query_returns_500():
+    async def fail(query):
+        raise RuntimeError("tool exploded")
+
+    async def scenario(server, client):
+        return await client.post("/query", json={"query": "boom"})
+
+    response = run_with_server(scenario, answer=fail)
+    assert response.status_code == 500
+    assert response.json() == {"error": "tool exploded"}
+
+def test_queries_over_the_queue_limit_are_refused():
+    release = None
+
+    async def blocked(query):
+        await release.wait()
+        return query
+
+    async def scenario(server, client):
+        nonlocal release
+        release = asyncio.Event()
+        requests = [asyncio.ensure_future(client.post("/query", json={"query": f"q{index}"})) for index in range(2)]
+        while server.admitted < 2:
+            await asyncio.sleep(0.01)
+        assert (server.running, server.queued) == (1, 1)
+        refused = await client.post("/query", json={"query": "q2"})
+        release.set()
+        return refused, await asyncio.gather(*requests), server.rejected
+
+    refused, answered, rejected = run_with_server(scenario, answer=blocked, workers=1, queue_limit=1)
+    assert refused.status_code == 503
+    assert refused.headers["retry-after"] == "1"
+    assert [response.json() for response in answered] == [{"result": "q0"}, {"result": "q1"}]
+    assert rejected == 1
+
+def test_shutdown_lets_admitted_queries_finish():
+    async def slow(query):
+        await asyncio.sleep(0.2)
+        return query
+
+    async def run():
+        server = await AgentServer(port=0, answer=slow).start()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+            request = asyncio.ensure_future(client.post("/query", json={"query": "finish me"}))
+            while server.admitted == 0:
+                await asyncio.sleep(0.01)
+            await server.shutdown()
+            response = await request
+            with pytest.raises(httpx.ConnectError):
+                await client.post("/query", json={"query": "too late"})
+        return response
+
+    response = asyncio.run(run())
+    assert response.json() == {"result": "finish me"}
+    assert response.headers["connection"] == "close"
+
+def test_shutdown_timeout_cancels_stuck_queries():
+    cancelled = []
+
+    async def stuck(query):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+
+    async def run():
+        server = await AgentServer(port=0, answer=stuck, shutdown_timeout=0.1).start()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+            request = asyncio.ensure_future(client.post("/query", json={"query": "stuck"}))
+            while server.admitted == 0:
+                await asyncio.sleep(0.01)
+            await server.shutdown()
+            with pytest.raises(httpx.HTTPError):
+                await request
+
+    asyncio.run(run())
+    assert cancelled == ["stuck"]
+
+def test_serves_the_agent_pipeline():
+    async def scenario(server, client):
+        return await client.post("/query", json={"query": "what is 12 + 30"})
+
+    assert run_with_server(scenario).json() == {"result": "The result of the calculation is: 42.0"}
+
+def test_warm_up_loads_the_search_index_instead_of_building_the_json_index():
+    from agent.tools import knowledge_loader
+
+    async def scenario(server, client):
+        return (await client.get("/health")).status_code
+
+    with patch.object(knowledge_loader, "get_search_index") as get_search_index, \
+            patch.object(knowledge_loader, "get_knowledge_index") as get_knowledge_index:
+        assert run_with_server(scenario, answer=echo) == 200
+    get_search_index.assert_called_once()
+    get_knowledge_index.assert_not_called()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent.singleflight import SingleFlight
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_lookup(value):
+        calls.append(value)
+        release.wait(1)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("key", slow_lookup, 21))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [21]
+    assert results == [42] * 20
+    assert flights.stats() == {"executions": 1, "shared": 19}
+
+def test_sequential_calls_run_again():
+    flights = SingleFlight()
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+    assert flights.stats() == {"executions": 2, "shared": 0}
+
+def test_exception_is_raised_and_call_is_forgotten():
+    flights = SingleFlight()
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        flights.do("key", failing)
+    assert not flights.in_flight("key")
+
+def test_concurrent_tasks_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow_lookup(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def run():
+        return await asyncio.gather(*[flights.do_async("key", slow_lookup, 21) for _ in range(100)])
+
+    assert asyncio.run(run()) == [42] * 100
+    assert calls == [21]
+    assert flights.stats() == {"executions": 1, "shared": 99}
+    assert not flights.in_flight("key")
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = SingleFlight()
+
+    async def slow_lookup():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do_async("key", slow_lookup))
+        second = asyncio.ensure_future(flights.do_async("key", slow_lookup))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,182 @@
+import sys
+import os
+import json
+import asyncio
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import tracing
+from agent.tracing import LatencyHistogram, JSONLinesExporter, NOOP_SPAN
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+        self.closed = False
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def exporter():
+    exporter = RecordingExporter()
+    tracing.reset_stats()
+    tracing.enable([exporter])
+    yield exporter
+    tracing.disable()
+    tracing.reset_stats()
+
+def test_disabled_spans_are_noops():
+    tracing.reset_stats()
+    assert not tracing.is_enabled()
+    with tracing.span("planner", source="rules") as span:
+        span.set_attribute("ignored", True)
+    assert span is NOOP_SPAN
+    assert tracing.stage_stats() == {}
+
+def test_nested_spans_share_trace(exporter):
+    with tracing.span("request") as parent:
+        with tracing.span("tool.weather", city="dhaka") as child:
+            child.set_attribute("days", 3)
+
+    inner, outer = exporter.spans
+    assert (inner.name, outer.name) == ("tool.weather", "request")
+    assert inner.parent_id == parent.span_id
+    assert inner.trace_id == outer.trace_id
+    assert outer.parent_id is None
+    assert inner.attributes == {"city": "dhaka", "days": 3}
+    assert outer.duration_ms >= inner.duration_ms
+
+def test_separate_requests_get_separate_traces(exporter):
+    with tracing.span("request"):
+        pass
+    with tracing.span("request"):
+        pass
+    assert exporter.spans[0].trace_id != exporter.spans[1].trace_id
+
+def test_errors_are_recorded(exporter):
+    with pytest.raises(ValueError):
+        with tracing.span("http.currency"):
+            raise ValueError("bad base")
+    assert exporter.spans[0].error == "ValueError: bad base"
+    assert tracing.stage_stats()["http.currency"]["count"] == 1
+
+def test_concurrent_tasks_keep_their_parents(exporter):
+    async def tool(name):
+        with tracing.span(name) as span:
+            await asyncio.sleep(0.01)
+            with tracing.span(f"http.{name}") as request:
+                await asyncio.sleep(0)
+        return span, request
+
+    async def run():
+        with tracing.span("request") as root:
+            results = await asyncio.gather(tool("a"), tool("b"))
+        return root, results
+
+    root, results = asyncio.run(run())
+    for span, request in results:
+        assert span.parent_id == root.span_id
+        assert request.parent_id == span.span_id
+
+def test_histogram_percentiles_are_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for duration_ms in range(1, 1001):
+        histogram.record(float(duration_ms))
+
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["max_ms"] == 1000.0
+    for name, expected in (("p50_ms", 500), ("p95_ms", 950), ("p99_ms", 990)):
+        assert expected <= summary[name] <= expected * tracing.HISTOGRAM_GROWTH
+
+def test_empty_histogram():
+    assert LatencyHistogram().percentile(0.99) == 0.0
+
+def test_stage_stats_and_table(exporter):
+    for _ in range(3):
+        with tracing.span("planner"):
+            pass
+    stats = tracing.stage_stats()
+    assert stats["planner"]["count"] == 3
+    table = tracing.format_stage_stats()
+    assert table.splitlines()[0].split() == ["stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    assert table.splitlines()[1].split()[:2] == ["planner", "3"]
+
+def test_jsonl_export(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.enable([JSONLinesExporter(str(path))])
+    try:
+        with tracing.span("request"):
+            with tracing.span("tool.calculator", operand="+"):
+                pass
+    finally:
+        tracing.disable()
+        tracing.reset_stats()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["tool.calculator", "request"]
+    assert records[0]["parent_id"] == records[1]["span_id"]
+    assert records[0]["attributes"] == {"operand": "+"}
+
+def test_opentelemetry_spans_keep_their_parents():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    exporter = tracing.OpenTelemetryExporter()
+    exporter.tracer = provider.get_tracer("agent")
+    tracing.enable([exporter])
+    try:
+        with tracing.span("request"):
+            with tracing.span("planner"):
+                with tracing.span("llm"):
+                    pass
+            with tracing.span("tool.calculator"):
+                pass
+    finally:
+        tracing.disable()
+        tracing.reset_stats()
+
+    spans = {span.name: span for span in memory.get_finished_spans()}
+    root = spans["request"]
+    assert root.parent is None
+    assert spans["planner"].parent.span_id == root.context.span_id
+    assert spans["tool.calculator"].parent.span_id == root.context.span_id
+    assert spans["llm"].parent.span_id == spans["planner"].context.span_id
+    assert {span.context.trace_id for span in spans.values()} == {root.context.trace_id}
+
+def test_configure_from_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv(tracing.TRACE_FILE_SETTING, str(tmp_path / "traces.jsonl"))
+    try:
+        assert tracing.configure_from_settings()
+        with tracing.span("request"):
+            pass
+    finally:
+        tracing.disable()
+        tracing.reset_stats()
+    assert (tmp_path / "traces.jsonl").read_text().count("\n") == 1
+
+def test_disable_closes_exporters():
+    exporter = RecordingExporter()
+    tracing.enable([exporter])
+    tracing.disable()
+    assert exporter.closed
+
+def test_pipeline_stages_are_traced(exporter):
+    from agent.agent import process_user_query
+
+    assert process_user_query("what is 12 + 30") is not None
+    names = [span.name for span in exporter.spans]
+    assert "planner" in names
+    assert "tool.calculator" in names
+    planner_span = names.index("planner")
+    assert exporter.spans[planner_span].attributes["source"] == "rules"
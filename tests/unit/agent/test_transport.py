@@ -0,0 +1,177 @@
+import sys
+import os
+import json
+import time
+import asyncio
+from unittest.mock import patch
+import httpx
+import pytest
+import requests
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../src")))
+
+from agent import http_client, resilience, transport
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import currency_converter, weather
+from agent.tools.rate_cache import RateTableCache
+from agent.tools.weather_cache import WeatherHistoryCache
+from agent.transport import RecordingTransport, ReplayTransport, interaction_key
+
+WEATHER_ARGS = {"city": "Paris", "from_date": "2024-01-01", "to_date": "2024-01-03"}
+
+@pytest.fixture
+def upstream():
+    with UpstreamStubServer() as server:
+        yield server
+
+@pytest.fixture
+def tools(upstream, monkeypatch):
+    monkeypatch.setenv(weather.API_KEY_SETTING, "secret-key")
+    monkeypatch.setenv(currency_converter.API_KEY_SETTING, "secret-key")
+    monkeypatch.setattr(weather, "BASE_URL", upstream.weather_url)
+    monkeypatch.setattr(weather, "_weather_cache", WeatherHistoryCache())
+    monkeypatch.setattr(currency_converter, "BASE_URL", upstream.currency_url)
+    monkeypatch.setattr(currency_converter, "RATE_CACHE", RateTableCache())
+    resilience.set_policy(resilience.UpstreamPolicy(backoff_ms=0))
+    yield
+    transport.set_transport(None)
+    resilience.set_policy(None)
+
+def reset_caches(monkeypatch):
+    monkeypatch.setattr(weather, "_weather_cache", WeatherHistoryCache())
+    monkeypatch.setattr(currency_converter, "RATE_CACHE", RateTableCache())
+
+@pytest.fixture
+def cassette(tmp_path, tools, upstream, monkeypatch):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = RecordingTransport(path)
+    transport.set_transport(recorder)
+    recorded = (weather.get_weather_details(WEATHER_ARGS), currency_converter.convert_currency({"from_currency": "USD", "to_currency": "EUR", "amount": 100}))
+    recorder.close()
+    reset_caches(monkeypatch)
+    return path, recorded
+
+def test_interaction_key_ignores_api_keys_and_parameter_order():
+    assert interaction_key("GET", "http://x/h", {"q": "Paris", "key": "a", "dt": "2024-01-01"}) == \
+        interaction_key("GET", "http://x/h", {"dt": "2024-01-01", "q": "Paris", "key": "b"})
+    assert interaction_key("GET", "http://x/h", {"q": "Paris"}) != interaction_key("GET", "http://x/h", {"q": "Rome"})
+
+def test_recording_writes_responses_without_api_keys(cassette, upstream):
+    path, _ = cassette
+    with open(path) as f:
+        interactions = [json.loads(line) for line in f]
+    assert [interaction["url"] for interaction in interactions] == [f"{upstream.weather_url}/history.json", f"{upstream.currency_url}/USD"]
+    assert interactions[0]["params"] == {"q": "Paris", "dt": "2024-01-01", "end_dt": "2024-01-03"}
+    assert all(interaction["status"] == 200 for interaction in interactions)
+    assert "secret-key" not in open(path).read()
+
+def test_replay_answers_offline_like_the_recording(cassette, upstream):
+    path, recorded = cassette
+    requests_before = upstream.request_count
+    replay = ReplayTransport(path)
+    transport.set_transport(replay)
+
+    assert weather.get_weather_details(WEATHER_ARGS) == recorded[0]
+    assert currency_converter.convert_currency({"from_currency": "USD", "to_currency": "EUR", "amount": 100}) == recorded[1]
+    assert upstream.request_count == requests_before
+    assert replay.stats() == {"requests": 2, "injected_errors": 0, "misses": 0, "max_in_flight": 1}
+
+def test_replay_async(cassette, upstream, monkeypatch):
+    path, recorded = cassette
+    transport.set_transport(ReplayTransport(path))
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                weather.get_weather_details_async(WEATHER_ARGS),
+                currency_converter.convert_currency_async({"from_currency": "USD", "to_currency": "EUR", "amount": 100}),
+            )
+        finally:
+            await http_client.aclose()
+
+    assert asyncio.run(run()) == list(recorded)
+
+def test_unrecorded_request_fails_like_an_outage(cassette):
+    path, _ = cassette
+    replay = ReplayTransport(path)
+    transport.set_transport(replay)
+
+    with pytest.raises(ConnectionError):
+        weather.get_weather_details({"city": "Rome", "from_date": "2024-01-01", "to_date": "2024-01-01"})
+    with pytest.raises(requests.ConnectionError):
+        replay.get("http://unknown/path")
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(replay.get_async("http://unknown/path"))
+    # The tool's request is retried twice
+    assert replay.misses == 5
+
+def test_injected_errors(cassette):
+    path, _ = cassette
+    replay = ReplayTransport(path, error_rate=1.0, error_status=503)
+    transport.set_transport(replay)
+    with pytest.raises(ConnectionError, match="503"):
+        weather.get_weather_details(WEATHER_ARGS)
+
+    # Another three failures would open the circuit of the stub
+    resilience.set_policy(resilience.UpstreamPolicy(backoff_ms=0))
+    dropped = ReplayTransport(path, error_rate=1.0, error_status=transport.CONNECTION_ERROR_STATUS)
+    transport.set_transport(dropped)
+    with pytest.raises(ConnectionError, match="Injected connection failure"):
+        weather.get_weather_details(WEATHER_ARGS)
+    assert (replay.injected_errors, dropped.injected_errors) == (3, 3)
+
+def test_error_injection_is_reproducible_with_a_seed(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    path.write_text(json.dumps({"method": "GET", "url": "http://x/a", "params": {}, "status": 200, "headers": {}, "body": "{}"}) + "\n")
+
+    def statuses(seed):
+        replay = ReplayTransport(str(path), error_rate=0.5, seed=seed)
+        return [replay.get("http://x/a").status_code for _ in range(20)]
+
+    assert statuses(7) == statuses(7)
+    assert set(statuses(7)) == {200, 503}
+
+def test_replay_latency_and_cycling(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    lines = [
+        {"method": "GET", "url": "http://x/a", "params": {}, "status": 200, "headers": {}, "body": '{"n": 1}', "elapsed_ms": 30},
+        {"method": "GET", "url": "http://x/a", "params": {}, "status": 200, "headers": {}, "body": '{"n": 2}', "elapsed_ms": 30},
+    ]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    replay = ReplayTransport(str(path), latency_ms=transport.RECORDED_LATENCY)
+    started = time.perf_counter()
+    assert [replay.get("http://x/a").json()["n"] for _ in range(3)] == [1, 2, 1]
+    assert time.perf_counter() - started >= 0.09
+
+def test_async_replay_keeps_the_per_host_connection_limit(tmp_path, monkeypatch):
+    path = tmp_path / "cassette.jsonl"
+    path.write_text(json.dumps({"method": "GET", "url": "http://x/a", "params": {}, "status": 200, "headers": {}, "body": "{}"}) + "\n")
+    monkeypatch.setattr(http_client, "MAX_CONNECTIONS_PER_HOST", 3)
+    replay = ReplayTransport(str(path), latency_ms=10)
+
+    async def run():
+        return await asyncio.gather(*[replay.get_async("http://x/a") for _ in range(10)])
+
+    assert [response.status_code for response in asyncio.run(run())] == [200] * 10
+    assert replay.max_in_flight == 3
+
+def test_transport_from_settings(cassette):
+    path, _ = cassette
+    settings = {
+        transport.HTTP_TRANSPORT_SETTING: "replay",
+        transport.HTTP_CASSETTE_SETTING: path,
+        transport.HTTP_REPLAY_LATENCY_SETTING: "5",
+        transport.HTTP_REPLAY_ERROR_RATE_SETTING: "0.25",
+    }
+    with patch.dict(os.environ, settings):
+        created = transport.create_transport()
+    assert isinstance(created, ReplayTransport)
+    assert (created.latency_ms, created.error_rate, created.error_status) == (5.0, 0.25, 503)
+
+    with patch.dict(os.environ, {transport.HTTP_TRANSPORT_SETTING: "carrier-pigeon"}):
+        with pytest.raises(ValueError):
+            transport.create_transport()
+    with patch.dict(os.environ, {transport.HTTP_TRANSPORT_SETTING: "live"}):
+        assert isinstance(transport.create_transport(), transport.LiveTransport)
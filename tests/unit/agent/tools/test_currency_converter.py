@@ -2,12 +2,16 @@ import os
 import sys
 import importlib
 from unittest.mock import patch, MagicMock
+import asyncio
 import pytest
 import requests
 
 # Add src/ to sys.path so imports work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
 
+from agent import http_client
+from agent.stubs.upstream_server import UpstreamStubServer
+
 @pytest.fixture
 def currency_module(monkeypatch):
     """
@@ -40,7 +44,7 @@ def test_convert_currency_success(currency_module):
         # Assert
         assert "amount is 85.0" in result
         assert "conversion rate is 0.85" in result
-        mock_get.assert_called_once_with("https://api.exchangerate-api.com/v4/latest/USD")
+        mock_get.assert_called_once_with("https://api.exchangerate-api.com/v4/latest/USD", timeout=(5.0, 10.0))
 
 
 # --------- Validation errors ---------
@@ -81,3 +85,102 @@ def test_unexpected_exception_maps_to_runtime_error(currency_module):
         args = {"from_currency": "USD", "to_currency": "EUR", "amount": 100}
         with pytest.raises(RuntimeError, match=r"Conversion error: Network down"):
             currency_module.convert_currency(args)
+
+
+# --------- Async conversion against the local stub server ---------
+@pytest.fixture
+def upstream_server():
+    with UpstreamStubServer() as server:
+        yield server
+
+async def _convert_and_close(currency_module, args):
+    try:
+        return await currency_module.convert_currency_async(args)
+    finally:
+        await http_client.aclose()
+
+def test_convert_currency_async_success(currency_module, upstream_server, monkeypatch):
+    monkeypatch.setattr(currency_module, "BASE_URL", upstream_server.currency_url)
+    args = {"from_currency": "usd", "to_currency": "EUR", "amount": 100}
+
+    result = asyncio.run(_convert_and_close(currency_module, args))
+
+    assert "amount is 85.0" in result
+    assert "conversion rate is 0.85" in result
+    assert upstream_server.paths == ["/v4/latest/USD"]
+
+def test_convert_currency_async_invalid_currency_code(currency_module, upstream_server, monkeypatch):
+    monkeypatch.setattr(currency_module, "BASE_URL", upstream_server.currency_url)
+    args = {"from_currency": "USD", "to_currency": "XYZ", "amount": 100}
+
+    with pytest.raises(ValueError, match=r"Invalid input: Invalid currency code: XYZ"):
+        asyncio.run(_convert_and_close(currency_module, args))
+
+def test_convert_currency_async_api_error_maps_to_connection_error(currency_module, upstream_server, monkeypatch):
+    monkeypatch.setattr(currency_module, "BASE_URL", upstream_server.currency_url)
+    args = {"from_currency": "XYZ", "to_currency": "EUR", "amount": 100}
+
+    with pytest.raises(ConnectionError, match=r"Failed to fetch exchange rates"):
+        asyncio.run(_convert_and_close(currency_module, args))
+
+def test_convert_currency_async_validation_skips_request(currency_module, upstream_server, monkeypatch):
+    monkeypatch.setattr(currency_module, "BASE_URL", upstream_server.currency_url)
+
+    with pytest.raises(ValueError, match="Amount must be positive"):
+        asyncio.run(_convert_and_close(currency_module, {"from_currency": "USD", "to_currency": "EUR", "amount": -5}))
+    assert upstream_server.request_count == 0
+
+def test_convert_currency_reuses_cached_rate_table(currency_module):
+    with patch(f"{currency_module.__name__}.requests.get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"rates": {"EUR": 0.85, "USD": 1.0, "JPY": 150.0}}
+        mock_get.return_value = mock_response
+
+        currency_module.convert_currency({"from_currency": "USD", "to_currency": "EUR", "amount": 100})
+        currency_module.convert_currency({"from_currency": "USD", "to_currency": "JPY", "amount": 10})
+        result = currency_module.convert_currency({"from_currency": "EUR", "to_currency": "JPY", "amount": 10})
+
+        assert "conversion rate is 176.471" in result
+        mock_get.assert_called_once_with("https://api.exchangerate-api.com/v4/latest/USD", timeout=(5.0, 10.0))
+
+def test_convert_currency_async_concurrent_requests_share_one_fetch(currency_module, upstream_server, monkeypatch):
+    monkeypatch.setattr(currency_module, "BASE_URL", upstream_server.currency_url)
+    upstream_server.httpd.latency_seconds = 0.02
+
+    async def convert_many():
+        try:
+            return await asyncio.gather(*[
+                currency_module.convert_currency_async({"from_currency": "USD", "to_currency": currency, "amount": 1})
+                for currency in ["EUR", "GBP", "JPY"] * 100
+            ])
+        finally:
+            await http_client.aclose()
+
+    results = asyncio.run(convert_many())
+
+    assert len(results) == 300
+    assert upstream_server.request_count == 1
+
+def test_prefetch_rates_fetches_each_needed_base_once(currency_module):
+    with patch(f"{currency_module.__name__}.requests.get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"rates": {"EUR": 0.85, "USD": 1.0, "JPY": 150.0}}
+        mock_get.return_value = mock_response
+
+        currency_module.prefetch_rates([("usd", "EUR"), ("USD", "JPY"), ("EUR", "JPY"), ("USD", "EUR")])
+        result = currency_module.convert_currency({"from_currency": "EUR", "to_currency": "JPY", "amount": 1})
+
+        assert "conversion rate is 176.471" in result
+        mock_get.assert_called_once_with("https://api.exchangerate-api.com/v4/latest/USD", timeout=(5.0, 10.0))
+
+def test_prefetch_rates_ignores_failures(currency_module):
+    with patch(f"{currency_module.__name__}.requests.get") as mock_get:
+        mock_get.side_effect = requests.RequestException("boom")
+        currency_module.prefetch_rates([("USD", "EUR")])
+
+def test_missing_api_key_is_reported_when_fetching(currency_module, monkeypatch):
+    monkeypatch.setenv("EXCHANGE_RATE_API_KEY", "")
+    with patch(f"{currency_module.__name__}.requests.get") as mock_get:
+        with pytest.raises(ValueError, match="EXCHANGE_RATE_API_KEY not found in environment variables"):
+            currency_module.convert_currency({"from_currency": "USD", "to_currency": "EUR", "amount": 100})
+        mock_get.assert_not_called()
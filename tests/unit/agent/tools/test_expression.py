@@ -0,0 +1,75 @@
+import sys
+import os
+import math
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools.calculator import calculate, EXPRESSION
+from agent.tools.expression import (
+    evaluate_expression, normalize_expression, expression_cache_stats, clear_expression_cache, MAX_EXPRESSION_LENGTH,
+)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_expression_cache()
+    yield
+    clear_expression_cache()
+
+def test_percent_of_and_division_round_like_calculator():
+    assert evaluate_expression("(12.5% of 243) + 10 / 3") == 33.71
+
+def test_operator_precedence_and_unary_minus():
+    assert evaluate_expression("2 + 3 * 4") == 14
+    assert evaluate_expression("-(2 + 3) * 2") == -10
+    assert evaluate_expression("2 × 3 ÷ 4") == 1.5
+    assert evaluate_expression("3 x 4") == 12
+    assert evaluate_expression("(1 + 2)x(3)") == 9
+
+def test_division_by_zero_is_infinite():
+    assert evaluate_expression("5 / 0") == math.inf
+
+def test_numbers_become_placeholders():
+    assert normalize_expression("(12.5% of 243) + 10 / 3") == ("(n0%n1)+n2/n3", (12.5, 243.0, 10.0, 3.0))
+
+def test_expressions_with_the_same_shape_share_a_compiled_template():
+    before = expression_cache_stats()
+    assert evaluate_expression("1 + 2 * 3") == 7
+    assert evaluate_expression("10 + 20 * 30") == 610
+    assert evaluate_expression("1.5 +2*  4") == 9.5
+    stats = expression_cache_stats()
+    assert stats["size"] == 1
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 2
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('echo hi')",
+    "abs(-1)",
+    "(1).real",
+    "2 ** 10",
+    "7 // 2",
+    "n0 + 1",
+    "1 if 1 else 2",
+    "[1, 2]",
+    "lambda: 1",
+    "1; 2",
+    "0x10",
+    "3x4",
+    "",
+])
+def test_rejects_anything_but_arithmetic(expression):
+    with pytest.raises(ValueError):
+        evaluate_expression(expression)
+
+def test_rejects_long_and_deeply_nested_expressions():
+    with pytest.raises(ValueError):
+        evaluate_expression("1+" * MAX_EXPRESSION_LENGTH + "1")
+    with pytest.raises(ValueError):
+        evaluate_expression("(" * 400 + "1" + ")" * 400)
+
+def test_calculator_evaluates_expressions():
+    assert calculate({EXPRESSION: "(12.5 % 243) + 10 / 3"}) == 33.71
+
+def test_calculator_reports_invalid_expressions():
+    assert calculate({EXPRESSION: "open('x')"}).startswith("Invalid values:")
@@ -3,11 +3,13 @@ from unittest.mock import mock_open, patch
 import json
 import os
 import sys
+import tempfile
 
 # Add src/ to sys.path so imports work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
 
-from agent.tools.knowledge_loader import load_knowledge_base, get_all_titles, search_titles_and_details, KNOWLEDGE_SOURCE, ENTRIES, TTILE, DETAIL
+from agent.tools import knowledge_loader
+from agent.tools.knowledge_loader import load_knowledge_base, get_all_titles, search_titles_and_details, rank_titles_and_details, shortlist_titles, reset_knowledge_index, KnowledgeIndex, KNOWLEDGE_SOURCE, ENTRIES, TTILE, DETAIL
 
 class TestKnowledgeBase(unittest.TestCase):
     def setUp(self):
@@ -21,6 +23,10 @@ class TestKnowledgeBase(unittest.TestCase):
         }
         self.sample_json = json.dumps(self.sample_knowledge_base)
         self.invalid_json = "{invalid json}"
+        reset_knowledge_index()
+
+    def tearDown(self):
+        reset_knowledge_index()
 
     @patch('builtins.open', new_callable=mock_open)
     def test_load_knowledge_base_success(self, mock_file):
@@ -32,7 +38,7 @@ class TestKnowledgeBase(unittest.TestCase):
         
         # Assert
         self.assertEqual(result, self.sample_knowledge_base)
-        mock_file.assert_called_once_with(os.path.join(os.path.dirname(KNOWLEDGE_SOURCE)), 'r')
+        mock_file.assert_called_once_with(KNOWLEDGE_SOURCE, 'r')
 
     @patch('builtins.open', new_callable=mock_open)
     def test_load_knowledge_base_file_not_found(self, mock_file):
@@ -163,4 +169,127 @@ class TestKnowledgeBase(unittest.TestCase):
         result = search_titles_and_details("Python Basics")
         
         # Assert
-        self.assertEqual(result, [])
\ No newline at end of file
+        self.assertEqual(result, [])
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_search_titles_and_details_with_title_list(self, mock_file):
+        # Arrange
+        mock_file.return_value.read.return_value = self.sample_json
+
+        # Act
+        result = search_titles_and_details(["Machine Learning", "Python Basics", "Unknown"])
+
+        # Assert
+        expected_result = [
+            {TTILE: "Python Basics", DETAIL: "Introduction to Python programming"},
+            {TTILE: "Machine Learning", DETAIL: "Basics of ML algorithms"}
+        ]
+        self.assertEqual(result, expected_result)
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_rank_titles_and_details(self, mock_file):
+        # Arrange
+        mock_file.return_value.read.return_value = self.sample_json
+
+        # Act
+        result = rank_titles_and_details("what are the basics of machine learning", top_k=2)
+
+        # Assert
+        self.assertEqual(result[0][TTILE], "Machine Learning")
+        self.assertEqual(len(result), 2)
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_rank_titles_and_details_no_match(self, mock_file):
+        # Arrange
+        mock_file.return_value.read.return_value = self.sample_json
+
+        # Act
+        result = rank_titles_and_details("quantum chromodynamics")
+
+        # Assert
+        self.assertEqual(result, [])
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_shortlist_titles(self, mock_file):
+        # Arrange
+        mock_file.return_value.read.return_value = self.sample_json
+
+        # Act
+        result = shortlist_titles("data science overview", limit=2)
+
+        # Assert
+        self.assertEqual(result[0][0], "Data Science")
+        self.assertTrue(0 < result[0][1] <= 1)
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_shortlist_titles_falls_back_to_trigrams(self, mock_file):
+        # Arrange
+        mock_file.return_value.read.return_value = self.sample_json
+
+        # Act
+        result = shortlist_titles("Machin Lerning", limit=1)
+
+        # Assert
+        self.assertEqual([title for title, _ in result], ["Machine Learning"])
+
+    def test_index_is_reused_until_file_changes(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "knowledge_base.json")
+            with open(source, "w") as f:
+                json.dump(self.sample_knowledge_base, f)
+
+            with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", source):
+                # Act
+                first_index = knowledge_loader.get_knowledge_index()
+                second_index = knowledge_loader.get_knowledge_index()
+
+                with open(source, "w") as f:
+                    json.dump({ENTRIES: [{TTILE: "Rust", DETAIL: "Systems programming"}]}, f)
+                stat = os.stat(source)
+                os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+                reloaded_titles = get_all_titles()
+
+        # Assert
+        self.assertIs(first_index, second_index)
+        self.assertEqual(reloaded_titles, ["Rust"])
+
+
+class TestKnowledgeIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = KnowledgeIndex([
+            {TTILE: "Ada Lovelace", DETAIL: "Early computing pioneer"},
+            {TTILE: "Alan Turing", DETAIL: "Father of theoretical computer science"},
+            {TTILE: "C++", DETAIL: "A programming language"},
+            {DETAIL: "Entry without title"}
+        ])
+
+    def test_find_titles_in_text(self):
+        self.assertEqual(self.index.find_titles_in_text("Who was Alan Turing?"), [1, 3])
+
+    def test_find_titles_in_text_requires_full_title(self):
+        self.assertNotIn(2, self.index.find_titles_in_text("Is C a language?"))
+        self.assertIn(2, self.index.find_titles_in_text("Is C++ a language?"))
+
+    def test_find_titles_in_text_requires_a_whole_word(self):
+        index = KnowledgeIndex([{TTILE: "Py", DETAIL: "Short for Python"}])
+        self.assertEqual(index.find_titles_in_text("Tell me about Python"), [])
+        self.assertEqual(index.find_titles_in_text("Is Py short for Python?"), [0])
+
+    def test_find_exact_titles(self):
+        self.assertEqual(self.index.find_exact_titles(["Alan Turing", "Ada Lovelace"]), [0, 1])
+
+    def test_top_k_prefers_title_matches(self):
+        ranked = self.index.top_k("computer pioneer Turing", k=2)
+        self.assertEqual([entry_id for entry_id, _ in ranked], [1, 0])
+
+    def test_score_bound_limits_scores(self):
+        query = "Alan Turing computer science"
+        for _, score in self.index.top_k(query, k=4):
+            self.assertLessEqual(score, self.index.score_bound(query))
+
+    def test_similar_titles_tolerates_typos(self):
+        self.assertEqual(self.index.similar_titles("Ada Lovlace", k=1)[0][0], 0)
+
+    def test_top_k_with_empty_index(self):
+        self.assertEqual(KnowledgeIndex([]).top_k("anything"), [])
@@ -0,0 +1,106 @@
+import sys
+import os
+import io
+import json
+import tracemalloc
+from unittest.mock import patch
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools import knowledge_loader, knowledge_reader
+from agent.tools.knowledge_reader import iter_json_entries, iter_jsonl_entries, iter_entries, append_entries
+
+ENTRIES = [
+    {"title": "Quote \" and bracket ]}", "detail": "Backslash \\ and escaped \\\" quote"},
+    {"title": "Café Müller", "detail": "Ünïcode ✓ [{"},
+    {"title": "Plain", "detail": "Nothing special"},
+]
+
+DOCUMENTS = [
+    {"entries": ENTRIES},
+    {"version": 2, "meta": {"tags": ["a", {"b": "}"}], "empty": {}}, "entries": ENTRIES, "after": [1.5e3, True, None]},
+    {"entries": []},
+    {},
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_streamed_entries_match_json_load(document, indent, chunk_size):
+    text = json.dumps(document, indent=indent, ensure_ascii=False)
+    with patch.object(knowledge_reader, "CHUNK_SIZE", chunk_size):
+        assert list(iter_json_entries(io.StringIO(text))) == json.loads(text).get("entries", [])
+
+SCALAR_DOCUMENTS = [
+    '{"entries": [1e5, 3]}',
+    '{"entries": [-12.5E-3, 0, 1.25e+10, true, false, null, "x"], "after": 2e2}',
+    '{"entries":[123456789,-0.5e1,1E2]}',
+]
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+@pytest.mark.parametrize("text", SCALAR_DOCUMENTS)
+def test_scalars_split_across_chunks_match_json_load(text, chunk_size):
+    with patch.object(knowledge_reader, "CHUNK_SIZE", chunk_size):
+        assert list(iter_json_entries(io.StringIO(text))) == json.loads(text)["entries"]
+
+@pytest.mark.parametrize("text", [
+    "{invalid json}",
+    "",
+    "[1, 2]",
+    '{"entries": [{"title": "a"}',
+    '{"entries": [{"title": "a"} {"title": "b"}]}',
+    '{"entries": [{"title": }]}',
+    '{"entries": [{"title": "a"}], "x": ',
+])
+def test_invalid_documents_raise(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_entries(io.StringIO(text)))
+
+def test_streaming_holds_one_entry_at_a_time(tmp_path):
+    path = tmp_path / "knowledge_base.json"
+    entries = [{"title": f"Title {index}", "detail": "detail " * 20} for index in range(60_000)]
+    path.write_text(json.dumps({"entries": entries}))
+    size = path.stat().st_size
+    del entries
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_entries(str(path)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 60_000
+    assert peak < size / 10
+
+def test_jsonl_entries_can_be_appended(tmp_path):
+    path = str(tmp_path / "knowledge_base.jsonl")
+    assert append_entries(path, ENTRIES[:2]) == 2
+    assert append_entries(path, ENTRIES[2:]) == 1
+    assert list(iter_entries(path)) == ENTRIES
+
+def test_append_after_last_line_without_newline(tmp_path):
+    path = tmp_path / "knowledge_base.jsonl"
+    path.write_text(json.dumps(ENTRIES[0]) + "\n\n" + json.dumps(ENTRIES[1]))
+    append_entries(str(path), ENTRIES[2:])
+    assert list(iter_entries(str(path))) == ENTRIES
+
+def test_invalid_jsonl_line_is_reported():
+    with pytest.raises(json.JSONDecodeError, match="line 2"):
+        list(iter_jsonl_entries(io.StringIO('{"title": "a"}\n{broken\n')))
+
+def test_knowledge_loader_reads_jsonl(tmp_path):
+    path = str(tmp_path / "knowledge_base.jsonl")
+    append_entries(path, ENTRIES)
+    knowledge_loader.reset_knowledge_index()
+    try:
+        with patch.object(knowledge_loader, "KNOWLEDGE_SOURCE", path):
+            assert knowledge_loader.load_knowledge_base() == {"entries": ENTRIES}
+            assert knowledge_loader.search_titles_and_details(["Plain"]) == [ENTRIES[2]]
+
+            append_entries(path, [{"title": "Appended", "detail": "Added later"}])
+            assert knowledge_loader.search_titles_and_details(["Appended"]) == [{"title": "Appended", "detail": "Added later"}]
+    finally:
+        knowledge_loader.reset_knowledge_index()
@@ -0,0 +1,142 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+import tempfile
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools import knowledge_loader
+from agent.tools.knowledge_loader import KnowledgeIndex, ENTRIES, TTILE, DETAIL, KNOWLEDGE_STORE_SETTING
+from agent.tools.knowledge_store import KnowledgeStore, KnowledgeStoreError, write_knowledge_store, convert
+from agent.tools.knowledge_reader import append_entries
+
+class TestKnowledgeStore(unittest.TestCase):
+    def setUp(self):
+        self.entries = [
+            {TTILE: "Python Basics", DETAIL: "Introduction to Python programming"},
+            {TTILE: "Data Science", DETAIL: "Overview of data science concepts"},
+            {TTILE: "Machine Learning", DETAIL: "Basics of ML algorithms"},
+            {TTILE: "Café Müller", DETAIL: "Ünïcode détails ✓"},
+            {TTILE: "Data Science", DETAIL: "A second entry with the same title"},
+            {TTILE: "", DETAIL: "Entry without a title"},
+        ]
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "knowledge_base.akb")
+        write_knowledge_store(self.entries, self.path)
+        self.store = KnowledgeStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_entries_round_trip(self):
+        self.assertEqual(len(self.store), len(self.entries))
+        self.assertEqual([self.store.entry(entry_id) for entry_id in range(len(self.store))], self.entries)
+        self.assertEqual(self.store.titles, [entry[TTILE] for entry in self.entries])
+
+    def test_find_exact_titles(self):
+        self.assertEqual(self.store.find_exact_titles(["Data Science", "Café Müller", "Missing", None]), [1, 3, 4])
+        self.assertEqual(self.store.find_exact_titles([""]), [5])
+        self.assertEqual(self.store.find_exact_titles([]), [])
+
+    def test_lookups_match_knowledge_index(self):
+        index = KnowledgeIndex(self.entries)
+        for text in ["Tell me about Data Science and Machine Learning", "café müller", "Café Müller!", "Data Sciences", "nothing"]:
+            self.assertEqual(self.store.find_titles_in_text(text), index.find_titles_in_text(text))
+        titles = ["Python Basics", "Data Science", "Unknown"]
+        self.assertEqual(self.store.find_exact_titles(titles), index.find_exact_titles(titles))
+
+    def test_ranking_matches_knowledge_index(self):
+        index = KnowledgeIndex(self.entries)
+        for query in ["data science overview", "python basics", "ML algorithms", "café", "nothing indexed", ""]:
+            self.assertEqual(self.store.top_k(query, 4), index.top_k(query, 4))
+            self.assertEqual(self.store.score_bound(query), index.score_bound(query))
+        self.assertEqual(self.store.similar_titles("Machin Lerning", 2), index.similar_titles("Machin Lerning", 2))
+        self.assertIsNone(self.store.postings("missing"))
+        self.assertEqual(list(self.store.postings("data")), [(1, 3), (4, 2)])
+
+    def test_shortlist_uses_configured_store(self):
+        knowledge_loader.reset_knowledge_store()
+        try:
+            with patch.dict(os.environ, {KNOWLEDGE_STORE_SETTING: self.path}), \
+                 patch.object(knowledge_loader, "get_knowledge_index", side_effect=AssertionError("JSON index used")):
+                shortlist = knowledge_loader.shortlist_titles("machine learning algorithms", 2)
+                ranked = knowledge_loader.rank_titles_and_details("machine learning algorithms", 1)
+        finally:
+            knowledge_loader.reset_knowledge_store()
+
+        self.assertEqual([title for title, _ in shortlist], ["Machine Learning"])
+        self.assertEqual(ranked, [self.entries[2]])
+
+    def test_entry_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.store.entry(len(self.entries))
+
+    def test_empty_store(self):
+        path = os.path.join(self.directory.name, "empty.akb")
+        self.assertEqual(write_knowledge_store([], path), 0)
+        with KnowledgeStore(path) as store:
+            self.assertEqual(len(store), 0)
+            self.assertEqual(store.find_exact_titles(["Data Science"]), [])
+            self.assertEqual(store.find_titles_in_text("Data Science"), [])
+            self.assertEqual(store.top_k("Data Science"), [])
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory.name, "knowledge_base.json")
+        with open(path, "w") as f:
+            json.dump({ENTRIES: self.entries}, f)
+        with self.assertRaises(KnowledgeStoreError):
+            KnowledgeStore(path)
+
+    def test_convert_from_json(self):
+        source = os.path.join(self.directory.name, "knowledge_base.json")
+        target = os.path.join(self.directory.name, "converted.akb")
+        with open(source, "w") as f:
+            json.dump({ENTRIES: self.entries}, f)
+
+        self.assertEqual(convert(source, target), len(self.entries))
+        with KnowledgeStore(target) as store:
+            self.assertEqual([store.entry(entry_id) for entry_id in range(len(store))], self.entries)
+
+    def test_convert_from_jsonl(self):
+        source = os.path.join(self.directory.name, "knowledge_base.jsonl")
+        target = os.path.join(self.directory.name, "converted.akb")
+        append_entries(source, self.entries)
+
+        self.assertEqual(convert(source, target), len(self.entries))
+        with KnowledgeStore(target) as store:
+            self.assertEqual([store.entry(entry_id) for entry_id in range(len(store))], self.entries)
+
+    def test_search_uses_configured_store(self):
+        knowledge_loader.reset_knowledge_store()
+        try:
+            with patch.dict(os.environ, {KNOWLEDGE_STORE_SETTING: self.path}), \
+                 patch.object(knowledge_loader, "get_knowledge_index", side_effect=AssertionError("JSON index used")):
+                result = knowledge_loader.search_titles_and_details(["Machine Learning"])
+        finally:
+            knowledge_loader.reset_knowledge_store()
+
+        self.assertEqual(result, [self.entries[2]])
+
+    def test_store_is_reopened_when_file_changes(self):
+        knowledge_loader.reset_knowledge_store()
+        try:
+            with patch.dict(os.environ, {KNOWLEDGE_STORE_SETTING: self.path}):
+                first = knowledge_loader.get_knowledge_store()
+                self.assertIs(knowledge_loader.get_knowledge_store(), first)
+
+                write_knowledge_store(self.entries[:2], self.path)
+                reopened = knowledge_loader.get_knowledge_store()
+        finally:
+            knowledge_loader.reset_knowledge_store()
+
+        self.assertIsNot(reopened, first)
+        self.assertEqual(len(reopened), 2)
+        # The replaced file stays readable through the old map
+        self.assertEqual(first.entry(3), self.entries[3])
+
+if __name__ == "__main__":
+    unittest.main()
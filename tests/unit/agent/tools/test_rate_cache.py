@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools.rate_cache import RateTableCache
+
+USD_RATES = {"USD": 1.0, "EUR": 0.8, "JPY": 150.0}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CountingFetch:
+    def __init__(self, tables=None):
+        self.tables = tables or {"USD": USD_RATES}
+        self.calls = []
+
+    def __call__(self, base):
+        self.calls.append(base)
+        return self.tables[base]
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_table_is_fetched_once_while_fresh(clock):
+    cache = RateTableCache(ttl_seconds=60, stale_seconds=10, clock=clock)
+    fetch = CountingFetch()
+
+    assert cache.get_rate("USD", "EUR", fetch) == 0.8
+    assert cache.get_rate("USD", "JPY", fetch) == 150.0
+    assert fetch.calls == ["USD"]
+
+def test_unknown_target_currency_returns_none(clock):
+    cache = RateTableCache(clock=clock)
+    assert cache.get_rate("USD", "XYZ", CountingFetch()) is None
+
+def test_cross_rate_uses_cached_base(clock):
+    cache = RateTableCache(clock=clock)
+    fetch = CountingFetch()
+    cache.get_rates("USD", fetch)
+
+    assert cache.get_rate("EUR", "JPY", fetch) == 187.5
+    assert fetch.calls == ["USD"]
+    assert cache.stats()["cross_rate_hits"] == 1
+
+def test_stale_table_is_served_and_refreshed_in_background(clock):
+    cache = RateTableCache(ttl_seconds=60, stale_seconds=30, clock=clock)
+    fetch = CountingFetch()
+    cache.get_rates("USD", fetch)
+    fetch.tables = {"USD": {"USD": 1.0, "EUR": 0.9}}
+    clock.now = 70
+
+    assert cache.get_rate("USD", "EUR", fetch) == 0.8
+    deadline = time.monotonic() + 1
+    while len(fetch.calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    time.sleep(0.01)
+
+    assert fetch.calls == ["USD", "USD"]
+    assert cache.get_rate("USD", "EUR", fetch) == 0.9
+    assert cache.stats()["stale_hits"] == 1
+
+def test_stale_table_is_not_used_for_cross_rates(clock):
+    cache = RateTableCache(ttl_seconds=60, stale_seconds=30, clock=clock)
+    fetch = CountingFetch({"USD": USD_RATES, "EUR": {"EUR": 1.0, "JPY": 190.0}})
+    cache.get_rates("USD", fetch)
+    clock.now = 70
+
+    assert cache.get_rate("EUR", "JPY", fetch) == 190.0
+    assert fetch.calls == ["USD", "EUR"]
+
+def test_expired_table_is_fetched_again(clock):
+    cache = RateTableCache(ttl_seconds=60, stale_seconds=30, clock=clock)
+    fetch = CountingFetch()
+    cache.get_rates("USD", fetch)
+    clock.now = 90
+
+    cache.get_rates("USD", fetch)
+    assert fetch.calls == ["USD", "USD"]
+
+def test_least_recently_used_base_is_evicted(clock):
+    cache = RateTableCache(max_bases=1, clock=clock)
+    fetch = CountingFetch({"USD": USD_RATES, "GBP": {"GBP": 1.0}})
+    cache.get_rates("USD", fetch)
+    cache.get_rates("GBP", fetch)
+    cache.get_rates("USD", fetch)
+
+    assert fetch.calls == ["USD", "GBP", "USD"]
+
+def test_concurrent_threads_trigger_one_fetch(clock):
+    cache = RateTableCache(clock=clock)
+    calls = []
+
+    def slow_fetch(base):
+        calls.append(base)
+        time.sleep(0.05)
+        return USD_RATES
+
+    threads = [threading.Thread(target=cache.get_rate, args=("USD", "EUR", slow_fetch)) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["USD"]
+
+def test_concurrent_tasks_trigger_one_fetch(clock):
+    cache = RateTableCache(clock=clock)
+    calls = []
+
+    async def slow_fetch(base):
+        calls.append(base)
+        await asyncio.sleep(0.01)
+        return USD_RATES
+
+    async def run():
+        return await asyncio.gather(*[cache.get_rate_async("USD", "EUR", slow_fetch) for _ in range(10_000)])
+
+    assert set(asyncio.run(run())) == {0.8}
+    assert calls == ["USD"]
+    assert cache.stats()["coalesced_fetches"] == 9_999
+
+def test_failed_fetch_is_raised(clock):
+    cache = RateTableCache(clock=clock)
+
+    def failing_fetch(base):
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError, match="down"):
+        cache.get_rates("USD", failing_fetch)
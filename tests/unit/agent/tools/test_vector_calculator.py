@@ -0,0 +1,73 @@
+import sys
+import os
+import math
+import random
+import numpy as np
+import pytest
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools.calculator import calculate, ROWS, OPERAND, OPERATOR_1, OPERATOR_2
+from agent.tools.vector_calculator import calculate_arrays, calculate_rows, evaluate, round_cents
+
+def test_rows_match_scalar_calculator():
+    generator = random.Random(7)
+    rows = [
+        {OPERAND: generator.choice("+-*/%"),
+         OPERATOR_1: round(generator.uniform(-1000, 1000), generator.randint(0, 3)),
+         OPERATOR_2: generator.choice([0, round(generator.uniform(-1000, 1000), generator.randint(0, 3))])}
+        for _ in range(20_000)
+    ]
+    assert calculate_rows(rows).to_list() == [calculate(row) for row in rows]
+
+def test_round_cents_matches_builtin_round_on_half_cents():
+    values = np.array([2.675, 1.005, 0.125, -0.375, 539.865])
+    assert round_cents(values).tolist() == [round(value, 2) for value in values.tolist()]
+
+def test_division_by_zero_is_infinite():
+    assert calculate_rows([{OPERAND: "/", OPERATOR_1: 5, OPERATOR_2: 0}]).to_list() == [math.inf]
+
+def test_errors_are_reported_as_masks():
+    # Act
+    result = calculate_rows([
+        {OPERAND: "+", OPERATOR_1: 1, OPERATOR_2: 2},
+        {OPERAND: "^", OPERATOR_1: 1, OPERATOR_2: 2},
+        {OPERAND: "+", OPERATOR_1: "abc", OPERATOR_2: 2},
+        {OPERAND: "+", OPERATOR_1: 1},
+    ])
+
+    # Assert
+    assert result.invalid_operand.tolist() == [False, True, False, False]
+    assert result.invalid_value.tolist() == [False, False, True, True]
+    assert result.errors.tolist() == [False, True, True, True]
+    assert np.isnan(result.values[1:]).all()
+    assert result.to_list() == [3.0, None, None, None]
+
+def test_rows_can_be_triples():
+    assert calculate_rows([("+", 1, 2), ("%", 20, 50), "junk"]).to_list() == [3.0, 10.0, None]
+
+def test_calculate_arrays_broadcasts_a_single_operand():
+    result = calculate_arrays("%", [10, 20, 12.5], 243)
+    assert result.values.tolist() == [24.3, 48.6, 30.38]
+    assert len(result) == 3
+
+def test_calculate_arrays_accepts_numeric_strings():
+    assert calculate_arrays(["+", "*"], ["1.5", "2"], [1, "3"]).to_list() == [2.5, 6.0]
+
+def test_empty_rows():
+    assert calculate_rows([]).to_list() == []
+
+def test_expression_tree_over_array_leaves():
+    # (12.5% of price) + 10 for every price
+    tree = {OPERAND: "+", OPERATOR_1: {OPERAND: "%", OPERATOR_1: 12.5, OPERATOR_2: [100, 200, 243]}, OPERATOR_2: 10}
+    assert evaluate(tree).to_list() == pytest.approx([22.5, 35.0, 40.38])
+
+def test_expression_tree_errors_propagate():
+    tree = {OPERAND: "+", OPERATOR_1: {OPERAND: "?", OPERATOR_1: 1, OPERATOR_2: [1, 2]}, OPERATOR_2: [10, "x"]}
+    result = evaluate(tree)
+    assert result.invalid_operand.tolist() == [True, True]
+    assert result.invalid_value.tolist() == [False, True]
+
+def test_calculator_rows_argument():
+    assert calculate({ROWS: [{OPERAND: "*", OPERATOR_1: 7, OPERATOR_2: 6}, {OPERAND: "/", OPERATOR_1: 1}]}) == [42.0, None]
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, Mock
 import os
+import datetime
 import sys
 import requests
 from dotenv import load_dotenv
@@ -8,7 +9,10 @@ from dotenv import load_dotenv
 # Add src/ to sys.path so imports work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
 
-from agent.tools.weather import get_weather_details, API_KEY, DATE, MAX_TEMPERATURE_IN_CELCIOUS, MIN_TEMPERATURE_IN_CELCIOUS, AVERAGE_TEMPERATURE_IN_CELCIOUS, WEATHER_CONDITION
+from agent import http_client
+from agent.stubs.upstream_server import UpstreamStubServer
+from agent.tools import weather
+from agent.tools.weather import get_weather_details, get_weather_details_async, API_KEY, DATE, MAX_TEMPERATURE_IN_CELCIOUS, MIN_TEMPERATURE_IN_CELCIOUS, AVERAGE_TEMPERATURE_IN_CELCIOUS, WEATHER_CONDITION
 
 class TestWeatherAPI(unittest.TestCase):
     def setUp(self):
@@ -17,6 +21,7 @@ class TestWeatherAPI(unittest.TestCase):
         self.api_key = os.getenv('WEATHER_API_KEY')
         if not self.api_key:
             self.skipTest("WEATHER_API_KEY not found in environment variables")
+        weather.WEATHER_CACHE.clear()
         
         # Sample valid input
         self.valid_args = {
@@ -159,4 +164,155 @@ class TestWeatherAPI(unittest.TestCase):
         # Act/Assert
         with self.assertRaises(ConnectionError) as cm:
             get_weather_details(self.valid_args)
-        self.assertTrue(str(cm.exception).startswith("Failed to fetch weather detail: 404 Client Error"))
\ No newline at end of file
+        self.assertTrue(str(cm.exception).startswith("Failed to fetch weather detail: 404 Client Error"))
+
+class TestWeatherCache(unittest.TestCase):
+    def setUp(self):
+        weather.WEATHER_CACHE.clear()
+        self.environment_patch = patch.dict(os.environ, {"WEATHER_API_KEY": "test-key"})
+        self.environment_patch.start()
+        self.valid_args = {
+            'city': 'London',
+            'from_date': '2023-01-01',
+            'to_date': '2023-01-02'
+        }
+        self.mock_response = {
+            'forecast': {
+                'forecastday': [
+                    {'date': date, 'day': {'maxtemp_c': 15.5, 'mintemp_c': 5.0, 'avgtemp_c': 10.2, 'condition': {'text': 'Sunny'}}}
+                    for date in ('2023-01-01', '2023-01-02')
+                ]
+            }
+        }
+
+    def tearDown(self):
+        self.environment_patch.stop()
+
+    @patch('agent.tools.weather.requests.get')
+    def test_cached_days_are_not_fetched_again(self, mock_get):
+        # Arrange
+        mock_get.return_value = Mock(status_code=200)
+        mock_get.return_value.json.return_value = self.mock_response
+
+        # Act
+        first_result = get_weather_details(self.valid_args)
+        second_result = get_weather_details({'city': 'LONDON', 'from_date': '2023-01-02', 'to_date': '2023-01-02'})
+
+        # Assert
+        self.assertEqual(second_result, first_result[1:])
+        mock_get.assert_called_once()
+
+    @patch('agent.tools.weather.requests.get')
+    def test_reversed_date_range(self, mock_get):
+        # Arrange
+        args = {'city': 'London', 'from_date': '2023-01-02', 'to_date': '2023-01-01'}
+
+        # Act
+        result = get_weather_details(args)
+
+        # Assert
+        self.assertEqual(result, "Error from system: from_date must not be after to_date")
+        mock_get.assert_not_called()
+
+class TestWeatherAPIAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        weather.WEATHER_CACHE.clear()
+        self.server = UpstreamStubServer().start()
+        self.base_url_patch = patch.object(weather, "BASE_URL", self.server.weather_url)
+        self.base_url_patch.start()
+        self.environment_patch = patch.dict(os.environ, {"WEATHER_API_KEY": "test-key"})
+        self.environment_patch.start()
+        self.valid_args = {
+            'city': 'London',
+            'from_date': '2023-01-01',
+            'to_date': '2023-01-03'
+        }
+
+    async def asyncTearDown(self):
+        await http_client.aclose()
+
+    def tearDown(self):
+        self.environment_patch.stop()
+        self.base_url_patch.stop()
+        self.server.stop()
+
+    async def test_successful_weather_fetch(self):
+        # Act
+        result = await get_weather_details_async(self.valid_args)
+
+        # Assert
+        self.assertEqual([day[DATE] for day in result], ['2023-01-01', '2023-01-02', '2023-01-03'])
+        self.assertLess(result[0][MIN_TEMPERATURE_IN_CELCIOUS], result[0][MAX_TEMPERATURE_IN_CELCIOUS])
+        self.assertEqual(self.server.request_count, 1)
+
+    async def test_overlapping_range_fetches_only_missing_days(self):
+        # Act
+        await get_weather_details_async(self.valid_args)
+        result = await get_weather_details_async({'city': 'london ', 'from_date': '2022-12-30', 'to_date': '2023-01-05'})
+
+        # Assert
+        self.assertEqual(len(result), 7)
+        self.assertEqual([day[DATE] for day in result][:3], ['2022-12-30', '2022-12-31', '2023-01-01'])
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(sorted(path.split('&dt=')[1] for path in self.server.paths[1:]), [
+            '2022-12-30&end_dt=2022-12-31', '2023-01-04&end_dt=2023-01-05'
+        ])
+
+    async def test_prefetch_merges_overlapping_ranges(self):
+        # Act
+        weather.prefetch_weather_details([
+            {'city': 'London', 'from_date': '2023-01-01', 'to_date': '2023-01-03'},
+            {'city': 'london', 'from_date': '2023-01-04', 'to_date': '2023-01-05'},
+            {'city': 'Paris', 'from_date': '2023-01-01', 'to_date': '2023-01-01'},
+            {'city': 'Nowhere'},
+        ])
+        result = await get_weather_details_async({'city': 'London', 'from_date': '2023-01-02', 'to_date': '2023-01-05'})
+
+        # Assert
+        self.assertEqual(len(result), 4)
+        self.assertEqual(self.server.request_count, 2)
+
+    async def test_prefetch_skips_days_too_recent_to_cache(self):
+        today = datetime.date.today()
+        recent = {'city': 'Paris', 'from_date': (today - datetime.timedelta(days=4)).isoformat(), 'to_date': today.isoformat()}
+        only_recent = {'city': 'Rome', 'from_date': (today - datetime.timedelta(days=1)).isoformat(), 'to_date': today.isoformat()}
+
+        # Act
+        weather.prefetch_weather_details([recent, only_recent])
+        self.assertEqual(self.server.request_count, 1)
+        self.assertTrue(self.server.paths[0].endswith(f"end_dt={(today - datetime.timedelta(days=2)).isoformat()}"))
+        await get_weather_details_async(recent)
+        await get_weather_details_async(only_recent)
+
+        # Assert: the recent days were fetched once, by the requests themselves
+        self.assertEqual(self.server.request_count, 3)
+
+    async def test_missing_api_key(self):
+        # Arrange
+        with patch.dict(os.environ, {"WEATHER_API_KEY": ""}):
+            # Act
+            result = await get_weather_details_async(self.valid_args)
+
+        # Assert
+        self.assertEqual(result, "Error from system: WEATHER_API_KEY not found in environment variables")
+        self.assertEqual(self.server.request_count, 0)
+
+    async def test_missing_city(self):
+        # Arrange
+        args = self.valid_args.copy()
+        args.pop('city')
+
+        # Act
+        result = await get_weather_details_async(args)
+
+        # Assert
+        self.assertTrue(result.startswith("Error from system: Missing required parameters"))
+        self.assertEqual(self.server.request_count, 0)
+
+    async def test_api_bad_status_code(self):
+        # Arrange
+        with patch.object(weather, "BASE_URL", self.server.url + "/missing"):
+            # Act/Assert
+            with self.assertRaises(ConnectionError) as cm:
+                await get_weather_details_async(self.valid_args)
+        self.assertTrue(str(cm.exception).startswith("Failed to fetch weather detail"))
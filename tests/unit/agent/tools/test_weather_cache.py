@@ -0,0 +1,106 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../src")))
+
+from agent.tools.weather_cache import WeatherHistoryCache, normalize_city, date_range
+
+TODAY = datetime.date(2024, 6, 30)
+
+def day_info(date):
+    return {"date": date, "average_temperature_in_celcious": 20.0}
+
+class TestWeatherHistoryCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = WeatherHistoryCache(today=lambda: TODAY)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_normalize_city(self):
+        self.assertEqual(normalize_city("  New   York "), "new york")
+
+    def test_date_range_is_inclusive(self):
+        self.assertEqual(date_range(datetime.date(2024, 1, 30), datetime.date(2024, 2, 1)), [
+            datetime.date(2024, 1, 30), datetime.date(2024, 1, 31), datetime.date(2024, 2, 1)
+        ])
+
+    def test_stored_days_are_returned_for_any_city_spelling(self):
+        # Arrange
+        self.cache.store_days("Paris", [day_info("2024-01-01"), day_info("2024-01-02")], "date")
+
+        # Act
+        days = self.cache.get_days(" PARIS", datetime.date(2024, 1, 1), datetime.date(2024, 1, 3))
+
+        # Assert
+        self.assertEqual(sorted(days), ["2024-01-01", "2024-01-02"])
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1, "upstream_requests": 0})
+
+    def test_counters_are_not_lost_across_threads(self):
+        # Act
+        with ThreadPoolExecutor(8) as pool:
+            for _ in range(8):
+                pool.submit(lambda: [self.cache.record_upstream_request() for _ in range(1000)])
+
+        # Assert
+        self.assertEqual(self.cache.stats()["upstream_requests"], 8000)
+
+    def test_recent_days_are_not_cached(self):
+        # Arrange
+        self.cache.store_days("Paris", [day_info("2024-06-28"), day_info("2024-06-29")], "date")
+
+        # Act
+        days = self.cache.get_days("Paris", datetime.date(2024, 6, 28), datetime.date(2024, 6, 29))
+
+        # Assert
+        self.assertEqual(list(days), ["2024-06-28"])
+
+    def test_missing_ranges(self):
+        # Arrange
+        cached = {"2024-01-02": {}, "2024-01-03": {}, "2024-01-06": {}}
+
+        # Act
+        ranges = self.cache.missing_ranges(datetime.date(2024, 1, 1), datetime.date(2024, 1, 8), cached)
+
+        # Assert
+        self.assertEqual(ranges, [
+            (datetime.date(2024, 1, 1), datetime.date(2024, 1, 1)),
+            (datetime.date(2024, 1, 4), datetime.date(2024, 1, 5)),
+            (datetime.date(2024, 1, 7), datetime.date(2024, 1, 8)),
+        ])
+
+    def test_missing_ranges_when_fully_cached(self):
+        cached = {"2024-01-01": {}, "2024-01-02": {}}
+        self.assertEqual(self.cache.missing_ranges(datetime.date(2024, 1, 1), datetime.date(2024, 1, 2), cached), [])
+
+    def test_returned_days_are_copies(self):
+        # Arrange
+        self.cache.store_days("Paris", [day_info("2024-01-01")], "date")
+
+        # Act
+        self.cache.get_days("Paris", datetime.date(2024, 1, 1), datetime.date(2024, 1, 1))["2024-01-01"]["date"] = "changed"
+
+        # Assert
+        days = self.cache.get_days("Paris", datetime.date(2024, 1, 1), datetime.date(2024, 1, 1))
+        self.assertEqual(days["2024-01-01"]["date"], "2024-01-01")
+
+    def test_sqlite_tier_survives_new_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, "weather.sqlite3")
+            first_cache = WeatherHistoryCache(database_path=database_path, today=lambda: TODAY)
+            first_cache.store_days("London", [day_info("2024-02-01")], "date")
+            first_cache.close()
+
+            second_cache = WeatherHistoryCache(database_path=database_path, today=lambda: TODAY)
+            days = second_cache.get_days("london", datetime.date(2024, 2, 1), datetime.date(2024, 2, 2))
+            second_cache.clear()
+            cleared_days = second_cache.get_days("london", datetime.date(2024, 2, 1), datetime.date(2024, 2, 1))
+            second_cache.close()
+
+        self.assertEqual(days, {"2024-02-01": day_info("2024-02-01")})
+        self.assertEqual(cleared_days, {})
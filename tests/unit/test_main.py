@@ -0,0 +1,77 @@
+import io
+import json
+import os
+import sys
+from unittest.mock import patch
+
+# Add src/ to sys.path so imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+import main
+
+def test_parse_batch_line_plain_text():
+    assert main.parse_batch_line("What is 2 + 2?") == {"query": "What is 2 + 2?"}
+
+def test_parse_batch_line_json_record():
+    assert main.parse_batch_line('{"id": 3, "query": "Who is Ada?"}') == {"id": 3, "query": "Who is Ada?"}
+
+def test_parse_batch_line_json_string():
+    assert main.parse_batch_line('"Who is Ada?"') == {"query": "Who is Ada?"}
+
+def test_parse_batch_line_invalid_json_is_plain_text():
+    assert main.parse_batch_line("{not json") == {"query": "{not json"}
+
+def test_run_batch_streams_ordered_jsonl():
+    stdin = io.StringIO('first\n\n{"id": 2, "query": "second"}\nthird\n')
+    stdout = io.StringIO()
+
+    def answer(user_queries, concurrency, group_tool_calls, return_exceptions):
+        for user_query in user_queries:
+            print("diagnostic output")
+            yield ValueError("bad query") if user_query == "third" else user_query.upper()
+
+    with patch.object(main, "process_user_queries", side_effect=answer), \
+            patch.object(sys, "stdin", stdin), patch.object(sys, "stdout", stdout):
+        main.run_batch(["--concurrency", "2"])
+
+    assert [json.loads(line) for line in stdout.getvalue().splitlines()] == [
+        {"query": "first", "result": "FIRST"},
+        {"id": 2, "query": "second", "result": "SECOND"},
+        {"query": "third", "error": "bad query"},
+    ]
+
+def test_generate_result_prints_chunks_as_they_arrive():
+    stdout = io.StringIO()
+    written = []
+
+    def answer(user_query):
+        for chunk in ["It ", "is ", "sunny."]:
+            written.append(stdout.getvalue())
+            yield chunk
+
+    with patch.object(main, "stream_user_query", side_effect=answer), \
+            patch.object(sys, "argv", ["main.py", "weather", "in", "Dhaka"]), patch.object(sys, "stdout", stdout):
+        main.generate_result()
+
+    assert written == ["", "It ", "It is "]
+    assert stdout.getvalue() == "It is sunny.\n"
+
+def test_trace_stats_flag_prints_stage_latencies():
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    def answer(user_query):
+        with main.tracing.span("planner"):
+            yield user_query
+
+    main.tracing.reset_stats()
+    with patch.object(main, "stream_user_query", side_effect=answer), \
+            patch.object(sys, "argv", ["main.py", "--trace-stats", "hello"]), \
+            patch.object(sys, "stdout", stdout), patch.object(sys, "stderr", stderr):
+        main.main()
+    main.tracing.reset_stats()
+
+    assert stdout.getvalue() == "hello\n"
+    assert stderr.getvalue().splitlines()[0].split()[0] == "stage"
+    assert stderr.getvalue().splitlines()[1].split()[:2] == ["planner", "1"]
+    assert not main.tracing.is_enabled()